@@ -23,7 +23,10 @@ from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, Tool
 
 from app.agents.base.agent_config import AgentConfig, AgentType, ModelProvider
 from app.agents.base.context_loader import ContextLoader, AgentContext
+from app.services.llm_scheduler import RequestPriority
 from app.services.llm_service import llm_service, LLMConfig, LLMResponse, LLMProvider, calculate_cost
+from app.services.prompt_cache import prompt_prefix_tracker, extract_cache_usage
+from app.services.token_budget import BudgetReport
 from app.services.privacy_middleware import PrivacyMiddleware, PrivacyBlockedException, check_ai_allowed
 from app.database import get_db
 
@@ -42,6 +45,8 @@ class AgentResult:
     usage: Dict[str, int] = field(default_factory=dict)
     cost: float = 0.0
     execution_time_ms: int = 0
+    prompt_cache: Dict[str, Any] = field(default_factory=dict)  # Prefix reuse stats
+    context_budget: Dict[str, Any] = field(default_factory=dict)  # Per-section token usage
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary"""
@@ -53,7 +58,9 @@ class AgentResult:
             "teaching_points": self.teaching_points,
             "usage": self.usage,
             "cost": self.cost,
-            "execution_time_ms": self.execution_time_ms
+            "execution_time_ms": self.execution_time_ms,
+            "prompt_cache": self.prompt_cache,
+            "context_budget": self.context_budget,
         }
 
 
@@ -161,8 +168,20 @@ class BaseMaxwellAgent(ABC):
             manuscript_weight=self.config.manuscript_context_weight
         )
 
-    def _format_system_prompt(self, context: Optional[AgentContext] = None) -> str:
-        """Format the full system prompt with context"""
+    def _format_system_prompt(
+        self,
+        context: Optional[AgentContext] = None,
+        focus_text: str = ""
+    ) -> str:
+        """
+        Format the full system prompt with context
+
+        Ordered from most to least stable (agent instructions, teaching and
+        response format, then hierarchical context) so the whole system prompt
+        forms a reusable prefix for provider prompt caching. Volatile content
+        (the text under analysis) belongs in the user message; it only steers
+        which context items survive when the token budget is exceeded.
+        """
         parts = [self.system_prompt]
 
         # Add custom prompt if configured
@@ -180,11 +199,6 @@ You are a writing mentor, not just an analyzer. For each issue or suggestion:
 3. Reference established writing craft principles when relevant
 4. Be encouraging - highlight what works well too""")
 
-        # Add context if provided
-        if context:
-            context_text = context.to_prompt_context(self.config.max_context_tokens)
-            parts.append(f"\n\n{context_text}")
-
         # Add response format instruction
         if self.config.response_format == "json":
             parts.append("""
@@ -219,6 +233,15 @@ Respond with valid JSON matching this schema:
   "overall_assessment": "string"
 }""")
 
+        # Context goes last: it varies per manuscript, while everything above is
+        # identical for every call to this agent type
+        if context:
+            context_text = context.to_prompt_context(
+                self.config.max_context_tokens,
+                focus_text=focus_text
+            )
+            parts.append(f"\n\n{context_text}")
+
         return "\n".join(parts)
 
     async def analyze(
@@ -276,17 +299,19 @@ Respond with valid JSON matching this schema:
             )
 
             # Build prompt
-            system_prompt = self._format_system_prompt(context)
+            system_prompt = self._format_system_prompt(context, focus_text=text)
 
             # Build user message
             user_content = f"Please analyze the following text:\n\n---\n{text}\n---"
             if additional_context:
                 user_content += f"\n\nAdditional context:\n{additional_context}"
 
+            # The system prompt is the cacheable prefix shared across calls
             messages = [
-                {"role": "system", "content": system_prompt},
+                {"role": "system", "content": system_prompt, "cache": True},
                 {"role": "user", "content": user_content}
             ]
+            prefix_stats = prompt_prefix_tracker.record(system_prompt)
 
             # Check if we have tools to use
             tools = self.get_tools()
@@ -308,12 +333,19 @@ Respond with valid JSON matching this schema:
             self._total_tokens += result.usage.get("total_tokens", 0)
 
             # Parse response
-            return self._parse_response(
+            agent_result = self._parse_response(
                 result.content,
                 result.usage,
                 result.cost,
                 execution_time
             )
+            prefix_stats.prompt_tokens = result.usage.get("prompt_tokens", 0)
+            prefix_stats.cached_prompt_tokens = result.usage.get("cached_prompt_tokens", 0)
+            prefix_stats.cache_write_tokens = result.usage.get("cache_creation_tokens", 0)
+            agent_result.prompt_cache = prefix_stats.to_dict()
+            if isinstance(getattr(context, "budget_report", None), BudgetReport):
+                agent_result.context_budget = context.budget_report.to_dict()
+            return agent_result
 
         except Exception as e:
             execution_time = int(
@@ -330,9 +362,15 @@ Respond with valid JSON matching this schema:
                 execution_time_ms=execution_time
             )
 
-    async def _run_direct(self, messages: List[Dict[str, str]]) -> LLMResponse:
-        """Run direct LLM call without tools"""
+    async def _run_direct(
+        self,
+        messages: List[Dict[str, str]],
+        priority: Optional[RequestPriority] = None
+    ) -> LLMResponse:
+        """Run direct LLM call without tools (optionally at another scheduling priority)"""
         config = self._build_llm_config()
+        if priority is not None:
+            config.priority = priority
         return await llm_service.generate(config, messages)
 
     async def _run_with_tools(
@@ -361,14 +399,16 @@ Respond with valid JSON matching this schema:
             )
             return await self._run_with_tools_fallback(messages, tools)
 
-        # Convert dict messages to LangChain message objects
-        lc_messages = llm_service.convert_messages(messages)
+        # Convert dict messages to LangChain message objects (with cache markers)
+        lc_messages = llm_service.convert_messages(messages, config)
 
         total_prompt_tokens = 0
         total_completion_tokens = 0
+        total_cached_tokens = 0
+        total_cache_write_tokens = 0
 
         for iteration in range(max_iterations + 1):
-            response = await model_with_tools.ainvoke(lc_messages)
+            response = await llm_service.invoke_model(config, model_with_tools, lc_messages)
 
             # Accumulate usage from response metadata
             if hasattr(response, "response_metadata"):
@@ -377,6 +417,11 @@ Respond with valid JSON matching this schema:
                 total_prompt_tokens += usage.get("prompt_tokens", 0) or usage.get("input_tokens", 0)
                 total_completion_tokens += usage.get("completion_tokens", 0) or usage.get("output_tokens", 0)
 
+            # Every iteration resends the same prefix, so each can hit the cache
+            cache_read, cache_write = extract_cache_usage(response)
+            total_cached_tokens += cache_read
+            total_cache_write_tokens += cache_write
+
             # If no tool calls, we're done
             if not hasattr(response, "tool_calls") or not response.tool_calls:
                 break
@@ -424,15 +469,20 @@ Respond with valid JSON matching this schema:
             config.model, total_prompt_tokens, total_completion_tokens
         )
 
+        usage = {
+            "prompt_tokens": total_prompt_tokens,
+            "completion_tokens": total_completion_tokens,
+            "total_tokens": total_tokens,
+        }
+        if total_cached_tokens or total_cache_write_tokens:
+            usage["cached_prompt_tokens"] = total_cached_tokens
+            usage["cache_creation_tokens"] = total_cache_write_tokens
+
         return LLMResponse(
             content=content,
             model=config.model,
             provider=LLMProvider(config.provider.value),
-            usage={
-                "prompt_tokens": total_prompt_tokens,
-                "completion_tokens": total_completion_tokens,
-                "total_tokens": total_tokens,
-            },
+            usage=usage,
             cost=cost,
             raw_response=response,
         )
@@ -535,7 +585,7 @@ Respond with valid JSON matching this schema:
         """
         # Build messages
         system_prompt = self._format_system_prompt(context)
-        messages = [{"role": "system", "content": system_prompt}]
+        messages = [{"role": "system", "content": system_prompt, "cache": True}]
 
         # Add history
         if history:
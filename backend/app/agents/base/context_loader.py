@@ -6,6 +6,12 @@ Loads context from the four-level hierarchy:
 2. World Context (shared across universe)
 3. Series Context (shared within series)
 4. Manuscript Context (current work)
+
+Each level breaks into small ranked items that AgentContext packs into a
+token budget (see app.services.token_budget). Which items each level lists
+(and their order) never depends on the text under analysis, so the rendered
+context is a stable, cacheable prefix; focus text only ranks the items, which
+decides what is dropped when the budget is exceeded.
 """
 
 from dataclasses import dataclass, field
@@ -19,6 +25,21 @@ from app.models.manuscript import Manuscript, Chapter
 from app.models.entity import Entity, Relationship, ENTITY_SCOPE_MANUSCRIPT, ENTITY_SCOPE_SERIES, ENTITY_SCOPE_WORLD
 from app.models.timeline import TimelineEvent
 from app.models.outline import Outline, PlotBeat
+from app.services.token_budget import (
+    BudgetReport,
+    ContextItem,
+    ContextSection,
+    PackedContext,
+    pack_sections,
+    render_section,
+)
+
+
+def _mentions(focus: str, *names: Any) -> bool:
+    """Whether any of the names appears in the (lowercased) focus text"""
+    if not focus:
+        return False
+    return any(isinstance(n, str) and len(n) > 2 and n.lower() in focus for n in names)
 
 
 @dataclass
@@ -34,42 +55,41 @@ class AuthorContext:
     feedback_patterns: List[Dict[str, Any]] = field(default_factory=list)
     learning_history: List[Dict[str, Any]] = field(default_factory=list)
 
+    def to_context_section(self, weight: float = 1.0, focus: str = "") -> ContextSection:
+        """Break into rankable items; earlier strengths/weaknesses rank higher"""
+        items = []
+
+        for metric, value in self.style_metrics.items():
+            items.append(ContextItem(f"- {metric}: {value}", 0.6, "\n### Writing Style Metrics"))
+
+        for i, s in enumerate(self.strengths[:5]):
+            items.append(ContextItem(f"- {s}", 0.8 - 0.05 * i, "\n### Strengths"))
+
+        for i, w in enumerate(self.weaknesses[:5]):
+            items.append(ContextItem(f"- {w}", 0.9 - 0.05 * i, "\n### Areas for Improvement"))
+
+        for key, value in list(self.preferences.items())[:10]:
+            items.append(ContextItem(f"- {key}: {value}", 0.4, "\n### Preferences"))
+
+        top_overused = sorted(
+            self.overused_words.items(),
+            key=lambda x: x[1],
+            reverse=True
+        )[:5]
+        for i, (word, count) in enumerate(top_overused):
+            relevance = 0.9 if _mentions(focus, word) else 0.7 - 0.05 * i
+            items.append(ContextItem(f"- \"{word}\" (used {count}x)", relevance, "\n### Watch Words (overused)"))
+
+        return ContextSection(
+            name="author",
+            header=f"## Author Profile (User: {self.user_id})",
+            items=items,
+            weight=weight,
+        )
+
     def to_prompt_context(self) -> str:
         """Convert to text suitable for prompt injection"""
-        parts = [f"## Author Profile (User: {self.user_id})"]
-
-        if self.style_metrics:
-            parts.append("\n### Writing Style Metrics")
-            for metric, value in self.style_metrics.items():
-                parts.append(f"- {metric}: {value}")
-
-        if self.strengths:
-            parts.append("\n### Strengths")
-            for s in self.strengths[:5]:
-                parts.append(f"- {s}")
-
-        if self.weaknesses:
-            parts.append("\n### Areas for Improvement")
-            for w in self.weaknesses[:5]:
-                parts.append(f"- {w}")
-
-        if self.preferences:
-            parts.append("\n### Preferences")
-            for key, value in list(self.preferences.items())[:10]:
-                parts.append(f"- {key}: {value}")
-
-        if self.overused_words:
-            top_overused = sorted(
-                self.overused_words.items(),
-                key=lambda x: x[1],
-                reverse=True
-            )[:5]
-            if top_overused:
-                parts.append("\n### Watch Words (overused)")
-                for word, count in top_overused:
-                    parts.append(f"- \"{word}\" (used {count}x)")
-
-        return "\n".join(parts)
+        return render_section(self.to_context_section())
 
 
 @dataclass
@@ -83,47 +103,48 @@ class WorldContext:
     rules: List[str] = field(default_factory=list)  # Magic systems, laws of physics, etc.
     cultures: List[Dict[str, Any]] = field(default_factory=list)
 
-    def to_prompt_context(self) -> str:
-        """Convert to text suitable for prompt injection"""
-        parts = [f"## World: {self.name}"]
+    def to_context_section(self, weight: float = 1.0, focus: str = "") -> ContextSection:
+        """Break into rankable items; entities and cultures named in the focus are dropped last"""
+        items = []
 
         if self.description:
-            parts.append(f"\n{self.description}")
-
-        if self.settings:
-            parts.append("\n### World Settings")
-            for key, value in self.settings.items():
-                if isinstance(value, dict):
-                    parts.append(f"\n#### {key}")
-                    for k, v in value.items():
-                        parts.append(f"- {k}: {v}")
-                else:
-                    parts.append(f"- {key}: {value}")
-
-        if self.rules:
-            parts.append("\n### World Rules")
-            for rule in self.rules[:10]:
-                parts.append(f"- {rule}")
-
-        if self.cultures:
-            parts.append(f"\n### Cultures ({len(self.cultures)} total)")
-            for culture in self.cultures[:10]:
-                line = f"- {culture.get('title')}"
-                sd = culture.get('structured_data', {})
-                if sd.get('values'):
-                    line += f" — Values: {', '.join(sd['values'][:3])}"
-                if sd.get('taboos'):
-                    line += f" | Taboos: {', '.join(sd['taboos'][:3])}"
-                parts.append(line)
-                if culture.get('member_count', 0) > 0:
-                    parts.append(f"  Members: {culture['member_count']}")
-
-        if self.world_entities:
-            parts.append(f"\n### World Entities ({len(self.world_entities)} total)")
-            for entity in self.world_entities[:15]:
-                parts.append(f"- {entity.get('name')} ({entity.get('type')})")
-
-        return "\n".join(parts)
+            items.append(ContextItem(f"\n{self.description}", 1.0, truncatable=True))
+
+        for key, value in self.settings.items():
+            if isinstance(value, dict):
+                lines = [f"\n#### {key}"] + [f"- {k}: {v}" for k, v in value.items()]
+                items.append(ContextItem("\n".join(lines), 0.6, "\n### World Settings"))
+            else:
+                items.append(ContextItem(f"- {key}: {value}", 0.6, "\n### World Settings"))
+
+        for rule in self.rules[:10]:
+            items.append(ContextItem(f"- {rule}", 0.9, "\n### World Rules"))
+
+        for culture in self.cultures[:10]:
+            line = f"- {culture.get('title')}"
+            sd = culture.get('structured_data', {})
+            if sd.get('values'):
+                line += f" — Values: {', '.join(sd['values'][:3])}"
+            if sd.get('taboos'):
+                line += f" | Taboos: {', '.join(sd['taboos'][:3])}"
+            if culture.get('member_count', 0) > 0:
+                line += f"\n  Members: {culture['member_count']}"
+            relevance = 0.9 if _mentions(focus, culture.get('title')) else 0.5
+            items.append(ContextItem(line, relevance, f"\n### Cultures ({len(self.cultures)} total)"))
+
+        for entity in self.world_entities[:15]:
+            relevance = 1.0 if _mentions(focus, entity.get('name')) else 0.5
+            items.append(ContextItem(
+                f"- {entity.get('name')} ({entity.get('type')})",
+                relevance,
+                f"\n### World Entities ({len(self.world_entities)} total)",
+            ))
+
+        return ContextSection(name="world", header=f"## World: {self.name}", items=items, weight=weight)
+
+    def to_prompt_context(self) -> str:
+        """Convert to text suitable for prompt injection"""
+        return render_section(self.to_context_section())
 
 
 @dataclass
@@ -137,29 +158,36 @@ class SeriesContext:
     character_arcs: List[Dict[str, Any]] = field(default_factory=list)
     recurring_themes: List[str] = field(default_factory=list)
 
-    def to_prompt_context(self) -> str:
-        """Convert to text suitable for prompt injection"""
-        parts = [f"## Series: {self.name}"]
+    def to_context_section(self, weight: float = 1.0, focus: str = "") -> ContextSection:
+        """Break into rankable items; arcs of characters named in the focus are dropped last"""
+        items = []
 
         if self.description:
-            parts.append(f"\n{self.description}")
+            items.append(ContextItem(f"\n{self.description}", 0.9, truncatable=True))
 
-        if self.manuscripts:
-            parts.append(f"\n### Books in Series ({len(self.manuscripts)})")
-            for ms in self.manuscripts:
-                parts.append(f"- {ms.get('order_index', 0) + 1}. {ms.get('title')} ({ms.get('word_count', 0)} words)")
+        for ms in self.manuscripts:
+            items.append(ContextItem(
+                f"- {ms.get('order_index', 0) + 1}. {ms.get('title')} ({ms.get('word_count', 0)} words)",
+                0.6,
+                f"\n### Books in Series ({len(self.manuscripts)})",
+            ))
 
-        if self.character_arcs:
-            parts.append("\n### Character Arcs Across Series")
-            for arc in self.character_arcs[:5]:
-                parts.append(f"- {arc.get('character')}: {arc.get('arc_summary', 'No summary')}")
+        for arc in self.character_arcs[:5]:
+            relevance = 1.0 if _mentions(focus, arc.get('character')) else 0.7
+            items.append(ContextItem(
+                f"- {arc.get('character')}: {arc.get('arc_summary', 'No summary')}",
+                relevance,
+                "\n### Character Arcs Across Series",
+            ))
 
-        if self.recurring_themes:
-            parts.append("\n### Recurring Themes")
-            for theme in self.recurring_themes[:5]:
-                parts.append(f"- {theme}")
+        for theme in self.recurring_themes[:5]:
+            items.append(ContextItem(f"- {theme}", 0.6, "\n### Recurring Themes"))
 
-        return "\n".join(parts)
+        return ContextSection(name="series", header=f"## Series: {self.name}", items=items, weight=weight)
+
+    def to_prompt_context(self) -> str:
+        """Convert to text suitable for prompt injection"""
+        return render_section(self.to_context_section())
 
 
 @dataclass
@@ -175,47 +203,73 @@ class ManuscriptContext:
     outline: Optional[Dict[str, Any]] = None
     current_position: Optional[Dict[str, Any]] = None  # Current chapter, beat, etc.
 
-    def to_prompt_context(self) -> str:
-        """Convert to text suitable for prompt injection"""
-        parts = [f"## Current Manuscript: {self.title}"]
+    def to_context_section(self, weight: float = 1.0, focus: str = "") -> ContextSection:
+        """
+        Break into rankable items.
+
+        Chapters near the current position and entities named in the focus
+        text rank higher, so they are dropped last when over budget.
+        """
+        items = []
 
         if self.description:
-            parts.append(f"\n{self.description}")
+            items.append(ContextItem(f"\n{self.description}", 1.0, truncatable=True))
 
-        parts.append(f"\nWord Count: {self.word_count}")
+        items.append(ContextItem(f"\nWord Count: {self.word_count}", 1.0))
 
         if self.current_position:
-            parts.append("\n### Current Position")
             for key, value in self.current_position.items():
-                parts.append(f"- {key}: {value}")
-
-        if self.chapters:
-            parts.append(f"\n### Chapters ({len(self.chapters)} total)")
-            for ch in self.chapters[:20]:
-                status = "folder" if ch.get("is_folder") else f"{ch.get('word_count', 0)} words"
-                parts.append(f"- {ch.get('title')} ({status})")
-
-        if self.entities:
-            parts.append(f"\n### Entities ({len(self.entities)} total)")
-            by_type: Dict[str, List[str]] = {}
-            for e in self.entities:
-                t = e.get("type", "OTHER")
-                if t not in by_type:
-                    by_type[t] = []
-                by_type[t].append(e.get("name", "Unknown"))
-
-            for entity_type, names in by_type.items():
-                parts.append(f"\n#### {entity_type}")
-                for name in names[:10]:
-                    parts.append(f"- {name}")
+                items.append(ContextItem(f"- {key}: {value}", 1.0, "\n### Current Position"))
+
+        current_index = (self.current_position or {}).get("chapter_index")
+
+        def chapter_relevance(ch: Dict[str, Any]) -> float:
+            if current_index is None or ch.get("order_index") is None:
+                return 0.5
+            return 0.8 / (1 + 0.25 * abs(ch["order_index"] - current_index))
+
+        for ch in self.chapters[:20]:
+            status = "folder" if ch.get("is_folder") else f"{ch.get('word_count', 0)} words"
+            items.append(ContextItem(
+                f"- {ch.get('title')} ({status})",
+                chapter_relevance(ch),
+                f"\n### Chapters ({len(self.chapters)} total)",
+            ))
+
+        def entity_mentioned(e: Dict[str, Any]) -> bool:
+            return _mentions(focus, e.get("name"), *(e.get("aliases") or []))
+
+        by_type: Dict[str, List[Dict[str, Any]]] = {}
+        for e in self.entities:
+            by_type.setdefault(e.get("type", "OTHER"), []).append(e)
+
+        for entity_type, members in by_type.items():
+            for e in members[:10]:
+                items.append(ContextItem(
+                    f"- {e.get('name', 'Unknown')}",
+                    1.0 if entity_mentioned(e) else 0.6,
+                    f"\n### Entities: {entity_type} ({len(members)} of {len(self.entities)} total)",
+                ))
 
         if self.outline:
-            parts.append("\n### Outline")
-            parts.append(f"Structure: {self.outline.get('structure_type', 'Unknown')}")
+            items.append(ContextItem(
+                f"Structure: {self.outline.get('structure_type', 'Unknown')}", 0.9, "\n### Outline"
+            ))
             if self.outline.get("premise"):
-                parts.append(f"Premise: {self.outline.get('premise')}")
+                items.append(ContextItem(
+                    f"Premise: {self.outline.get('premise')}", 0.9, "\n### Outline", truncatable=True
+                ))
+
+        return ContextSection(
+            name="manuscript",
+            header=f"## Current Manuscript: {self.title}",
+            items=items,
+            weight=weight,
+        )
 
-        return "\n".join(parts)
+    def to_prompt_context(self) -> str:
+        """Convert to text suitable for prompt injection"""
+        return render_section(self.to_context_section())
 
 
 @dataclass
@@ -232,48 +286,45 @@ class AgentContext:
     series_weight: float = 0.5
     manuscript_weight: float = 1.0
 
-    def to_prompt_context(self, max_tokens: int = 8000) -> str:
+    # Per-section accounting from the most recent to_prompt_context call
+    budget_report: Optional[BudgetReport] = field(default=None, repr=False, compare=False)
+
+    def to_context_sections(self, focus_text: str = "") -> List[ContextSection]:
+        """All non-zero-weight levels as rankable sections"""
+        focus = focus_text.lower()
+        levels = [
+            (self.author, self.author_weight),
+            (self.world, self.world_weight),
+            (self.series, self.series_weight),
+            (self.manuscript, self.manuscript_weight),
+        ]
+        return [
+            level.to_context_section(weight, focus)
+            for level, weight in levels
+            if level and weight > 0
+        ]
+
+    def pack(self, max_tokens: int = 8000, focus_text: str = "") -> PackedContext:
+        """Pack all levels into max_tokens, returning the text and a budget report"""
+        return pack_sections(
+            self.to_context_sections(focus_text),
+            max_tokens,
+            title="# Context for Analysis",
+        )
+
+    def to_prompt_context(self, max_tokens: int = 8000, focus_text: str = "") -> str:
         """
         Generate prompt context string, weighted by importance
 
         Args:
-            max_tokens: Approximate max tokens (uses char count / 4 as estimate)
+            max_tokens: Max tokens for the whole context (real tokenizer when available)
+            focus_text: Text under analysis; entities it mentions are preferred when a
+                list is capped or the budget is tight. Otherwise the output is identical
+                with or without it, which keeps the prompt prefix cacheable.
         """
-        parts = ["# Context for Analysis\n"]
-        max_chars = max_tokens * 4  # Rough estimate
-
-        # Gather sections with weights
-        sections = []
-
-        if self.author and self.author_weight > 0:
-            sections.append((self.author_weight, self.author.to_prompt_context()))
-
-        if self.world and self.world_weight > 0:
-            sections.append((self.world_weight, self.world.to_prompt_context()))
-
-        if self.series and self.series_weight > 0:
-            sections.append((self.series_weight, self.series.to_prompt_context()))
-
-        if self.manuscript and self.manuscript_weight > 0:
-            sections.append((self.manuscript_weight, self.manuscript.to_prompt_context()))
-
-        # Sort by weight (highest first)
-        sections.sort(key=lambda x: x[0], reverse=True)
-
-        current_length = len(parts[0])
-
-        for weight, content in sections:
-            if current_length + len(content) < max_chars:
-                parts.append(content)
-                current_length += len(content)
-            else:
-                # Truncate if needed
-                remaining = max_chars - current_length - 100
-                if remaining > 500:
-                    parts.append(content[:remaining] + "\n[Context truncated]")
-                break
-
-        return "\n\n".join(parts)
+        packed = self.pack(max_tokens, focus_text)
+        self.budget_report = packed.report
+        return packed.text
 
 
 class ContextLoader:
@@ -351,7 +402,7 @@ class ContextLoader:
             world_entities = db.query(Entity).filter(
                 Entity.world_id == world_id,
                 Entity.scope == ENTITY_SCOPE_WORLD
-            ).all()
+            ).order_by(Entity.type, Entity.name).all()
 
             # Extract rules from settings
             settings = world.settings or {}
@@ -413,7 +464,7 @@ class ContextLoader:
             if series_outline:
                 beats = db.query(PlotBeat).filter(
                     PlotBeat.outline_id == series_outline.id
-                ).all()
+                ).order_by(PlotBeat.order_index).all()
                 # Process beats for character arc info
                 # This would need more sophisticated extraction in production
 
@@ -473,9 +524,11 @@ class ContextLoader:
             ).order_by(Chapter.order_index).all()
 
             # Get manuscript-scoped entities
+            # Deterministic order keeps the rendered context byte-identical between
+            # calls, which prompt-prefix caching depends on
             entities = db.query(Entity).filter(
                 Entity.manuscript_id == manuscript_id
-            ).all()
+            ).order_by(Entity.type, Entity.name).all()
 
             # Get timeline events
             timeline_events = db.query(TimelineEvent).filter(
@@ -420,7 +420,7 @@ class SmartCoachAgent:
             total_completion_tokens = 0
 
             for iteration in range(max_iterations + 1):
-                response = await model_with_tools.ainvoke(lc_messages)
+                response = await llm_service.invoke_model(llm_config, model_with_tools, lc_messages)
 
                 # Accumulate usage
                 if hasattr(response, "response_metadata"):
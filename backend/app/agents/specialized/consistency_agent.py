@@ -12,6 +12,18 @@ Supports two modes:
 - Real-time: Quick checks during writing (single-focus, fast)
 - Full scan: Comprehensive manuscript analysis (thorough, slower)
 
+A full scan is a map-reduce over the chapters. The canon (character
+profiles, timeline, world rules, relationships, culture) is rendered once
+into a system prompt shared by every call, so providers can cache it.
+Chapters are packed into token-budgeted windows that run concurrently
+within the provider's rate limit, and the reduce step merges duplicate
+issues. Each chapter's issues are stored against a hash of its text and
+the canon, so the next scan only re-reads chapters that changed.
+
+Configuration:
+- CONSISTENCY_SCAN_WINDOW_TOKENS: chapter text per window (default 6000)
+- CONSISTENCY_SCAN_CONCURRENCY: windows in flight per scan (default 4)
+
 Usage:
     agent = create_consistency_agent(api_key="sk-...")
 
@@ -22,8 +34,13 @@ Usage:
     result = await agent.full_scan(manuscript_id, include_resolved=False)
 """
 
+import asyncio
+import hashlib
+import json
 import logging
-from typing import List, Dict, Any, Optional
+import os
+import re
+from typing import Callable, List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
@@ -38,11 +55,30 @@ from app.agents.tools import (
     query_world_rules,
     query_chapters,
 )
+from app.services.chapter_analysis_store import chapter_analysis_store
+from app.services.llm_scheduler import RequestPriority
 from app.services.llm_service import LLMResponse
+from app.services.prompt_cache import prompt_prefix_tracker
+from app.services.token_budget import count_tokens
 from langchain_core.tools import BaseTool
+from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
 
+# Token budget for the chapter text in one full-scan window
+FULL_SCAN_WINDOW_TOKENS = int(os.getenv("CONSISTENCY_SCAN_WINDOW_TOKENS", "6000"))
+
+# Windows analyzed at once by one scan; the provider lane caps overall traffic
+FULL_SCAN_CONCURRENCY = int(os.getenv("CONSISTENCY_SCAN_CONCURRENCY", "4"))
+
+# Stored per-chapter scan results; bump the version when the scan prompt changes
+FULL_SCAN_ANALYZER = "consistency_scan"
+FULL_SCAN_VERSION = 1
+
+_SEVERITY_RANK = {"high": 3, "medium": 2, "low": 1}
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
 
 class ConsistencyFocus(str, Enum):
     """Areas to focus consistency checks on"""
@@ -91,6 +127,9 @@ class ConsistencyResult:
     events_checked: int = 0
     execution_time_ms: int = 0
     cost: float = 0.0
+    chapters_analyzed: int = 0  # Full scan: chapters sent to the model
+    chapters_reused: int = 0  # Full scan: unchanged chapters answered from stored results
+    windows: int = 0  # Full scan: model calls
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -102,6 +141,9 @@ class ConsistencyResult:
             "events_checked": self.events_checked,
             "execution_time_ms": self.execution_time_ms,
             "cost": self.cost,
+            "chapters_analyzed": self.chapters_analyzed,
+            "chapters_reused": self.chapters_reused,
+            "windows": self.windows,
             "issue_count": len(self.issues),
             "high_severity_count": len([i for i in self.issues if i.severity == "high"]),
         }
@@ -165,7 +207,8 @@ REALTIME_PROMPT_TEMPLATE = """Perform a quick consistency check on this text, fo
 Check for any contradictions with the established facts, including cultural norms and behaviors. Be concise - this is a real-time check while the author writes."""
 
 
-FULL_SCAN_PROMPT_TEMPLATE = """Perform a comprehensive consistency analysis of this manuscript section.
+FULL_SCAN_PREAMBLE_TEMPLATE = """## Full Manuscript Scan
+You will be sent the manuscript a few sections at a time. Check every section against this canon.
 
 ## Character Profiles
 {character_context}
@@ -182,12 +225,7 @@ FULL_SCAN_PROMPT_TEMPLATE = """Perform a comprehensive consistency analysis of t
 ## Cultural Context
 {culture_context}
 
-## Text to Analyze
----
-{text}
----
-
-Thoroughly check for:
+For each section, thoroughly check for:
 1. Character fact contradictions
 2. Timeline impossibilities
 3. World rule violations
@@ -198,6 +236,126 @@ Thoroughly check for:
 Be comprehensive - this is a full manuscript scan."""
 
 
+FULL_SCAN_WINDOW_TEMPLATE = """Perform a comprehensive consistency analysis of these manuscript sections.
+
+{sections}
+
+For every issue, set "chapter" to the label of the section containing the source text (e.g. "{example_label}")."""
+
+
+@dataclass
+class ScanSection:
+    """A chapter, or one part of a chapter too long for a single window"""
+    chapter_index: int
+    text: str
+    part: int = 1
+    parts: int = 1
+    tokens: int = 0
+
+
+def split_to_token_budget(text: str, max_tokens: int) -> List[str]:
+    """Pieces of at most ~max_tokens, cut at paragraph (or, failing that, word) boundaries"""
+    pieces: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+
+    def flush():
+        nonlocal current, current_tokens
+        if current:
+            pieces.append("\n\n".join(current))
+        current, current_tokens = [], 0
+
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        tokens = count_tokens(paragraph)
+        if tokens > max_tokens:
+            flush()
+            words: List[str] = []
+            word_tokens = 0
+            for word in paragraph.split():
+                cost = count_tokens(word)
+                if words and word_tokens + cost > max_tokens:
+                    pieces.append(" ".join(words))
+                    words, word_tokens = [], 0
+                words.append(word)
+                word_tokens += cost
+            if words:
+                current, current_tokens = [" ".join(words)], word_tokens
+            continue
+        if current and current_tokens + tokens > max_tokens:
+            flush()
+        current.append(paragraph)
+        current_tokens += tokens
+    flush()
+    return pieces
+
+
+def build_scan_windows(
+    chapters: List[Dict[str, Any]],
+    max_tokens: int = FULL_SCAN_WINDOW_TOKENS
+) -> List[List[ScanSection]]:
+    """
+    Pack chapters, in order, into windows of at most max_tokens of text.
+
+    Short chapters share a window; a chapter longer than the budget is
+    split into parts that each get their own window. Empty chapters are
+    left out.
+    """
+    windows: List[List[ScanSection]] = []
+    window: List[ScanSection] = []
+    window_tokens = 0
+    for index, chapter in enumerate(chapters):
+        pieces = split_to_token_budget(chapter.get("content") or "", max_tokens)
+        for part, piece in enumerate(pieces, start=1):
+            section = ScanSection(index, piece, part, len(pieces), count_tokens(piece))
+            if window and window_tokens + section.tokens > max_tokens:
+                windows.append(window)
+                window, window_tokens = [], 0
+            window.append(section)
+            window_tokens += section.tokens
+    if window:
+        windows.append(window)
+    return windows
+
+
+def _normalize(text: str) -> str:
+    return _NON_WORD.sub(" ", (text or "").lower()).strip()
+
+
+def dedupe_issues(issues: List[ConsistencyIssue]) -> List[ConsistencyIssue]:
+    """
+    Merge issues reported more than once: same type and either the same
+    source text or the same description (ignoring case and punctuation).
+    The merged issue keeps the highest severity and every location.
+    """
+    merged: List[ConsistencyIssue] = []
+    index: Dict[Tuple[str, str, str], ConsistencyIssue] = {}
+    for issue in issues:
+        issue_type = issue.issue_type.lower()
+        keys = [
+            (issue_type, field_name, value)
+            for field_name, value in (("source", _normalize(issue.source_text)), ("description", _normalize(issue.description)))
+            if value
+        ]
+        existing = next((index[key] for key in keys if key in index), None)
+        if existing is None:
+            existing = ConsistencyIssue(**{**issue.__dict__})
+            merged.append(existing)
+        else:
+            if _SEVERITY_RANK.get(issue.severity, 0) > _SEVERITY_RANK.get(existing.severity, 0):
+                existing.severity = issue.severity
+            locations = [loc for loc in (existing.location or "").split(", ") if loc]
+            if issue.location and issue.location not in locations:
+                existing.location = ", ".join(locations + [issue.location])
+            existing.suggestion = existing.suggestion or issue.suggestion
+            existing.entity_id = existing.entity_id or issue.entity_id
+        for key in keys:
+            index.setdefault(key, existing)
+    return merged
+
+
 class ConsistencyAgent(BaseMaxwellAgent):
     """
     Agent specialized in detecting story inconsistencies.
@@ -205,6 +363,27 @@ class ConsistencyAgent(BaseMaxwellAgent):
     Supports real-time and full-scan modes for different use cases.
     """
 
+    def __init__(
+        self,
+        config: AgentConfig,
+        api_key: Optional[str] = None,
+        tools: Optional[List[BaseTool]] = None,
+        session_factory: Optional[Callable[[], Session]] = None
+    ):
+        """
+        Args:
+            session_factory: Opens the sessions the full scan uses for its
+                stored issues and privacy check (default: app.database.SessionLocal)
+        """
+        super().__init__(config, api_key=api_key, tools=tools)
+        self._session_factory = session_factory
+
+    def _open_session(self) -> Session:
+        if self._session_factory is None:
+            from app.database import SessionLocal
+            return SessionLocal()
+        return self._session_factory()
+
     @property
     def agent_type(self) -> AgentType:
         return AgentType.CONTINUITY
@@ -296,12 +475,16 @@ class ConsistencyAgent(BaseMaxwellAgent):
         user_id: str,
         manuscript_id: str,
         chapter_ids: Optional[List[str]] = None,
-        include_resolved: bool = False
+        include_resolved: bool = False,
+        progress_callback: Optional[Callable[[int, int], None]] = None
     ) -> ConsistencyResult:
         """
         Perform a comprehensive consistency scan of the manuscript.
 
         This is thorough but slower - meant for periodic checks, not real-time.
+        Chapters unchanged since the last scan (same text, title and canon)
+        reuse their stored issues. progress_callback(windows_done,
+        windows_total) is called as each window finishes.
         """
         start_time = datetime.utcnow()
 
@@ -316,45 +499,86 @@ class ConsistencyAgent(BaseMaxwellAgent):
             # Load chapter content
             chapters = await self._load_chapters(manuscript_id, chapter_ids)
 
-            all_issues = []
-            total_cost = 0.0
-
-            # Analyze each chapter
-            for chapter in chapters:
-                prompt = FULL_SCAN_PROMPT_TEMPLATE.format(
-                    character_context=character_context,
-                    timeline_context=timeline_context,
-                    world_context=world_context,
-                    relationship_context=relationship_context,
-                    culture_context=culture_context,
-                    text=chapter.get("content", "")[:8000]
+            allowed, reason = await self._ai_allowed(manuscript_id)
+            if not allowed:
+                return ConsistencyResult(
+                    success=False,
+                    mode="full_scan",
+                    warnings=[reason or "AI assistance is disabled for this manuscript"],
+                    execution_time_ms=int((datetime.utcnow() - start_time).total_seconds() * 1000)
                 )
 
-                result = await self.analyze(
-                    text=prompt,
-                    user_id=user_id,
-                    manuscript_id=manuscript_id,
-                    current_chapter_id=chapter.get("id")
-                )
+            # One system prompt for every window: the cacheable prefix
+            context = await self.load_context(user_id=user_id, manuscript_id=manuscript_id)
+            system_prompt = self._format_system_prompt(context) + "\n\n" + FULL_SCAN_PREAMBLE_TEMPLATE.format(
+                character_context=character_context,
+                timeline_context=timeline_context,
+                world_context=world_context,
+                relationship_context=relationship_context,
+                culture_context=culture_context,
+            )
 
-                issues = self._parse_issues(result)
-                for issue in issues:
-                    issue.location = chapter.get("title", "Unknown chapter")
-                all_issues.extend(issues)
-                total_cost += result.cost
+            # Reuse issues of chapters unchanged since the last scan
+            hashes = self._chapter_hashes(chapters, system_prompt)
+            stored = await asyncio.to_thread(self._load_stored_issues, chapters, hashes)
+            pending = [chapter for chapter in chapters if chapter["id"] not in stored]
+
+            windows = build_scan_windows(pending, FULL_SCAN_WINDOW_TOKENS)
+            total_cost = 0.0
+            warnings: List[str] = []
+            chapter_issues: Dict[int, List[ConsistencyIssue]] = {i: [] for i in range(len(pending))}
+            failed_chapters = set()
+            failed_windows = 0
+            done = 0
+            semaphore = asyncio.Semaphore(max(1, FULL_SCAN_CONCURRENCY))
+
+            async def run_window(window: List[ScanSection]):
+                nonlocal done, failed_windows, total_cost
+                async with semaphore:
+                    try:
+                        found, cost = await self._scan_window(window, pending, system_prompt)
+                        total_cost += cost
+                        for chapter_index, issue in found:
+                            chapter_issues[chapter_index].append(issue)
+                    except Exception as e:
+                        logger.warning("Consistency scan window failed: %s", e)
+                        warnings.append(f"Could not scan {self._window_label(window, pending)}: {e}")
+                        failed_chapters.update(section.chapter_index for section in window)
+                        failed_windows += 1
+                    done += 1
+                    if progress_callback:
+                        progress_callback(done, len(windows))
+
+            await asyncio.gather(*(run_window(window) for window in windows))
+
+            # Store the issues of every chapter that was fully analyzed
+            await asyncio.to_thread(self._store_issues, manuscript_id, [
+                (pending[i], hashes[pending[i]["id"]], chapter_issues[i])
+                for i in range(len(pending)) if i not in failed_chapters
+            ])
+
+            # Reduce: chapter order, then merge duplicates across windows and chapters
+            analyzed = {chapter["id"]: chapter_issues[i] for i, chapter in enumerate(pending)}
+            all_issues = []
+            for chapter in chapters:
+                all_issues.extend(stored.get(chapter["id"]) or analyzed.get(chapter["id"], []))
 
             execution_time = int(
                 (datetime.utcnow() - start_time).total_seconds() * 1000
             )
 
             return ConsistencyResult(
-                success=True,
+                success=failed_windows < len(windows) or not windows,
                 mode="full_scan",
-                issues=all_issues,
+                issues=dedupe_issues(all_issues),
+                warnings=warnings,
                 entities_checked=len(character_context.split('\n')),
                 events_checked=len(timeline_context.split('\n')),
                 execution_time_ms=execution_time,
-                cost=total_cost
+                cost=total_cost,
+                chapters_analyzed=len(pending),
+                chapters_reused=len(stored),
+                windows=len(windows)
             )
 
         except Exception as e:
@@ -368,19 +592,144 @@ class ConsistencyAgent(BaseMaxwellAgent):
                 execution_time_ms=execution_time
             )
 
+    async def _scan_window(
+        self,
+        window: List[ScanSection],
+        chapters: List[Dict[str, Any]],
+        system_prompt: str
+    ) -> Tuple[List[Tuple[int, ConsistencyIssue]], float]:
+        """Map step: analyze one window; returns ([(chapter_index, issue)], cost)"""
+        labels = {}
+        blocks = []
+        for section in window:
+            label = f"C{section.chapter_index + 1}"
+            labels[label.lower()] = section.chapter_index
+            title = chapters[section.chapter_index].get("title") or "Untitled"
+            if section.parts > 1:
+                title += f" (part {section.part} of {section.parts})"
+            blocks.append(f"### [{label}] {title}\n---\n{section.text}\n---")
+
+        messages = [
+            {"role": "system", "content": system_prompt, "cache": True},
+            {"role": "user", "content": FULL_SCAN_WINDOW_TEMPLATE.format(
+                sections="\n\n".join(blocks),
+                example_label=f"C{window[0].chapter_index + 1}",
+            )},
+        ]
+        prefix_stats = prompt_prefix_tracker.record(system_prompt)
+
+        response = await self._run_direct(messages, priority=RequestPriority.BACKGROUND)
+        prefix_stats.prompt_tokens = response.usage.get("prompt_tokens", 0)
+        prefix_stats.cached_prompt_tokens = response.usage.get("cached_prompt_tokens", 0)
+        prefix_stats.cache_write_tokens = response.usage.get("cache_creation_tokens", 0)
+        self._total_cost += response.cost
+        self._total_tokens += response.usage.get("total_tokens", 0)
+
+        result = self._parse_response(response.content, response.usage, response.cost, 0)
+        found = []
+        for issue_data in result.issues:
+            chapter_index = labels.get(str(issue_data.get("chapter", "")).strip("[] ").lower())
+            if chapter_index is None:
+                # No usable label: attribute by where the source text appears
+                source = issue_data.get("source_text") or ""
+                chapter_index = next(
+                    (section.chapter_index for section in window if source and source in section.text),
+                    window[0].chapter_index
+                )
+            issue = self._parse_issue(issue_data)
+            issue.location = chapters[chapter_index].get("title", "Unknown chapter")
+            found.append((chapter_index, issue))
+        return found, response.cost
+
+    @staticmethod
+    def _window_label(window: List[ScanSection], chapters: List[Dict[str, Any]]) -> str:
+        titles = []
+        for section in window:
+            title = chapters[section.chapter_index].get("title") or "Untitled"
+            if title not in titles:
+                titles.append(title)
+        return ", ".join(titles)
+
+    def _chapter_hashes(self, chapters: List[Dict[str, Any]], system_prompt: str) -> Dict[str, str]:
+        """Per-chapter hash of everything its scan result depends on"""
+        model_config = self.config.model_config
+        prefix = hashlib.sha256(
+            f"{model_config.provider.value}\0{model_config.model_name}\0{system_prompt}".encode("utf-8")
+        ).hexdigest()
+        return {
+            chapter["id"]: hashlib.sha256(
+                json.dumps([prefix, chapter.get("title") or "", chapter.get("content") or ""]).encode("utf-8")
+            ).hexdigest()
+            for chapter in chapters
+        }
+
+    def _load_stored_issues(
+        self,
+        chapters: List[Dict[str, Any]],
+        hashes: Dict[str, str]
+    ) -> Dict[str, List[ConsistencyIssue]]:
+        """Issues stored by earlier scans for chapters whose hash still matches (blocking)"""
+        keys = {
+            (chapter["id"], FULL_SCAN_ANALYZER): (FULL_SCAN_VERSION, hashes[chapter["id"]])
+            for chapter in chapters
+        }
+        db = self._open_session()
+        try:
+            found = chapter_analysis_store.get_many(db, keys)
+        except Exception as e:
+            logger.warning("Could not load stored consistency scan results: %s", e)
+            return {}
+        finally:
+            db.close()
+        return {
+            chapter_id: [ConsistencyIssue(**issue) for issue in issues]
+            for (chapter_id, _), issues in found.items()
+        }
+
+    def _store_issues(
+        self,
+        manuscript_id: str,
+        entries: List[Tuple[Dict[str, Any], str, List[ConsistencyIssue]]]
+    ) -> None:
+        """Store each analyzed chapter's issues for the next scan (best effort, blocking)"""
+        if not entries:
+            return
+        db = self._open_session()
+        try:
+            chapter_analysis_store.put_many(db, manuscript_id, [
+                (chapter["id"], FULL_SCAN_ANALYZER, FULL_SCAN_VERSION, content_hash, [i.to_dict() for i in issues])
+                for chapter, content_hash, issues in entries
+            ])
+            db.commit()
+        except Exception as e:
+            logger.warning("Could not store consistency scan results: %s", e)
+        finally:
+            db.close()
+
+    async def _ai_allowed(self, manuscript_id: str) -> Tuple[bool, Optional[str]]:
+        """Whether AI assistance is enabled for the manuscript, checked once per scan"""
+        from app.services.privacy_middleware import check_ai_allowed
+
+        db = self._open_session()
+        try:
+            result = await check_ai_allowed(db, manuscript_id)
+            return result.allowed, result.reason
+        finally:
+            db.close()
+
+    def _parse_issue(self, issue_data: Dict[str, Any]) -> ConsistencyIssue:
+        return ConsistencyIssue(
+            issue_type=issue_data.get("issue_type") or issue_data.get("type", "unknown"),
+            severity=issue_data.get("severity", "medium"),
+            description=issue_data.get("description", ""),
+            source_text=issue_data.get("source_text", ""),
+            conflicting_fact=issue_data.get("conflicting_fact", ""),
+            suggestion=issue_data.get("suggestion", ""),
+        )
+
     def _parse_issues(self, result: AgentResult) -> List[ConsistencyIssue]:
         """Parse AgentResult into ConsistencyIssue objects"""
-        issues = []
-        for issue_data in result.issues:
-            issues.append(ConsistencyIssue(
-                issue_type=issue_data.get("type", "unknown"),
-                severity=issue_data.get("severity", "medium"),
-                description=issue_data.get("description", ""),
-                source_text=issue_data.get("source_text", ""),
-                conflicting_fact=issue_data.get("conflicting_fact", ""),
-                suggestion=issue_data.get("suggestion", ""),
-            ))
-        return issues
+        return [self._parse_issue(issue_data) for issue_data in result.issues]
 
     async def _run_with_tools(
         self,
@@ -593,10 +942,11 @@ class ConsistencyAgent(BaseMaxwellAgent):
 
 def create_consistency_agent(
     api_key: str,
-    config: Optional[AgentConfig] = None
+    config: Optional[AgentConfig] = None,
+    session_factory: Optional[Callable[[], Session]] = None
 ) -> ConsistencyAgent:
     """Factory function to create a Consistency Agent"""
     if config is None:
         config = AgentConfig.for_agent_type(AgentType.CONTINUITY)
 
-    return ConsistencyAgent(config=config, api_key=api_key)
+    return ConsistencyAgent(config=config, api_key=api_key, session_factory=session_factory)
@@ -17,6 +17,7 @@ from typing import Optional, Dict, Any
 from dataclasses import dataclass
 
 from app.services.llm_service import llm_service, LLMConfig, LLMProvider
+from app.services.llm_scheduler import RequestPriority
 
 logger = logging.getLogger(__name__)
 
@@ -97,6 +98,7 @@ async def merge_entity_into_wiki(
         max_tokens=4096,
         response_format="json",
         api_key=api_key,
+        priority=RequestPriority.BACKGROUND,
     )
 
     user_prompt = f"""Merge the following incoming entity data into the existing wiki entry.
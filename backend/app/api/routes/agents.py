@@ -15,14 +15,18 @@ from typing import List, Dict, Any, Optional
 
 from app.agents.orchestrator.writing_assistant import WritingAssistantOrchestrator
 from app.agents.coach.smart_coach_agent import SmartCoachAgent, create_smart_coach
-from app.agents.base.agent_config import AgentType, ModelConfig, ModelProvider
+from app.agents.base.agent_config import AgentConfig, AgentType, ModelConfig, ModelProvider
+from app.api.routes.jobs import submit_job
 from app.services.author_learning_service import author_learning_service
+from app.services.job_queue import JobContext, job_handler
 from app.database import SessionLocal
 from app.models.agent import AgentAnalysis, SuggestionFeedback, CoachSession
 
 
 router = APIRouter(prefix="/api/agents", tags=["agents"])
 
+CONSISTENCY_FULL_SCAN_JOB = "consistency.full_scan"
+
 
 # Request/Response Models
 
@@ -782,27 +786,43 @@ async def consistency_quick_check(request: ConsistencyCheckRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _full_scan_agent(api_key: str, model_provider: Optional[str], model_name: Optional[str]):
+    """The consistency agent a full scan runs with"""
+    from app.agents.specialized.consistency_agent import create_consistency_agent
+
+    model_config = ModelConfig(
+        provider=ModelProvider(model_provider),
+        model_name=model_name,
+        temperature=0.3,
+        max_tokens=4096
+    )
+
+    config = AgentConfig.for_agent_type(AgentType.CONTINUITY)
+    config.model_config = model_config
+
+    return create_consistency_agent(api_key, config)
+
+
+def _full_scan_response(result) -> Dict[str, Any]:
+    return {
+        "data": result.to_dict(),
+        "cost": {
+            "total": result.cost,
+            "formatted": f"${result.cost:.4f}"
+        }
+    }
+
+
 @router.post("/consistency/full-scan")
-async def consistency_full_scan(request: FullScanRequest, background_tasks: BackgroundTasks):
+async def consistency_full_scan(request: FullScanRequest):
     """
     Perform a comprehensive consistency scan of the manuscript.
 
-    This is thorough but slower - runs in background for large manuscripts.
+    This is thorough but slower - waits for the whole scan. Large manuscripts
+    should use /consistency/full-scan/jobs, which runs it in the background.
     """
     try:
-        from app.agents.specialized.consistency_agent import create_consistency_agent
-
-        model_config = ModelConfig(
-            provider=ModelProvider(request.model_provider),
-            model_name=request.model_name,
-            temperature=0.3,
-            max_tokens=4096
-        )
-
-        config = AgentConfig.for_agent_type(AgentType.CONTINUITY)
-        config.model_config = model_config
-
-        agent = create_consistency_agent(request.api_key, config)
+        agent = _full_scan_agent(request.api_key, request.model_provider, request.model_name)
 
         result = await agent.full_scan(
             user_id=request.user_id,
@@ -811,19 +831,53 @@ async def consistency_full_scan(request: FullScanRequest, background_tasks: Back
             include_resolved=request.include_resolved
         )
 
-        return {
-            "success": True,
-            "data": result.to_dict(),
-            "cost": {
-                "total": result.cost,
-                "formatted": f"${result.cost:.4f}"
-            }
-        }
+        return {"success": True, **_full_scan_response(result)}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@job_handler(CONSISTENCY_FULL_SCAN_JOB, secret_params=("api_key",))
+async def run_consistency_full_scan(
+    ctx: JobContext,
+    api_key: str,
+    user_id: str,
+    manuscript_id: str,
+    chapter_ids: Optional[List[str]] = None,
+    include_resolved: bool = False,
+    model_provider: Optional[str] = "anthropic",
+    model_name: Optional[str] = "claude-3-haiku-20240307"
+):
+    """Job: full consistency scan; the result matches the /consistency/full-scan response"""
+    ctx.report(progress_percent=0.0, stage="Scanning manuscript")
+    agent = _full_scan_agent(api_key, model_provider, model_name)
+
+    def on_window(done: int, total: int):
+        if not ctx.cancelled:
+            ctx.report(progress_percent=done / total * 100, windows_done=done, windows_total=total)
+
+    result = await agent.full_scan(
+        user_id=user_id,
+        manuscript_id=manuscript_id,
+        chapter_ids=chapter_ids,
+        include_resolved=include_resolved,
+        progress_callback=on_window
+    )
+    return _full_scan_response(result)
+
+
+@router.post("/consistency/full-scan/jobs")
+def start_consistency_full_scan(request: FullScanRequest):
+    """
+    Run a full consistency scan as a background job.
+
+    Returns job_id; poll /api/jobs/{job_id} or stream /api/jobs/{job_id}/events.
+    The API key is held in memory only, so a scan interrupted by a restart
+    fails and must be started again.
+    """
+    return submit_job(CONSISTENCY_FULL_SCAN_JOB, request.model_dump(), user_id=request.user_id)
+
+
 # ============================================================================
 # Research & Worldbuilding Endpoints
 # ============================================================================
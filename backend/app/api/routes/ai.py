@@ -3,6 +3,8 @@ AI Routes - Standalone AI endpoints for Maxwell
 
 Provides reusable AI capabilities:
 - POST /api/ai/refine - Generic refinement loop for any suggestion type
+- GET /api/ai/metrics - LLM traffic counters (coalescing, queue depth, prefix reuse,
+  local inference)
 """
 
 import logging
@@ -12,6 +14,10 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
 from app.services.refinement_service import refinement_service
+from app.services.request_coalescer import llm_request_coalescer
+from app.services.llm_scheduler import llm_scheduler
+from app.services.prompt_cache import prompt_prefix_tracker
+from app.services.local_inference_worker import local_inference_worker
 
 logger = logging.getLogger(__name__)
 
@@ -72,3 +78,25 @@ async def refine_suggestion(request: RefineRequest):
             status_code=500,
             detail=f"Refinement failed: {str(e)}"
         )
+
+
+@router.get("/metrics")
+async def get_llm_metrics():
+    """
+    LLM traffic counters for this worker process.
+
+    - coalescing: identical concurrent requests that shared one provider call
+    - scheduler: per-(provider, key) queue depth by priority, active calls,
+      retries and 429 counts
+    - prompt_prefixes: how often agent system prompts repeated a recent prefix
+    - local_inference: resident local models, queue wait and tokens/sec
+    """
+    return {
+        "success": True,
+        "data": {
+            "coalescing": llm_request_coalescer.get_stats(),
+            "scheduler": llm_scheduler.get_metrics(),
+            "prompt_prefixes": prompt_prefix_tracker.get_stats(),
+            "local_inference": local_inference_worker.get_metrics(),
+        },
+    }
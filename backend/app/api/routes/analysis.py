@@ -12,7 +12,7 @@ Endpoints for:
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
+from typing import Callable, List, Optional, Dict, Any
 from pydantic import BaseModel
 
 from app.database import get_db
@@ -22,6 +22,9 @@ from app.services.relationship_evolution_service import RelationshipEvolutionSer
 from app.services.emotional_beat_service import EmotionalBeatService
 from app.services.subplot_tracker_service import SubplotTrackerService
 from app.services.pacing_optimizer_service import PacingOptimizerService
+from app.services.analysis_engine import ANALYZERS, analysis_engine
+from app.services.job_queue import JobContext, job_handler
+from app.api.routes.jobs import submit_job
 
 
 router = APIRouter(prefix="/analysis", tags=["analysis"])
@@ -81,8 +84,7 @@ def analyze_manuscript_pov(
     db: Session = Depends(get_db)
 ):
     """Analyze entire manuscript for POV consistency"""
-    service = POVConsistencyService(db)
-    result = service.analyze_manuscript(request.manuscript_id)
+    result = analysis_engine.analyze(db, request.manuscript_id, analyzers=["pov"])["pov"]
 
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
@@ -154,10 +156,9 @@ def analyze_manuscript_scene_purposes(
 ):
     """Analyze scene purposes across entire manuscript"""
     service = ScenePurposeService(db)
-    result = service.analyze_manuscript(
-        request.manuscript_id,
-        genre=request.genre
-    )
+    result = analysis_engine.analyze(
+        db, request.manuscript_id, request.genre, analyzers=["scene_purpose"]
+    )["scene_purpose"]
 
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
@@ -251,11 +252,7 @@ def analyze_all_relationships(
     db: Session = Depends(get_db)
 ):
     """Analyze all character relationships in a manuscript"""
-    service = RelationshipEvolutionService(db)
-    result = service.analyze_all_relationships(
-        request.manuscript_id,
-        world_id=request.world_id
-    )
+    result = analysis_engine.analyze(db, request.manuscript_id, analyzers=["relationships"])["relationships"]
 
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
@@ -347,10 +344,12 @@ def full_manuscript_analysis(
         "manuscript_id": request.manuscript_id,
         "analyses": {}
     }
+    reports = analysis_engine.analyze(
+        db, request.manuscript_id, request.genre, analyzers=["pov", "scene_purpose", "relationships"]
+    )
 
     # POV Analysis
-    pov_service = POVConsistencyService(db)
-    pov_result = pov_service.analyze_manuscript(request.manuscript_id)
+    pov_result = reports["pov"]
     if "error" not in pov_result:
         results["analyses"]["pov"] = {
             "dominant_pov": pov_result.get("dominant_pov"),
@@ -362,10 +361,7 @@ def full_manuscript_analysis(
 
     # Scene Purpose Analysis
     purpose_service = ScenePurposeService(db)
-    purpose_result = purpose_service.analyze_manuscript(
-        request.manuscript_id,
-        genre=request.genre
-    )
+    purpose_result = reports["scene_purpose"]
     if "error" not in purpose_result:
         results["analyses"]["scene_purpose"] = {
             "total_scenes": purpose_result.get("total_scenes"),
@@ -377,8 +373,7 @@ def full_manuscript_analysis(
         results["analyses"]["scene_purpose"]["suggestions"] = purpose_service.get_purpose_suggestions(purpose_result)
 
     # Relationship Analysis
-    rel_service = RelationshipEvolutionService(db)
-    rel_result = rel_service.analyze_all_relationships(request.manuscript_id)
+    rel_result = reports["relationships"]
     if "error" not in rel_result:
         results["analyses"]["relationships"] = {
             "relationships_analyzed": rel_result.get("relationships_analyzed"),
@@ -435,10 +430,10 @@ def get_dashboard_issues(
     Issues are sorted by severity and category.
     """
     issues = []
+    reports = analysis_engine.analyze(db, request.manuscript_id, request.genre)
 
     # POV Issues
-    pov_service = POVConsistencyService(db)
-    pov_result = pov_service.analyze_manuscript(request.manuscript_id)
+    pov_result = reports["pov"]
     if "error" not in pov_result:
         for ch in pov_result.get("chapter_analyses", []):
             # Head hopping
@@ -454,8 +449,7 @@ def get_dashboard_issues(
                 })
 
     # Scene Purpose Issues
-    purpose_service = ScenePurposeService(db)
-    purpose_result = purpose_service.analyze_manuscript(request.manuscript_id, request.genre)
+    purpose_result = reports["scene_purpose"]
     if "error" not in purpose_result:
         for ch in purpose_result.get("chapter_analyses", []):
             for scene in ch.get("scene_analyses", []):
@@ -471,8 +465,7 @@ def get_dashboard_issues(
                     })
 
     # Relationship Issues
-    rel_service = RelationshipEvolutionService(db)
-    rel_result = rel_service.analyze_all_relationships(request.manuscript_id)
+    rel_result = reports["relationships"]
     if "error" not in rel_result:
         for rel in rel_result.get("relationships", []):
             for change in rel.get("unearned_change_details", []):
@@ -488,7 +481,7 @@ def get_dashboard_issues(
 
     # Emotional Beat Issues
     emotion_service = EmotionalBeatService(db)
-    emotion_result = emotion_service.analyze_manuscript(request.manuscript_id, request.genre)
+    emotion_result = reports["emotional_beats"]
     if "error" not in emotion_result:
         for beat in emotion_result.get("missing_beats", [])[:3]:
             issues.append({
@@ -502,7 +495,7 @@ def get_dashboard_issues(
 
     # Subplot Issues
     subplot_service = SubplotTrackerService(db)
-    subplot_result = subplot_service.analyze_manuscript(request.manuscript_id)
+    subplot_result = reports["subplots"]
     if "error" not in subplot_result:
         for subplot in subplot_result.get("abandoned_subplots", []):
             health = subplot_result.get("subplot_health", {}).get(subplot, {})
@@ -526,8 +519,7 @@ def get_dashboard_issues(
             })
 
     # Pacing Issues
-    pacing_service = PacingOptimizerService(db)
-    pacing_result = pacing_service.analyze_manuscript_pacing(request.manuscript_id, request.genre)
+    pacing_result = reports["pacing"]
     if "error" not in pacing_result:
         for valley in pacing_result.get("tension_valleys", []):
             issues.append({
@@ -613,10 +605,9 @@ def analyze_manuscript_emotional_beats(
 ):
     """Analyze emotional beats across entire manuscript"""
     service = EmotionalBeatService(db)
-    result = service.analyze_manuscript(
-        request.manuscript_id,
-        genre=request.genre
-    )
+    result = analysis_engine.analyze(
+        db, request.manuscript_id, request.genre, analyzers=["emotional_beats"]
+    )["emotional_beats"]
 
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
@@ -695,7 +686,7 @@ def analyze_manuscript_subplots(
 ):
     """Analyze subplot threads across entire manuscript"""
     service = SubplotTrackerService(db)
-    result = service.analyze_manuscript(request.manuscript_id)
+    result = analysis_engine.analyze(db, request.manuscript_id, analyzers=["subplots"])["subplots"]
 
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
@@ -731,7 +722,7 @@ def sync_subplots_to_wiki(
     service = SubplotTrackerService(db)
 
     # First analyze manuscript
-    analysis = service.analyze_manuscript(request.manuscript_id)
+    analysis = analysis_engine.analyze(db, request.manuscript_id, analyzers=["subplots"])["subplots"]
 
     if "error" in analysis:
         raise HTTPException(status_code=400, detail=analysis["error"])
@@ -787,10 +778,9 @@ def analyze_manuscript_pacing(
 ):
     """Analyze pacing across entire manuscript"""
     service = PacingOptimizerService(db)
-    result = service.analyze_manuscript_pacing(
-        request.manuscript_id,
-        genre=request.genre
-    )
+    result = analysis_engine.analyze(
+        db, request.manuscript_id, request.genre, analyzers=["pacing"]
+    )["pacing"]
 
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
@@ -826,83 +816,76 @@ def get_genre_pacing_norms(
 
 # ==================== Complete Analysis Endpoint ====================
 
-@router.post("/complete-manuscript")
-def complete_manuscript_analysis(
-    request: ManuscriptAnalysisRequest,
-    db: Session = Depends(get_db)
-):
+def _summarize_report(name: str, report: Dict[str, Any]) -> Dict[str, Any]:
+    """The complete-manuscript summary of one analyzer's report"""
+    if name == "pov":
+        return {
+            "dominant_pov": report.get("dominant_pov"),
+            "is_consistent": report.get("pov_consistency", {}).get("is_consistent"),
+            "head_hopping_instances": report.get("total_head_hopping_instances", 0),
+            "knowledge_issues": report.get("total_knowledge_issues", 0)
+        }
+    if name == "scene_purpose":
+        return {
+            "total_scenes": report.get("total_scenes"),
+            "purposeless_scenes": report.get("purposeless_scenes", 0),
+            "purpose_distribution": report.get("purpose_distribution")
+        }
+    if name == "relationships":
+        return {
+            "tracked": report.get("relationships_analyzed", 0),
+            "unearned_changes": report.get("total_unearned_changes", 0),
+            "health_summary": report.get("health_summary")
+        }
+    if name == "emotional_beats":
+        return {
+            "beat_distribution": report.get("beat_distribution"),
+            "missing_beats": report.get("missing_beats", []),
+            "genre_fit_score": (report.get("genre_analysis") or {}).get("fit_score")
+        }
+    if name == "subplots":
+        return {
+            "found": report.get("subplots_found", 0),
+            "abandoned": len(report.get("abandoned_subplots", [])),
+            "unresolved": len(report.get("unresolved_subplots", []))
+        }
+    # Pacing
+    return {
+        "avg_chapter_length": report.get("manuscript_metrics", {}).get("avg_chapter_length"),
+        "length_consistency": report.get("manuscript_metrics", {}).get("length_consistency"),
+        "tension_valleys": len(report.get("tension_valleys", [])),
+        "slow_sections": len(report.get("slow_sections", []))
+    }
+
+
+def build_complete_report(
+    db: Session,
+    manuscript_id: str,
+    genre: Optional[str] = None,
+    on_summary: Optional[Callable[[str, Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
     """
-    Run comprehensive narrative analysis on a manuscript.
-    Includes all analysis types: POV, Scene Purpose, Relationships,
-    Emotional Beats, Subplots, and Pacing.
+    The complete-manuscript report. on_summary(name, summary) is called as
+    each analyzer's summary becomes available.
     """
     results = {
-        "manuscript_id": request.manuscript_id,
-        "genre": request.genre,
+        "manuscript_id": manuscript_id,
+        "genre": genre,
         "analyses": {}
     }
+    summaries: Dict[str, Dict[str, Any]] = {}
 
-    # POV Analysis
-    pov_service = POVConsistencyService(db)
-    pov_result = pov_service.analyze_manuscript(request.manuscript_id)
-    if "error" not in pov_result:
-        results["analyses"]["pov"] = {
-            "dominant_pov": pov_result.get("dominant_pov"),
-            "is_consistent": pov_result.get("pov_consistency", {}).get("is_consistent"),
-            "head_hopping_instances": pov_result.get("total_head_hopping_instances", 0),
-            "knowledge_issues": pov_result.get("total_knowledge_issues", 0)
-        }
-
-    # Scene Purpose
-    purpose_service = ScenePurposeService(db)
-    purpose_result = purpose_service.analyze_manuscript(request.manuscript_id, request.genre)
-    if "error" not in purpose_result:
-        results["analyses"]["scene_purpose"] = {
-            "total_scenes": purpose_result.get("total_scenes"),
-            "purposeless_scenes": purpose_result.get("purposeless_scenes", 0),
-            "purpose_distribution": purpose_result.get("purpose_distribution")
-        }
-
-    # Relationships
-    rel_service = RelationshipEvolutionService(db)
-    rel_result = rel_service.analyze_all_relationships(request.manuscript_id)
-    if "error" not in rel_result:
-        results["analyses"]["relationships"] = {
-            "tracked": rel_result.get("relationships_analyzed", 0),
-            "unearned_changes": rel_result.get("total_unearned_changes", 0),
-            "health_summary": rel_result.get("health_summary")
-        }
-
-    # Emotional Beats
-    emotion_service = EmotionalBeatService(db)
-    emotion_result = emotion_service.analyze_manuscript(request.manuscript_id, request.genre)
-    if "error" not in emotion_result:
-        results["analyses"]["emotional_beats"] = {
-            "beat_distribution": emotion_result.get("beat_distribution"),
-            "missing_beats": emotion_result.get("missing_beats", []),
-            "genre_fit_score": emotion_result.get("genre_analysis", {}).get("fit_score")
-        }
+    def on_report(name: str, report: Dict[str, Any]):
+        if "error" not in report:
+            summaries[name] = _summarize_report(name, report)
+            if on_summary is not None:
+                on_summary(name, summaries[name])
 
-    # Subplots
-    subplot_service = SubplotTrackerService(db)
-    subplot_result = subplot_service.analyze_manuscript(request.manuscript_id)
-    if "error" not in subplot_result:
-        results["analyses"]["subplots"] = {
-            "found": subplot_result.get("subplots_found", 0),
-            "abandoned": len(subplot_result.get("abandoned_subplots", [])),
-            "unresolved": len(subplot_result.get("unresolved_subplots", []))
-        }
-
-    # Pacing
-    pacing_service = PacingOptimizerService(db)
-    pacing_result = pacing_service.analyze_manuscript_pacing(request.manuscript_id, request.genre)
-    if "error" not in pacing_result:
-        results["analyses"]["pacing"] = {
-            "avg_chapter_length": pacing_result.get("manuscript_metrics", {}).get("avg_chapter_length"),
-            "length_consistency": pacing_result.get("manuscript_metrics", {}).get("length_consistency"),
-            "tension_valleys": len(pacing_result.get("tension_valleys", [])),
-            "slow_sections": len(pacing_result.get("slow_sections", []))
-        }
+    # All analyzers in one pass over the chapters: POV, Scene Purpose,
+    # Relationships, Emotional Beats, Subplots and Pacing
+    reports = analysis_engine.analyze(db, manuscript_id, genre, on_report=on_report)
+    results["analyses"] = {name: summaries[name] for name in reports if name in summaries}
+    pacing_result = reports["pacing"]
 
     # Calculate overall score
     issues = 0
@@ -940,3 +923,43 @@ def complete_manuscript_analysis(
     results["total_issues"] = issues
 
     return results
+
+
+@job_handler("analysis.complete_manuscript")
+def run_complete_analysis(ctx: JobContext, manuscript_id: str, genre: Optional[str] = None) -> Dict[str, Any]:
+    """Job: the complete-manuscript report, streaming each analyzer's summary"""
+    ctx.report(0, "Analyzing chapters")
+
+    def on_summary(name: str, summary: Dict[str, Any]):
+        ctx.partial({"analyzer": name, "summary": summary})
+        ctx.report(len(ctx.partial_results) / len(ANALYZERS) * 100, f"Analyzed {name}")
+
+    with ctx.session() as db:
+        return build_complete_report(db, manuscript_id, genre, on_summary)
+
+
+@router.post("/complete-manuscript")
+def complete_manuscript_analysis(
+    request: ManuscriptAnalysisRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Run comprehensive narrative analysis on a manuscript.
+    Includes all analysis types: POV, Scene Purpose, Relationships,
+    Emotional Beats, Subplots, and Pacing, computed by the analysis engine
+    in a single pass over the chapters.
+    """
+    return build_complete_report(db, request.manuscript_id, request.genre)
+
+
+@router.post("/complete-manuscript/jobs")
+def start_complete_manuscript_analysis(request: ManuscriptAnalysisRequest):
+    """
+    Run the complete-manuscript analysis as a background job. Poll
+    /api/jobs/{job_id} or stream /api/jobs/{job_id}/events; each analyzer's
+    summary arrives as a partial result.
+    """
+    return submit_job(
+        "analysis.complete_manuscript",
+        {"manuscript_id": request.manuscript_id, "genre": request.genre},
+    )
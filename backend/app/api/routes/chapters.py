@@ -22,9 +22,10 @@ from app.models.manuscript import (
 )
 from app.models.entity import Entity
 from app.models.outline import PlotBeat
+from app.services.dialogue_index import dialogue_index
 from app.services.manuscript_aggregation_service import manuscript_aggregation_service
 from app.services.scene_detection_service import scene_detection_service
-from app.services.lexical_utils import extract_text_from_lexical
+from app.services.lexical_utils import parse_lexical
 
 
 # Type alias for document types
@@ -169,12 +170,15 @@ async def create_chapter(
     is_folder_type = document_type == DOCUMENT_TYPE_FOLDER
 
     # If lexical state exists but no explicit content, extract it
+    word_count = None
     if lexical_state and not content and not is_folder_type:
-        extracted_text = extract_text_from_lexical(lexical_state)
-        if extracted_text:
-            content = extracted_text
+        document = parse_lexical(lexical_state)
+        if document.text:
+            content = document.text
+            word_count = document.word_count
 
-    word_count = 0 if is_folder_type else len(content.split()) if content else 0
+    if word_count is None:
+        word_count = 0 if is_folder_type else len(content.split()) if content else 0
 
     db_chapter = Chapter(
         id=str(uuid.uuid4()),
@@ -377,10 +381,10 @@ async def update_chapter(
         # Auto-extract plain text from lexical state for search/analysis
         is_folder_type = chapter.is_folder or chapter.document_type == DOCUMENT_TYPE_FOLDER
         if chapter.lexical_state and not is_folder_type:
-            extracted_text = extract_text_from_lexical(chapter.lexical_state)
-            if extracted_text:
-                chapter.content = extracted_text
-                chapter.word_count = len(extracted_text.split())
+            document = parse_lexical(chapter.lexical_state)
+            if document.text:
+                chapter.content = document.text
+                chapter.word_count = document.word_count
     if 'content' in update_data:
         chapter.content = update_data['content']
         # Auto-calculate word count from content
@@ -398,6 +402,10 @@ async def update_chapter(
     db.commit()
     db.refresh(chapter)
 
+    # Re-index the chapter's dialogue for voice analysis
+    if ('content' in update_data or 'lexical_state' in update_data) and not chapter.is_folder:
+        dialogue_index.index_chapter(db, chapter)
+
     # Update aggregations if word count changed
     if word_count_changed and not chapter.is_folder:
         # Update manuscript total
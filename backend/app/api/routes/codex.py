@@ -10,6 +10,7 @@ from typing import List, Dict, Any, Optional
 from app.services.codex_service import codex_service
 from app.services.nlp_service import nlp_service
 from app.services.ai_entity_service import ai_entity_service
+from app.services.realtime_bus import realtime_bus
 
 logger = logging.getLogger(__name__)
 
@@ -302,6 +303,18 @@ def _gather_entity_world_context(
         db.close()
 
 
+async def _broadcast_codex_entity(entity, suggestion_id: Optional[str] = None):
+    """Tell every connected editor of the manuscript about a new Codex entity"""
+    try:
+        await realtime_bus.publish(entity.manuscript_id, {
+            "type": "codex_entity",
+            "entity": {"id": entity.id, "name": entity.name, "type": entity.type},
+            "suggestion_id": suggestion_id,
+        })
+    except Exception as e:
+        logger.warning(f"Codex entity broadcast failed: {e}")
+
+
 # Entity Endpoints
 
 @router.post("/entities")
@@ -317,6 +330,7 @@ async def create_entity(request: CreateEntityRequest):
             template_type=request.template_type,
             template_data=request.template_data
         )
+        await _broadcast_codex_entity(entity)
 
         return {
             "success": True,
@@ -708,6 +722,7 @@ async def approve_suggestion(request: ApproveSuggestionRequest):
             aliases=request.aliases,
             attributes=request.attributes
         )
+        await _broadcast_codex_entity(entity, suggestion_id=request.suggestion_id)
 
         return {
             "success": True,
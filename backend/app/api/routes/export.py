@@ -1,16 +1,34 @@
 """
 Export API Routes
 Endpoints for exporting manuscripts to various formats
+
+Exports render in the export worker pool to a temp file, which is streamed
+back in chunks. POST /api/export/jobs starts a background export that can
+be polled for progress and downloaded when done.
+
+Rendered files are kept in the export cache, keyed by the manuscript's
+current state and the export options, so re-exporting an unchanged
+manuscript streams the stored file without rendering it again.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+import logging
+import os
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.background import BackgroundTask
 from typing import Optional, List
 from pydantic import BaseModel
 
 from app.database import get_db
+from app.models.manuscript import Manuscript
+from app.services.export_cache import ExportCacheKey, export_cache, export_cache_key
 from app.services.export_service import ExportService
+from app.services.export_task_registry import export_registry
+from app.services.export_workers import EXPORT_FORMATS, export_pool, iter_open_file
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/export", tags=["export"])
 
@@ -21,6 +39,12 @@ class ExportRequest(BaseModel):
     include_folders: bool = False
 
 
+class ExportJobRequest(ExportRequest):
+    """Request model for a background export"""
+    manuscript_id: str
+    format: str = "docx"
+
+
 @router.get("/preview/{manuscript_id}")
 async def get_export_preview(
     manuscript_id: str,
@@ -33,11 +57,15 @@ async def get_export_preview(
         manuscript_id: ID of the manuscript
 
     Returns:
-        Export preview data including chapter list and word count
+        Export preview data including chapter list, word count and
+        whether each format is already in the export cache
     """
     try:
         service = ExportService(db)
         preview = await service.get_export_preview(manuscript_id)
+        preview["export_cache"] = export_cache.status([
+            export_cache_key(db, manuscript_id, fmt) for fmt in EXPORT_FORMATS
+        ])
 
         return {
             "success": True,
@@ -68,36 +96,7 @@ async def export_to_docx(
     Returns:
         DOCX file as streaming response
     """
-    try:
-        service = ExportService(db)
-
-        # Get manuscript title for filename
-        preview = await service.get_export_preview(manuscript_id)
-        filename = f"{preview['title'].replace(' ', '_')}.docx"
-
-        # Generate DOCX
-        buffer = await service.export_to_docx(
-            manuscript_id,
-            include_folders=request.include_folders,
-            chapter_ids=request.chapter_ids
-        )
-
-        return StreamingResponse(
-            buffer,
-            media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            headers={
-                "Content-Disposition": f"attachment; filename={filename}",
-                "Content-Type": "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-            }
-        )
-
-    except ValueError as e:
-        raise HTTPException(status_code=404, detail=str(e))
-    except Exception as e:
-        print(f"DOCX export error: {e}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Failed to export to DOCX: {str(e)}")
+    return await _stream_export("docx", manuscript_id, request, db)
 
 
 @router.post("/pdf/{manuscript_id}")
@@ -116,33 +115,169 @@ async def export_to_pdf(
     Returns:
         PDF file as streaming response
     """
+    return await _stream_export("pdf", manuscript_id, request, db)
+
+
+def _cache_key(fmt: str, manuscript_id: str, request: ExportRequest, db: Session) -> ExportCacheKey:
     try:
-        service = ExportService(db)
+        return export_cache_key(db, manuscript_id, fmt, request.chapter_ids, request.include_folders)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
-        # Get manuscript title for filename
-        preview = await service.get_export_preview(manuscript_id)
-        filename = f"{preview['title'].replace(' ', '_')}.pdf"
 
-        # Generate PDF
-        buffer = await service.export_to_pdf(
-            manuscript_id,
-            include_folders=request.include_folders,
-            chapter_ids=request.chapter_ids
-        )
+def _export_filename(key: ExportCacheKey) -> str:
+    return f"{(key.title or 'manuscript').replace(' ', '_')}.{key.format}"
+
+
+def _open_cached(key: ExportCacheKey):
+    """Open the cached export for a key (None on a miss or if it was just evicted)"""
+    path = export_cache.get(key)
+    if path is None:
+        return None
+    try:
+        return open(path, 'rb')
+    except FileNotFoundError:
+        return None
+
+
+async def _render_into_cache(key: ExportCacheKey, chapter_ids: Optional[List[str]], progress=None):
+    """Render an export and move it into the cache; returns (path, size, cached)"""
+    export_file = await export_pool.render(key.format, key.manuscript_id, chapter_ids, progress=progress)
+    try:
+        cached_path = export_cache.put(key, export_file.path)
+    except OSError as e:
+        logger.warning(f"Could not cache export of {key.manuscript_id}: {e}")
+        cached_path = None
+    if cached_path is None:
+        return export_file.path, export_file.size, False
+    return str(cached_path), export_file.size, True
 
-        return StreamingResponse(
-            buffer,
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": f"attachment; filename={filename}",
-                "Content-Type": "application/pdf"
-            }
-        )
 
+async def _stream_export(fmt: str, manuscript_id: str, request: ExportRequest, db: Session) -> StreamingResponse:
+    """Stream the cached export, or render it in the export worker and cache it"""
+    key = _cache_key(fmt, manuscript_id, request, db)
+    cached = _open_cached(key)
+    if cached is not None:
+        return _file_response(cached, _export_filename(key), EXPORT_FORMATS[fmt], os.fstat(cached.fileno()).st_size,
+                              cache_status="hit")
+
+    try:
+        path, size, in_cache = await _render_into_cache(key, request.chapter_ids)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        print(f"PDF export error: {e}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Failed to export to PDF: {str(e)}")
+        logger.exception(f"{fmt.upper()} export failed for manuscript {manuscript_id}")
+        raise HTTPException(status_code=500, detail=f"Failed to export to {fmt.upper()}: {str(e)}")
+
+    return _file_response(open(path, 'rb'), _export_filename(key), EXPORT_FORMATS[fmt], size, cache_status="miss",
+                          background=None if in_cache else BackgroundTask(os.remove, path))
+
+
+def _file_response(f, filename: str, media_type: str, size: int, cache_status: Optional[str] = None,
+                   background=None) -> StreamingResponse:
+    headers = {
+        "Content-Disposition": f"attachment; filename={filename}",
+        "Content-Type": media_type,
+        "Content-Length": str(size),
+    }
+    if cache_status:
+        headers["X-Export-Cache"] = cache_status
+    return StreamingResponse(iter_open_file(f), media_type=media_type, headers=headers, background=background)
+
+
+# --- Background export jobs ---
+
+@router.post("/jobs")
+async def start_export_job(
+    request: ExportJobRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    """
+    Start a background export. Returns task_id for polling.
+
+    Poll GET /api/export/jobs/{task_id} for progress (chapters rendered), then
+    download the file from GET /api/export/jobs/{task_id}/download.
+    """
+    if request.format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid format. Must be one of: {', '.join(EXPORT_FORMATS)}"
+        )
+    if not db.query(Manuscript.id).filter_by(id=request.manuscript_id).first():
+        raise HTTPException(status_code=404, detail=f"Manuscript {request.manuscript_id} not found")
+
+    key = _cache_key(request.format, request.manuscript_id, request, db)
+    task = export_registry.create_task(request.manuscript_id, request.format)
+    cached_path = export_cache.get(key)
+    if cached_path is not None:
+        export_registry.update_progress(task.id, key.chapters, key.chapters)
+        export_registry.complete_task(
+            task.id,
+            file_path=str(cached_path),
+            filename=_export_filename(key),
+            media_type=EXPORT_FORMATS[key.format],
+            size=cached_path.stat().st_size,
+            cached=True,
+        )
+        return {"success": True, "task_id": task.id, "status": "completed", "cached": True}
+
+    background_tasks.add_task(_run_export_job, task.id, key, request.chapter_ids)
+    return {"success": True, "task_id": task.id, "status": "started", "cached": False}
+
+
+async def _run_export_job(task_id: str, key: ExportCacheKey, chapter_ids: Optional[List[str]]):
+    """Background task: render an export into the cache and keep it for download"""
+    def report(done: int, total: int):
+        export_registry.update_progress(task_id, done, total)
+
+    try:
+        path, size, in_cache = await _render_into_cache(key, chapter_ids, progress=report)
+        export_registry.complete_task(
+            task_id,
+            file_path=path,
+            filename=_export_filename(key),
+            media_type=EXPORT_FORMATS[key.format],
+            size=size,
+            cached=in_cache,
+        )
+    except Exception as e:
+        logger.exception(f"Export failed for task {task_id}")
+        export_registry.fail_task(task_id, str(e))
+
+
+@router.get("/jobs/{task_id}")
+async def get_export_job(task_id: str):
+    """Poll the progress of a background export"""
+    task = export_registry.get_task(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return {
+        "task_id": task.id,
+        "manuscript_id": task.manuscript_id,
+        "format": task.format,
+        "status": task.status,
+        "chapters_completed": task.chapters_completed,
+        "total_chapters": task.total_chapters,
+        "progress_percent": round(task.progress_percent, 1),
+        "filename": task.filename,
+        "size": task.size,
+        "cached": task.cached,
+        "error": task.error,
+    }
+
+
+@router.get("/jobs/{task_id}/download")
+async def download_export_job(task_id: str):
+    """Download the file of a completed background export"""
+    task = export_registry.get_task(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if task.status != "completed":
+        raise HTTPException(status_code=409, detail=f"Export is {task.status}")
+    try:
+        f = open(task.file_path, 'rb')
+    except FileNotFoundError:
+        # Evicted from the export cache, or the manuscript changed since
+        raise HTTPException(status_code=410, detail="Export file is no longer available; start a new export")
+    return _file_response(f, task.filename, task.media_type, task.size)
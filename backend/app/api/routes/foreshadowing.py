@@ -294,6 +294,7 @@ async def detect_foreshadowing(
     manuscript_id: str,
     min_confidence: float = 0.5,
     chapter_ids: Optional[List[str]] = None,
+    use_embeddings: bool = False,
 ):
     """
     Auto-detect potential foreshadowing setups and payoffs in a manuscript.
@@ -305,7 +306,9 @@ async def detect_foreshadowing(
     - Hints (subtle clues)
     - Parallels (scene echoes)
 
-    Returns detected setups, payoffs, and potential matches.
+    Returns detected setups, payoffs, and potential matches. Payoffs only
+    match setups that come before them; use_embeddings adds semantic
+    similarity when the embedding model is available.
     """
     from app.services.foreshadowing_detector_service import ForeshadowingDetectorService
     from app.database import SessionLocal
@@ -316,7 +319,8 @@ async def detect_foreshadowing(
         results = detector.detect_foreshadowing(
             manuscript_id=manuscript_id,
             chapter_ids=chapter_ids,
-            min_confidence=min_confidence
+            min_confidence=min_confidence,
+            use_embeddings=use_embeddings
         )
         return {
             "success": True,
@@ -1,25 +1,34 @@
 """
 Import API Routes
 Handles manuscript import from various document formats.
+
+Uploads are streamed to a temp file and parsed in the import worker pool.
+The -async variants return a task_id to poll at /api/import/tasks/{task_id}.
 """
 
-import os
+import logging
 import uuid as uuid_lib
-import tempfile
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Query
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app.services.import_service import import_service, SUPPORTED_FORMATS
+from app.database import get_db, SessionLocal
+from app.services.import_service import import_service, ImportResult, SUPPORTED_FORMATS
+from app.services.import_task_registry import import_registry
+from app.services.import_workers import SpooledUpload, spool_upload
 from app.services.scrivener_import_service import scrivener_import_service
+from app.services.lexical_utils import plain_text_to_lexical_json
 from app.models.manuscript import Manuscript, Chapter
 from app.models.entity import Entity
 
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/api/import", tags=["import"])
 
+VALID_DETECTION_MODES = ["auto", "headings", "pattern", "page_breaks", "single"]
+
 
 # --- Response Models ---
 
@@ -136,36 +145,118 @@ async def parse_document(
     Returns:
         ParseResponse with chapter previews and a parse_id for step 2
     """
-    # Validate detection mode
-    valid_modes = ["auto", "headings", "pattern", "page_breaks", "single"]
-    if detection_mode not in valid_modes:
+    _validate_detection_mode(detection_mode)
+    upload = await _spool(file)
+
+    # Parse the document
+    try:
+        result = await import_service.parse_file(
+            path=upload.path,
+            filename=file.filename or "unknown.txt",
+            detection_mode=detection_mode,
+            file_hash=upload.sha256,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to parse document: {e}")
+    finally:
+        upload.remove()
+
+    return _parse_response(result)
+
+
+@router.post("/parse-async")
+async def parse_document_async(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    detection_mode: str = Query("auto", description="Chapter detection mode (see /parse)"),
+) -> dict:
+    """
+    Start parsing an uploaded document in the background.
+
+    For large PDFs and DOCX files. Returns a task_id; poll
+    GET /api/import/tasks/{task_id} for progress and, once completed, fetch
+    the preview with GET /api/import/preview/{parse_id}.
+    """
+    _validate_detection_mode(detection_mode)
+    filename = file.filename or "unknown.txt"
+    try:
+        import_service._validate_format(filename)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    upload = await _spool(file)
+    task = import_registry.create_task(filename, kind="document")
+    background_tasks.add_task(_run_parse_task, task.id, upload, filename, detection_mode)
+    return {"success": True, "task_id": task.id, "status": "started"}
+
+
+@router.get("/tasks/{task_id}")
+async def get_import_task(task_id: str) -> dict:
+    """Poll the progress of a background import"""
+    task = import_registry.get_task(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return {
+        "task_id": task.id,
+        "kind": task.kind,
+        "filename": task.filename,
+        "status": task.status,
+        "units_completed": task.units_completed,
+        "total_units": task.total_units,
+        "progress_percent": round(task.progress_percent, 1),
+        "stage": task.current_stage,
+        "parse_id": task.parse_id,
+        "manuscript_id": task.manuscript_id,
+        "error": task.error,
+    }
+
+
+def _validate_detection_mode(detection_mode: str):
+    if detection_mode not in VALID_DETECTION_MODES:
         raise HTTPException(
             status_code=400,
-            detail=f"Invalid detection_mode. Must be one of: {', '.join(valid_modes)}"
+            detail=f"Invalid detection_mode. Must be one of: {', '.join(VALID_DETECTION_MODES)}"
         )
 
-    # Read file content
+
+async def _spool(file: UploadFile, suffix: str = "") -> SpooledUpload:
+    """Stream an upload to a temp file (400 when empty or over the size limit)"""
     try:
-        content = await file.read()
+        return await spool_upload(file, suffix=suffix)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to read file: {e}")
 
-    if not content:
-        raise HTTPException(status_code=400, detail="File is empty")
 
-    # Parse the document
+def _progress_reporter(task_id: str):
+    def report(units_completed: int, total_units: int, stage: str):
+        import_registry.update_progress(task_id, units_completed, total_units, stage)
+    return report
+
+
+async def _run_parse_task(task_id: str, upload: SpooledUpload, filename: str, detection_mode: str):
+    """Background task: parse a spooled upload and cache the result"""
     try:
-        result = await import_service.parse_document(
-            file_content=content,
-            filename=file.filename or "unknown.txt",
+        result = await import_service.parse_file(
+            path=upload.path,
+            filename=filename,
             detection_mode=detection_mode,
+            progress=_progress_reporter(task_id),
+            file_hash=upload.sha256,
         )
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        import_registry.complete_task(task_id, parse_id=result.parse_id)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to parse document: {e}")
+        logger.exception(f"Import parse failed for task {task_id}")
+        import_registry.fail_task(task_id, str(e))
+    finally:
+        upload.remove()
 
-    # Build chapter previews
+
+def _parse_response(result: ImportResult) -> dict:
+    """Parse result with chapter previews, as returned by /parse and /preview"""
     chapter_previews = []
     for ch in result.chapters:
         # Generate preview text
@@ -197,6 +288,7 @@ async def parse_document(
 @router.post("/create")
 async def create_manuscript(
     request: CreateRequest,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
 ) -> dict:
     """
@@ -210,7 +302,9 @@ async def create_manuscript(
         request: CreateRequest with parse_id and optional overrides
 
     Returns:
-        CreateResponse with the new manuscript ID
+        CreateResponse with the new manuscript ID, plus followup_task_id for
+        the background job that aggregates word counts, embeds chapters and
+        updates the wiki
     """
     # Validate parse_id exists
     cached = import_service.get_cached_result(request.parse_id)
@@ -242,12 +336,17 @@ async def create_manuscript(
             __import__('app.models.manuscript', fromlist=['Chapter']).Chapter
         ).filter_by(manuscript_id=manuscript.id).count()
 
+        # One follow-up job for the whole manuscript
+        followup = import_registry.create_task(manuscript.title, kind="followup")
+        background_tasks.add_task(import_service.run_import_followups, manuscript.id, followup.id)
+
         return {
             "success": True,
             "manuscript_id": manuscript.id,
             "title": manuscript.title,
             "chapter_count": chapter_count,
             "total_words": manuscript.word_count,
+            "followup_task_id": followup.id,
         }
 
     except ValueError as e:
@@ -270,32 +369,7 @@ async def get_parse_preview(parse_id: str) -> dict:
             detail="Parse result not found or expired. Please re-upload the file."
         )
 
-    # Build chapter previews
-    chapter_previews = []
-    for ch in result.chapters:
-        preview = ch.plain_content[:200].strip()
-        if len(ch.plain_content) > 200:
-            preview += "..."
-
-        chapter_previews.append(ChapterPreview(
-            index=ch.index,
-            title=ch.title,
-            word_count=ch.word_count,
-            preview_text=preview,
-            included=True,
-        ))
-
-    return {
-        "success": True,
-        "parse_id": result.parse_id,
-        "title": result.title,
-        "author": result.author,
-        "total_words": result.total_words,
-        "detection_method": result.detection_method,
-        "format_warnings": result.format_warnings,
-        "chapters": [cp.model_dump() for cp in chapter_previews],
-        "source_format": result.source_format,
-    }
+    return _parse_response(result)
 
 
 # --- Scrivener Import Models ---
@@ -349,16 +423,10 @@ async def preview_scrivener_import(
             detail="Please upload a .zip file containing your .scriv project folder"
         )
 
-    # Save uploaded file temporarily
-    temp_path = None
+    upload = await _spool(file, suffix='.zip')
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_path = temp_file.name
-
         # Parse Scrivener project
-        project = await scrivener_import_service.parse_scrivener_project(temp_path)
+        project = await scrivener_import_service.parse_scrivener_project(upload.path)
 
         # Get preview
         preview = scrivener_import_service.get_preview(project)
@@ -386,9 +454,7 @@ async def preview_scrivener_import(
             detail=f"Error parsing Scrivener project: {str(e)}"
         )
     finally:
-        # Cleanup temp file
-        if temp_path and os.path.exists(temp_path):
-            os.remove(temp_path)
+        upload.remove()
 
 
 @router.post("/scrivener")
@@ -428,16 +494,10 @@ async def import_scrivener_project(
             detail="Please upload a .zip file containing your .scriv project folder"
         )
 
-    # Save uploaded file temporarily
-    temp_path = None
+    upload = await _spool(file, suffix='.zip')
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_path = temp_file.name
-
         # Parse Scrivener project
-        project = await scrivener_import_service.parse_scrivener_project(temp_path)
+        project = await scrivener_import_service.parse_scrivener_project(upload.path)
 
         # Convert to Maxwell format
         maxwell_data = scrivener_import_service.convert_to_maxwell(
@@ -447,79 +507,7 @@ async def import_scrivener_project(
             import_locations=import_locations
         )
 
-        # Create manuscript
-        manuscript_id = str(uuid_lib.uuid4())
-        manuscript = Manuscript(
-            id=manuscript_id,
-            title=maxwell_data["title"],
-            settings={
-                "imported_from": "scrivener",
-                "original_author": maxwell_data.get("author"),
-                "import_stats": maxwell_data.get("import_stats", {})
-            }
-        )
-        db.add(manuscript)
-
-        # Track totals
-        total_chapters = 0
-        total_word_count = 0
-
-        # Create chapters recursively
-        def create_chapters(chapter_list, parent_id=None):
-            nonlocal total_chapters, total_word_count
-
-            for idx, chapter_data in enumerate(chapter_list):
-                chapter_id = str(uuid_lib.uuid4())
-
-                chapter = Chapter(
-                    id=chapter_id,
-                    manuscript_id=manuscript_id,
-                    title=chapter_data["title"],
-                    content=chapter_data.get("content", ""),
-                    document_type=chapter_data.get("document_type", "CHAPTER"),
-                    order=idx,
-                    parent_id=parent_id
-                )
-                db.add(chapter)
-                total_chapters += 1
-                total_word_count += chapter_data.get("word_count", 0)
-
-                # Handle nested children
-                if chapter_data.get("children"):
-                    create_chapters(chapter_data["children"], chapter_id)
-
-        create_chapters(maxwell_data["chapters"])
-
-        # Create entities
-        total_entities = 0
-        for entity_data in maxwell_data["entities"]:
-            entity = Entity(
-                id=str(uuid_lib.uuid4()),
-                manuscript_id=manuscript_id,
-                name=entity_data["name"],
-                type=entity_data["type"],
-                description=entity_data.get("description", ""),
-                aliases=[],
-                attributes={
-                    "notes": entity_data.get("notes", ""),
-                    "imported_from": "scrivener",
-                    "scrivener_metadata": entity_data.get("metadata", {})
-                }
-            )
-            db.add(entity)
-            total_entities += 1
-
-        db.commit()
-
-        return {
-            "success": True,
-            "manuscript_id": manuscript_id,
-            "title": maxwell_data["title"],
-            "chapters_imported": total_chapters,
-            "entities_imported": total_entities,
-            "word_count": total_word_count,
-            "message": f"Successfully imported '{maxwell_data['title']}' from Scrivener"
-        }
+        return _create_scrivener_manuscript(db, maxwell_data)
 
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -530,6 +518,150 @@ async def import_scrivener_project(
             detail=f"Error importing Scrivener project: {str(e)}"
         )
     finally:
-        # Cleanup temp file
-        if temp_path and os.path.exists(temp_path):
-            os.remove(temp_path)
+        upload.remove()
+
+
+@router.post("/scrivener-async")
+async def import_scrivener_project_async(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(..., description="Zipped .scriv project folder"),
+    import_research: bool = Query(False, description="Import research folder as notes"),
+    import_characters: bool = Query(True, description="Import character sheets as Codex entities"),
+    import_locations: bool = Query(True, description="Import location documents as Codex entities"),
+) -> dict:
+    """
+    Start a Scrivener import in the background.
+
+    Returns a task_id; poll GET /api/import/tasks/{task_id} until it
+    completes with the new manuscript_id.
+    """
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="No file uploaded")
+
+    if not file.filename.endswith('.zip'):
+        raise HTTPException(
+            status_code=400,
+            detail="Please upload a .zip file containing your .scriv project folder"
+        )
+
+    upload = await _spool(file, suffix='.zip')
+    task = import_registry.create_task(file.filename, kind="scrivener")
+    background_tasks.add_task(
+        _run_scrivener_task, task.id, upload,
+        import_research, import_characters, import_locations,
+    )
+    return {"success": True, "task_id": task.id, "status": "started"}
+
+
+async def _run_scrivener_task(
+    task_id: str,
+    upload: SpooledUpload,
+    import_research: bool,
+    import_characters: bool,
+    import_locations: bool,
+):
+    """Background task: parse a spooled Scrivener zip and create the manuscript"""
+    db = SessionLocal()
+    try:
+        project = await scrivener_import_service.parse_scrivener_project(
+            upload.path, progress=_progress_reporter(task_id)
+        )
+        maxwell_data = scrivener_import_service.convert_to_maxwell(
+            project,
+            import_research=import_research,
+            import_characters=import_characters,
+            import_locations=import_locations
+        )
+        result = _create_scrivener_manuscript(db, maxwell_data)
+        import_registry.complete_task(task_id, manuscript_id=result["manuscript_id"])
+    except Exception as e:
+        logger.exception(f"Scrivener import failed for task {task_id}")
+        db.rollback()
+        import_registry.fail_task(task_id, str(e))
+    finally:
+        db.close()
+        upload.remove()
+
+
+def _create_scrivener_manuscript(db: Session, maxwell_data: dict) -> dict:
+    """Create the manuscript, chapters and entities for a converted Scrivener project"""
+    # Create manuscript
+    manuscript_id = str(uuid_lib.uuid4())
+    manuscript = Manuscript(
+        id=manuscript_id,
+        title=maxwell_data["title"],
+        settings={
+            "imported_from": "scrivener",
+            "original_author": maxwell_data.get("author"),
+            "import_stats": maxwell_data.get("import_stats", {})
+        }
+    )
+    db.add(manuscript)
+
+    # Track totals
+    total_chapters = 0
+    total_word_count = 0
+
+    # Create chapters recursively
+    def create_chapters(chapter_list, parent_id=None):
+        nonlocal total_chapters, total_word_count
+
+        for idx, chapter_data in enumerate(chapter_list):
+            chapter_id = str(uuid_lib.uuid4())
+            document_type = chapter_data.get("document_type", "CHAPTER")
+            content = chapter_data.get("content", "")
+            word_count = chapter_data.get("word_count", 0)
+
+            chapter = Chapter(
+                id=chapter_id,
+                manuscript_id=manuscript_id,
+                title=chapter_data["title"],
+                is_folder=1 if document_type == "FOLDER" else 0,
+                document_type=document_type,
+                order_index=idx,
+                parent_id=parent_id,
+                lexical_state=plain_text_to_lexical_json(content) if content else "",
+                content=content,
+                word_count=word_count,
+            )
+            db.add(chapter)
+            total_chapters += 1
+            total_word_count += word_count
+
+            # Handle nested children
+            if chapter_data.get("children"):
+                create_chapters(chapter_data["children"], chapter_id)
+
+    create_chapters(maxwell_data["chapters"])
+
+    # Create entities
+    total_entities = 0
+    for entity_data in maxwell_data["entities"]:
+        entity = Entity(
+            id=str(uuid_lib.uuid4()),
+            manuscript_id=manuscript_id,
+            name=entity_data["name"],
+            type=entity_data["type"],
+            aliases=[],
+            attributes={
+                "description": entity_data.get("description", ""),
+                "notes": entity_data.get("notes", ""),
+                "imported_from": "scrivener",
+                "scrivener_metadata": entity_data.get("metadata", {})
+            }
+        )
+        db.add(entity)
+        total_entities += 1
+
+    manuscript.word_count = total_word_count
+    db.commit()
+
+    return {
+        "success": True,
+        "manuscript_id": manuscript_id,
+        "title": maxwell_data["title"],
+        "chapters_imported": total_chapters,
+        "entities_imported": total_entities,
+        "word_count": total_word_count,
+        "message": f"Successfully imported '{maxwell_data['title']}' from Scrivener"
+    }
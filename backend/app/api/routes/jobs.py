@@ -0,0 +1,164 @@
+"""
+Job API Routes - Submit, poll, cancel and stream background jobs.
+
+Endpoints for:
+- Submitting any registered kind of job (deduplicated against in-flight jobs)
+- Polling a job or listing a user's jobs
+- Cancelling a job
+- Streaming progress and partial results (Server-Sent Events or WebSocket)
+"""
+
+import asyncio
+import json
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from app.services.job_queue import JOB_HANDLERS, job_manager
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+
+class SubmitJobRequest(BaseModel):
+    kind: str
+    params: Dict[str, Any] = {}
+    user_id: Optional[str] = None
+
+
+def submit_job(kind: str, params: Dict[str, Any], user_id: Optional[str] = None) -> Dict[str, Any]:
+    """Submit a job for a route; the response every job-starting endpoint returns"""
+    try:
+        job, created = job_manager.submit(kind, params, user_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "success": True,
+        "job_id": job["id"],
+        "status": job["status"],
+        "deduplicated": not created,
+        "data": job,
+    }
+
+
+@router.post("")
+def create_job(request: SubmitJobRequest):
+    """
+    Queue a job. If an identical job (same kind, user and parameters) is
+    already queued or running, that job is returned with deduplicated=true.
+    """
+    return submit_job(request.kind, request.params, request.user_id)
+
+
+@router.get("")
+def list_jobs(
+    user_id: Optional[str] = None,
+    status: Optional[str] = None,
+    kind: Optional[str] = None,
+    limit: int = 50
+):
+    """List jobs, most recent first"""
+    return {
+        "success": True,
+        "data": job_manager.list_jobs(user_id=user_id, status=status, kind=kind, limit=min(limit, 200)),
+    }
+
+
+@router.get("/kinds")
+def list_job_kinds():
+    """Kinds of job that can be submitted"""
+    return {
+        "success": True,
+        "data": [
+            {"kind": kind, "secret_params": list(handler.secret_params)}
+            for kind, handler in sorted(JOB_HANDLERS.items())
+        ],
+    }
+
+
+@router.get("/stats")
+def job_stats():
+    """Worker pool and queue counters"""
+    return {"success": True, "data": job_manager.get_stats()}
+
+
+@router.get("/{job_id}")
+def get_job(job_id: str):
+    """Poll a job's status, progress and (partial) results"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"success": True, "data": job}
+
+
+@router.post("/{job_id}/cancel")
+def cancel_job(job_id: str):
+    """Cancel a queued or running job"""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"success": True, "data": job}
+
+
+@router.get("/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """
+    Server-Sent Events for a job: a "snapshot" event, then "status",
+    "progress" and "partial" events until the job finishes.
+    """
+    subscription = await job_manager.subscribe(job_id)
+    if subscription is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        try:
+            async for event in subscription:
+                yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/{job_id}/ws")
+async def job_websocket(websocket: WebSocket, job_id: str):
+    """
+    The same events as /events over a WebSocket.
+
+    Client may send: {"type": "cancel"} to cancel the job
+    """
+    subscription = await job_manager.subscribe(job_id)
+    if subscription is None:
+        await websocket.close(code=1008, reason="Job not found")
+        return
+
+    await websocket.accept()
+
+    async def receive_commands():
+        while True:
+            message = await websocket.receive_json()
+            if isinstance(message, dict) and message.get("type") == "cancel":
+                await asyncio.to_thread(job_manager.cancel, job_id)
+
+    def on_receiver_done(task: asyncio.Task):
+        # A disconnect ends the stream too
+        subscription.close()
+        if not task.cancelled():
+            task.exception()
+
+    receiver = asyncio.create_task(receive_commands())
+    receiver.add_done_callback(on_receiver_done)
+    try:
+        async for event in subscription:
+            await websocket.send_json(json.loads(json.dumps(event, default=str)))
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        subscription.close()
@@ -8,72 +8,32 @@ from sqlalchemy.orm import Session
 import json
 import asyncio
 
-from app.database import get_db, SessionLocal
+from app.database import get_db
 from app.services.realtime_nlp_service import realtime_nlp_service
-from app.services.codex_service import codex_service
+from app.services.realtime_nlp_worker import realtime_nlp_worker
+from app.services.entity_suggestion_store import known_name_cache, persist_entity_suggestions
+from app.services.realtime_bus import realtime_bus
 from app.models.entity import Entity, EntitySuggestion
 
 router = APIRouter(prefix="/api/realtime", tags=["realtime"])
 
 
-def persist_entity_suggestion(manuscript_id: str, entity_data: dict) -> dict:
+@router.get("/metrics")
+async def get_realtime_metrics():
     """
-    Persist a detected entity to the database as a suggestion.
-    Returns the entity data with suggestion_id added.
+    Realtime NLP worker metrics for this process: pending chunks, batch size
+    and latency histograms (per nlp.pipe batch and per request end to end).
+    active_connections counts every worker sharing the realtime bus.
     """
-    db = SessionLocal()
-    try:
-        # Check for existing pending suggestion with same name
-        existing = db.query(EntitySuggestion).filter(
-            EntitySuggestion.manuscript_id == manuscript_id,
-            EntitySuggestion.name == entity_data['name'],
-            EntitySuggestion.status == "PENDING"
-        ).first()
-
-        if existing:
-            # Return existing suggestion ID
-            entity_data['suggestion_id'] = existing.id
-            entity_data['is_new'] = False
-            return entity_data
-
-        # Also check if entity already exists in codex
-        existing_entity = db.query(Entity).filter(
-            Entity.manuscript_id == manuscript_id,
-            Entity.name == entity_data['name']
-        ).first()
-
-        if existing_entity:
-            # Skip - entity already in codex
-            entity_data['suggestion_id'] = None
-            entity_data['is_new'] = False
-            entity_data['already_in_codex'] = True
-            return entity_data
-
-        # Create new suggestion
-        suggestion = EntitySuggestion(
-            manuscript_id=manuscript_id,
-            name=entity_data['name'],
-            type=entity_data['type'],
-            context=entity_data.get('context', ''),
-            status="PENDING"
-        )
-        db.add(suggestion)
-        db.commit()
-        db.refresh(suggestion)
-
-        entity_data['suggestion_id'] = suggestion.id
-        entity_data['is_new'] = True
-
-        print(f"💾 Persisted entity suggestion: {entity_data['name']} (ID: {suggestion.id})")
-        return entity_data
-    except Exception as e:
-        print(f"Error persisting entity suggestion: {e}")
-        db.rollback()
-        entity_data['suggestion_id'] = None
-        entity_data['is_new'] = False
-        return entity_data
-    finally:
-        db.close()
+    return {
+        "success": True,
+        "data": {
+            "worker": realtime_nlp_worker.get_metrics(),
+            "known_names": known_name_cache.get_stats(),
+            "bus": realtime_bus.get_stats(),
+            "active_connections": await realtime_bus.total_connections(),
+        },
+    }
 
 
 @router.websocket("/nlp/{manuscript_id}")
@@ -88,18 +48,20 @@ async def websocket_nlp_endpoint(
     Client sends: {"text_delta": "newly typed text"}
     Client sends: {"type": "config", "settings": {...}} for extraction settings
     Server sends: {"new_entities": [...], "timestamp": "...", "type": "entities"}
+    Server sends: {"type": "codex_entity", "entity": {...}, "suggestion_id": ...}
+      when any editor (in any worker) adds an entity to the Codex
     Server sends: {"type": "pong"} for keep-alive
+
+    Suggestions detected for one editor are broadcast as "entities" messages
+    to the manuscript's other editors.
     """
-    # Check connection limit
-    if not realtime_nlp_service.can_accept_connection(manuscript_id):
+    # Check connection limit (shared by all workers)
+    connection_id = realtime_bus.new_connection_id()
+    if not await realtime_bus.register(manuscript_id, connection_id):
         await websocket.close(code=1008, reason="Too many connections for this manuscript")
         print(f"❌ Connection rejected for {manuscript_id}: too many connections")
         return
 
-    await websocket.accept()
-    realtime_nlp_service.register_connection(manuscript_id)
-    print(f"✨ WebSocket connected for manuscript: {manuscript_id} ({realtime_nlp_service.active_connections.get(manuscript_id, 0)} active)")
-
     # Client-specific settings (can be updated via config messages)
     client_settings = {
         'enabled': True,
@@ -108,7 +70,11 @@ async def websocket_nlp_endpoint(
         'entity_types': ['CHARACTER', 'LOCATION', 'ITEM', 'LORE', 'CULTURE', 'CREATURE', 'RACE', 'ORGANIZATION', 'EVENT']  # types to detect
     }
 
+    subscription = None
     try:
+        await websocket.accept()
+        print(f"✨ WebSocket connected for manuscript: {manuscript_id} ({await realtime_bus.connection_count(manuscript_id)} active)")
+
         # Get existing entities from database (cached per connection)
         existing_entities = db.query(Entity).filter_by(
             manuscript_id=manuscript_id
@@ -121,16 +87,31 @@ async def websocket_nlp_endpoint(
             status="PENDING"
         ).all()
         existing_names.extend([s.name for s in pending_suggestions])
+        known_name_cache.seed(manuscript_id, existing_names)
 
         # Close database session early to free connection
         db.close()
 
-        # Create a queue for incoming text
-        text_queue = asyncio.Queue()
+        # Per-connection stream processor: own debounce, coalesced deltas
+        session = realtime_nlp_service.create_session(
+            manuscript_id,
+            existing_names,
+            client_settings['confidence_threshold']
+        )
+
+        # Messages from the manuscript's other editors, in any worker
+        subscription = await realtime_bus.subscribe(manuscript_id)
+
+        def remember(names):
+            """Names other editors already handled need no suggestion here"""
+            for name in names:
+                if name not in existing_names:
+                    existing_names.append(name)
+            known_name_cache.add(manuscript_id, names)
 
         # Start background processor
         async def receive_text():
-            """Receive text deltas from client and add to queue"""
+            """Receive text deltas from client and feed this connection's session"""
             nonlocal client_settings
             try:
                 while True:
@@ -139,7 +120,7 @@ async def websocket_nlp_endpoint(
 
                     if 'text_delta' in message:
                         if client_settings['enabled']:
-                            await text_queue.put(message['text_delta'])
+                            session.push(message['text_delta'])
                     elif message.get('type') == 'ping':
                         # Respond to keep-alive pings
                         await websocket.send_json({"type": "pong"})
@@ -155,8 +136,11 @@ async def websocket_nlp_endpoint(
                         if 'entity_types' in settings:
                             client_settings['entity_types'] = settings['entity_types']
 
-                        # Update service debounce delay
-                        realtime_nlp_service.debounce_delay = client_settings['debounce_delay']
+                        # Applies to this connection only
+                        session.configure(
+                            debounce_delay=client_settings['debounce_delay'],
+                            confidence_threshold=client_settings['confidence_threshold']
+                        )
 
                         await websocket.send_json({
                             "type": "config_ack",
@@ -167,17 +151,15 @@ async def websocket_nlp_endpoint(
                 print(f"❌ WebSocket disconnected: {manuscript_id}")
             except Exception as e:
                 print(f"Error receiving text: {e}")
+            finally:
+                session.close()
+                subscription.close()
 
         async def process_and_send():
             """Process text queue and send entity suggestions"""
             nonlocal existing_names
             try:
-                async for result in realtime_nlp_service.process_text_stream(
-                    manuscript_id,
-                    existing_names,
-                    text_queue,
-                    client_settings['confidence_threshold']
-                ):
+                async for result in session.results():
                     # Filter by configured entity types
                     filtered_entities = [
                         e for e in result['new_entities']
@@ -187,14 +169,19 @@ async def websocket_nlp_endpoint(
                     if not filtered_entities:
                         continue
 
-                    # Persist each entity to database and get suggestion IDs
-                    persisted_entities = []
-                    for entity in filtered_entities:
-                        persisted = persist_entity_suggestion(manuscript_id, entity)
-                        # Only include new suggestions (not duplicates or already in codex)
-                        if persisted.get('is_new') or persisted.get('suggestion_id'):
-                            if not persisted.get('already_in_codex'):
-                                persisted_entities.append(persisted)
+                    # Persist the whole result set in one transaction, off the event loop
+                    persisted_entities = await asyncio.to_thread(
+                        persist_entity_suggestions, manuscript_id, filtered_entities
+                    )
+
+                    new_entities = [e for e in persisted_entities if e['is_new']]
+                    if new_entities:
+                        await realtime_bus.publish(manuscript_id, {
+                            "type": "entities",
+                            "new_entities": new_entities,
+                            "timestamp": result['timestamp'],
+                            "origin": connection_id
+                        })
 
                     if persisted_entities:
                         # Send detected entities to client with suggestion IDs
@@ -207,16 +194,29 @@ async def websocket_nlp_endpoint(
                         print(f"📤 Sent {len(persisted_entities)} entity suggestions (persisted)")
 
                         # Update existing entities list to avoid duplicates
-                        for entity in persisted_entities:
-                            if entity['name'] not in existing_names:
-                                existing_names.append(entity['name'])
+                        remember([e['name'] for e in persisted_entities])
             except Exception as e:
                 print(f"Error processing text: {e}")
 
-        # Run both tasks concurrently
+        async def forward_broadcasts():
+            """Relay other editors' suggestions and Codex changes to this client"""
+            try:
+                async for message in subscription:
+                    if message.get('origin') == connection_id:
+                        continue
+                    if message.get('type') == 'entities':
+                        remember([e['name'] for e in message.get('new_entities', [])])
+                    elif message.get('type') == 'codex_entity':
+                        remember([message['entity']['name']])
+                    await websocket.send_json({k: v for k, v in message.items() if k != 'origin'})
+            except Exception as e:
+                print(f"Error forwarding broadcast: {e}")
+
+        # Run all three tasks concurrently
         await asyncio.gather(
             receive_text(),
-            process_and_send()
+            process_and_send(),
+            forward_broadcasts()
         )
 
     except WebSocketDisconnect:
@@ -226,6 +226,9 @@ async def websocket_nlp_endpoint(
         import traceback
         traceback.print_exc()
     finally:
-        realtime_nlp_service.unregister_connection(manuscript_id)
-        remaining = realtime_nlp_service.active_connections.get(manuscript_id, 0)
+        if subscription is not None:
+            subscription.close()
+        remaining = await realtime_bus.unregister(manuscript_id, connection_id)
+        if not realtime_bus.local_connections(manuscript_id):
+            known_name_cache.forget(manuscript_id)
         print(f"🔌 WebSocket closed for manuscript: {manuscript_id} ({remaining} remaining)")
@@ -6,15 +6,19 @@ Endpoints for timeline event management, analysis, and inconsistency detection
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 
-from fastapi import APIRouter, BackgroundTasks, HTTPException
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 
+from app.api.routes.jobs import submit_job
 from app.services.codex_service import codex_service
+from app.services.job_queue import JobContext, job_handler
 from app.services.nlp_service import nlp_service
 from app.services.timeline_service import timeline_service
 
 router = APIRouter(prefix="/api/timeline", tags=["timeline"])
 
+TIMELINE_ANALYSIS_JOB = "timeline.analyze"
+
 
 # ==================== Request/Response Models ====================
 
@@ -271,10 +275,10 @@ async def reorder_events(request: ReorderEventsRequest):
 # ==================== Timeline Analysis Endpoint ====================
 
 @router.post("/analyze")
-async def analyze_timeline(request: AnalyzeTimelineRequest, background_tasks: BackgroundTasks):
+def analyze_timeline(request: AnalyzeTimelineRequest):
     """
     Analyze text and extract timeline events using NLP
-    Runs as background task
+    Runs as a background job; poll or stream it via /api/jobs/{job_id}
     """
     if not nlp_service.is_available():
         raise HTTPException(
@@ -282,119 +286,128 @@ async def analyze_timeline(request: AnalyzeTimelineRequest, background_tasks: Ba
             detail="NLP service not available. Install spaCy and download en_core_web_lg model."
         )
 
-    # Start background analysis
-    background_tasks.add_task(
-        _process_timeline_analysis,
-        request.manuscript_id,
-        request.text,
-        request.chapter_id
+    response = submit_job(
+        TIMELINE_ANALYSIS_JOB,
+        {"manuscript_id": request.manuscript_id, "text": request.text, "chapter_id": request.chapter_id},
     )
+    response["message"] = "Timeline analysis started. Events will be created automatically."
+    response["manuscript_id"] = request.manuscript_id
+    return response
+
+
+@job_handler(TIMELINE_ANALYSIS_JOB)
+def run_timeline_analysis(ctx: JobContext, manuscript_id: str, text: str, chapter_id: Optional[str] = None):
+    """Job: extract timeline events from text, then check for inconsistencies"""
+    print(f"🔍 Starting timeline analysis for manuscript {manuscript_id}" + (f", chapter {chapter_id}" if chapter_id else "") + "...")
+    ctx.report(progress_percent=0.0, stage="Extracting events")
+
+    # Get existing entities (for character/location detection)
+    existing_entities = codex_service.get_entities(manuscript_id)
+    existing_dicts = [
+        {
+            "name": e.name,
+            "type": e.type,
+            "aliases": e.aliases
+        }
+        for e in existing_entities
+    ]
+
+    # Analyze timeline
+    results = nlp_service.analyze_timeline(text, manuscript_id, existing_dicts)
+    total_events = len(results["events"])
+
+    print(f"📊 Found {total_events} events")
+    ctx.report(progress_percent=40.0, stage="Creating events", events_found=total_events)
+
+    # Get existing events for deduplication
+    existing_events = timeline_service.get_events(manuscript_id)
+    existing_descriptions = {e.description.lower().strip() for e in existing_events}
+
+    # Create timeline events with deduplication
+    created_count = 0
+    skipped_count = 0
+
+    for index, event_data in enumerate(results["events"]):
+        ctx.check_cancelled()
+
+        # Deduplication check - skip if exact description already exists
+        event_desc = event_data["description"].strip()
+        if event_desc.lower() in existing_descriptions:
+            skipped_count += 1
+            print(f"⏭️  Skipping duplicate event: {event_desc[:50]}...")
+            continue
+
+        # Map character names to IDs
+        character_ids = []
+        for char_name in event_data.get("characters", []):
+            char_entity = next((e for e in existing_entities if e.name == char_name), None)
+            if char_entity:
+                character_ids.append(char_entity.id)
+
+        # Map location name to ID
+        location_id = None
+        if event_data.get("location"):
+            loc_entity = next((e for e in existing_entities if e.name == event_data["location"]), None)
+            if loc_entity:
+                location_id = loc_entity.id
+
+        # Create event with auto_generated flag and chapter_id
+        event_metadata = event_data.get("metadata", {})
+        event_metadata["auto_generated"] = True  # Mark as auto-generated
+        if chapter_id:
+            event_metadata["chapter_id"] = chapter_id  # Track source chapter
+
+        timeline_service.create_event(
+            manuscript_id=manuscript_id,
+            description=event_desc,
+            event_type=event_data["event_type"],
+            order_index=event_data["order_index"],
+            timestamp=event_data.get("timestamp"),
+            location_id=location_id,
+            character_ids=character_ids,
+            metadata=event_metadata
+        )
 
-    return {
-        "success": True,
-        "message": "Timeline analysis started. Events will be created automatically.",
-        "manuscript_id": request.manuscript_id
-    }
+        # Add to our deduplication set
+        existing_descriptions.add(event_desc.lower())
+        created_count += 1
+
+        # Track character locations if both character and location exist
+        if location_id and character_ids:
+            for char_id in character_ids:
+                try:
+                    timeline_service.track_character_location(
+                        character_id=char_id,
+                        event_id=event_data["order_index"],  # Use order_index temporarily
+                        location_id=location_id,
+                        manuscript_id=manuscript_id
+                    )
+                except Exception as e:
+                    print(f"⚠️ Failed to track character location: {e}")
+
+        ctx.report(
+            progress_percent=40.0 + 50.0 * (index + 1) / total_events,
+            events_created=created_count,
+            duplicates_skipped=skipped_count,
+        )
 
+    print(f"✅ Timeline analysis complete. Created {created_count} new events, skipped {skipped_count} duplicates.")
 
-async def _process_timeline_analysis(manuscript_id: str, text: str, chapter_id: Optional[str] = None):
-    """Background task to process timeline analysis"""
+    # Run inconsistency detection
+    ctx.report(progress_percent=90.0, stage="Detecting inconsistencies")
+    inconsistency_count = None
     try:
-        print(f"🔍 Starting timeline analysis for manuscript {manuscript_id}" + (f", chapter {chapter_id}" if chapter_id else "") + "...")
-
-        # Get existing entities (for character/location detection)
-        existing_entities = codex_service.get_entities(manuscript_id)
-        existing_dicts = [
-            {
-                "name": e.name,
-                "type": e.type,
-                "aliases": e.aliases
-            }
-            for e in existing_entities
-        ]
-
-        # Analyze timeline
-        results = nlp_service.analyze_timeline(text, manuscript_id, existing_dicts)
-
-        print(f"📊 Found {len(results['events'])} events")
-
-        # Get existing events for deduplication
-        existing_events = timeline_service.get_events(manuscript_id)
-        existing_descriptions = {e.description.lower().strip() for e in existing_events}
-
-        # Create timeline events with deduplication
-        created_count = 0
-        skipped_count = 0
-
-        for event_data in results["events"]:
-            # Deduplication check - skip if exact description already exists
-            event_desc = event_data["description"].strip()
-            if event_desc.lower() in existing_descriptions:
-                skipped_count += 1
-                print(f"⏭️  Skipping duplicate event: {event_desc[:50]}...")
-                continue
-
-            # Map character names to IDs
-            character_ids = []
-            for char_name in event_data.get("characters", []):
-                char_entity = next((e for e in existing_entities if e.name == char_name), None)
-                if char_entity:
-                    character_ids.append(char_entity.id)
-
-            # Map location name to ID
-            location_id = None
-            if event_data.get("location"):
-                loc_entity = next((e for e in existing_entities if e.name == event_data["location"]), None)
-                if loc_entity:
-                    location_id = loc_entity.id
-
-            # Create event with auto_generated flag and chapter_id
-            event_metadata = event_data.get("metadata", {})
-            event_metadata["auto_generated"] = True  # Mark as auto-generated
-            if chapter_id:
-                event_metadata["chapter_id"] = chapter_id  # Track source chapter
-
-            timeline_service.create_event(
-                manuscript_id=manuscript_id,
-                description=event_desc,
-                event_type=event_data["event_type"],
-                order_index=event_data["order_index"],
-                timestamp=event_data.get("timestamp"),
-                location_id=location_id,
-                character_ids=character_ids,
-                metadata=event_metadata
-            )
-
-            # Add to our deduplication set
-            existing_descriptions.add(event_desc.lower())
-            created_count += 1
-
-            # Track character locations if both character and location exist
-            if location_id and character_ids:
-                for char_id in character_ids:
-                    try:
-                        timeline_service.track_character_location(
-                            character_id=char_id,
-                            event_id=event_data["order_index"],  # Use order_index temporarily
-                            location_id=location_id,
-                            manuscript_id=manuscript_id
-                        )
-                    except Exception as e:
-                        print(f"⚠️ Failed to track character location: {e}")
-
-        print(f"✅ Timeline analysis complete. Created {created_count} new events, skipped {skipped_count} duplicates.")
-
-        # Run inconsistency detection
-        try:
-            inconsistencies = timeline_service.detect_inconsistencies(manuscript_id)
-            print(f"🔍 Detected {len(inconsistencies)} timeline inconsistencies")
-        except Exception as e:
-            print(f"⚠️ Failed to detect inconsistencies: {e}")
-
+        inconsistency_count = len(timeline_service.detect_inconsistencies(manuscript_id))
+        print(f"🔍 Detected {inconsistency_count} timeline inconsistencies")
     except Exception as e:
-        print(f"❌ Timeline analysis failed: {e}")
-        import traceback
-        traceback.print_exc()
+        print(f"⚠️ Failed to detect inconsistencies: {e}")
+
+    return {
+        "events_found": total_events,
+        "events_created": created_count,
+        "duplicates_skipped": skipped_count,
+        "inconsistencies": inconsistency_count,
+    }
 
 
 # ==================== Character Location Tracking ====================
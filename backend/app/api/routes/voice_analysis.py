@@ -84,6 +84,15 @@ class ManuscriptVoiceSummary(BaseModel):
     open_inconsistencies: int
 
 
+def _character_names(db: Session, character_ids) -> dict:
+    """Character names by id, in one query"""
+    from app.models.entity import Entity
+
+    if not character_ids:
+        return {}
+    return dict(db.query(Entity.id, Entity.name).filter(Entity.id.in_(list(character_ids))).all())
+
+
 # --- Endpoints ---
 
 @router.get("/profile/{character_id}")
@@ -146,40 +155,20 @@ async def analyze_voice_consistency(
     service = VoiceAnalysisService(db)
 
     try:
-        all_inconsistencies = []
-
-        if character_id:
-            # Analyze specific character
-            inconsistencies = service.detect_inconsistencies(
-                manuscript_id=manuscript_id,
-                character_id=character_id,
-                chapter_id=chapter_id
-            )
-            all_inconsistencies.extend(inconsistencies)
-        else:
-            # Analyze all characters
-            from app.models.entity import Entity
-            characters = db.query(Entity).filter(
-                Entity.manuscript_id == manuscript_id,
-                Entity.type == "CHARACTER"
-            ).all()
-
-            for char in characters:
-                inconsistencies = service.detect_inconsistencies(
-                    manuscript_id=manuscript_id,
-                    character_id=char.id,
-                    chapter_id=chapter_id
-                )
-                all_inconsistencies.extend(inconsistencies)
+        all_inconsistencies = service.detect_all_inconsistencies(
+            manuscript_id=manuscript_id,
+            character_ids=[character_id] if character_id else None,
+            chapter_id=chapter_id
+        )
 
         # Format response
+        names = _character_names(db, {issue.character_id for issue in all_inconsistencies})
         results = []
         for issue in all_inconsistencies:
-            character = db.query(Entity).filter(Entity.id == issue.character_id).first()
             results.append({
                 "id": issue.id,
                 "character_id": issue.character_id,
-                "character_name": character.name if character else "Unknown",
+                "character_name": names.get(issue.character_id, "Unknown"),
                 "chapter_id": issue.chapter_id,
                 "inconsistency_type": issue.inconsistency_type,
                 "severity": issue.severity,
@@ -267,8 +256,6 @@ async def get_inconsistencies(
 
     Can be filtered by character, severity, and resolution status.
     """
-    from app.models.entity import Entity
-
     query = db.query(VoiceInconsistency).filter(
         VoiceInconsistency.manuscript_id == manuscript_id
     )
@@ -284,13 +271,13 @@ async def get_inconsistencies(
 
     issues = query.order_by(VoiceInconsistency.created_at.desc()).all()
 
+    names = _character_names(db, {issue.character_id for issue in issues})
     results = []
     for issue in issues:
-        character = db.query(Entity).filter(Entity.id == issue.character_id).first()
         results.append({
             "id": issue.id,
             "character_id": issue.character_id,
-            "character_name": character.name if character else "Unknown",
+            "character_name": names.get(issue.character_id, "Unknown"),
             "chapter_id": issue.chapter_id,
             "inconsistency_type": issue.inconsistency_type,
             "severity": issue.severity,
@@ -408,26 +395,28 @@ async def build_all_voice_profiles(
         Entity.type == "CHARACTER"
     ).all()
 
-    profiles_built = []
-    for char in characters:
-        try:
-            profile = service.build_voice_profile(
-                manuscript_id=manuscript_id,
-                character_id=char.id,
-                force_rebuild=force_rebuild
-            )
-            profiles_built.append({
-                "character_id": char.id,
-                "character_name": char.name,
-                "confidence_score": profile.confidence_score,
-                "dialogue_samples": profile.profile_data.get("dialogue_samples", 0) if profile.profile_data else 0,
-            })
-        except Exception as e:
-            profiles_built.append({
+    try:
+        profiles = service.build_voice_profiles(
+            manuscript_id=manuscript_id,
+            character_ids=[char.id for char in characters],
+            force_rebuild=force_rebuild
+        )
+    except Exception as e:
+        db.rollback()
+        profiles_built = [
+            {"character_id": char.id, "character_name": char.name, "error": str(e)}
+            for char in characters
+        ]
+    else:
+        profiles_built = [
+            {
                 "character_id": char.id,
                 "character_name": char.name,
-                "error": str(e)
-            })
+                "confidence_score": profiles[char.id].confidence_score,
+                "dialogue_samples": (profiles[char.id].profile_data or {}).get("dialogue_samples", 0),
+            }
+            for char in characters
+        ]
 
     return {
         "success": True,
@@ -8,20 +8,22 @@ Endpoints for:
 - Wiki-Codex synchronization
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel
 from datetime import datetime
 import logging
 
-from app.database import get_db, SessionLocal
+from app.database import get_db
 from app.services.wiki_service import WikiService, WikiConsistencyEngine
 from app.services.wiki_codex_bridge import WikiCodexBridge
 from app.services.wiki_auto_populator import WikiAutoPopulator
 from app.services.culture_service import CultureService
-from app.services.scan_task_registry import scan_registry
+from app.services.job_queue import JobContext, job_handler
+from app.services.scan_task_registry import WIKI_SCAN_JOB, scan_registry
 from app.services.world_service import world_service
+from app.services.world_scan import world_scanner
 from app.models.wiki import WikiEntry, WikiEntryType, WikiEntryStatus, WikiChangeType, WikiReferenceType
 from app.models.manuscript import Manuscript
 
@@ -618,11 +620,13 @@ def get_reference_types():
 class AnalyzeManuscriptRequest(BaseModel):
     manuscript_id: str
     world_id: Optional[str] = None
+    full_rescan: bool = False  # Re-extract unchanged paragraphs too
 
 
 class AnalyzeChapterRequest(BaseModel):
     chapter_id: str
     world_id: Optional[str] = None
+    full_rescan: bool = False
 
 
 class AutoApproveRequest(BaseModel):
@@ -636,13 +640,15 @@ def analyze_manuscript_for_wiki(
 ):
     """
     Analyze a manuscript for wiki updates.
-    Creates proposed changes in the approval queue.
+    Creates proposed changes in the approval queue; only paragraphs changed
+    since the last analysis are extracted unless full_rescan is set.
     """
     populator = WikiAutoPopulator(db)
 
     result = populator.analyze_manuscript(
         manuscript_id=request.manuscript_id,
-        world_id=request.world_id
+        world_id=request.world_id,
+        full_rescan=request.full_rescan
     )
 
     if "error" in result:
@@ -658,13 +664,14 @@ def analyze_chapter_for_wiki(
 ):
     """
     Analyze a single chapter for wiki updates.
-    Lightweight analysis for incremental updates.
+    Incremental: only paragraphs changed since the last analysis are extracted.
     """
     populator = WikiAutoPopulator(db)
 
     result = populator.analyze_chapter(
         chapter_id=request.chapter_id,
-        world_id=request.world_id
+        world_id=request.world_id,
+        full_rescan=request.full_rescan
     )
 
     if "error" in result:
@@ -723,97 +730,22 @@ class MergeEntriesRequest(BaseModel):
     target_entry_id: str
 
 
-def _run_world_scan(task_id: str, world_id: str):
-    """Background task: scan all manuscripts in a world"""
-    db = SessionLocal()
-    try:
-        manuscripts = world_service.list_manuscripts_in_world(db, world_id, limit=500)
-        total = len(manuscripts)
-        total_changes = 0
-
-        for i, manuscript in enumerate(manuscripts):
-            scan_registry.update_progress(
-                task_id,
-                manuscripts_completed=i,
-                current_manuscript_title=manuscript.title or f"Manuscript {i+1}",
-                current_stage="Starting analysis",
-                progress_percent=(i / max(total, 1)) * 100,
-                changes_so_far=total_changes,
-            )
-
-            populator = WikiAutoPopulator(db)
-
-            def on_stage(stage_name: str, stage_index: int):
-                # 5 stages per manuscript
-                ms_progress = (i + (stage_index / 5)) / max(total, 1) * 100
-                scan_registry.update_progress(
-                    task_id,
-                    manuscripts_completed=i,
-                    current_manuscript_title=manuscript.title or f"Manuscript {i+1}",
-                    current_stage=stage_name,
-                    progress_percent=ms_progress,
-                    changes_so_far=total_changes,
-                )
-
-            result = populator.analyze_manuscript(
-                manuscript_id=manuscript.id,
-                world_id=world_id,
-                progress_callback=on_stage,
-            )
-            total_changes += result.get("total_changes", 0)
-
-        scan_registry.complete_task(task_id, total_changes)
-    except Exception as e:
-        logger.exception(f"World scan failed for task {task_id}")
-        scan_registry.fail_task(task_id, str(e))
-    finally:
-        db.close()
-
-
-def _run_manuscript_scan(task_id: str, manuscript_id: str, world_id: Optional[str]):
-    """Background task: scan a single manuscript"""
-    db = SessionLocal()
-    try:
-        from app.models.manuscript import Manuscript as ManuscriptModel
-        manuscript = db.query(ManuscriptModel).filter_by(id=manuscript_id).first()
-        ms_title = manuscript.title if manuscript else "Unknown"
-
-        scan_registry.update_progress(
-            task_id,
-            manuscripts_completed=0,
-            current_manuscript_title=ms_title,
-            current_stage="Starting analysis",
-            progress_percent=0,
-        )
-
-        populator = WikiAutoPopulator(db)
+@job_handler(WIKI_SCAN_JOB, dedup_params=("world_id",))
+def run_wiki_scan(ctx: JobContext, world_id: str, manuscript_id: Optional[str] = None):
+    """Job: scan one manuscript, or every manuscript in a world (in parallel), for wiki changes"""
+    with ctx.session() as db:
+        if manuscript_id:
+            manuscripts = db.query(Manuscript).filter_by(id=manuscript_id).all()
+        else:
+            manuscripts = world_service.list_manuscripts_in_world(db, world_id, limit=500)
 
-        def on_stage(stage_name: str, stage_index: int):
-            scan_registry.update_progress(
-                task_id,
-                manuscripts_completed=0,
-                current_manuscript_title=ms_title,
-                current_stage=stage_name,
-                progress_percent=(stage_index / 5) * 100,
-            )
-
-        result = populator.analyze_manuscript(
-            manuscript_id=manuscript_id,
-            world_id=world_id,
-            progress_callback=on_stage,
-        )
-        scan_registry.complete_task(task_id, result.get("total_changes", 0))
-    except Exception as e:
-        logger.exception(f"Manuscript scan failed for task {task_id}")
-        scan_registry.fail_task(task_id, str(e))
-    finally:
-        db.close()
+        result = world_scanner.scan(db, world_id, manuscripts, progress_callback=ctx.report)
+        return {"total_changes": result["total_changes"]}
 
 
 @router.post("/auto-populate/world")
 def start_world_scan(
     request: WorldScanRequest,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """Start a background scan of all manuscripts in a world. Returns task_id for polling."""
@@ -826,15 +758,13 @@ def start_world_scan(
     if not manuscripts:
         raise HTTPException(status_code=400, detail="No manuscripts found in this world")
 
-    task = scan_registry.create_task(request.world_id, len(manuscripts))
-    background_tasks.add_task(_run_world_scan, task.id, request.world_id)
+    task = scan_registry.start_scan(request.world_id)
     return {"task_id": task.id, "total_manuscripts": len(manuscripts)}
 
 
 @router.post("/auto-populate/manuscript-async")
 def start_manuscript_scan(
     request: ManuscriptScanAsyncRequest,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """Start a background scan of a single manuscript. Returns task_id for polling."""
@@ -851,8 +781,7 @@ def start_manuscript_scan(
     if active:
         return {"task_id": active.id, "status": "already_running"}
 
-    task = scan_registry.create_task(world_id, 1)
-    background_tasks.add_task(_run_manuscript_scan, task.id, request.manuscript_id, world_id)
+    task = scan_registry.start_scan(world_id, request.manuscript_id)
     return {"task_id": task.id, "total_manuscripts": 1}
 
 
@@ -872,6 +801,7 @@ def get_scan_task(task_id: str):
         "current_stage": task.current_stage,
         "progress_percent": round(task.progress_percent, 1),
         "total_changes": task.total_changes,
+        "workers": task.workers,
         "error": task.error,
     }
 
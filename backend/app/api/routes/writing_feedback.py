@@ -19,6 +19,7 @@ from app.services.writing_feedback_service import (
     WritingIssue
 )
 from app.services.languagetool_service import languagetool_service
+from app.services.lexical_utils import parse_lexical
 
 router = APIRouter(prefix="/api/writing-feedback", tags=["writing-feedback"])
 
@@ -453,25 +454,5 @@ def _extract_text_from_content(content: Optional[str]) -> str:
         return content
 
     # Parse Lexical JSON and extract text
-    try:
-        import json
-        data = json.loads(content)
-        return _extract_text_from_lexical(data)
-    except (json.JSONDecodeError, KeyError):
-        return content
-
-
-def _extract_text_from_lexical(node: dict) -> str:
-    """Recursively extract text from Lexical JSON nodes."""
-    text_parts = []
-
-    if node.get("type") == "text":
-        text_parts.append(node.get("text", ""))
-    elif "children" in node:
-        for child in node["children"]:
-            text_parts.append(_extract_text_from_lexical(child))
-        # Add paragraph breaks between block-level elements
-        if node.get("type") in ("paragraph", "heading"):
-            text_parts.append("\n")
-
-    return "".join(text_parts)
+    document = parse_lexical(content)
+    return document.text if document.valid else content
@@ -7,6 +7,9 @@ FastAPI application for fiction writing IDE
 from dotenv import load_dotenv
 load_dotenv()
 
+import asyncio
+import os
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -23,7 +26,15 @@ from app.services import (
     GRAPH_AVAILABLE
 )
 from app.services.nlp_service import nlp_service
-from app.api.routes import versioning, manuscripts, codex, timeline, chapters, stats, realtime, fast_coach, recap, export, onboarding, outlines, brainstorming, worlds, entity_states, foreshadowing, import_routes, share, agents, privacy, carbon, thesaurus, writing_feedback, voice_analysis, wiki, character_arcs, world_rules, analysis, ai
+from app.services.local_inference_worker import local_inference_worker, warm_models_from_env
+from app.services.realtime_nlp_worker import realtime_nlp_worker
+from app.services.realtime_bus import realtime_bus
+from app.services.import_workers import import_pool
+from app.services.export_workers import export_pool
+from app.services.analysis_engine import analysis_engine
+from app.services.world_scan import world_scanner
+from app.services.job_queue import job_manager
+from app.api.routes import versioning, manuscripts, codex, timeline, chapters, stats, realtime, fast_coach, recap, export, onboarding, outlines, brainstorming, worlds, entity_states, foreshadowing, import_routes, share, agents, privacy, carbon, thesaurus, writing_feedback, voice_analysis, wiki, character_arcs, world_rules, analysis, ai, jobs
 
 
 @asynccontextmanager
@@ -36,6 +47,9 @@ async def lifespan(app: FastAPI):
     print("📊 Setting up database...")
     init_db()
 
+    # Resume jobs a restart interrupted and start the job workers
+    job_manager.start()
+
     # Initialize services
     if nlp_service.is_available():
         print("🧠 NLP service available (spaCy en_core_web_lg)")
@@ -56,12 +70,29 @@ async def lifespan(app: FastAPI):
     print("🌱 Carbon tracking enabled (SCI methodology)")
     print("📚 World Wiki enabled (unified narrative backbone)")
 
+    # Load configured local models in the background so offline mode answers fast
+    warm_task = None
+    if os.getenv("LOCAL_LLM_WARM_MODELS"):
+        print("🦙 Warming local LLM models...")
+        warm_task = asyncio.create_task(asyncio.to_thread(warm_models_from_env, local_inference_worker))
+
     print("✅ Backend ready!")
 
     yield
 
     # Shutdown
     print("👋 Shutting down Codex IDE backend...")
+    if warm_task is not None and not warm_task.done():
+        warm_task.cancel()
+        await asyncio.gather(warm_task, return_exceptions=True)
+    local_inference_worker.unload()
+    realtime_nlp_worker.shutdown()
+    await realtime_bus.close()
+    import_pool.shutdown()
+    export_pool.shutdown()
+    analysis_engine.shutdown()
+    world_scanner.shutdown()
+    job_manager.shutdown()
 
 
 # Create FastAPI app
@@ -111,6 +142,7 @@ app.include_router(character_arcs.router)
 app.include_router(world_rules.router)
 app.include_router(analysis.router)
 app.include_router(ai.router)
+app.include_router(jobs.router)
 
 
 @app.get("/")
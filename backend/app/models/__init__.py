@@ -27,6 +27,9 @@ from app.models.wiki import (
 )
 from app.models.character_arc import CharacterArc, ArcTemplate, ARC_TEMPLATE_DEFINITIONS
 from app.models.world_rule import WorldRule, RuleViolation, RuleType, RuleSeverity, RULE_TEMPLATES
+from app.models.analysis_cache import ChapterAnalysisCache
+from app.models.dialogue_index import DialogueIndexChapter, DialogueSpan
+from app.models.job import Job, JobStatus
 
 __all__ = [
     # World/Series hierarchy
@@ -117,4 +120,12 @@ __all__ = [
     "RuleType",
     "RuleSeverity",
     "RULE_TEMPLATES",
+    # Analysis Cache
+    "ChapterAnalysisCache",
+    # Dialogue Index
+    "DialogueIndexChapter",
+    "DialogueSpan",
+    # Jobs
+    "Job",
+    "JobStatus",
 ]
@@ -0,0 +1,45 @@
+"""
+Chapter Analysis Cache model - persisted per-chapter narrative analysis results.
+
+Manuscript reports (POV, pacing, emotional beats, scene purpose, subplots,
+relationships) are reductions over per-chapter partial results. Storing each
+partial against a hash of its inputs lets a report re-run only the chapters
+that changed since the last analysis.
+"""
+
+from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, JSON, Index
+from datetime import datetime
+import uuid
+
+from app.database import Base
+
+
+class ChapterAnalysisCache(Base):
+    """
+    One analyzer's partial result for one chapter.
+
+    A row is valid for (chapter_id, analyzer, analyzer_version, content_hash):
+    content_hash covers everything the analyzer reads (chapter text, title,
+    position and manuscript inputs such as character names). Each chapter
+    keeps a single row per analyzer, replaced whenever it is re-analyzed.
+    """
+    __tablename__ = "chapter_analysis_cache"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    chapter_id = Column(String, ForeignKey("chapters.id", ondelete="CASCADE"), nullable=False)
+    manuscript_id = Column(String, nullable=False, index=True)
+
+    analyzer = Column(String, nullable=False)  # pov, pacing, emotional_beats, ...
+    analyzer_version = Column(Integer, nullable=False)
+    content_hash = Column(String(64), nullable=False)  # sha256 of the analyzer's inputs
+    result = Column(JSON, nullable=False)  # The analyzer's per-chapter output
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Conflict target for the bulk upsert after each analysis
+        Index("uq_chapter_analysis_cache_chapter_analyzer", "chapter_id", "analyzer", unique=True),
+    )
+
+    def __repr__(self):
+        return f"<ChapterAnalysisCache(chapter={self.chapter_id}, analyzer={self.analyzer}, v{self.analyzer_version})>"
@@ -0,0 +1,63 @@
+"""
+Dialogue Index models - attributed dialogue spans for voice analysis.
+
+Voice profiles, inconsistency checks and voice comparisons all read the
+dialogue each character speaks. Extracting it is a regex pass over every
+chapter, so the results are stored once per chapter and refreshed only
+when the chapter text (or the cast's names) changes.
+"""
+
+from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Text, Index
+from datetime import datetime
+import uuid
+
+from app.database import Base
+
+
+class DialogueIndexChapter(Base):
+    """
+    Index state of one chapter.
+
+    content_hash covers the chapter text and every speaker's name variants;
+    the chapter's spans are current while it matches. Chapters without any
+    attributed dialogue still get a row, so they aren't re-scanned.
+    """
+    __tablename__ = "dialogue_index_chapters"
+
+    chapter_id = Column(String, ForeignKey("chapters.id", ondelete="CASCADE"), primary_key=True)
+    manuscript_id = Column(String, nullable=False, index=True)
+    content_hash = Column(String(64), nullable=False)
+    span_count = Column(Integer, default=0)
+    indexed_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<DialogueIndexChapter(chapter={self.chapter_id}, spans={self.span_count})>"
+
+
+class DialogueSpan(Base):
+    """
+    A quote attributed to a character.
+
+    Offsets are the attribution match within the chapter's plain-text
+    content (quote plus speaker tag); position orders a chapter's spans.
+    """
+    __tablename__ = "dialogue_spans"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    manuscript_id = Column(String, nullable=False)
+    chapter_id = Column(String, ForeignKey("chapters.id", ondelete="CASCADE"), nullable=False, index=True)
+    character_id = Column(String, nullable=False)  # Entity id of the speaker
+
+    text = Column(Text, nullable=False)  # The quoted dialogue
+    context = Column(Text, default="")  # Surrounding text
+    start_offset = Column(Integer, nullable=False)
+    end_offset = Column(Integer, nullable=False)
+    position = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        # Every voice feature reads one manuscript's spans for some speakers
+        Index("ix_dialogue_spans_manuscript_character", "manuscript_id", "character_id"),
+    )
+
+    def __repr__(self):
+        return f"<DialogueSpan(chapter={self.chapter_id}, character={self.character_id}, {self.start_offset}-{self.end_offset})>"
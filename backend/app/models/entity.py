@@ -2,7 +2,7 @@
 Entity models for The Codex (characters, locations, items, lore)
 """
 
-from sqlalchemy import Column, String, Text, DateTime, Integer, ForeignKey, JSON
+from sqlalchemy import Column, String, Text, DateTime, Integer, ForeignKey, JSON, Index, func
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
@@ -168,6 +168,15 @@ class EntitySuggestion(Base):
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    # One suggestion per name and status; realtime detection upserts against this
+    __table_args__ = (
+        Index(
+            "uq_entity_suggestions_manuscript_name_status",
+            "manuscript_id", func.lower(name), "status",
+            unique=True,
+        ),
+    )
+
     def __repr__(self):
         return f"<EntitySuggestion(name='{self.name}', type={self.type}, status={self.status})>"
 
@@ -0,0 +1,89 @@
+"""
+Job model - persisted background jobs for long-running analyses.
+
+Complete-manuscript analysis, consistency scans, timeline extraction and
+wiki scans run as jobs. A row records what to run (kind and parameters),
+who asked for it, and how far it got, so progress can be polled or
+streamed and queued or interrupted jobs resume after a restart.
+"""
+
+from sqlalchemy import Column, String, DateTime, Integer, Float, JSON, Text, Index
+from datetime import datetime
+import uuid
+
+from app.database import Base
+
+
+class JobStatus:
+    """Job lifecycle states"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    ACTIVE = (QUEUED, RUNNING)
+    FINISHED = (COMPLETED, FAILED, CANCELLED)
+
+
+class Job(Base):
+    """
+    A background job.
+
+    dedup_key hashes the kind, user and identifying parameters; a second
+    submission of an identical job while one is queued or running returns
+    the existing job. Secret parameters (API keys) are never stored here.
+    """
+    __tablename__ = "jobs"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    kind = Column(String, nullable=False, index=True)  # analysis.complete_manuscript, wiki.scan, ...
+    user_id = Column(String, nullable=True, index=True)
+    dedup_key = Column(String(64), nullable=False)
+    params = Column(JSON, default=dict)
+
+    status = Column(String, nullable=False, default=JobStatus.QUEUED)
+    progress_percent = Column(Float, default=0.0)
+    current_stage = Column(String, default="")
+    progress = Column(JSON, default=dict)  # Kind-specific counters
+    partial_results = Column(JSON, default=list)  # Results streamed while running
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+
+    attempts = Column(Integer, default=0)  # Runs started, including runs a restart interrupted
+    cancel_requested = Column(Integer, default=0)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    completed_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # In-flight lookups: dedup on submit, dispatch of queued jobs
+        Index("ix_jobs_status_dedup_key", "status", "dedup_key"),
+    )
+
+    def to_dict(self, include_results: bool = True):
+        data = {
+            "id": self.id,
+            "kind": self.kind,
+            "user_id": self.user_id,
+            "params": self.params or {},
+            "status": self.status,
+            "progress_percent": round(self.progress_percent or 0.0, 1),
+            "current_stage": self.current_stage or "",
+            "progress": self.progress or {},
+            "error": self.error,
+            "attempts": self.attempts or 0,
+            "cancel_requested": bool(self.cancel_requested),
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
+        }
+        if include_results:
+            data["partial_results"] = self.partial_results or []
+            data["result"] = self.result
+        return data
+
+    def __repr__(self):
+        return f"<Job(id={self.id}, kind={self.kind}, status={self.status})>"
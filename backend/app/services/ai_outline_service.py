@@ -3,6 +3,7 @@ AI Outline Service - AI-powered outline analysis and suggestions
 Uses OpenRouter API with Claude 3.5 Sonnet for intelligent story structure insights
 """
 
+import asyncio
 import httpx
 import json
 from typing import Dict, Any, List, Optional
@@ -12,6 +13,7 @@ import logging
 from app.models.outline import Outline, PlotBeat, ITEM_TYPE_BEAT, ITEM_TYPE_SCENE
 from app.models.manuscript import Manuscript, Chapter
 from app.services.openrouter_service import OpenRouterService
+from app.services.llm_scheduler import llm_scheduler, RequestPriority
 from app.services.story_structures import get_available_structures
 
 logger = logging.getLogger(__name__)
@@ -137,8 +139,9 @@ class AIOutlineService:
         self,
         outline: Outline,
         beats: List[PlotBeat],
-        db: Session,
-        feedback: Optional[Dict[str, Dict[str, Any]]] = None
+        db: Optional[Session],
+        feedback: Optional[Dict[str, Dict[str, Any]]] = None,
+        manuscript_context: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Generate AI-powered descriptions for plot beats with manuscript context
@@ -146,9 +149,10 @@ class AIOutlineService:
         Args:
             outline: Outline object with premise and structure info
             beats: List of PlotBeat objects
-            db: Database session
+            db: Database session (unused when manuscript_context is given)
             feedback: Optional user feedback on previous suggestions
                      Format: {beatName: {liked: [], disliked: [], notes: ""}}
+            manuscript_context: Optional pre-loaded manuscript context
 
         Returns:
             Dict with beat descriptions and usage info
@@ -156,7 +160,8 @@ class AIOutlineService:
         try:
             # Get manuscript context from chapters
             logger.info(f"🎬 Generating beat descriptions for outline {outline.id}")
-            manuscript_context = _get_manuscript_context(db, outline)
+            if manuscript_context is None:
+                manuscript_context = _get_manuscript_context(db, outline)
             logger.info(f"📝 Manuscript context retrieved: {len(manuscript_context)} characters")
 
             # Build prompt with outline context
@@ -231,20 +236,25 @@ Respond in JSON format:
 
             # Make API call
             async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.openrouter.BASE_URL}/chat/completions",
-                    headers=self.openrouter.headers,
-                    json={
-                        "model": self.openrouter.DEFAULT_MODEL,
-                        "messages": [
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": user_prompt}
-                        ],
-                        "max_tokens": 3000,  # Increased for detailed story-specific responses
-                        "temperature": 0.6,  # Slightly lower for more focused responses
-                        "response_format": {"type": "json_object"}
-                    },
-                    timeout=60.0
+                response = await llm_scheduler.run_http(
+                    "openrouter",
+                    self.api_key,
+                    lambda: client.post(
+                        f"{self.openrouter.BASE_URL}/chat/completions",
+                        headers=self.openrouter.headers,
+                        json={
+                            "model": self.openrouter.DEFAULT_MODEL,
+                            "messages": [
+                                {"role": "system", "content": system_prompt},
+                                {"role": "user", "content": user_prompt}
+                            ],
+                            "max_tokens": 3000,  # Increased for detailed story-specific responses
+                            "temperature": 0.6,  # Slightly lower for more focused responses
+                            "response_format": {"type": "json_object"}
+                        },
+                        timeout=60.0
+                    ),
+                    priority=RequestPriority.ANALYSIS,
                 )
 
                 if response.status_code != 200:
@@ -414,20 +424,25 @@ Format as a JSON array of suggestion objects:
 }}"""
 
             async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.openrouter.BASE_URL}/chat/completions",
-                    headers=self.openrouter.headers,
-                    json={
-                        "model": self.openrouter.DEFAULT_MODEL,
-                        "messages": [
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": user_prompt}
-                        ],
-                        "max_tokens": 1500,
-                        "temperature": 0.8,  # Higher for creativity
-                        "response_format": {"type": "json_object"}
-                    },
-                    timeout=45.0
+                response = await llm_scheduler.run_http(
+                    "openrouter",
+                    self.api_key,
+                    lambda: client.post(
+                        f"{self.openrouter.BASE_URL}/chat/completions",
+                        headers=self.openrouter.headers,
+                        json={
+                            "model": self.openrouter.DEFAULT_MODEL,
+                            "messages": [
+                                {"role": "system", "content": system_prompt},
+                                {"role": "user", "content": user_prompt}
+                            ],
+                            "max_tokens": 1500,
+                            "temperature": 0.8,  # Higher for creativity
+                            "response_format": {"type": "json_object"}
+                        },
+                        timeout=45.0
+                    ),
+                    priority=RequestPriority.ANALYSIS,
                 )
 
                 if response.status_code != 200:
@@ -472,8 +487,9 @@ Format as a JSON array of suggestion objects:
         self,
         outline: Outline,
         beats: List[PlotBeat],
-        db: Session,
-        dismissed_holes: Optional[List] = None
+        db: Optional[Session],
+        dismissed_holes: Optional[List] = None,
+        manuscript_context: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Analyze outline for plot holes with manuscript context and validation
@@ -481,15 +497,17 @@ Format as a JSON array of suggestion objects:
         Args:
             outline: Outline object
             beats: List of all plot beats with notes
-            db: Database session
+            db: Database session (unused when manuscript_context is given)
             dismissed_holes: Optional list of PlotHoleDismissal records to exclude from re-flagging
+            manuscript_context: Optional pre-loaded manuscript context
 
         Returns:
             Dict with detected plot holes and usage info
         """
         try:
             # Get manuscript context
-            manuscript_context = _get_manuscript_context(db, outline)
+            if manuscript_context is None:
+                manuscript_context = _get_manuscript_context(db, outline)
 
             # Check if we have enough data to analyze
             beats_with_content = [
@@ -582,20 +600,25 @@ Respond in JSON format:
 }}"""
 
             async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.openrouter.BASE_URL}/chat/completions",
-                    headers=self.openrouter.headers,
-                    json={
-                        "model": self.openrouter.DEFAULT_MODEL,
-                        "messages": [
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": user_prompt}
-                        ],
-                        "max_tokens": 2000,
-                        "temperature": 0.5,  # Lower for analytical work
-                        "response_format": {"type": "json_object"}
-                    },
-                    timeout=60.0
+                response = await llm_scheduler.run_http(
+                    "openrouter",
+                    self.api_key,
+                    lambda: client.post(
+                        f"{self.openrouter.BASE_URL}/chat/completions",
+                        headers=self.openrouter.headers,
+                        json={
+                            "model": self.openrouter.DEFAULT_MODEL,
+                            "messages": [
+                                {"role": "system", "content": system_prompt},
+                                {"role": "user", "content": user_prompt}
+                            ],
+                            "max_tokens": 2000,
+                            "temperature": 0.5,  # Lower for analytical work
+                            "response_format": {"type": "json_object"}
+                        },
+                        timeout=60.0
+                    ),
+                    priority=RequestPriority.ANALYSIS,
                 )
 
                 if response.status_code != 200:
@@ -704,20 +727,25 @@ Respond in JSON format:
 }}"""
 
             async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.openrouter.BASE_URL}/chat/completions",
-                    headers=self.openrouter.headers,
-                    json={
-                        "model": self.openrouter.DEFAULT_MODEL,
-                        "messages": [
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": user_prompt}
-                        ],
-                        "max_tokens": 2000,
-                        "temperature": 0.7,
-                        "response_format": {"type": "json_object"}
-                    },
-                    timeout=60.0
+                response = await llm_scheduler.run_http(
+                    "openrouter",
+                    self.api_key,
+                    lambda: client.post(
+                        f"{self.openrouter.BASE_URL}/chat/completions",
+                        headers=self.openrouter.headers,
+                        json={
+                            "model": self.openrouter.DEFAULT_MODEL,
+                            "messages": [
+                                {"role": "system", "content": system_prompt},
+                                {"role": "user", "content": user_prompt}
+                            ],
+                            "max_tokens": 2000,
+                            "temperature": 0.7,
+                            "response_format": {"type": "json_object"}
+                        },
+                        timeout=60.0
+                    ),
+                    priority=RequestPriority.ANALYSIS,
                 )
 
                 if response.status_code != 200:
@@ -851,20 +879,25 @@ Respond in JSON format:
 }}"""
 
             async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.openrouter.BASE_URL}/chat/completions",
-                    headers=self.openrouter.headers,
-                    json={
-                        "model": self.openrouter.DEFAULT_MODEL,
-                        "messages": [
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": user_prompt}
-                        ],
-                        "max_tokens": 1500,
-                        "temperature": 0.5,
-                        "response_format": {"type": "json_object"}
-                    },
-                    timeout=60.0
+                response = await llm_scheduler.run_http(
+                    "openrouter",
+                    self.api_key,
+                    lambda: client.post(
+                        f"{self.openrouter.BASE_URL}/chat/completions",
+                        headers=self.openrouter.headers,
+                        json={
+                            "model": self.openrouter.DEFAULT_MODEL,
+                            "messages": [
+                                {"role": "system", "content": system_prompt},
+                                {"role": "user", "content": user_prompt}
+                            ],
+                            "max_tokens": 1500,
+                            "temperature": 0.5,
+                            "response_format": {"type": "json_object"}
+                        },
+                        timeout=60.0
+                    ),
+                    priority=RequestPriority.ANALYSIS,
                 )
 
                 if response.status_code != 200:
@@ -950,38 +983,54 @@ Respond in JSON format:
                 "total_tokens": 0
             }
 
-            # Run selected analyses
-            if "beat_descriptions" in analysis_types:
-                desc_result = await self.generate_beat_descriptions(outline, beats, db, feedback)
-                if desc_result["success"]:
-                    results["data"]["beat_descriptions"] = desc_result["beat_descriptions"]
-                    usage = desc_result.get("usage", {})
-                    total_usage["prompt_tokens"] += usage.get("prompt_tokens", 0)
-                    total_usage["completion_tokens"] += usage.get("completion_tokens", 0)
-                    total_usage["total_tokens"] += usage.get("total_tokens", 0)
-
+            # Load dismissed holes to feed into plot hole analysis
+            dismissed_holes = None
             if "plot_holes" in analysis_types:
-                # Load dismissed holes to feed into analysis
                 from app.models.outline import PlotHoleDismissal
                 dismissed_holes = db.query(PlotHoleDismissal).filter(
                     PlotHoleDismissal.outline_id == outline_id,
                     PlotHoleDismissal.status == "dismissed"
                 ).all()
 
-                holes_result = await self.detect_plot_holes(outline, beats, db, dismissed_holes=dismissed_holes or None)
-                if holes_result["success"]:
-                    results["data"]["plot_holes"] = holes_result["plot_holes"]
-                    results["data"]["overall_assessment"] = holes_result.get("overall_assessment", "")
-                    usage = holes_result.get("usage", {})
-                    total_usage["prompt_tokens"] += usage.get("prompt_tokens", 0)
-                    total_usage["completion_tokens"] += usage.get("completion_tokens", 0)
-                    total_usage["total_tokens"] += usage.get("total_tokens", 0)
+            # The analyses below share no session: load everything they read first
+            manuscript_context = None
+            if "beat_descriptions" in analysis_types or "plot_holes" in analysis_types:
+                manuscript_context = _get_manuscript_context(db, outline)
 
+            # Run selected analyses concurrently - the LLM scheduler bounds
+            # in-flight requests per API key and retries rate-limited calls
+            tasks = {}
+            if "beat_descriptions" in analysis_types:
+                tasks["beat_descriptions"] = self.generate_beat_descriptions(
+                    outline, beats, None, feedback, manuscript_context=manuscript_context
+                )
+            if "plot_holes" in analysis_types:
+                tasks["plot_holes"] = self.detect_plot_holes(
+                    outline, beats, None,
+                    dismissed_holes=dismissed_holes or None,
+                    manuscript_context=manuscript_context
+                )
             if "pacing" in analysis_types:
-                pacing_result = await self.analyze_pacing(outline, beats)
-                if pacing_result["success"]:
-                    results["data"]["pacing_analysis"] = pacing_result["pacing_analysis"]
-                    usage = pacing_result.get("usage", {})
+                tasks["pacing"] = self.analyze_pacing(outline, beats)
+
+            outcomes = dict(zip(tasks.keys(), await asyncio.gather(*tasks.values())))
+
+            desc_result = outcomes.get("beat_descriptions")
+            if desc_result and desc_result["success"]:
+                results["data"]["beat_descriptions"] = desc_result["beat_descriptions"]
+
+            holes_result = outcomes.get("plot_holes")
+            if holes_result and holes_result["success"]:
+                results["data"]["plot_holes"] = holes_result["plot_holes"]
+                results["data"]["overall_assessment"] = holes_result.get("overall_assessment", "")
+
+            pacing_result = outcomes.get("pacing")
+            if pacing_result and pacing_result["success"]:
+                results["data"]["pacing_analysis"] = pacing_result["pacing_analysis"]
+
+            for outcome in outcomes.values():
+                if outcome["success"]:
+                    usage = outcome.get("usage", {})
                     total_usage["prompt_tokens"] += usage.get("prompt_tokens", 0)
                     total_usage["completion_tokens"] += usage.get("completion_tokens", 0)
                     total_usage["total_tokens"] += usage.get("total_tokens", 0)
@@ -1081,20 +1130,25 @@ Respond in JSON format:
 }}"""
 
             async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.openrouter.BASE_URL}/chat/completions",
-                    headers=self.openrouter.headers,
-                    json={
-                        "model": self.openrouter.DEFAULT_MODEL,
-                        "messages": [
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": user_prompt}
-                        ],
-                        "max_tokens": 2000,
-                        "temperature": 0.7,  # Balanced creativity
-                        "response_format": {"type": "json_object"}
-                    },
-                    timeout=60.0
+                response = await llm_scheduler.run_http(
+                    "openrouter",
+                    self.api_key,
+                    lambda: client.post(
+                        f"{self.openrouter.BASE_URL}/chat/completions",
+                        headers=self.openrouter.headers,
+                        json={
+                            "model": self.openrouter.DEFAULT_MODEL,
+                            "messages": [
+                                {"role": "system", "content": system_prompt},
+                                {"role": "user", "content": user_prompt}
+                            ],
+                            "max_tokens": 2000,
+                            "temperature": 0.7,  # Balanced creativity
+                            "response_format": {"type": "json_object"}
+                        },
+                        timeout=60.0
+                    ),
+                    priority=RequestPriority.ANALYSIS,
                 )
 
                 if response.status_code != 200:
@@ -1246,20 +1300,25 @@ Respond in JSON format:
 }}"""
 
             async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.openrouter.BASE_URL}/chat/completions",
-                    headers=self.openrouter.headers,
-                    json={
-                        "model": self.openrouter.DEFAULT_MODEL,
-                        "messages": [
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": user_prompt}
-                        ],
-                        "max_tokens": 4000,
-                        "temperature": 0.4,
-                        "response_format": {"type": "json_object"}
-                    },
-                    timeout=90.0
+                response = await llm_scheduler.run_http(
+                    "openrouter",
+                    self.api_key,
+                    lambda: client.post(
+                        f"{self.openrouter.BASE_URL}/chat/completions",
+                        headers=self.openrouter.headers,
+                        json={
+                            "model": self.openrouter.DEFAULT_MODEL,
+                            "messages": [
+                                {"role": "system", "content": system_prompt},
+                                {"role": "user", "content": user_prompt}
+                            ],
+                            "max_tokens": 4000,
+                            "temperature": 0.4,
+                            "response_format": {"type": "json_object"}
+                        },
+                        timeout=90.0
+                    ),
+                    priority=RequestPriority.ANALYSIS,
                 )
 
                 if response.status_code != 200:
@@ -1385,20 +1444,25 @@ Respond in JSON format:
 }}"""
 
             async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.openrouter.BASE_URL}/chat/completions",
-                    headers=self.openrouter.headers,
-                    json={
-                        "model": self.openrouter.DEFAULT_MODEL,
-                        "messages": [
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": user_prompt}
-                        ],
-                        "max_tokens": 3000,
-                        "temperature": 0.4,
-                        "response_format": {"type": "json_object"}
-                    },
-                    timeout=60.0
+                response = await llm_scheduler.run_http(
+                    "openrouter",
+                    self.api_key,
+                    lambda: client.post(
+                        f"{self.openrouter.BASE_URL}/chat/completions",
+                        headers=self.openrouter.headers,
+                        json={
+                            "model": self.openrouter.DEFAULT_MODEL,
+                            "messages": [
+                                {"role": "system", "content": system_prompt},
+                                {"role": "user", "content": user_prompt}
+                            ],
+                            "max_tokens": 3000,
+                            "temperature": 0.4,
+                            "response_format": {"type": "json_object"}
+                        },
+                        timeout=60.0
+                    ),
+                    priority=RequestPriority.ANALYSIS,
                 )
 
                 if response.status_code != 200:
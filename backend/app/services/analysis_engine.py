@@ -0,0 +1,428 @@
+"""
+Analysis Engine - Single-pass narrative analysis of a whole manuscript.
+
+/api/analysis/complete-manuscript used to call six services one after
+another (POV, scene purpose, relationships, emotional beats, subplots,
+pacing), and each re-queried every chapter and re-read the full text; the
+relationship service even re-queried all chapters once per character pair.
+
+The engine splits each analysis into a map step (one chapter's text -> a
+partial result, no database access) and a reduce step (ordered partials ->
+the manuscript report), using the services' own analyze_chapter_text and
+summarize_* methods so results match the per-service endpoints:
+
+1. Load the manuscript, its chapters (one column query) and the character
+   names / relationship pairs once
+2. Stream chapters through every requested analyzer in one pass; batches
+   of chapters run in a process pool, since analyzers are independent
+3. Reduce each analyzer's partials, in chapter order, in this process
+
+Partials are persisted per chapter (see chapter_analysis_store), keyed by the
+analyzer's version and a hash of everything its map step reads, so step 2
+only runs for chapters that changed since the last analysis.
+
+Configuration:
+- ANALYSIS_PROCESSES: worker processes (default 2; 0 = run in this process)
+- ANALYSIS_CHAPTERS_PER_TASK: chapters per worker task (default 4); books
+  that fit in one task are analyzed in this process
+- ANALYSIS_CHAPTER_CACHE: set to 0 to re-analyze every chapter on every
+  request (default 1)
+"""
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.manuscript import Manuscript, Chapter
+from app.models.entity import Entity
+from app.services.pov_consistency_service import POVConsistencyService
+from app.services.scene_purpose_service import ScenePurposeService
+from app.services.relationship_evolution_service import RelationshipEvolutionService
+from app.services.emotional_beat_service import EmotionalBeatService
+from app.services.subplot_tracker_service import SubplotTrackerService
+from app.services.pacing_optimizer_service import PacingOptimizerService
+from app.services.chapter_analysis_store import ChapterAnalysisStore, chapter_analysis_store
+
+logger = logging.getLogger(__name__)
+
+PROCESSES = int(os.getenv("ANALYSIS_PROCESSES", "2"))
+CHAPTERS_PER_TASK = int(os.getenv("ANALYSIS_CHAPTERS_PER_TASK", "4"))
+CHAPTER_CACHE = os.getenv("ANALYSIS_CHAPTER_CACHE", "1") != "0"
+
+
+@dataclass
+class ChapterText:
+    """The chapter fields analyzers read"""
+    id: str
+    title: Optional[str]
+    order_index: int
+    content: Optional[str]
+
+
+@dataclass
+class AnalysisContext:
+    """Per-manuscript inputs shared by every chapter (picklable)"""
+    manuscript_id: str
+    genre: Optional[str]
+    analyzers: Tuple[str, ...]
+    characters: List[str] = field(default_factory=list)
+    # (char_a, char_b, is_tracked), or None with fewer than 2 characters
+    relationship_pairs: Optional[List[Tuple[str, str, bool]]] = None
+    # Aliases of the characters in relationship_pairs, by name
+    character_aliases: Dict[str, List[str]] = field(default_factory=dict)
+
+
+class _Services:
+    """Stateless service instances for map/reduce (no database session)"""
+
+    def __init__(self):
+        self.pov = POVConsistencyService(None)
+        self.scene_purpose = ScenePurposeService(None)
+        self.relationships = RelationshipEvolutionService(None)
+        self.emotional_beats = EmotionalBeatService(None)
+        self.subplots = SubplotTrackerService(None)
+        self.pacing = PacingOptimizerService(None)
+
+
+_services: Optional[_Services] = None
+
+
+def _get_services() -> _Services:
+    global _services
+    if _services is None:
+        _services = _Services()
+    return _services
+
+
+# --- Map: one chapter's text -> partial result per analyzer ---
+
+def _map_pov(services: _Services, chapter: ChapterText, context: AnalysisContext):
+    return services.pov.analyze_chapter_text(chapter.id, chapter.title, chapter.content, context.characters)
+
+
+def _map_scene_purpose(services: _Services, chapter: ChapterText, context: AnalysisContext):
+    return services.scene_purpose.analyze_chapter_text(chapter.id, chapter.title, chapter.content)
+
+
+def _map_relationships(services: _Services, chapter: ChapterText, context: AnalysisContext):
+    pairs = context.relationship_pairs or []
+    matcher = services.relationships.character_matcher(pairs, context.character_aliases)
+    return services.relationships.chapter_signals(chapter.content, matcher, matcher.pair_index(pairs))
+
+
+def _map_emotional_beats(services: _Services, chapter: ChapterText, context: AnalysisContext):
+    return services.emotional_beats.analyze_chapter_text(chapter.id, chapter.title, chapter.content)
+
+
+def _map_subplots(services: _Services, chapter: ChapterText, context: AnalysisContext):
+    return services.subplots.analyze_chapter_text(
+        chapter.id, chapter.title, chapter.order_index, chapter.content, context.characters
+    )
+
+
+def _map_pacing(services: _Services, chapter: ChapterText, context: AnalysisContext):
+    return services.pacing.analyze_chapter_text(chapter.id, chapter.title, chapter.order_index, chapter.content)
+
+
+# --- Manuscript inputs each map step reads besides the chapter ---
+
+def _character_inputs(context: AnalysisContext):
+    return context.characters
+
+
+def _pair_inputs(context: AnalysisContext):
+    return {
+        "pairs": [[char_a, char_b] for char_a, char_b, _ in context.relationship_pairs or []],
+        "aliases": context.character_aliases,
+    }
+
+
+# --- Reduce: partials in chapter order -> manuscript report ---
+
+def _reduce_pov(services, context, chapters, partials):
+    return services.pov.summarize_manuscript(context.manuscript_id, partials)
+
+
+def _reduce_scene_purpose(services, context, chapters, partials):
+    return services.scene_purpose.summarize_manuscript(context.manuscript_id, context.genre, partials)
+
+
+def _reduce_relationships(services, context, chapters, partials):
+    analyzed = [chapter for chapter in chapters if chapter.content]
+    # Without chapters every pair's timeline errors out and is left out
+    pairs = context.relationship_pairs if chapters else []
+    matcher = services.relationships.character_matcher(pairs, context.character_aliases)
+    evolutions = [
+        evolution
+        for (_, _, is_tracked), evolution in zip(pairs, services.relationships.pair_evolutions(
+            context.manuscript_id, pairs, matcher, list(zip(analyzed, partials))
+        ))
+        if is_tracked or evolution.get('total_state_changes', 0) > 0
+    ]
+    return services.relationships.summarize_relationships(context.manuscript_id, evolutions)
+
+
+def _reduce_emotional_beats(services, context, chapters, partials):
+    analyzed = [chapter for chapter in chapters if chapter.content]
+    return services.emotional_beats.summarize_manuscript(
+        context.manuscript_id, context.genre, list(zip(analyzed, partials))
+    )
+
+
+def _reduce_subplots(services, context, chapters, partials):
+    return services.subplots.summarize_manuscript(context.manuscript_id, len(chapters), partials)
+
+
+def _reduce_pacing(services, context, chapters, partials):
+    return services.pacing.summarize_manuscript(context.manuscript_id, context.genre, partials, chapters)
+
+
+@dataclass(frozen=True)
+class Analyzer:
+    name: str
+    map: Callable[[_Services, ChapterText, AnalysisContext], Any]
+    reduce: Callable[[_Services, AnalysisContext, List[ChapterText], List[Any]], Dict[str, Any]]
+    needs_manuscript: bool = False  # Reports "Manuscript not found" like its service
+    # Manuscript-level inputs of the map step; part of each stored partial's hash
+    inputs: Optional[Callable[[AnalysisContext], Any]] = None
+    # Bump when the map step's output changes, so stored partials are recomputed
+    version: int = 1
+
+
+ANALYZERS: Dict[str, Analyzer] = {
+    analyzer.name: analyzer
+    for analyzer in (
+        Analyzer("pov", _map_pov, _reduce_pov, inputs=_character_inputs),
+        Analyzer("scene_purpose", _map_scene_purpose, _reduce_scene_purpose, needs_manuscript=True),
+        Analyzer("relationships", _map_relationships, _reduce_relationships, inputs=_pair_inputs, version=2),
+        Analyzer("emotional_beats", _map_emotional_beats, _reduce_emotional_beats, needs_manuscript=True),
+        Analyzer("subplots", _map_subplots, _reduce_subplots, inputs=_character_inputs),
+        Analyzer("pacing", _map_pacing, _reduce_pacing, needs_manuscript=True),
+    )
+}
+
+
+def chapter_input_hashes(chapters: Sequence[ChapterText], context: AnalysisContext) -> Dict[Tuple[str, str], str]:
+    """sha256 of everything each analyzer's map step reads, by (chapter_id, analyzer)"""
+    inputs = {
+        name: json.dumps(ANALYZERS[name].inputs(context) if ANALYZERS[name].inputs else None)
+        for name in context.analyzers
+    }
+    hashes = {}
+    for chapter in chapters:
+        content_digest = hashlib.sha256(chapter.content.encode("utf-8")).hexdigest()
+        prefix = json.dumps([content_digest, chapter.title, chapter.order_index])
+        for name in context.analyzers:
+            hashes[(chapter.id, name)] = hashlib.sha256(f"{prefix}:{inputs[name]}".encode("utf-8")).hexdigest()
+    return hashes
+
+
+def analyze_chapters(chapters: Sequence[ChapterText], context: AnalysisContext) -> List[Dict[str, Any]]:
+    """
+    Run every requested analyzer over each chapter (worker process entry point).
+
+    Returns one {analyzer: partial} dict per chapter with content, in order.
+    """
+    services = _get_services()
+    results = []
+    for chapter in chapters:
+        if not chapter.content:
+            continue
+        partials = {}
+        for name in context.analyzers:
+            try:
+                partials[name] = ANALYZERS[name].map(services, chapter, context)
+            except Exception as e:
+                raise RuntimeError(f"{name} analysis failed for chapter {chapter.id}: {e}") from e
+        results.append(partials)
+    return results
+
+
+class NarrativeAnalysisEngine:
+    """Loads a manuscript once and runs all analyzers over it in one pass"""
+
+    def __init__(
+        self,
+        processes: int = PROCESSES,
+        chapters_per_task: int = CHAPTERS_PER_TASK,
+        store: Optional[ChapterAnalysisStore] = chapter_analysis_store if CHAPTER_CACHE else None,
+    ):
+        self.processes = processes
+        self.chapters_per_task = max(1, chapters_per_task)
+        self.store = store  # None re-analyzes every chapter
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def load_context(
+        self,
+        db: Session,
+        manuscript_id: str,
+        genre: Optional[str],
+        analyzers: Sequence[str],
+    ) -> Tuple[AnalysisContext, List[ChapterText], bool]:
+        """Chapters and shared inputs in a handful of queries: (context, chapters, manuscript_found)"""
+        manuscript = db.query(Manuscript.genre).filter(Manuscript.id == manuscript_id).first()
+        if not genre and manuscript is not None:
+            genre = manuscript.genre.lower() if manuscript.genre else None
+
+        chapters = [
+            ChapterText(*row)
+            for row in db.query(Chapter.id, Chapter.title, Chapter.order_index, Chapter.content).filter(
+                Chapter.manuscript_id == manuscript_id,
+                Chapter.document_type == "CHAPTER"
+            ).order_by(Chapter.order_index)
+        ]
+
+        context = AnalysisContext(manuscript_id=manuscript_id, genre=genre, analyzers=tuple(analyzers))
+        if "pov" in analyzers or "subplots" in analyzers:
+            context.characters = [
+                name for (name,) in db.query(Entity.name).filter(
+                    Entity.manuscript_id == manuscript_id,
+                    Entity.type == "CHARACTER"
+                )
+            ]
+        if "relationships" in analyzers:
+            relationships = RelationshipEvolutionService(db)
+            context.relationship_pairs = relationships.relationship_pairs(manuscript_id)
+            context.character_aliases = relationships.character_aliases(
+                manuscript_id, [name for pair in context.relationship_pairs or [] for name in pair[:2]]
+            )
+        return context, chapters, manuscript is not None
+
+    def _map(self, chapters: List[ChapterText], context: AnalysisContext) -> List[Dict[str, Any]]:
+        with_content = [chapter for chapter in chapters if chapter.content]
+        if self.processes <= 0 or len(with_content) <= self.chapters_per_task:
+            return analyze_chapters(with_content, context)
+
+        batches = [
+            with_content[i:i + self.chapters_per_task]
+            for i in range(0, len(with_content), self.chapters_per_task)
+        ]
+        executor = self._get_executor()
+        futures = [executor.submit(analyze_chapters, batch, context) for batch in batches]
+        results = []
+        for future in futures:
+            results.extend(future.result())
+        return results
+
+    def _map_changed(
+        self,
+        db: Session,
+        chapters: List[ChapterText],
+        context: AnalysisContext,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Partials for every chapter with content, analyzing only chapters whose
+        stored partials are missing or stale: (partials, chapters analyzed).
+        """
+        with_content = [chapter for chapter in chapters if chapter.content]
+        if self.store is None:
+            return self._map(with_content, context), len(with_content)
+
+        hashes = chapter_input_hashes(with_content, context)
+        partials = self.store.get_many(db, {
+            key: (ANALYZERS[key[1]].version, content_hash) for key, content_hash in hashes.items()
+        })
+
+        changed = [
+            chapter for chapter in with_content
+            if any((chapter.id, name) not in partials for name in context.analyzers)
+        ]
+        if changed:
+            missing = tuple(
+                name for name in context.analyzers
+                if any((chapter.id, name) not in partials for chapter in changed)
+            )
+            entries = []
+            for chapter, results in zip(changed, self._map(changed, replace(context, analyzers=missing))):
+                for name, partial in results.items():
+                    key = (chapter.id, name)
+                    if key not in partials:
+                        partials[key] = partial
+                        entries.append((chapter.id, name, ANALYZERS[name].version, hashes[key], partial))
+            if self.store.put_many(db, context.manuscript_id, entries):
+                db.commit()
+
+        return [
+            {name: partials[(chapter.id, name)] for name in context.analyzers}
+            for chapter in with_content
+        ], len(changed)
+
+    def analyze(
+        self,
+        db: Session,
+        manuscript_id: str,
+        genre: Optional[str] = None,
+        analyzers: Optional[Sequence[str]] = None,
+        on_report: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Full reports for each analyzer, keyed by analyzer name.
+
+        Each report matches what the analyzer's service returns for the
+        manuscript, including {"error": ...} entries. on_report(name,
+        report) is called as each analyzed report is reduced. Commits db
+        after storing the partials of re-analyzed chapters.
+        """
+        analyzers = list(analyzers or ANALYZERS)
+        unknown = [name for name in analyzers if name not in ANALYZERS]
+        if unknown:
+            raise ValueError(f"Unknown analyzers: {', '.join(unknown)}")
+
+        started = datetime.utcnow()
+        context, chapters, manuscript_found = self.load_context(db, manuscript_id, genre, analyzers)
+
+        reports: Dict[str, Dict[str, Any]] = {}
+        active = []
+        analyzed = 0
+        for name in analyzers:
+            if ANALYZERS[name].needs_manuscript and not manuscript_found:
+                reports[name] = {"error": "Manuscript not found"}
+            elif name == "relationships" and context.relationship_pairs is None:
+                reports[name] = {"error": "Need at least 2 characters for relationship analysis"}
+            elif not chapters and name != "relationships":
+                reports[name] = {"error": "No chapters found"}
+            else:
+                active.append(name)
+
+        if active:
+            context.analyzers = tuple(active)
+            partials, analyzed = self._map_changed(db, chapters, context)
+            services = _get_services()
+            for name in active:
+                reports[name] = ANALYZERS[name].reduce(
+                    services, context, chapters, [chapter_partials[name] for chapter_partials in partials]
+                )
+                if on_report is not None:
+                    on_report(name, reports[name])
+
+        logger.info(
+            f"Analyzed {len(chapters)} chapters of {manuscript_id} with {len(active)} analyzers "
+            f"({analyzed} changed since the last run) "
+            f"in {(datetime.utcnow() - started).total_seconds():.2f}s"
+        )
+        return {name: reports[name] for name in analyzers}
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Module-level singleton
+analysis_engine = NarrativeAnalysisEngine()
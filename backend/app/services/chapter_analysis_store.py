@@ -0,0 +1,217 @@
+"""
+Chapter Analysis Store - Persisted per-chapter analysis results.
+
+Every manuscript report (POV, pacing, emotional beats, scene purpose,
+subplots, relationships) used to re-analyze every chapter, so a one-line
+edit followed by a dashboard refresh re-read the whole book. The analysis
+engine now keeps each analyzer's per-chapter partial result in the
+chapter_analysis_cache table and only re-runs chapters whose inputs changed:
+
+- A partial is valid for (chapter_id, analyzer, analyzer version, content
+  hash); the hash covers the chapter text, title and position plus any
+  manuscript inputs the analyzer reads, such as character names
+- Lookups for a whole manuscript are one SELECT; results of the chapters
+  that were re-analyzed are written back with one INSERT ... ON CONFLICT
+  DO UPDATE, replacing that chapter's previous row for the analyzer
+- Deleting a chapter through the ORM deletes its rows
+
+Writes are best effort: a failed write is logged and the report is still
+returned. They run in a SAVEPOINT of the caller's session and are kept
+when the caller commits.
+"""
+
+import logging
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, event
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.analysis_cache import ChapterAnalysisCache
+from app.models.manuscript import Chapter
+
+logger = logging.getLogger(__name__)
+
+# (chapter_id, analyzer)
+CacheKey = Tuple[str, str]
+
+# Bound parameters per IN (...) list, well under SQLite's limit
+_QUERY_CHUNK = 500
+
+
+class ChapterAnalysisStore:
+    """Reads and writes per-chapter analyzer results in chapter_analysis_cache"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.write_errors = 0
+
+    def get_many(
+        self,
+        db: Session,
+        keys: Dict[CacheKey, Tuple[int, str]],
+    ) -> Dict[CacheKey, Any]:
+        """
+        Stored results for the keys whose (analyzer_version, content_hash) still match.
+
+        keys maps (chapter_id, analyzer) to the current (version, hash);
+        stale and missing entries are left out of the result.
+        """
+        if not keys:
+            return {}
+        chapter_ids = sorted({chapter_id for chapter_id, _ in keys})
+        analyzers = sorted({analyzer for _, analyzer in keys})
+
+        found: Dict[CacheKey, Any] = {}
+        for i in range(0, len(chapter_ids), _QUERY_CHUNK):
+            rows = db.query(
+                ChapterAnalysisCache.chapter_id,
+                ChapterAnalysisCache.analyzer,
+                ChapterAnalysisCache.analyzer_version,
+                ChapterAnalysisCache.content_hash,
+                ChapterAnalysisCache.result,
+            ).filter(
+                ChapterAnalysisCache.chapter_id.in_(chapter_ids[i:i + _QUERY_CHUNK]),
+                ChapterAnalysisCache.analyzer.in_(analyzers),
+            )
+            for chapter_id, analyzer, version, content_hash, result in rows:
+                if keys.get((chapter_id, analyzer)) == (version, content_hash):
+                    found[(chapter_id, analyzer)] = result
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def get_latest(
+        self,
+        db: Session,
+        chapter_ids: Sequence[str],
+        analyzer: str,
+    ) -> Dict[str, Tuple[int, str, Any]]:
+        """
+        Each chapter's stored (analyzer_version, content_hash, result), stale or not.
+
+        For analyzers that diff a chapter against what they processed last
+        time rather than reusing a result outright.
+        """
+        chapter_ids = sorted(set(chapter_ids))
+        found: Dict[str, Tuple[int, str, Any]] = {}
+        for i in range(0, len(chapter_ids), _QUERY_CHUNK):
+            rows = db.query(
+                ChapterAnalysisCache.chapter_id,
+                ChapterAnalysisCache.analyzer_version,
+                ChapterAnalysisCache.content_hash,
+                ChapterAnalysisCache.result,
+            ).filter(
+                ChapterAnalysisCache.chapter_id.in_(chapter_ids[i:i + _QUERY_CHUNK]),
+                ChapterAnalysisCache.analyzer == analyzer,
+            )
+            for chapter_id, version, content_hash, result in rows:
+                found[chapter_id] = (version, content_hash, result)
+        return found
+
+    def put_many(
+        self,
+        db: Session,
+        manuscript_id: str,
+        entries: Sequence[Tuple[str, str, int, str, Any]],
+    ) -> bool:
+        """
+        Store (chapter_id, analyzer, version, content_hash, result) entries.
+
+        The upsert runs in a SAVEPOINT: a failed write only rolls back its own
+        rows and returns False, and committing the session is left to the caller.
+        """
+        if not entries:
+            return True
+        now = datetime.utcnow()
+        rows = [
+            {
+                "id": str(uuid.uuid4()),
+                "chapter_id": chapter_id,
+                "manuscript_id": manuscript_id,
+                "analyzer": analyzer,
+                "analyzer_version": version,
+                "content_hash": content_hash,
+                "result": result,
+                "created_at": now,
+            }
+            for chapter_id, analyzer, version, content_hash, result in entries
+        ]
+        try:
+            with db.begin_nested():
+                for i in range(0, len(rows), _QUERY_CHUNK):
+                    self._upsert(db, rows[i:i + _QUERY_CHUNK])
+        except Exception as e:
+            with self._lock:
+                self.write_errors += 1
+            logger.warning(f"Could not store chapter analysis results for {manuscript_id}: {e}")
+            return False
+        with self._lock:
+            self.writes += len(rows)
+        return True
+
+    def _upsert(self, db: Session, rows: List[Dict[str, Any]]):
+        """INSERT ... ON CONFLICT DO UPDATE on the unique (chapter_id, analyzer) index"""
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            insert = postgresql_insert
+        elif dialect == "sqlite":
+            insert = sqlite_insert
+        else:
+            raise NotImplementedError(f"Chapter analysis upsert not supported on {dialect}")
+
+        statement = insert(ChapterAnalysisCache).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=[ChapterAnalysisCache.chapter_id, ChapterAnalysisCache.analyzer],
+            set_={
+                "manuscript_id": statement.excluded.manuscript_id,
+                "analyzer_version": statement.excluded.analyzer_version,
+                "content_hash": statement.excluded.content_hash,
+                "result": statement.excluded.result,
+                "created_at": statement.excluded.created_at,
+            },
+        )
+        db.execute(statement)
+
+    def invalidate(self, db: Session, manuscript_id: str, analyzer: Optional[str] = None) -> int:
+        """Delete a manuscript's stored results (optionally one analyzer's); returns rows deleted"""
+        query = db.query(ChapterAnalysisCache).filter(ChapterAnalysisCache.manuscript_id == manuscript_id)
+        if analyzer:
+            query = query.filter(ChapterAnalysisCache.analyzer == analyzer)
+        deleted = query.delete(synchronize_session=False)
+        db.commit()
+        return deleted
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "writes": self.writes,
+                "write_errors": self.write_errors,
+            }
+
+
+# Module-level singleton
+chapter_analysis_store = ChapterAnalysisStore()
+
+
+def _delete_chapter_results(mapper, connection, target):
+    # SQLite doesn't enforce the ON DELETE CASCADE foreign key
+    connection.execute(
+        delete(ChapterAnalysisCache).where(ChapterAnalysisCache.chapter_id == target.id)
+    )
+
+
+event.listen(Chapter, "after_delete", _delete_chapter_results)
@@ -7,7 +7,7 @@ import logging
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 
-from sqlalchemy import and_
+from sqlalchemy import and_, func
 
 from app.database import SessionLocal
 from app.models.entity import Entity, Relationship, EntitySuggestion
@@ -556,6 +556,11 @@ class CodexService:
         """
         Create entity suggestion from NLP extraction
 
+        Suggestions are unique per manuscript, lowercased name and status
+        (the uq_entity_suggestions_manuscript_name_status index), so an
+        existing suggestion with the same name in any letter case is returned
+        even if it was suggested as a different type.
+
         Args:
             manuscript_id: Manuscript ID
             name: Suggested entity name
@@ -569,12 +574,11 @@ class CodexService:
         """
         db = SessionLocal()
         try:
-            # Check if suggestion already exists (any status)
+            # Check if suggestion already exists (any status, any type)
             existing = db.query(EntitySuggestion).filter(
                 and_(
                     EntitySuggestion.manuscript_id == manuscript_id,
-                    EntitySuggestion.name == name,
-                    EntitySuggestion.type == entity_type
+                    func.lower(EntitySuggestion.name) == name.lower()
                 )
             ).first()
 
@@ -706,7 +710,7 @@ class CodexService:
             db.add(entity)
 
             # Update suggestion status
-            suggestion.status = "APPROVED"
+            self._set_suggestion_status(db, suggestion, "APPROVED")
 
             db.commit()
             db.refresh(entity)
@@ -740,12 +744,30 @@ class CodexService:
             if suggestion.status != "PENDING":
                 raise ValueError(f"Suggestion already {suggestion.status}")
 
-            suggestion.status = "REJECTED"
+            self._set_suggestion_status(db, suggestion, "REJECTED")
             db.commit()
             return True
         finally:
             db.close()
 
+    def _set_suggestion_status(self, db, suggestion: EntitySuggestion, status: str):
+        """
+        Move a suggestion to a final status.
+
+        (manuscript_id, lower(name), status) is unique, so an older suggestion
+        for the same name with that status is replaced by this decision.
+        """
+        previous = db.query(EntitySuggestion).filter(
+            EntitySuggestion.manuscript_id == suggestion.manuscript_id,
+            func.lower(EntitySuggestion.name) == suggestion.name.lower(),
+            EntitySuggestion.status == status,
+            EntitySuggestion.id != suggestion.id
+        ).first()
+        if previous:
+            db.delete(previous)
+            db.flush()
+        suggestion.status = status
+
     def get_entity_appearance_summary(self, entity_id: str) -> Dict[str, Any]:
         """
         Get first and last appearance summary for an entity
@@ -22,6 +22,7 @@ from datetime import datetime
 from sqlalchemy.orm import Session
 
 from app.models.privacy import AuthorPrivacyPreferences, AIInteractionAudit, ContentSharingLevel
+from app.services.token_budget import count_tokens, truncate_to_tokens
 from app.services.privacy_config import (
     AIPrivacyConfig,
     DEFAULT_PRIVACY_CONFIG,
@@ -248,16 +249,11 @@ class ContentGateway:
         For most AI operations, we don't need the full manuscript.
         This limits how much content is sent.
         """
-        max_tokens = self.config.max_context_tokens
-        estimated_tokens = self._estimate_tokens(content)
-
-        if estimated_tokens <= max_tokens:
-            return content
-
-        # Truncate to approximate token limit
-        # Rough estimate: 1 token ≈ 4 characters for English
-        max_chars = max_tokens * 4
-        return content[:max_chars] + "\n[Content truncated for processing]"
+        return truncate_to_tokens(
+            content,
+            self.config.max_context_tokens,
+            marker="\n[Content truncated for processing]"
+        )
 
     def _build_system_prompt(
         self,
@@ -313,13 +309,8 @@ IMPORTANT PRIVACY CONSTRAINTS:
         return hashlib.sha256(content.encode('utf-8')).hexdigest()
 
     def _estimate_tokens(self, text: str) -> int:
-        """
-        Estimate token count for text.
-
-        Rough estimate: ~4 characters per token for English.
-        For more accuracy, use tiktoken or similar.
-        """
-        return len(text) // 4
+        """Token count for text (shared tokenizer, see token_budget)"""
+        return count_tokens(text)
 
     def _map_request_type_to_feature(self, request_type: str) -> str:
         """Map AI request types to feature preference names"""
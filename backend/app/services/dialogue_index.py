@@ -0,0 +1,336 @@
+"""
+Dialogue Index - Attributed dialogue for every speaker, persisted per chapter.
+
+Voice profiles, inconsistency checks and voice comparisons used to re-scan
+every chapter once per character. The index extracts the quotes of all
+speakers in one pass per chapter and stores them:
+
+- Every character's name, aliases and first name are compiled into one
+  trie-shaped alternation, in the two attribution patterns voice analysis
+  uses ("dialogue," Name verb / Name verb, "dialogue"). A match is
+  attributed to the character(s) owning the matched name; longer names win,
+  so "John Smith said" belongs to John Smith even if another character is
+  called John
+- Spans (quote text, speaker id and offsets within the chapter) are stored
+  in dialogue_spans; dialogue_index_chapters keeps a hash of each chapter's
+  text and the cast's name variants
+- Saving a chapter re-indexes it; reads first re-index any chapter whose
+  hash is stale (imports, restores, new or renamed characters)
+
+Writes are best effort: if the index can't be updated, dialogue is
+extracted in memory for that request.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import threading
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, event, insert
+from sqlalchemy.orm import Session
+
+from app.models.dialogue_index import DialogueIndexChapter, DialogueSpan
+from app.models.entity import Entity
+from app.models.manuscript import Chapter
+from app.services.pattern_bank import trie_pattern
+
+logger = logging.getLogger(__name__)
+
+# Quotes this short ("No.", "Hm?") say nothing about a voice
+MIN_DIALOGUE_LENGTH = 5
+
+# Bound parameters per IN (...) list, well under SQLite's limit
+_QUERY_CHUNK = 500
+
+
+@dataclass
+class DialogueSample:
+    """A single piece of dialogue attributed to a character"""
+    text: str
+    chapter_id: str
+    start_offset: int
+    end_offset: int
+    context: str = ""  # Surrounding text for context
+
+
+@dataclass(frozen=True)
+class Speaker:
+    id: str
+    variants: Tuple[str, ...]  # Lowercased names that attribute dialogue
+
+
+def name_variants(name: str, aliases: Optional[Iterable[str]] = None) -> Tuple[str, ...]:
+    """Lowercased name, aliases and (for full names) first name"""
+    variants = [name.lower()]
+    variants.extend(alias.lower() for alias in aliases or [] if isinstance(alias, str))
+
+    # Also add first name if full name
+    name_parts = name.split()
+    if len(name_parts) > 1:
+        variants.append(name_parts[0].lower())
+
+    return tuple(dict.fromkeys(variant for variant in variants if variant.strip()))
+
+
+class DialogueExtractor:
+    """Finds attributed dialogue for a set of speakers in one pass per pattern"""
+
+    def __init__(self, speakers: Sequence[Speaker]):
+        self._owners: Dict[str, List[str]] = {}
+        for speaker in speakers:
+            for variant in speaker.variants:
+                owners = self._owners.setdefault(variant, [])
+                if speaker.id not in owners:
+                    owners.append(speaker.id)
+
+        self._after = self._before = None
+        if self._owners:
+            names = trie_pattern(list(self._owners))
+            # "dialogue," name verb  OR  "dialogue." Name verb
+            self._after = re.compile(r'"([^"]+)"[,.]?\s*(' + names + r')\s+\w+', re.IGNORECASE)
+            # name verb, "dialogue"
+            self._before = re.compile(r'(' + names + r')\s+\w+[,]?\s*"([^"]+)"', re.IGNORECASE)
+
+    def extract(self, text: str, chapter_id: str) -> List[Tuple[str, DialogueSample]]:
+        """(speaker id, sample) pairs: attribution-after matches, then attribution-before"""
+        found = []
+        if not self._owners or not text:
+            return found
+        for regex, dialogue_group, name_group in ((self._after, 1, 2), (self._before, 2, 1)):
+            for match in regex.finditer(text):
+                dialogue = match.group(dialogue_group).strip()
+                if len(dialogue) <= MIN_DIALOGUE_LENGTH:
+                    continue
+                sample = DialogueSample(
+                    text=dialogue,
+                    chapter_id=chapter_id,
+                    start_offset=match.start(),
+                    end_offset=match.end(),
+                    context=text[max(0, match.start() - 50):match.end() + 50]
+                )
+                for speaker_id in self._speakers_named(match.group(name_group)):
+                    found.append((speaker_id, sample))
+        return found
+
+    def _speakers_named(self, name: str) -> List[str]:
+        owners = self._owners.get(name.lower())
+        if owners is None:
+            # Case-insensitive matches that lower() doesn't map back (e.g. "ſ")
+            owners = next((
+                ids for variant, ids in self._owners.items()
+                if re.fullmatch(re.escape(variant), name, re.IGNORECASE)
+            ), [])
+        return owners
+
+
+def _speakers_signature(speakers: Sequence[Speaker]) -> str:
+    return json.dumps(sorted([speaker.id, list(speaker.variants)] for speaker in speakers))
+
+
+def _chapter_hash(content: str, signature: str) -> str:
+    digest = hashlib.sha256(signature.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update((content or "").encode("utf-8"))
+    return digest.hexdigest()
+
+
+class DialogueIndex:
+    """Maintains dialogue_spans and reads attributed dialogue from it"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.chapters_indexed = 0
+        self.chapters_reused = 0
+        self.write_errors = 0
+
+    def speakers(self, db: Session, manuscript_id: str) -> List[Speaker]:
+        """The manuscript's characters with their attribution names"""
+        return [
+            Speaker(id=entity_id, variants=name_variants(name, aliases))
+            for entity_id, name, aliases in db.query(Entity.id, Entity.name, Entity.aliases).filter(
+                Entity.manuscript_id == manuscript_id,
+                Entity.type == "CHARACTER"
+            ).order_by(Entity.id)
+        ]
+
+    def refresh(
+        self,
+        db: Session,
+        manuscript_id: str,
+        chapter_ids: Optional[Sequence[str]] = None
+    ) -> bool:
+        """
+        Re-index the manuscript's chapters (or just chapter_ids) whose text or
+        cast changed since they were indexed. Returns False if the index
+        couldn't be written.
+        """
+        speakers = self.speakers(db, manuscript_id)
+        signature = _speakers_signature(speakers)
+
+        chapter_query = db.query(Chapter.id, Chapter.content).filter(
+            Chapter.manuscript_id == manuscript_id,
+            Chapter.document_type == "CHAPTER"
+        )
+        state_query = db.query(DialogueIndexChapter.chapter_id, DialogueIndexChapter.content_hash).filter(
+            DialogueIndexChapter.manuscript_id == manuscript_id
+        )
+        if chapter_ids is not None:
+            chapter_query = chapter_query.filter(Chapter.id.in_(chapter_ids))
+            state_query = state_query.filter(DialogueIndexChapter.chapter_id.in_(chapter_ids))
+
+        indexed = dict(state_query.all())
+        chapters = chapter_query.all()
+        stale = []
+        for chapter_id, content in chapters:
+            content_hash = _chapter_hash(content, signature)
+            if indexed.get(chapter_id) != content_hash:
+                stale.append((chapter_id, content, content_hash))
+        # Chapters deleted, or no longer of type CHAPTER
+        removed = set(indexed) - {chapter_id for chapter_id, _ in chapters}
+
+        with self._lock:
+            self.chapters_reused += len(chapters) - len(stale)
+        if not stale and not removed:
+            return True
+
+        extractor = DialogueExtractor(speakers)
+        states, spans = [], []
+        now = datetime.utcnow()
+        for chapter_id, content, content_hash in stale:
+            found = extractor.extract(content, chapter_id)
+            states.append({
+                "chapter_id": chapter_id,
+                "manuscript_id": manuscript_id,
+                "content_hash": content_hash,
+                "span_count": len(found),
+                "indexed_at": now,
+            })
+            spans.extend({
+                "id": str(uuid.uuid4()),
+                "manuscript_id": manuscript_id,
+                "chapter_id": chapter_id,
+                "character_id": speaker_id,
+                "text": sample.text,
+                "context": sample.context,
+                "start_offset": sample.start_offset,
+                "end_offset": sample.end_offset,
+                "position": position,
+            } for position, (speaker_id, sample) in enumerate(found))
+
+        changed = [chapter_id for chapter_id, _, _ in stale] + sorted(removed)
+        try:
+            for i in range(0, len(changed), _QUERY_CHUNK):
+                chunk = changed[i:i + _QUERY_CHUNK]
+                db.execute(delete(DialogueSpan).where(DialogueSpan.chapter_id.in_(chunk)))
+                db.execute(delete(DialogueIndexChapter).where(DialogueIndexChapter.chapter_id.in_(chunk)))
+            if states:
+                db.execute(insert(DialogueIndexChapter), states)
+            if spans:
+                db.execute(insert(DialogueSpan), spans)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            with self._lock:
+                self.write_errors += 1
+            logger.warning(f"Could not update the dialogue index for {manuscript_id}: {e}")
+            return False
+
+        with self._lock:
+            self.chapters_indexed += len(stale)
+        return True
+
+    def index_chapter(self, db: Session, chapter: Chapter) -> bool:
+        """Re-index a chapter after it was saved"""
+        return self.refresh(db, chapter.manuscript_id, [chapter.id])
+
+    def samples(
+        self,
+        db: Session,
+        manuscript_id: str,
+        character_ids: Optional[Sequence[str]] = None,
+        chapter_id: Optional[str] = None
+    ) -> Dict[str, List[DialogueSample]]:
+        """
+        Attributed dialogue by speaker id (all speakers, or character_ids),
+        in chapter order. Refreshes stale chapters first.
+        """
+        chapter_ids = [chapter_id] if chapter_id else None
+        if not self.refresh(db, manuscript_id, chapter_ids):
+            return self._extract_samples(db, manuscript_id, character_ids, chapter_ids)
+
+        query = db.query(
+            DialogueSpan.character_id,
+            DialogueSpan.chapter_id,
+            DialogueSpan.text,
+            DialogueSpan.context,
+            DialogueSpan.start_offset,
+            DialogueSpan.end_offset,
+        ).join(Chapter, Chapter.id == DialogueSpan.chapter_id).filter(
+            DialogueSpan.manuscript_id == manuscript_id
+        )
+        if character_ids is not None:
+            query = query.filter(DialogueSpan.character_id.in_(character_ids))
+        if chapter_id:
+            query = query.filter(DialogueSpan.chapter_id == chapter_id)
+
+        samples: Dict[str, List[DialogueSample]] = {}
+        for speaker_id, span_chapter_id, text, context, start, end in query.order_by(
+            Chapter.order_index, Chapter.id, DialogueSpan.position
+        ):
+            samples.setdefault(speaker_id, []).append(DialogueSample(
+                text=text, chapter_id=span_chapter_id, start_offset=start, end_offset=end, context=context or ""
+            ))
+        return samples
+
+    def _extract_samples(
+        self,
+        db: Session,
+        manuscript_id: str,
+        character_ids: Optional[Sequence[str]],
+        chapter_ids: Optional[Sequence[str]]
+    ) -> Dict[str, List[DialogueSample]]:
+        """samples() without the index"""
+        speakers = self.speakers(db, manuscript_id)
+        if character_ids is not None:
+            wanted = set(character_ids)
+            speakers = [speaker for speaker in speakers if speaker.id in wanted]
+        extractor = DialogueExtractor(speakers)
+
+        query = db.query(Chapter.id, Chapter.content).filter(
+            Chapter.manuscript_id == manuscript_id,
+            Chapter.document_type == "CHAPTER"
+        )
+        if chapter_ids is not None:
+            query = query.filter(Chapter.id.in_(chapter_ids))
+
+        samples: Dict[str, List[DialogueSample]] = {}
+        for chapter_id, content in query.order_by(Chapter.order_index, Chapter.id):
+            for speaker_id, sample in extractor.extract(content, chapter_id):
+                samples.setdefault(speaker_id, []).append(sample)
+        return samples
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "chapters_indexed": self.chapters_indexed,
+                "chapters_reused": self.chapters_reused,
+                "write_errors": self.write_errors,
+            }
+
+
+# Module-level singleton
+dialogue_index = DialogueIndex()
+
+
+def _delete_chapter_dialogue(mapper, connection, target):
+    # SQLite doesn't enforce the ON DELETE CASCADE foreign keys
+    connection.execute(delete(DialogueSpan).where(DialogueSpan.chapter_id == target.id))
+    connection.execute(delete(DialogueIndexChapter).where(DialogueIndexChapter.chapter_id == target.id))
+
+
+event.listen(Chapter, "after_delete", _delete_chapter_dialogue)
@@ -50,6 +50,10 @@ class EmbeddingService:
         """Generate embedding for a text"""
         return self.model.encode(text).tolist()
 
+    def embed_texts(self, texts: List[str]):
+        """Unit-length embeddings for many texts, one row per text"""
+        return self.model.encode(texts, normalize_embeddings=True)
+
     def add_scene_embedding(
         self,
         scene_id: str,
@@ -8,12 +8,13 @@ Analyzes:
 - Character-specific emotional arcs
 """
 
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime
 from sqlalchemy.orm import Session
 import re
 
 from app.models.manuscript import Manuscript, Chapter
+from app.services.pattern_bank import PatternBank
 
 
 # ==================== Emotional Beat Types ====================
@@ -87,6 +88,8 @@ BEAT_PATTERNS = {
     ],
 }
 
+BEAT_BANK = PatternBank(BEAT_PATTERNS)
+
 # Genre emotional expectations
 GENRE_EMOTIONAL_PATTERNS = {
     "romance": {
@@ -158,17 +161,9 @@ class EmotionalBeatService:
             }
 
         text_lower = text.lower()
-        beat_scores = {}
-
-        # Score each beat type
-        for beat, patterns in BEAT_PATTERNS.items():
-            score = 0
-            for pattern in patterns:
-                matches = re.findall(pattern, text_lower)
-                score += len(matches)
 
-            if score > 0:
-                beat_scores[beat] = score
+        # Score every beat type in one pass
+        beat_scores = BEAT_BANK.counts(text_lower)
 
         if not beat_scores:
             return {
@@ -208,13 +203,17 @@ class EmotionalBeatService:
         if not chapter.content:
             return {"error": "No content to analyze"}
 
+        return self.analyze_chapter_text(chapter_id, chapter.title, chapter.content)
+
+    def analyze_chapter_text(self, chapter_id: str, chapter_title: Optional[str], content: str) -> Dict[str, Any]:
+        """Emotional beat analysis of one chapter's text (no database access)"""
         # Split into scenes or paragraphs
         scene_break_pattern = r'\n\s*(?:\*\s*\*\s*\*|\#\s*\#\s*\#|~~~)\s*\n'
-        scenes = re.split(scene_break_pattern, chapter.content)
+        scenes = re.split(scene_break_pattern, content)
 
         if len(scenes) == 1:
             # No scene breaks, analyze by paragraph groups
-            paragraphs = [p for p in chapter.content.split('\n\n') if p.strip()]
+            paragraphs = [p for p in content.split('\n\n') if p.strip()]
             # Group paragraphs into chunks of ~500 words
             scenes = self._group_paragraphs(paragraphs, target_words=500)
 
@@ -242,7 +241,7 @@ class EmotionalBeatService:
 
         return {
             "chapter_id": chapter_id,
-            "chapter_title": chapter.title,
+            "chapter_title": chapter_title,
             "total_scenes": len(scene_beats),
             "beat_distribution": beat_counts,
             "scene_beats": scene_beats,
@@ -343,26 +342,43 @@ class EmotionalBeatService:
         if not chapters:
             return {"error": "No chapters found"}
 
+        chapter_results = [
+            (chapter, self.analyze_chapter_text(chapter.id, chapter.title, chapter.content))
+            for chapter in chapters
+            if chapter.content
+        ]
+        return self.summarize_manuscript(manuscript_id, genre, chapter_results)
+
+    def summarize_manuscript(
+        self,
+        manuscript_id: str,
+        genre: Optional[str],
+        chapter_results: List[Tuple[Any, Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Combine per-chapter beat analyses into the manuscript report.
+
+        chapter_results are (chapter, analysis) pairs in chapter order; the
+        chapter only needs title and order_index.
+        """
         chapter_analyses = []
         all_beats = {}
         intensity_by_chapter = []
 
-        for chapter in chapters:
-            analysis = self.analyze_chapter(chapter.id)
-            if "error" not in analysis:
-                chapter_analyses.append(analysis)
-
-                # Aggregate beat counts
-                for beat, count in analysis.get("beat_distribution", {}).items():
-                    all_beats[beat] = all_beats.get(beat, 0) + count
-
-                # Track intensity
-                avg_intensity = analysis.get("rhythm_analysis", {}).get("average_intensity", 0)
-                intensity_by_chapter.append({
-                    "chapter_index": chapter.order_index,
-                    "chapter_title": chapter.title,
-                    "average_intensity": avg_intensity
-                })
+        for chapter, analysis in chapter_results:
+            chapter_analyses.append(analysis)
+
+            # Aggregate beat counts
+            for beat, count in analysis.get("beat_distribution", {}).items():
+                all_beats[beat] = all_beats.get(beat, 0) + count
+
+            # Track intensity
+            avg_intensity = analysis.get("rhythm_analysis", {}).get("average_intensity", 0)
+            intensity_by_chapter.append({
+                "chapter_index": chapter.order_index,
+                "chapter_title": chapter.title,
+                "average_intensity": avg_intensity
+            })
 
         # Genre analysis
         genre_analysis = None
@@ -0,0 +1,204 @@
+"""
+Entity Suggestion Store - Batched persistence for realtime entity suggestions.
+
+The realtime WebSocket used to persist detections one entity at a time: a new
+SessionLocal, a SELECT for a pending suggestion, a SELECT for a Codex entity
+and a committed INSERT, all on the event loop. This module writes a whole
+result set in one transaction instead:
+
+1. A per-manuscript set of known names (Codex entities and pending
+   suggestions, lowercased) drops repeat detections without touching the DB
+2. One SELECT finds which remaining names are already Codex entities
+3. One INSERT ... ON CONFLICT DO NOTHING against the unique
+   (manuscript_id, lower(name), status) index adds the rest, so two editors of
+   the same manuscript can't create duplicate pending suggestions
+4. One SELECT reads back the pending suggestion id for every name
+
+persist_entity_suggestions is synchronous; callers on the event loop run it
+with asyncio.to_thread.
+
+Configuration:
+- REALTIME_KNOWN_NAME_MANUSCRIPTS: manuscripts whose name sets stay cached
+  (least recently used are dropped; default 256)
+"""
+
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.entity import Entity, EntitySuggestion
+
+KNOWN_NAME_MANUSCRIPTS = int(os.getenv("REALTIME_KNOWN_NAME_MANUSCRIPTS", "256"))
+
+
+class KnownNameCache:
+    """Lowercased names per manuscript that need no suggestion (in Codex or pending)"""
+
+    def __init__(self, max_manuscripts: int = KNOWN_NAME_MANUSCRIPTS):
+        self.max_manuscripts = max_manuscripts
+        self._names: "OrderedDict[str, Set[str]]" = OrderedDict()
+        # Writes happen in to_thread workers while the loop reads
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def seed(self, manuscript_id: str, names: Iterable[str]):
+        """Replace a manuscript's known names (on connect, from the DB)"""
+        with self._lock:
+            self._names[manuscript_id] = {n.lower() for n in names if n}
+            self._names.move_to_end(manuscript_id)
+            while len(self._names) > self.max_manuscripts:
+                self._names.popitem(last=False)
+
+    def add(self, manuscript_id: str, names: Iterable[str]):
+        with self._lock:
+            known = self._names.get(manuscript_id)
+            if known is not None:
+                known.update(n.lower() for n in names if n)
+
+    def forget(self, manuscript_id: str):
+        """Drop a manuscript's names (last editor disconnected; Codex may change meanwhile)"""
+        with self._lock:
+            self._names.pop(manuscript_id, None)
+
+    def unknown(self, manuscript_id: str, entities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Entities whose names aren't known yet, first occurrence per name"""
+        with self._lock:
+            known = self._names.get(manuscript_id, set())
+            result = []
+            seen = set()
+            for entity in entities:
+                key = entity["name"].lower()
+                if key in known or key in seen:
+                    self.hits += 1
+                    continue
+                seen.add(key)
+                self.misses += 1
+                result.append(entity)
+            if manuscript_id in self._names:
+                self._names.move_to_end(manuscript_id)
+            return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "manuscripts": len(self._names),
+                "names": sum(len(n) for n in self._names.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def _insert_ignoring_duplicates(db: Session, rows: List[Dict[str, Any]]):
+    """INSERT ... ON CONFLICT DO NOTHING on the unique (manuscript, lower(name), status) index"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        insert = postgresql_insert
+    elif dialect == "sqlite":
+        insert = sqlite_insert
+    else:
+        raise NotImplementedError(f"Bulk suggestion upsert not supported on {dialect}")
+
+    statement = insert(EntitySuggestion).values(rows).on_conflict_do_nothing(
+        index_elements=[
+            EntitySuggestion.manuscript_id,
+            func.lower(EntitySuggestion.name),
+            EntitySuggestion.status,
+        ]
+    )
+    db.execute(statement)
+
+
+def persist_entity_suggestions(
+    manuscript_id: str,
+    entities: List[Dict[str, Any]],
+    session_factory: Callable[[], Session] = SessionLocal,
+    known_names: Optional[KnownNameCache] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Persist one result set of detected entities as pending suggestions.
+
+    Returns copies of the entities that have a pending suggestion, each with
+    suggestion_id and is_new (False when another connection created it first).
+    Known names and names already in the Codex are left out.
+    """
+    known_names = known_names or known_name_cache
+    candidates = known_names.unknown(manuscript_id, entities)
+    if not candidates:
+        return []
+
+    by_key = {entity["name"].lower(): entity for entity in candidates}
+    db = session_factory()
+    try:
+        in_codex = {
+            name for (name,) in db.query(func.lower(Entity.name)).filter(
+                Entity.manuscript_id == manuscript_id,
+                func.lower(Entity.name).in_(list(by_key)),
+            )
+        }
+
+        now = datetime.utcnow()
+        rows = [
+            {
+                "id": str(uuid.uuid4()),
+                "manuscript_id": manuscript_id,
+                "name": entity["name"],
+                "type": entity["type"],
+                "context": entity.get("context", ""),
+                "status": "PENDING",
+                "created_at": now,
+            }
+            for key, entity in by_key.items()
+            if key not in in_codex
+        ]
+        pending_ids: Dict[str, str] = {}
+        if rows:
+            _insert_ignoring_duplicates(db, rows)
+            pending_ids = {
+                name: suggestion_id
+                for name, suggestion_id in db.query(
+                    func.lower(EntitySuggestion.name), EntitySuggestion.id
+                ).filter(
+                    EntitySuggestion.manuscript_id == manuscript_id,
+                    EntitySuggestion.status == "PENDING",
+                    func.lower(EntitySuggestion.name).in_([r["name"].lower() for r in rows]),
+                )
+            }
+        db.commit()
+    except Exception as e:
+        print(f"Error persisting entity suggestions: {e}")
+        db.rollback()
+        return []
+    finally:
+        db.close()
+
+    known_names.add(manuscript_id, by_key)
+
+    persisted = []
+    for row in rows:
+        suggestion_id = pending_ids.get(row["name"].lower())
+        if suggestion_id is None:
+            continue
+        persisted.append({
+            **by_key[row["name"].lower()],
+            "suggestion_id": suggestion_id,
+            "is_new": suggestion_id == row["id"],
+        })
+
+    created = sum(1 for entity in persisted if entity["is_new"])
+    if created:
+        print(f"💾 Persisted {created} entity suggestions for manuscript {manuscript_id}")
+    return persisted
+
+
+# Module-level singleton
+known_name_cache = KnownNameCache()
@@ -0,0 +1,273 @@
+"""
+Export Cache - Disk-backed, content-addressed cache of rendered exports.
+
+Writers export the same manuscript to DOCX/PDF over and over (one copy per
+beta reader) while nothing has changed. Rendered files are now kept on disk
+and served straight from there:
+
+- Entries are content-addressed by (manuscript id, format, export options,
+  fingerprint). The fingerprint hashes the manuscript's title/author and the
+  ordered chapters' ids, titles, updated_at and content lengths, read in one
+  column query without loading any chapter text
+- Entries live in one directory per manuscript; any chapter insert, update or
+  delete (and any manuscript update) drops that directory, and storing a new
+  render replaces older renders of the same format and options
+- Reads touch the file's mtime; when the cache grows past its byte budget the
+  least recently used files are deleted
+- Files are moved into place atomically, so a reader never sees a partial one
+
+Configuration:
+- EXPORT_CACHE_DIR: cache directory (default DATA_DIR/export_cache)
+- EXPORT_CACHE_MAX_MB: byte budget for all entries (default 1024)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from app.models.manuscript import Manuscript, Chapter
+from app.services.export_workers import select_export_chapters
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(
+    os.getenv("EXPORT_CACHE_DIR")
+    or Path(os.getenv("DATA_DIR", "./data")) / "export_cache"
+)
+MAX_BYTES = int(float(os.getenv("EXPORT_CACHE_MAX_MB", "1024")) * 1024 * 1024)
+
+# Bump when the DOCX/PDF writers change their output
+CACHE_FORMAT_VERSION = 1
+
+# Manuscript ids become directory names; anything else is simply not cached
+_SAFE_ID = re.compile(r"^[A-Za-z0-9_-]{1,128}$")
+
+
+@dataclass
+class ExportCacheKey:
+    """Where one export of one manuscript state lives in the cache"""
+    manuscript_id: str
+    format: str
+    options_hash: str
+    fingerprint: str
+    title: str
+    chapters: int
+
+    @property
+    def filename(self) -> str:
+        return f"{self.options_hash}-{self.fingerprint}.{self.format}"
+
+
+def options_hash(chapter_ids: Optional[List[str]] = None, include_folders: bool = False) -> str:
+    """Stable hash of the export options that change the output"""
+    options = {"chapter_ids": list(chapter_ids or []), "include_folders": include_folders}
+    return hashlib.sha256(
+        f"{CACHE_FORMAT_VERSION}:{json.dumps(options, sort_keys=True)}".encode()
+    ).hexdigest()[:16]
+
+
+def export_cache_key(
+    db: Session,
+    manuscript_id: str,
+    fmt: str,
+    chapter_ids: Optional[List[str]] = None,
+    include_folders: bool = False,
+) -> ExportCacheKey:
+    """
+    Content address of an export of the manuscript as it is now.
+
+    Raises ValueError if the manuscript doesn't exist.
+    """
+    manuscript = db.query(
+        Manuscript.title, Manuscript.author, Manuscript.updated_at
+    ).filter(Manuscript.id == manuscript_id).first()
+    if not manuscript:
+        raise ValueError(f"Manuscript {manuscript_id} not found")
+
+    rows = select_export_chapters(
+        db, manuscript_id, chapter_ids,
+        (
+            Chapter.id,
+            Chapter.title,
+            Chapter.updated_at,
+            func.length(Chapter.lexical_state),
+            func.length(Chapter.content),
+        ),
+    ).all()
+
+    digest = hashlib.sha256()
+    digest.update(repr((manuscript.title, manuscript.author, manuscript.updated_at)).encode())
+    for row in rows:
+        digest.update(repr(tuple(row)).encode())
+    return ExportCacheKey(
+        manuscript_id=manuscript_id,
+        format=fmt,
+        options_hash=options_hash(chapter_ids, include_folders),
+        fingerprint=digest.hexdigest()[:32],
+        title=manuscript.title,
+        chapters=len(rows),
+    )
+
+
+class ExportCache:
+    """Rendered exports on disk, one directory per manuscript, evicted LRU by total size"""
+
+    def __init__(self, directory: Path = CACHE_DIR, max_bytes: int = MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _manuscript_dir(self, manuscript_id: str) -> Optional[Path]:
+        if not manuscript_id or not _SAFE_ID.match(manuscript_id):
+            return None
+        return self.directory / manuscript_id
+
+    def _path(self, key: ExportCacheKey) -> Optional[Path]:
+        directory = self._manuscript_dir(key.manuscript_id)
+        return directory / key.filename if directory else None
+
+    def get(self, key: ExportCacheKey) -> Optional[Path]:
+        """Path of the cached export for a key, or None"""
+        path = self._path(key)
+        try:
+            if path is None:
+                raise FileNotFoundError
+            os.utime(path)  # Mark as recently used
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def put(self, key: ExportCacheKey, rendered_path: str) -> Optional[Path]:
+        """
+        Move a rendered export into the cache; returns its cached path.
+
+        Returns None (leaving rendered_path alone) if the manuscript can't be cached.
+        """
+        path = self._path(key)
+        if path is None:
+            return None
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        os.close(fd)
+        try:
+            shutil.move(rendered_path, tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        # Older renders of the same export can never be served again
+        for stale in path.parent.glob(f"{key.options_hash}-*.{key.format}"):
+            if stale != path:
+                stale.unlink(missing_ok=True)
+        self._evict()
+        return path
+
+    def invalidate(self, manuscript_id: str):
+        """Drop every cached export of a manuscript"""
+        directory = self._manuscript_dir(manuscript_id)
+        if directory is not None and directory.exists():
+            shutil.rmtree(directory, ignore_errors=True)
+            self.invalidations += 1
+
+    def status(self, keys: List[ExportCacheKey]) -> Dict[str, Dict[str, Any]]:
+        """Whether each key is cached, by format (does not count as a read)"""
+        status = {}
+        for key in keys:
+            path = self._path(key)
+            try:
+                stat = path.stat() if path is not None else None
+            except FileNotFoundError:
+                stat = None
+            status[key.format] = {
+                "cached": stat is not None,
+                "size": stat.st_size if stat else None,
+                "cached_at": datetime.utcfromtimestamp(stat.st_ctime).isoformat() if stat else None,
+            }
+        return status
+
+    def _entries(self) -> List[Tuple[str, os.stat_result]]:
+        entries = []
+        try:
+            manuscript_dirs = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return entries
+        for manuscript_dir in manuscript_dirs:
+            try:
+                for entry in os.scandir(manuscript_dir.path):
+                    if not entry.name.endswith(".tmp"):
+                        try:
+                            entries.append((entry.path, entry.stat()))
+                        except FileNotFoundError:
+                            pass  # Invalidated meanwhile
+            except (FileNotFoundError, NotADirectoryError):
+                pass
+        return entries
+
+    def _evict(self):
+        """Delete least recently used exports until the cache fits the budget"""
+        with self._lock:
+            entries = self._entries()
+            total = sum(stat.st_size for _, stat in entries)
+            if total <= self.max_bytes:
+                return
+            for path, stat in sorted(entries, key=lambda e: e[1].st_mtime):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    self.evictions += 1
+                except FileNotFoundError:
+                    pass
+                total -= stat.st_size
+
+    def get_stats(self) -> Dict[str, Any]:
+        entries = self._entries()
+        return {
+            "entries": len(entries),
+            "bytes": sum(stat.st_size for _, stat in entries),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+# Module-level singleton
+export_cache = ExportCache()
+
+
+def _invalidate_chapter_manuscript(mapper, connection, target):
+    if target.manuscript_id:
+        export_cache.invalidate(target.manuscript_id)
+
+
+def _invalidate_manuscript(mapper, connection, target):
+    export_cache.invalidate(target.id)
+
+
+# Any ORM chapter write invalidates that manuscript's exports
+for _event_name in ("after_insert", "after_update", "after_delete"):
+    event.listen(Chapter, _event_name, _invalidate_chapter_manuscript)
+event.listen(Manuscript, "after_update", _invalidate_manuscript)
+event.listen(Manuscript, "after_delete", _invalidate_manuscript)
@@ -0,0 +1,123 @@
+"""
+Export Task Registry - In-memory singleton for tracking background exports.
+
+Mirrors ScanTaskRegistry: POST /api/export/jobs creates a task, the export
+worker reports chapters rendered, and the frontend polls
+/api/export/jobs/{task_id} and downloads the file once it completes.
+Finished tasks (and their files, unless the file belongs to the export
+cache) are dropped after an hour.
+"""
+
+import os
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Optional, Dict
+import uuid
+
+# Finished tasks and their files are dropped after this long
+FINISHED_TASK_TTL = timedelta(hours=1)
+
+
+@dataclass
+class ExportTask:
+    """Represents a background export with progress tracking"""
+    id: str
+    manuscript_id: str
+    format: str
+    status: str = "running"  # running, completed, failed
+    total_chapters: int = 0
+    chapters_completed: int = 0
+    progress_percent: float = 0.0
+    file_path: Optional[str] = None
+    filename: Optional[str] = None
+    media_type: Optional[str] = None
+    size: int = 0
+    cached: bool = False  # file_path is an export cache entry, not owned by the task
+    error: Optional[str] = None
+    started_at: datetime = field(default_factory=datetime.utcnow)
+    completed_at: Optional[datetime] = None
+
+
+class ExportTaskRegistry:
+    """Thread-safe singleton registry for export tasks"""
+
+    _instance: Optional["ExportTaskRegistry"] = None
+    _lock = threading.Lock()
+
+    def __new__(cls) -> "ExportTaskRegistry":
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._tasks: Dict[str, ExportTask] = {}
+                    cls._instance._task_lock = threading.Lock()
+        return cls._instance
+
+    def create_task(self, manuscript_id: str, format: str) -> ExportTask:
+        """Create a new export task"""
+        with self._task_lock:
+            self._prune()
+            task = ExportTask(id=str(uuid.uuid4()), manuscript_id=manuscript_id, format=format)
+            self._tasks[task.id] = task
+            return task
+
+    def get_task(self, task_id: str) -> Optional[ExportTask]:
+        """Get a task by ID"""
+        return self._tasks.get(task_id)
+
+    def update_progress(self, task_id: str, chapters_completed: int, total_chapters: int) -> None:
+        """Update progress on a running task"""
+        task = self._tasks.get(task_id)
+        if not task:
+            return
+        task.chapters_completed = chapters_completed
+        task.total_chapters = total_chapters
+        task.progress_percent = (chapters_completed / total_chapters) * 100 if total_chapters else 0.0
+
+    def complete_task(
+        self,
+        task_id: str,
+        file_path: str,
+        filename: str,
+        media_type: str,
+        size: int,
+        cached: bool = False,
+    ) -> None:
+        """Mark a task as completed with its rendered file"""
+        with self._task_lock:
+            task = self._tasks.get(task_id)
+            if not task:
+                return
+            task.status = "completed"
+            task.file_path = file_path
+            task.filename = filename
+            task.media_type = media_type
+            task.size = size
+            task.cached = cached
+            task.progress_percent = 100.0
+            task.completed_at = datetime.utcnow()
+
+    def fail_task(self, task_id: str, error: str) -> None:
+        """Mark a task as failed"""
+        with self._task_lock:
+            task = self._tasks.get(task_id)
+            if not task:
+                return
+            task.status = "failed"
+            task.error = error
+            task.completed_at = datetime.utcnow()
+
+    def _prune(self):
+        cutoff = datetime.utcnow() - FINISHED_TASK_TTL
+        for task in [
+            t for t in self._tasks.values()
+            if t.completed_at is not None and t.completed_at < cutoff
+        ]:
+            if task.file_path and not task.cached and os.path.exists(task.file_path):
+                os.remove(task.file_path)
+            del self._tasks[task.id]
+
+
+# Module-level singleton access
+export_registry = ExportTaskRegistry()
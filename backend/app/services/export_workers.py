@@ -0,0 +1,553 @@
+"""
+Export Workers - Streaming DOCX/PDF rendering in a worker process.
+
+Exports used to build the whole python-docx Document (or every ReportLab
+flowable) in memory inside the request coroutine, setting the font on every
+run, then save to a BytesIO that was only streamed out at the end. A series
+omnibus spiked memory and blocked the event loop for the whole render.
+
+- load_export_data: the manuscript plus its chapters in one ordered query
+  (selected chapter_ids keep the order they were given in)
+- write_docx: writes a minimal WordprocessingML package straight into a
+  zip stream, one paragraph at a time. Fonts, spacing and indents live in
+  document-level styles (Normal, Title, Heading 1-6), so runs only carry
+  bold/italic/underline/strike
+- write_pdf: feeds ReportLab flowables one chapter at a time instead of
+  building the full list up front
+- ExportWorkerPool: renders in a worker process to a temp file on disk and
+  relays per-chapter progress back to the event loop
+
+Configuration:
+- EXPORT_PROCESSES: worker processes (default 1; 0 = a thread in this
+  process, for development and tests)
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import re
+import tempfile
+import zipfile
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from sqlalchemy import and_, case
+from sqlalchemy.orm import Session
+
+from app.models.manuscript import Manuscript, Chapter
+from app.services.lexical_utils import lexical_to_rich_paragraphs, RichParagraph
+
+logger = logging.getLogger(__name__)
+
+PROCESSES = int(os.getenv("EXPORT_PROCESSES", "1"))
+
+EXPORT_FORMATS = {
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "pdf": "application/pdf",
+}
+
+# Called with (chapters_done, total_chapters)
+ExportProgress = Callable[[int, int], None]
+
+
+@dataclass
+class ExportManuscript:
+    """The manuscript fields an export needs"""
+    id: str
+    title: str
+    author: Optional[str]
+
+
+def load_export_data(
+    db: Session,
+    manuscript_id: str,
+    chapter_ids: Optional[List[str]] = None,
+) -> Tuple[ExportManuscript, List[Any]]:
+    """
+    Manuscript plus its chapters (id, title, lexical_state, content) in one ordered query.
+
+    With chapter_ids, only those chapters of the manuscript are exported, in
+    the order given.
+    """
+    manuscript = db.query(Manuscript).filter_by(id=manuscript_id).first()
+    if not manuscript:
+        raise ValueError(f"Manuscript {manuscript_id} not found")
+
+    chapters = select_export_chapters(
+        db, manuscript_id, chapter_ids,
+        (Chapter.id, Chapter.title, Chapter.lexical_state, Chapter.content),
+    ).all()
+    return ExportManuscript(manuscript.id, manuscript.title, manuscript.author), chapters
+
+
+def select_export_chapters(db: Session, manuscript_id: str, chapter_ids: Optional[List[str]], columns):
+    """Query for the chapters an export covers, in export order"""
+    if chapter_ids:
+        return db.query(*columns).filter(
+            and_(
+                Chapter.manuscript_id == manuscript_id,
+                Chapter.id.in_(chapter_ids)
+            )
+        ).order_by(
+            case({chapter_id: i for i, chapter_id in enumerate(chapter_ids)}, value=Chapter.id)
+        )
+    return db.query(*columns).filter(
+        and_(
+            Chapter.manuscript_id == manuscript_id,
+            Chapter.is_folder == False
+        )
+    ).order_by(Chapter.order_index)
+
+
+def chapter_paragraphs(chapter) -> Tuple[List[RichParagraph], List[str]]:
+    """Formatted paragraphs from Lexical state, else plain-text paragraphs from content"""
+    if chapter.lexical_state and chapter.lexical_state.strip():
+        rich_paragraphs = lexical_to_rich_paragraphs(chapter.lexical_state)
+        if rich_paragraphs:
+            return rich_paragraphs, []
+    if chapter.content:
+        return [], [p.strip() for p in chapter.content.split('\n') if p.strip()]
+    return [], []
+
+
+# --- DOCX ---
+
+_W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_INVALID_XML_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+<Override PartName="/word/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>
+<Override PartName="/docProps/core.xml" ContentType="application/vnd.openxmlformats-package.core-properties+xml"/>
+</Types>"""
+
+_PACKAGE_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>
+<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/package/2006/relationships/metadata/core-properties" Target="docProps/core.xml"/>
+</Relationships>"""
+
+_DOCUMENT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>
+</Relationships>"""
+
+_CORE_PROPERTIES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" xmlns:dc="http://purl.org/dc/elements/1.1/">
+<dc:title>{title}</dc:title>
+<dc:creator>{author}</dc:creator>
+</cp:coreProperties>"""
+
+# Heading sizes in half-points (18pt chapter headings, as before)
+_HEADING_SIZES = {1: 36, 2: 32, 3: 28, 4: 26, 5: 24, 6: 24}
+
+
+def _heading_style(level: int) -> str:
+    return (
+        f'<w:style w:type="paragraph" w:styleId="Heading{level}">'
+        f'<w:name w:val="heading {level}"/><w:basedOn w:val="Normal"/><w:next w:val="Normal"/><w:qFormat/>'
+        f'<w:pPr><w:keepNext/><w:spacing w:before="240" w:after="120" w:line="240" w:lineRule="auto"/>'
+        f'<w:ind w:firstLine="0"/><w:outlineLvl w:val="{level - 1}"/></w:pPr>'
+        f'<w:rPr><w:b/><w:sz w:val="{_HEADING_SIZES[level]}"/></w:rPr></w:style>'
+    )
+
+
+# Standard manuscript format: Times New Roman 12pt, double-spaced, 0.5" first-line indent
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    f'<w:styles xmlns:w="{_W_NS}">'
+    '<w:docDefaults><w:rPrDefault><w:rPr>'
+    '<w:rFonts w:ascii="Times New Roman" w:hAnsi="Times New Roman" w:eastAsia="Times New Roman" w:cs="Times New Roman"/>'
+    '<w:sz w:val="24"/><w:szCs w:val="24"/>'
+    '</w:rPr></w:rPrDefault><w:pPrDefault><w:pPr/></w:pPrDefault></w:docDefaults>'
+    '<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/><w:qFormat/>'
+    '<w:pPr><w:spacing w:after="0" w:line="480" w:lineRule="auto"/><w:ind w:firstLine="720"/></w:pPr>'
+    '<w:rPr><w:rFonts w:ascii="Times New Roman" w:hAnsi="Times New Roman" w:cs="Times New Roman"/>'
+    '<w:sz w:val="24"/></w:rPr></w:style>'
+    '<w:style w:type="paragraph" w:styleId="Title"><w:name w:val="Title"/><w:basedOn w:val="Normal"/><w:qFormat/>'
+    '<w:pPr><w:jc w:val="center"/><w:ind w:firstLine="0"/><w:spacing w:line="240" w:lineRule="auto"/></w:pPr>'
+    '<w:rPr><w:b/><w:sz w:val="48"/></w:rPr></w:style>'
+    '<w:style w:type="paragraph" w:styleId="Author"><w:name w:val="Author"/><w:basedOn w:val="Normal"/>'
+    '<w:pPr><w:jc w:val="center"/><w:ind w:firstLine="0"/></w:pPr><w:rPr><w:sz w:val="28"/></w:rPr></w:style>'
+    + ''.join(_heading_style(level) for level in range(1, 7)) +
+    '</w:styles>'
+)
+
+_SECTION = (
+    '<w:sectPr><w:pgSz w:w="12240" w:h="15840"/>'
+    '<w:pgMar w:top="1440" w:right="1440" w:bottom="1440" w:left="1440" w:header="720" w:footer="720" w:gutter="0"/>'
+    '</w:sectPr>'
+)
+
+_PAGE_BREAK = '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+
+
+def _xml_text(text: str) -> str:
+    return escape(_INVALID_XML_CHARS.sub('', text))
+
+
+def _docx_run(text: str, bold=False, italic=False, underline=False, strikethrough=False) -> str:
+    props = ''
+    if bold:
+        props += '<w:b/>'
+    if italic:
+        props += '<w:i/>'
+    if strikethrough:
+        props += '<w:strike/>'
+    if underline:
+        props += '<w:u w:val="single"/>'
+    if props:
+        props = f'<w:rPr>{props}</w:rPr>'
+    return f'<w:r>{props}<w:t xml:space="preserve">{_xml_text(text)}</w:t></w:r>'
+
+
+def _docx_paragraph(runs: str, style: Optional[str] = None) -> str:
+    props = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ''
+    return f'<w:p>{props}{runs}</w:p>'
+
+
+def _docx_chapter(chapter) -> Iterator[str]:
+    # Add chapter title as heading
+    yield _docx_paragraph(_docx_run(chapter.title or ''), 'Heading1')
+
+    rich_paragraphs, plain_paragraphs = chapter_paragraphs(chapter)
+    for rich_para in rich_paragraphs:
+        if rich_para.is_empty():
+            continue
+        runs = ''.join(
+            _docx_run(run.text, run.bold, run.italic, run.underline, run.strikethrough)
+            for run in rich_para.runs if run.text
+        )
+        style = f'Heading{min(rich_para.heading_level, 6)}' if rich_para.heading_level > 0 else None
+        yield _docx_paragraph(runs, style)
+    for text in plain_paragraphs:
+        yield _docx_paragraph(_docx_run(text))
+
+    # Page break between chapters
+    yield _PAGE_BREAK
+
+
+def write_docx(
+    out: BinaryIO,
+    manuscript: ExportManuscript,
+    chapters: List[Any],
+    progress: Optional[ExportProgress] = None,
+):
+    """Write a DOCX package to out, streaming word/document.xml a paragraph at a time"""
+    with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as package:
+        package.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        package.writestr('_rels/.rels', _PACKAGE_RELS)
+        package.writestr('word/_rels/document.xml.rels', _DOCUMENT_RELS)
+        package.writestr('word/styles.xml', _STYLES)
+        package.writestr('docProps/core.xml', _CORE_PROPERTIES.format(
+            title=_xml_text(manuscript.title or ''),
+            author=_xml_text(manuscript.author or ''),
+        ))
+
+        with package.open('word/document.xml', 'w', force_zip64=True) as stream:
+            def write(xml: str):
+                stream.write(xml.encode('utf-8'))
+
+            write(f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><w:document xmlns:w="{_W_NS}"><w:body>')
+
+            # Title page
+            write(_docx_paragraph(_docx_run(manuscript.title or ''), 'Title'))
+            if manuscript.author:
+                write(_docx_paragraph(_docx_run(f"by {manuscript.author}"), 'Author'))
+            write(_PAGE_BREAK)
+
+            total = len(chapters)
+            for done, chapter in enumerate(chapters, start=1):
+                for xml in _docx_chapter(chapter):
+                    write(xml)
+                if progress:
+                    progress(done, total)
+
+            write(_SECTION + '</w:body></w:document>')
+
+
+# --- PDF ---
+
+# Yielded by write_pdf's generator after each chapter's flowables
+_CHAPTER_END = object()
+
+
+class _FlowableStream(list):
+    """
+    A flowable list that refills itself from a generator, a chapter at a time.
+
+    ReportLab's build loop checks len() and consumes flowables from the front,
+    so only one chapter's Paragraphs exist at a time.
+    """
+
+    def __init__(self, source: Iterable[Any]):
+        super().__init__()
+        self._source = iter(source)
+
+    def __len__(self):
+        if super().__len__() == 0:
+            for item in self._source:
+                if item is _CHAPTER_END:
+                    if super().__len__():
+                        break
+                    continue
+                self.append(item)
+        return super().__len__()
+
+
+def _escape_for_reportlab(text: str) -> str:
+    """Escape special characters for ReportLab XML."""
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def _format_run_for_pdf(run) -> str:
+    """Convert a TextRun to ReportLab markup."""
+    text = _escape_for_reportlab(run.text)
+    if run.bold:
+        text = f'<b>{text}</b>'
+    if run.italic:
+        text = f'<i>{text}</i>'
+    if run.underline:
+        text = f'<u>{text}</u>'
+    if run.strikethrough:
+        text = f'<strike>{text}</strike>'
+    return text
+
+
+def write_pdf(
+    out: BinaryIO,
+    manuscript: ExportManuscript,
+    chapters: List[Any],
+    progress: Optional[ExportProgress] = None,
+):
+    """Write a PDF to out, generating each chapter's flowables only when ReportLab reaches it"""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
+    from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
+
+    doc = SimpleDocTemplate(
+        out,
+        pagesize=letter,
+        topMargin=1*inch,
+        bottomMargin=1*inch,
+        leftMargin=1*inch,
+        rightMargin=1*inch
+    )
+
+    # Define styles
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle', parent=styles['Title'], fontSize=24, textColor='black', spaceAfter=30, alignment=TA_CENTER
+    )
+    author_style = ParagraphStyle(
+        'Author', parent=styles['Normal'], fontSize=14, textColor='black', spaceAfter=30, alignment=TA_CENTER
+    )
+    chapter_style = ParagraphStyle(
+        'ChapterHeading', parent=styles['Heading1'], fontSize=18, textColor='black', spaceAfter=20, spaceBefore=20
+    )
+    # Body text style (manuscript format)
+    body_style = ParagraphStyle(
+        'ManuscriptBody',
+        parent=styles['Normal'],
+        fontSize=12,
+        leading=24,  # Double spacing
+        firstLineIndent=0.5*inch,
+        alignment=TA_JUSTIFY,
+        fontName='Times-Roman'
+    )
+
+    def flowables() -> Iterator[Any]:
+        # Title page
+        yield Paragraph(_escape_for_reportlab(manuscript.title or ''), title_style)
+        if manuscript.author:
+            yield Paragraph(_escape_for_reportlab(f"by {manuscript.author}"), author_style)
+        yield PageBreak()
+        yield _CHAPTER_END
+
+        total = len(chapters)
+        for i, chapter in enumerate(chapters):
+            yield Paragraph(_escape_for_reportlab(chapter.title or ''), chapter_style)
+            yield Spacer(1, 0.2*inch)
+
+            rich_paragraphs, plain_paragraphs = chapter_paragraphs(chapter)
+            for rich_para in rich_paragraphs:
+                if rich_para.is_empty():
+                    continue
+                # Build paragraph text with formatting tags
+                para_text = ''.join(_format_run_for_pdf(run) for run in rich_para.runs if run.text)
+                if para_text.strip():
+                    yield Paragraph(para_text, chapter_style if rich_para.heading_level > 0 else body_style)
+                    yield Spacer(1, 0.1*inch)
+            for text in plain_paragraphs:
+                yield Paragraph(_escape_for_reportlab(text), body_style)
+                yield Spacer(1, 0.1*inch)
+
+            # Page break between chapters (except last)
+            if i < total - 1:
+                yield PageBreak()
+            if progress:
+                progress(i + 1, total)
+            yield _CHAPTER_END
+
+    doc.build(_FlowableStream(flowables()))
+
+
+WRITERS = {
+    "docx": write_docx,
+    "pdf": write_pdf,
+}
+
+
+def render_export(
+    fmt: str,
+    manuscript_id: str,
+    chapter_ids: Optional[List[str]],
+    out_path: str,
+    progress_channel=None,
+    session_factory: Optional[Callable[[], Session]] = None,
+) -> Dict[str, Any]:
+    """
+    Render an export to out_path (worker process entry point).
+
+    Opens its own database session. Progress is put on progress_channel (a
+    queue) as (chapters_done, total_chapters).
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if session_factory is None:
+        from app.database import SessionLocal
+        session_factory = SessionLocal
+
+    db = session_factory()
+    try:
+        manuscript, chapters = load_export_data(db, manuscript_id, chapter_ids)
+    finally:
+        db.close()
+
+    report = (lambda done, total: progress_channel.put((done, total))) if progress_channel is not None else None
+    with open(out_path, 'wb') as out:
+        WRITERS[fmt](out, manuscript, chapters, report)
+    return {"title": manuscript.title, "chapters": len(chapters), "size": os.path.getsize(out_path)}
+
+
+@dataclass
+class ExportFile:
+    """A rendered export on disk; the caller removes it"""
+    path: str
+    format: str
+    title: str
+    chapters: int
+    size: int
+
+    @property
+    def media_type(self) -> str:
+        return EXPORT_FORMATS[self.format]
+
+    @property
+    def filename(self) -> str:
+        return f"{(self.title or 'manuscript').replace(' ', '_')}.{self.format}"
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def iter_open_file(f: BinaryIO, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+    """Stream an already opened export (survives the file being unlinked meanwhile), then close it"""
+    with f:
+        while chunk := f.read(chunk_size):
+            yield chunk
+
+
+class ExportWorkerPool:
+    """Renders exports in a worker process, relaying progress to the event loop"""
+
+    def __init__(
+        self,
+        processes: int = PROCESSES,
+        session_factory: Optional[Callable[[], Session]] = None,
+    ):
+        self.processes = processes
+        # Only usable with processes=0 (a session factory can't cross processes)
+        self.session_factory = session_factory
+        self._executor: Optional[Executor] = None
+        self._manager = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.processes > 0:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="export")
+        return self._executor
+
+    def _progress_channel(self):
+        if self.processes > 0:
+            if self._manager is None:
+                self._manager = multiprocessing.get_context("spawn").Manager()
+            return self._manager.Queue()
+        return queue.Queue()
+
+    async def render(
+        self,
+        fmt: str,
+        manuscript_id: str,
+        chapter_ids: Optional[List[str]] = None,
+        progress: Optional[ExportProgress] = None,
+    ) -> ExportFile:
+        """Render an export to a temp file off the event loop"""
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+
+        fd, path = tempfile.mkstemp(suffix=f".{fmt}", prefix="export-")
+        os.close(fd)
+        channel = self._progress_channel()
+        args = (fmt, manuscript_id, chapter_ids, path, channel)
+        if self.session_factory is not None:
+            args += (self.session_factory,)
+
+        def drain():
+            while True:
+                try:
+                    done, total = channel.get_nowait()
+                except queue.Empty:
+                    return
+                if progress:
+                    progress(done, total)
+
+        future = asyncio.get_running_loop().run_in_executor(self._get_executor(), render_export, *args)
+        try:
+            while not future.done():
+                await asyncio.wait([future], timeout=0.2)
+                drain()
+            result = future.result()
+        except BaseException:
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+        drain()
+        return ExportFile(path=path, format=fmt, title=result["title"], chapters=result["chapters"], size=result["size"])
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+
+
+# Module-level singleton
+export_pool = ExportWorkerPool()
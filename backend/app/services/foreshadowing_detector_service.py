@@ -3,20 +3,37 @@ Foreshadowing Detector Service
 
 Auto-detects potential foreshadowing setups and payoffs in manuscript text.
 Uses pattern matching and NLP to identify narrative promises and their resolutions.
+
+Setups and payoffs are matched in bulk: each is tokenized once into a word
+vector, and every setup is scored against every later payoff with a sparse
+product of those vectors (see SetupPayoffScorer), so detection stays cheap
+across long manuscripts. Optionally, MiniLM embeddings from the embedding
+service add semantic similarity to the keyword overlap.
 """
 
+import logging
 import re
 import uuid
 from datetime import datetime
-from typing import List, Optional, Dict, Any, Tuple
+from itertools import chain
+from typing import List, Optional, Dict, Any, Iterator, Set, Tuple
 from dataclasses import dataclass, field
 from collections import Counter
 
+import numpy as np
 from sqlalchemy.orm import Session
 
-from app.models.manuscript import Manuscript
-from app.models.chapter import Chapter
+from app.models.manuscript import Manuscript, Chapter
 from app.models.foreshadowing import ForeshadowingPair
+from app.services.pattern_bank import PatternBank
+
+logger = logging.getLogger(__name__)
+
+# A payoff must score above this to be matched with a setup
+MIN_MATCH_SCORE = 0.4
+
+# Setup x payoff cells counted per block when scoring in bulk
+_BLOCK_CELLS = 1 << 22
 
 
 @dataclass
@@ -56,6 +73,198 @@ class SetupPayoffMatch:
     match_type: str  # KEYWORD, SYMBOL, CHARACTER, OBJECT
 
 
+def _match_words(text: str, context: str) -> Set[str]:
+    """Lowercased words of 4+ characters in an item's text and context"""
+    return set(w.lower() for w in _MATCH_WORD_PATTERN.findall(text + " " + context))
+
+
+class SetupPayoffScorer:
+    """
+    Scores every setup against every payoff at once.
+
+    Setups and payoffs are tokenized once into binary word vectors. Shared
+    word counts come from a sparse product of the setup vectors with the
+    payoffs' word postings, a block of setups at a time, and the type cues
+    (object use, fulfilled prophecy) are checked once per payoff. Scores
+    equal ForeshadowingDetectorService._calculate_match_score.
+
+    With chapter_order (chapter id -> story position), a payoff is only
+    eligible for setups that come before it. With embeddings (unit-length
+    rows for setups and payoffs), a pair's similarity is the larger of its
+    word overlap and its cosine similarity.
+    """
+
+    def __init__(
+        self,
+        setups: List[DetectedSetup],
+        payoffs: List[DetectedPayoff],
+        chapter_order: Optional[Dict[str, int]] = None,
+        embeddings: Optional[Tuple[np.ndarray, np.ndarray]] = None
+    ):
+        self.setups = setups
+        self.payoffs = payoffs
+        self.embeddings = embeddings
+
+        vocabulary: Dict[str, int] = {}
+        setup_terms = [
+            [vocabulary.setdefault(w, len(vocabulary)) for w in _match_words(s.text, s.context)]
+            for s in setups
+        ]
+        payoff_terms = [
+            [vocabulary.setdefault(w, len(vocabulary)) for w in _match_words(p.text, p.context)]
+            for p in payoffs
+        ]
+
+        # Setup vectors as rows of word ids
+        self._setup_sizes = np.array([len(terms) for terms in setup_terms], dtype=np.int64)
+        self._setup_indptr = np.concatenate(([0], np.cumsum(self._setup_sizes))).astype(np.int64)
+        self._setup_terms = np.fromiter(chain.from_iterable(setup_terms), dtype=np.int64)
+
+        # Payoff vectors as the payoffs containing each word
+        payoff_rows = np.repeat(
+            np.arange(len(payoffs), dtype=np.int64), [len(terms) for terms in payoff_terms]
+        )
+        words = np.fromiter(chain.from_iterable(payoff_terms), dtype=np.int64)
+        self._postings = payoff_rows[np.argsort(words, kind="stable")]
+        self._postings_indptr = np.concatenate(
+            ([0], np.cumsum(np.bincount(words, minlength=len(vocabulary))))
+        ).astype(np.int64)
+
+        self._setup_confidence = np.array([s.confidence for s in setups], dtype=np.float64)
+        self._payoff_confidence = np.array([p.confidence for p in payoffs], dtype=np.float64)
+        self._chekhov = np.array([s.setup_type == "CHEKHOV_GUN" for s in setups], dtype=bool)
+        self._prophecy = np.array([s.setup_type == "PROPHECY" for s in setups], dtype=bool)
+        self._object_use = np.array([bool(_OBJECT_USE_PATTERN.search(p.context)) for p in payoffs], dtype=bool)
+        self._fulfilled = np.array([bool(_FULFILLMENT_PATTERN.search(p.context)) for p in payoffs], dtype=bool)
+
+        self._ordered = chapter_order is not None
+        if self._ordered:
+            self._setup_position = np.array([chapter_order[s.chapter_id] for s in setups], dtype=np.int64)
+            self._setup_start = np.array([s.start_offset for s in setups], dtype=np.int64)
+            self._payoff_position = np.array([chapter_order[p.chapter_id] for p in payoffs], dtype=np.int64)
+            self._payoff_start = np.array([p.start_offset for p in payoffs], dtype=np.int64)
+
+    def _shared_words(self, start: int, stop: int) -> np.ndarray:
+        """Words each of setups[start:stop] shares with each payoff"""
+        payoff_count = len(self.payoffs)
+        terms = self._setup_terms[self._setup_indptr[start]:self._setup_indptr[stop]]
+        rows = np.repeat(np.arange(stop - start, dtype=np.int64), self._setup_sizes[start:stop])
+
+        # Expand each (setup, word) entry into the payoffs posting that word
+        first = self._postings_indptr[terms]
+        hits = self._postings_indptr[terms + 1] - first
+        offsets = np.repeat(first - np.cumsum(hits) + hits, hits)
+        payoff_ids = self._postings[offsets + np.arange(offsets.size, dtype=np.int64)]
+
+        cells = np.repeat(rows, hits) * payoff_count + payoff_ids
+        return np.bincount(cells, minlength=(stop - start) * payoff_count).reshape(stop - start, payoff_count)
+
+    def _blocks(self) -> Iterator[Tuple[int, int]]:
+        """Setup ranges whose expansion and score matrix fit in _BLOCK_CELLS"""
+        hits = np.diff(self._postings_indptr)[self._setup_terms]
+        expanded = np.concatenate(([0], np.cumsum(hits)))[self._setup_indptr]
+        rows_per_block = max(1, _BLOCK_CELLS // max(1, len(self.payoffs)))
+        start = 0
+        while start < len(self.setups):
+            stop = int(np.searchsorted(expanded, expanded[start] + _BLOCK_CELLS, side="right")) - 1
+            stop = min(max(stop, start + 1), start + rows_per_block, len(self.setups))
+            yield start, stop
+            start = stop
+
+    def scores(self, start: int, stop: int) -> np.ndarray:
+        """Scores of setups[start:stop] against every payoff; -1 where not eligible"""
+        sizes = self._setup_sizes[start:stop, None]
+        shared = self._shared_words(start, stop)
+        similarity = np.divide(shared, sizes, out=np.zeros(shared.shape), where=sizes > 0)
+        if self.embeddings is not None:
+            setup_vectors, payoff_vectors = self.embeddings
+            similarity = np.maximum(similarity, setup_vectors[start:stop] @ payoff_vectors.T)
+
+        score = similarity * 0.4
+        type_cue = (
+            (self._chekhov[start:stop, None] & self._object_use[None, :])
+            | (self._prophecy[start:stop, None] & self._fulfilled[None, :])
+        )
+        score = score + np.where(type_cue, 0.3, 0.0)
+        score = score + (self._setup_confidence[start:stop, None] + self._payoff_confidence[None, :]) / 10
+        score = np.minimum(score, 1.0)
+
+        if self._ordered:
+            setup_position = self._setup_position[start:stop, None]
+            eligible = (self._payoff_position[None, :] > setup_position) | (
+                (self._payoff_position[None, :] == setup_position)
+                & (self._payoff_start[None, :] > self._setup_start[start:stop, None])
+            )
+            score[~eligible] = -1.0
+        return score
+
+    def score_matrix(self) -> np.ndarray:
+        """Every setup's scores against every payoff"""
+        blocks = [self.scores(start, stop) for start, stop in self._blocks()]
+        if not blocks:
+            return np.zeros((len(self.setups), len(self.payoffs)))
+        return np.vstack(blocks)
+
+    def best_matches(self) -> List[Tuple[int, int, float]]:
+        """
+        (setup index, payoff index, score) for each setup whose best payoff
+        scores above MIN_MATCH_SCORE; ties go to the earliest payoff.
+        """
+        matches: List[Tuple[int, int, float]] = []
+        if not self.payoffs:
+            return matches
+        for start, stop in self._blocks():
+            score = self.scores(start, stop)
+            best = score.argmax(axis=1)
+            best_score = score[np.arange(stop - start), best]
+            for row in np.flatnonzero(best_score > MIN_MATCH_SCORE):
+                matches.append((start + int(row), int(best[row]), float(best_score[row])))
+        return matches
+
+
+class SetupKeywordIndex:
+    """
+    Keyword counts of the setups found so far, so each payoff candidate is
+    checked against every prior setup in one product. Setups without
+    keywords can't be paid off by keyword and aren't indexed.
+    """
+
+    def __init__(self):
+        self.setups: List[DetectedSetup] = []
+        self._rows: List[np.ndarray] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._sizes = np.zeros(0, dtype=np.int64)
+        self._chapter_ids = np.zeros(0, dtype=object)
+        self._starts = np.zeros(0, dtype=np.int64)
+
+    def add(self, setups: List[DetectedSetup]) -> None:
+        added = [setup for setup in setups if setup.keywords]
+        if not added:
+            return
+        self.setups.extend(added)
+        self._rows.extend(
+            np.bincount([_SETUP_KEYWORD_IDS[kw] for kw in setup.keywords], minlength=len(_SETUP_KEYWORD_IDS))
+            for setup in added
+        )
+        self._matrix = None
+
+    def overlaps(self, payoff_words: Set[str], chapter_id: str, offset: int) -> np.ndarray:
+        """
+        Each indexed setup's keyword overlap with a payoff context at offset
+        in chapter_id; 0 for setups later in the same chapter.
+        """
+        if self._matrix is None:
+            self._matrix = np.vstack(self._rows) if self._rows else np.zeros((0, len(_SETUP_KEYWORD_IDS)), dtype=np.int64)
+            self._sizes = self._matrix.sum(axis=1)
+            self._chapter_ids = np.array([setup.chapter_id for setup in self.setups], dtype=object)
+            self._starts = np.array([setup.start_offset for setup in self.setups], dtype=np.int64)
+
+        present = np.array([kw in payoff_words for kw in _SETUP_KEYWORD_IDS], dtype=np.int64)
+        overlap = (self._matrix @ present) / self._sizes
+        overlap[(self._chapter_ids == chapter_id) & (self._starts >= offset)] = 0.0
+        return overlap
+
+
 class ForeshadowingDetectorService:
     """
     Service for auto-detecting foreshadowing patterns in manuscripts.
@@ -125,6 +334,15 @@ class ForeshadowingDetectorService:
         'destiny', 'fate', 'doom', 'ruin', 'salvation'
     ]
 
+    # What to tell the writer about each kind of setup
+    SETUP_SUGGESTIONS = {
+        "CHEKHOV_GUN": "This object/item is introduced with emphasis - consider if it needs a payoff later.",
+        "PROPHECY": "Predictions and visions create reader expectations - ensure they're addressed.",
+        "SYMBOL": "Recurring symbols can add depth - track this imagery for consistency.",
+        "HINT": "This subtle clue may set reader expectations - consider its payoff.",
+        "PARALLEL": "Scene echoes create narrative resonance - ensure intentional parallels.",
+    }
+
     # Keywords that often indicate payoffs
     PAYOFF_KEYWORDS = [
         'finally', 'at last', 'remembered', 'realized', 'understood',
@@ -139,7 +357,8 @@ class ForeshadowingDetectorService:
         self,
         manuscript_id: str,
         chapter_ids: Optional[List[str]] = None,
-        min_confidence: float = 0.5
+        min_confidence: float = 0.5,
+        use_embeddings: bool = False
     ) -> Dict[str, Any]:
         """
         Detect potential foreshadowing in a manuscript.
@@ -148,6 +367,8 @@ class ForeshadowingDetectorService:
             manuscript_id: The manuscript to analyze
             chapter_ids: Optional list of specific chapters to analyze
             min_confidence: Minimum confidence threshold (0.0 to 1.0)
+            use_embeddings: Also match setups and payoffs by MiniLM embedding
+                similarity, when the embedding service is available
 
         Returns:
             {
@@ -172,10 +393,11 @@ class ForeshadowingDetectorService:
         if chapter_ids:
             query = query.filter(Chapter.id.in_(chapter_ids))
 
-        chapters = query.order_by(Chapter.order).all()
+        chapters = query.order_by(Chapter.order_index).all()
 
         all_setups: List[DetectedSetup] = []
         all_payoffs: List[DetectedPayoff] = []
+        keyword_index = SetupKeywordIndex()
 
         # Analyze each chapter
         for chapter in chapters:
@@ -183,15 +405,18 @@ class ForeshadowingDetectorService:
                 continue
 
             # Detect setups
-            setups = self._detect_setups(chapter)
-            all_setups.extend([s for s in setups if s.confidence >= min_confidence])
+            setups = [s for s in self._detect_setups(chapter) if s.confidence >= min_confidence]
+            all_setups.extend(setups)
+            keyword_index.add(setups)
 
             # Detect payoffs
-            payoffs = self._detect_payoffs(chapter, all_setups)
+            payoffs = self._detect_payoffs(chapter, all_setups, keyword_index)
             all_payoffs.extend([p for p in payoffs if p.confidence >= min_confidence])
 
-        # Match setups with payoffs
-        matches = self._match_setups_payoffs(all_setups, all_payoffs)
+        # Match setups with later payoffs
+        chapter_order = {chapter.id: position for position, chapter in enumerate(chapters)}
+        embeddings = self._embed(all_setups, all_payoffs) if use_embeddings else None
+        matches = self._match_setups_payoffs(all_setups, all_payoffs, chapter_order, embeddings)
 
         # Generate suggestions
         suggestions = self._generate_suggestions(all_setups, all_payoffs, matches)
@@ -206,60 +431,19 @@ class ForeshadowingDetectorService:
                 "total_payoffs": len(all_payoffs),
                 "matched_pairs": len(matches),
                 "unmatched_setups": len(all_setups) - len(matches),
+                "embedding_similarity": embeddings is not None,
             }
         }
 
     def _detect_setups(self, chapter: Chapter) -> List[DetectedSetup]:
         """Detect potential foreshadowing setups in a chapter"""
-        setups: List[DetectedSetup] = []
         content = chapter.content or ""
 
-        # Detect Chekhov's Guns
-        for pattern in self.CHEKHOV_PATTERNS:
-            setups.extend(
-                self._find_pattern_matches(
-                    content, pattern, chapter, "CHEKHOV_GUN",
-                    "This object/item is introduced with emphasis - consider if it needs a payoff later."
-                )
-            )
-
-        # Detect Prophecies
-        for pattern in self.PROPHECY_PATTERNS:
-            setups.extend(
-                self._find_pattern_matches(
-                    content, pattern, chapter, "PROPHECY",
-                    "Predictions and visions create reader expectations - ensure they're addressed."
-                )
-            )
-
-        # Detect Symbols
-        for pattern in self.SYMBOL_PATTERNS:
-            setups.extend(
-                self._find_pattern_matches(
-                    content, pattern, chapter, "SYMBOL",
-                    "Recurring symbols can add depth - track this imagery for consistency."
-                )
-            )
-
-        # Detect Hints
-        for pattern in self.HINT_PATTERNS:
-            setups.extend(
-                self._find_pattern_matches(
-                    content, pattern, chapter, "HINT",
-                    "This subtle clue may set reader expectations - consider its payoff."
-                )
-            )
-
-        # Detect Parallels
-        for pattern in self.PARALLEL_PATTERNS:
-            setups.extend(
-                self._find_pattern_matches(
-                    content, pattern, chapter, "PARALLEL",
-                    "Scene echoes create narrative resonance - ensure intentional parallels."
-                )
-            )
-
-        return setups
+        # Chekhov's guns, prophecies, symbols, hints and parallels, pattern by pattern
+        return [
+            self._setup_from_match(content, match, chapter, pattern.category)
+            for pattern, match in SETUP_BANK.finditer(content)
+        ]
 
     def _find_pattern_matches(
         self,
@@ -270,41 +454,51 @@ class ForeshadowingDetectorService:
         suggestion: str
     ) -> List[DetectedSetup]:
         """Find all matches of a pattern in content"""
-        setups: List[DetectedSetup] = []
-
         try:
-            for match in re.finditer(pattern, content, re.IGNORECASE):
-                # Get context (surrounding text)
-                start = max(0, match.start() - 100)
-                end = min(len(content), match.end() + 100)
-                context = content[start:end]
-
-                # Extract keywords from match
-                keywords = [w.lower() for w in re.findall(r'\b\w+\b', match.group())
-                           if len(w) > 3 and w.lower() in self.SETUP_KEYWORDS]
-
-                # Calculate confidence based on pattern specificity and keywords
-                confidence = self._calculate_setup_confidence(
-                    match.group(), context, setup_type, keywords
-                )
-
-                setups.append(DetectedSetup(
-                    text=match.group(),
-                    chapter_id=chapter.id,
-                    chapter_title=chapter.title or f"Chapter {chapter.order}",
-                    start_offset=match.start(),
-                    end_offset=match.end(),
-                    setup_type=setup_type,
-                    confidence=confidence,
-                    context=context,
-                    keywords=keywords,
-                    suggestion=suggestion
-                ))
+            matches = list(re.finditer(pattern, content, re.IGNORECASE))
         except re.error:
             # Invalid regex pattern
-            pass
+            return []
+        return [
+            self._setup_from_match(content, match, chapter, setup_type, suggestion)
+            for match in matches
+        ]
 
-        return setups
+    def _setup_from_match(
+        self,
+        content: str,
+        match: re.Match,
+        chapter: Chapter,
+        setup_type: str,
+        suggestion: Optional[str] = None
+    ) -> DetectedSetup:
+        """A detected setup for one pattern match"""
+        # Get context (surrounding text)
+        start = max(0, match.start() - 100)
+        end = min(len(content), match.end() + 100)
+        context = content[start:end]
+
+        # Extract keywords from match
+        keywords = [w.lower() for w in re.findall(r'\b\w+\b', match.group())
+                   if len(w) > 3 and w.lower() in _SETUP_KEYWORD_SET]
+
+        # Calculate confidence based on pattern specificity and keywords
+        confidence = self._calculate_setup_confidence(
+            match.group(), context, setup_type, keywords
+        )
+
+        return DetectedSetup(
+            text=match.group(),
+            chapter_id=chapter.id,
+            chapter_title=chapter.title or f"Chapter {chapter.order_index}",
+            start_offset=match.start(),
+            end_offset=match.end(),
+            setup_type=setup_type,
+            confidence=confidence,
+            context=context,
+            keywords=keywords,
+            suggestion=suggestion or self.SETUP_SUGGESTIONS[setup_type]
+        )
 
     def _calculate_setup_confidence(
         self,
@@ -317,11 +511,13 @@ class ForeshadowingDetectorService:
         confidence = 0.5  # Base confidence
 
         # Boost for matching keywords
-        keyword_matches = sum(1 for kw in self.SETUP_KEYWORDS if kw in text.lower())
+        text_lower = text.lower()
+        keyword_matches = sum(1 for kw in self.SETUP_KEYWORDS if kw in text_lower)
         confidence += min(keyword_matches * 0.1, 0.3)
 
         # Boost for context keywords
-        context_keywords = sum(1 for kw in self.SETUP_KEYWORDS if kw in context.lower())
+        context_lower = context.lower()
+        context_keywords = sum(1 for kw in self.SETUP_KEYWORDS if kw in context_lower)
         confidence += min(context_keywords * 0.05, 0.15)
 
         # Boost for specific setup types
@@ -340,37 +536,43 @@ class ForeshadowingDetectorService:
     def _detect_payoffs(
         self,
         chapter: Chapter,
-        prior_setups: List[DetectedSetup]
+        prior_setups: List[DetectedSetup],
+        keyword_index: Optional[SetupKeywordIndex] = None
     ) -> List[DetectedPayoff]:
-        """Detect potential payoffs based on prior setups"""
+        """
+        Detect potential payoffs based on prior setups (setups from earlier
+        chapters, or earlier in this one). keyword_index, if given, already
+        holds prior_setups.
+        """
         payoffs: List[DetectedPayoff] = []
         content = chapter.content or ""
 
+        if keyword_index is None:
+            keyword_index = SetupKeywordIndex()
+            keyword_index.add(prior_setups)
+        if not keyword_index.setups:
+            return payoffs
+
         # Look for payoff keywords
-        for match in re.finditer(
-            r'\b(' + '|'.join(self.PAYOFF_KEYWORDS) + r')\b.{1,100}',
-            content,
-            re.IGNORECASE
-        ):
+        for match in _PAYOFF_PATTERN.finditer(content):
             # Check if this might be paying off a prior setup
             context = content[max(0, match.start()-100):min(len(content), match.end()+100)]
+            payoff_words = set(w.lower() for w in _CONTEXT_WORD_PATTERN.findall(context))
 
-            # Look for references to prior setups
-            for setup in prior_setups:
-                # Check for keyword overlap
-                overlap = self._calculate_keyword_overlap(setup.keywords, context)
-
-                if overlap > 0.3:
-                    payoffs.append(DetectedPayoff(
-                        text=match.group(),
-                        chapter_id=chapter.id,
-                        chapter_title=chapter.title or f"Chapter {chapter.order}",
-                        start_offset=match.start(),
-                        end_offset=match.end(),
-                        setup_reference=setup.text[:50],
-                        confidence=0.5 + overlap * 0.5,
-                        context=context
-                    ))
+            # Keyword overlap with every prior setup at once
+            overlaps = keyword_index.overlaps(payoff_words, chapter.id, match.start())
+            for i in np.flatnonzero(overlaps > 0.3):
+                setup, overlap = keyword_index.setups[i], float(overlaps[i])
+                payoffs.append(DetectedPayoff(
+                    text=match.group(),
+                    chapter_id=chapter.id,
+                    chapter_title=chapter.title or f"Chapter {chapter.order_index}",
+                    start_offset=match.start(),
+                    end_offset=match.end(),
+                    setup_reference=setup.text[:50],
+                    confidence=0.5 + overlap * 0.5,
+                    context=context
+                ))
 
         return payoffs
 
@@ -391,63 +593,71 @@ class ForeshadowingDetectorService:
     def _match_setups_payoffs(
         self,
         setups: List[DetectedSetup],
-        payoffs: List[DetectedPayoff]
+        payoffs: List[DetectedPayoff],
+        chapter_order: Optional[Dict[str, int]] = None,
+        embeddings: Optional[Tuple[np.ndarray, np.ndarray]] = None
     ) -> List[SetupPayoffMatch]:
-        """Match detected setups with their potential payoffs"""
-        matches: List[SetupPayoffMatch] = []
-
-        for setup in setups:
-            best_payoff = None
-            best_score = 0.0
-
-            for payoff in payoffs:
-                # Calculate similarity
-                score = self._calculate_match_score(setup, payoff)
-
-                if score > best_score and score > 0.4:
-                    best_score = score
-                    best_payoff = payoff
-
-            if best_payoff:
-                matches.append(SetupPayoffMatch(
-                    setup=setup,
-                    payoff=best_payoff,
-                    similarity_score=best_score,
-                    match_type=self._determine_match_type(setup, best_payoff)
-                ))
+        """
+        Match detected setups with their best-scoring payoffs. With
+        chapter_order, only payoffs after a setup are considered.
+        """
+        scorer = SetupPayoffScorer(setups, payoffs, chapter_order, embeddings)
+        return [
+            SetupPayoffMatch(
+                setup=setups[setup_index],
+                payoff=payoffs[payoff_index],
+                similarity_score=score,
+                match_type=self._determine_match_type(setups[setup_index], payoffs[payoff_index])
+            )
+            for setup_index, payoff_index, score in scorer.best_matches()
+        ]
 
-        return matches
+    def _embed(
+        self,
+        setups: List[DetectedSetup],
+        payoffs: List[DetectedPayoff]
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """MiniLM embeddings of each setup and payoff, or None if unavailable"""
+        if not setups or not payoffs:
+            return None
+        try:
+            from app.services.embedding_service import embedding_service
+        except Exception as e:
+            logger.info(f"Matching foreshadowing by keywords only (embedding service unavailable: {e})")
+            return None
+
+        texts = [item.text + " " + item.context for item in chain(setups, payoffs)]
+        vectors = np.asarray(embedding_service.embed_texts(texts), dtype=np.float64)
+        return vectors[:len(setups)], vectors[len(setups):]
 
     def _calculate_match_score(
         self,
         setup: DetectedSetup,
         payoff: DetectedPayoff
     ) -> float:
-        """Calculate how well a payoff matches a setup"""
+        """
+        Calculate how well a payoff matches a setup. SetupPayoffScorer
+        computes the same score for many pairs at once.
+        """
         score = 0.0
 
         # Keyword overlap
-        setup_words = set(w.lower() for w in re.findall(r'\b\w{4,}\b', setup.text + " " + setup.context))
-        payoff_words = set(w.lower() for w in re.findall(r'\b\w{4,}\b', payoff.text + " " + payoff.context))
+        setup_words = _match_words(setup.text, setup.context)
+        payoff_words = _match_words(payoff.text, payoff.context)
 
         common_words = setup_words & payoff_words
         if setup_words:
             score += len(common_words) / len(setup_words) * 0.4
 
-        # Check if payoff is after setup (chapter-wise)
-        # For simplicity, assume chapter order corresponds to story order
-
         # Type-specific matching
         if setup.setup_type == "CHEKHOV_GUN":
             # Look for object usage
-            object_pattern = r'\b(used|wielded|grabbed|pulled|drew|fired|threw)\b'
-            if re.search(object_pattern, payoff.context, re.IGNORECASE):
+            if _OBJECT_USE_PATTERN.search(payoff.context):
                 score += 0.3
 
         elif setup.setup_type == "PROPHECY":
             # Look for fulfillment language
-            fulfillment_pattern = r'\b(came true|fulfilled|proved|as (foretold|predicted))\b'
-            if re.search(fulfillment_pattern, payoff.context, re.IGNORECASE):
+            if _FULFILLMENT_PATTERN.search(payoff.context):
                 score += 0.3
 
         # Confidence boost
@@ -612,3 +822,28 @@ class ForeshadowingDetectorService:
         self.db.commit()
 
         return pair
+
+
+# Every setup pattern table, compiled once; matches come back table by table
+SETUP_BANK = PatternBank({
+    "CHEKHOV_GUN": ForeshadowingDetectorService.CHEKHOV_PATTERNS,
+    "PROPHECY": ForeshadowingDetectorService.PROPHECY_PATTERNS,
+    "SYMBOL": ForeshadowingDetectorService.SYMBOL_PATTERNS,
+    "HINT": ForeshadowingDetectorService.HINT_PATTERNS,
+    "PARALLEL": ForeshadowingDetectorService.PARALLEL_PATTERNS,
+}, re.IGNORECASE)
+
+_SETUP_KEYWORD_SET = frozenset(ForeshadowingDetectorService.SETUP_KEYWORDS)
+_SETUP_KEYWORD_IDS = {kw: i for i, kw in enumerate(dict.fromkeys(ForeshadowingDetectorService.SETUP_KEYWORDS))}
+
+_PAYOFF_PATTERN = re.compile(
+    r'\b(' + '|'.join(ForeshadowingDetectorService.PAYOFF_KEYWORDS) + r')\b.{1,100}',
+    re.IGNORECASE
+)
+
+_CONTEXT_WORD_PATTERN = re.compile(r'\b\w+\b')
+_MATCH_WORD_PATTERN = re.compile(r'\b\w{4,}\b')
+
+# Payoff context cues for setup types
+_OBJECT_USE_PATTERN = re.compile(r'\b(used|wielded|grabbed|pulled|drew|fired|threw)\b', re.IGNORECASE)
+_FULFILLMENT_PATTERN = re.compile(r'\b(came true|fulfilled|proved|as (foretold|predicted))\b', re.IGNORECASE)
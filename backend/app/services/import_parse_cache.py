@@ -0,0 +1,223 @@
+"""
+Import Parse Cache - Disk-backed, size-bounded cache of import parse results.
+
+Parse results used to live in a per-process dict, so the preview -> create
+flow broke whenever the two requests landed on different workers, and every
+pending import held its whole book in RAM. Results are now written to a
+shared directory as gzipped compact JSON, one file per entry:
+
+- Entries are content-addressed: the key (and the parse_id returned to the
+  client) is a hash of the uploaded file's sha256 plus the detection mode,
+  so re-uploading the same file skips parsing entirely
+- Reads touch the file's mtime; when the directory grows past its byte
+  budget the least recently used entries are deleted
+- Writes go to a temp file and are renamed into place, so concurrent
+  workers never see a partial entry
+
+Configuration:
+- IMPORT_CACHE_DIR: cache directory (default DATA_DIR/import_cache)
+- IMPORT_CACHE_MAX_MB: byte budget for all entries (default 512)
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from app.services.lexical_utils import RichParagraph, TextRun
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(
+    os.getenv("IMPORT_CACHE_DIR")
+    or Path(os.getenv("DATA_DIR", "./data")) / "import_cache"
+)
+MAX_BYTES = int(float(os.getenv("IMPORT_CACHE_MAX_MB", "512")) * 1024 * 1024)
+
+# Bump when the serialized layout or chapter detection output changes
+CACHE_FORMAT_VERSION = 1
+ENTRY_SUFFIX = ".json.gz"
+
+
+def cache_key(file_hash: str, detection_mode: str) -> str:
+    """Content address for a file parsed with one detection mode"""
+    return hashlib.sha256(
+        f"{CACHE_FORMAT_VERSION}:{file_hash}:{detection_mode}".encode()
+    ).hexdigest()
+
+
+def hash_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """sha256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _encode_paragraphs(paragraphs: List[RichParagraph]) -> List[Any]:
+    # [heading_level, [[text, format_mask], ...]] per paragraph
+    return [
+        [p.heading_level, [[run.text, run.to_format_bitmask()] for run in p.runs]]
+        for p in paragraphs
+    ]
+
+
+def _decode_paragraphs(data: List[Any]) -> List[RichParagraph]:
+    return [
+        RichParagraph(
+            runs=[TextRun.from_format_bitmask(text, mask) for text, mask in runs],
+            heading_level=heading_level,
+        )
+        for heading_level, runs in data
+    ]
+
+
+def encode_result(result) -> bytes:
+    """ImportResult -> gzipped compact JSON"""
+    data = {
+        "parse_id": result.parse_id,
+        "title": result.title,
+        "author": result.author,
+        "total_words": result.total_words,
+        "detection_method": result.detection_method,
+        "format_warnings": result.format_warnings,
+        "source_format": result.source_format,
+        "chapters": [
+            {
+                "index": ch.index,
+                "title": ch.title,
+                "paragraphs": _encode_paragraphs(ch.paragraphs),
+                "lexical_state": ch.lexical_state,
+                "plain_content": ch.plain_content,
+                "word_count": ch.word_count,
+            }
+            for ch in result.chapters
+        ],
+    }
+    return gzip.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"), compresslevel=6)
+
+
+def decode_result(blob: bytes):
+    """Gzipped compact JSON -> ImportResult"""
+    from app.services.import_service import DetectedChapter, ImportResult
+
+    data = json.loads(gzip.decompress(blob))
+    chapters = [
+        DetectedChapter(
+            index=ch["index"],
+            title=ch["title"],
+            paragraphs=_decode_paragraphs(ch["paragraphs"]),
+            lexical_state=ch["lexical_state"],
+            plain_content=ch["plain_content"],
+            word_count=ch["word_count"],
+        )
+        for ch in data.pop("chapters")
+    ]
+    return ImportResult(chapters=chapters, **data)
+
+
+class ImportParseCache:
+    """Parse results on disk, keyed by content address, evicted LRU by total size"""
+
+    def __init__(self, directory: Path = CACHE_DIR, max_bytes: int = MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{ENTRY_SUFFIX}"
+
+    def get(self, key: str):
+        """Cached ImportResult for a key, or None"""
+        # Keys come from clients as parse_ids; never let them escape the directory
+        if not key or not all(c in "0123456789abcdef" for c in key):
+            return None
+        path = self._path(key)
+        try:
+            blob = path.read_bytes()
+            os.utime(path)  # Mark as recently used
+            result = decode_result(blob)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            logger.warning(f"Dropping unreadable import cache entry {key}: {e}")
+            path.unlink(missing_ok=True)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def put(self, result) -> int:
+        """Store a result under its parse_id; returns the entry size in bytes"""
+        blob = encode_result(result)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(blob)
+            os.replace(tmp_path, self._path(result.parse_id))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._evict()
+        return len(blob)
+
+    def delete(self, key: str):
+        if key and all(c in "0123456789abcdef" for c in key):
+            self._path(key).unlink(missing_ok=True)
+
+    def _entries(self) -> List[Tuple[str, os.stat_result]]:
+        entries = []
+        try:
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(ENTRY_SUFFIX):
+                    try:
+                        entries.append((entry.path, entry.stat()))
+                    except FileNotFoundError:
+                        pass  # Evicted by another worker
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def _evict(self):
+        """Delete least recently used entries until the directory fits the budget"""
+        with self._lock:
+            entries = self._entries()
+            total = sum(stat.st_size for _, stat in entries)
+            if total <= self.max_bytes:
+                return
+            for path, stat in sorted(entries, key=lambda e: e[1].st_mtime):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    self.evictions += 1
+                except FileNotFoundError:
+                    pass
+                total -= stat.st_size
+
+    def get_stats(self) -> Dict[str, Any]:
+        entries = self._entries()
+        return {
+            "entries": len(entries),
+            "bytes": sum(stat.st_size for _, stat in entries),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+# Module-level singleton
+import_parse_cache = ImportParseCache()
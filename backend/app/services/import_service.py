@@ -1,28 +1,73 @@
 """
 Import Service
 Handles manuscript import from various document formats (DOCX, RTF, ODT, TXT, MD, PDF)
+
+Uploads are spooled to disk and parsed in the import worker pool
+(see import_workers), so large files never block the event loop. Results are
+cached on disk by file hash and detection mode (see import_parse_cache), so
+the preview and create steps can land on different workers and re-uploading
+a file skips parsing.
+
+Detected chapters are converted to Lexical JSON across the pool and inserted
+with one bulk INSERT. Follow-up work for the new manuscript (word-count
+aggregation, embeddings, wiki auto-population) runs afterwards as a single
+background job, run_import_followups.
+
+Configuration:
+- IMPORT_FOLLOWUP_EMBEDDINGS: embed imported chapters (default true; skipped
+  when the embedding service is unavailable)
+- IMPORT_FOLLOWUP_WIKI: propose wiki changes when the manuscript belongs to
+  a world (default true)
 """
 
+import asyncio
+import hashlib
+import logging
+import os
 import re
 import uuid
 import json
 from io import BytesIO
-from dataclasses import dataclass, field
-from typing import List, Optional, Tuple
-from datetime import datetime, timedelta
+from dataclasses import dataclass
+from typing import List, Optional
 
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
+from app.database import SessionLocal
 from app.models.manuscript import Manuscript, Chapter
+from app.services.import_parse_cache import (
+    ImportParseCache,
+    cache_key,
+    hash_file,
+    import_parse_cache,
+)
+from app.services.import_workers import (
+    ChapterSpec,
+    DetectedChapter,
+    ParsedDocument,
+    ProgressCallback,
+    create_detected_chapter,
+    import_pool,
+    parse_docx,
+    parse_markdown,
+    parse_odt,
+    parse_pdf,
+    parse_rtf,
+    parse_txt,
+)
 from app.services.lexical_utils import (
-    TextRun,
     RichParagraph,
-    rich_paragraphs_to_lexical_json,
     FORMAT_BOLD,
     FORMAT_ITALIC,
     FORMAT_UNDERLINE,
 )
 
+logger = logging.getLogger(__name__)
+
+FOLLOWUP_EMBEDDINGS = os.getenv("IMPORT_FOLLOWUP_EMBEDDINGS", "true").lower() == "true"
+FOLLOWUP_WIKI = os.getenv("IMPORT_FOLLOWUP_WIKI", "true").lower() == "true"
+
 
 # Supported formats with metadata
 SUPPORTED_FORMATS = {
@@ -83,27 +128,6 @@ class ChapterBoundary:
     detection_method: str  # "heading", "pattern", "page_break", "single"
 
 
-@dataclass
-class ParsedDocument:
-    """Result of parsing a document file."""
-    paragraphs: List[RichParagraph] = field(default_factory=list)
-    title: Optional[str] = None
-    author: Optional[str] = None
-    page_breaks: List[int] = field(default_factory=list)  # Paragraph indices after page breaks
-    warnings: List[str] = field(default_factory=list)
-
-
-@dataclass
-class DetectedChapter:
-    """A chapter detected from the imported document."""
-    index: int
-    title: str
-    paragraphs: List[RichParagraph]
-    lexical_state: str  # Pre-computed Lexical JSON
-    plain_content: str  # Plain text for word count
-    word_count: int
-
-
 @dataclass
 class ImportResult:
     """Result of parsing and detecting chapters in a document."""
@@ -117,27 +141,12 @@ class ImportResult:
     source_format: str
 
 
-# In-memory cache for parsed documents (30-minute TTL)
-_parse_cache: dict[str, Tuple[ImportResult, datetime]] = {}
-CACHE_TTL_MINUTES = 30
-
-
-def _clean_cache():
-    """Remove expired cache entries."""
-    now = datetime.utcnow()
-    expired_keys = [
-        key for key, (_, created_at) in _parse_cache.items()
-        if now - created_at > timedelta(minutes=CACHE_TTL_MINUTES)
-    ]
-    for key in expired_keys:
-        del _parse_cache[key]
-
-
 class ImportService:
     """Service for importing documents into Maxwell."""
 
-    def __init__(self):
-        pass
+    def __init__(self, cache: Optional[ImportParseCache] = None):
+        self.pool = import_pool
+        self.cache = cache or import_parse_cache
 
     @staticmethod
     def get_supported_formats() -> List[dict]:
@@ -153,6 +162,9 @@ class ImportService:
         """
         Parse a document and detect chapters.
 
+        Parses in this process; for uploads use parse_file, which runs in the
+        worker pool.
+
         Args:
             file_content: Raw file bytes
             filename: Original filename (used to detect format)
@@ -161,20 +173,85 @@ class ImportService:
         Returns:
             ImportResult with parsed chapters and metadata
         """
-        # Clean expired cache entries
-        _clean_cache()
+        ext = self._validate_format(filename)
+        parse_id = cache_key(hashlib.sha256(file_content).hexdigest(), detection_mode)
+        cached = self.cache.get(parse_id)
+        if cached is not None:
+            return cached
+
+        parsed = await self._parse_by_format(file_content, ext)
+        return self._build_result(parsed, filename, ext, detection_mode, parse_id)
+
+    async def parse_file(
+        self,
+        path: str,
+        filename: str,
+        detection_mode: str = "auto",
+        progress: Optional[ProgressCallback] = None,
+        file_hash: Optional[str] = None,
+    ) -> ImportResult:
+        """
+        Parse a document on disk (a spooled upload) in the worker pool and detect chapters.
+
+        Args:
+            path: Path to the file
+            filename: Original filename (used to detect format)
+            detection_mode: How to detect chapters
+            progress: Optional callback(units_completed, total_units, stage)
+            file_hash: sha256 of the file if already known (SpooledUpload.sha256)
+
+        Returns:
+            ImportResult with parsed chapters and metadata
+        """
+        ext = self._validate_format(filename)
+        if file_hash is None:
+            file_hash = await asyncio.to_thread(hash_file, path)
+        parse_id = cache_key(file_hash, detection_mode)
+        cached = await asyncio.to_thread(self.cache.get, parse_id)
+        if cached is not None:
+            if progress:
+                progress(1, 1, "Loaded from cache")
+            return cached
+
+        parsed = await self.pool.parse(path, ext, progress=progress)
+        # Boundaries are a quick scan; building each chapter's Lexical JSON is
+        # the expensive part, so it fans out across the pool
+        specs = await asyncio.to_thread(self._chapter_specs, parsed, detection_mode)
+        chapters = await self.pool.convert_chapters(specs, progress=progress)
+        return await asyncio.to_thread(
+            self._result_from_chapters, parsed, chapters, filename, ext, detection_mode, parse_id
+        )
 
+    def _validate_format(self, filename: str) -> str:
+        """Extension of a supported file, else ValueError"""
         # Determine format from extension
         ext = self._get_extension(filename)
         if ext not in SUPPORTED_FORMATS:
             raise ValueError(f"Unsupported file format: {ext}")
+        return ext
 
-        # Parse the document
-        parsed = await self._parse_by_format(file_content, ext)
-
-        # Detect chapters
+    def _build_result(
+        self,
+        parsed: ParsedDocument,
+        filename: str,
+        ext: str,
+        detection_mode: str,
+        parse_id: str,
+    ) -> ImportResult:
+        """Detect chapters in a parsed document and cache the result"""
         chapters = self._detect_chapters(parsed, detection_mode)
+        return self._result_from_chapters(parsed, chapters, filename, ext, detection_mode, parse_id)
 
+    def _result_from_chapters(
+        self,
+        parsed: ParsedDocument,
+        chapters: List[DetectedChapter],
+        filename: str,
+        ext: str,
+        detection_mode: str,
+        parse_id: str,
+    ) -> ImportResult:
+        """Assemble and cache the ImportResult for converted chapters"""
         # Extract title from filename if not found in document
         title = parsed.title or self._title_from_filename(filename)
 
@@ -183,7 +260,7 @@ class ImportService:
 
         # Build result
         result = ImportResult(
-            parse_id=str(uuid.uuid4()),
+            parse_id=parse_id,
             title=title,
             author=parsed.author,
             total_words=total_words,
@@ -194,7 +271,7 @@ class ImportService:
         )
 
         # Cache the result
-        _parse_cache[result.parse_id] = (result, datetime.utcnow())
+        self.cache.put(result)
 
         return result
 
@@ -224,12 +301,11 @@ class ImportService:
         Returns:
             Created Manuscript with chapters
         """
-        # Get cached parse result
-        if parse_id not in _parse_cache:
+        # Get cached parse result (left in the cache: re-importing the same file reuses it)
+        result = self.cache.get(parse_id)
+        if result is None:
             raise ValueError("Parse result not found or expired. Please re-upload the file.")
 
-        result, _ = _parse_cache.pop(parse_id)
-
         # Apply chapter adjustments
         included_chapters = []
         for ch in result.chapters:
@@ -259,33 +335,116 @@ class ImportService:
         db.add(manuscript)
         db.flush()  # Get the ID
 
-        # Create chapters
-        for order_idx, ch in enumerate(included_chapters):
-            chapter = Chapter(
-                id=str(uuid.uuid4()),
-                manuscript_id=manuscript.id,
-                title=ch.title,
-                is_folder=0,
-                order_index=order_idx,
-                lexical_state=ch.lexical_state,
-                content=ch.plain_content,
-                word_count=ch.word_count,
-            )
-            db.add(chapter)
+        # Create chapters in one bulk INSERT (content and word counts were computed at parse time)
+        if included_chapters:
+            db.execute(insert(Chapter), [
+                {
+                    "id": str(uuid.uuid4()),
+                    "manuscript_id": manuscript.id,
+                    "title": ch.title,
+                    "is_folder": 0,
+                    "order_index": order_idx,
+                    "lexical_state": ch.lexical_state,
+                    "content": ch.plain_content,
+                    "word_count": ch.word_count,
+                }
+                for order_idx, ch in enumerate(included_chapters)
+            ])
 
         db.commit()
         db.refresh(manuscript)
 
         return manuscript
 
+    def run_import_followups(
+        self,
+        manuscript_id: str,
+        task_id: Optional[str] = None,
+        session_factory=SessionLocal,
+    ) -> dict:
+        """
+        Follow-up work for a newly imported manuscript, run once as a background job.
+
+        Steps: recompute the manuscript word count, embed chapters, and propose
+        wiki changes when the manuscript belongs to a world. A failing optional
+        step is logged and skipped. Progress is reported to import_registry when
+        task_id is given.
+
+        Returns:
+            Summary of what each step did
+        """
+        from app.services.import_task_registry import import_registry
+        from app.services.manuscript_aggregation_service import manuscript_aggregation_service
+
+        steps = ["word_count", "embeddings", "wiki"]
+        summary = {}
+        db = session_factory()
+        try:
+            if task_id:
+                import_registry.update_progress(task_id, 0, len(steps), "Updating word count")
+            summary["word_count"] = manuscript_aggregation_service.update_manuscript_word_count(db, manuscript_id)
+
+            if task_id:
+                import_registry.update_progress(task_id, 1, len(steps), "Embedding chapters")
+            summary["embeddings"] = self._embed_chapters(db, manuscript_id) if FOLLOWUP_EMBEDDINGS else 0
+
+            if task_id:
+                import_registry.update_progress(task_id, 2, len(steps), "Updating wiki")
+            summary["wiki_changes"] = self._populate_wiki(db, manuscript_id) if FOLLOWUP_WIKI else 0
+
+            if task_id:
+                import_registry.complete_task(task_id, manuscript_id=manuscript_id)
+        except Exception as e:
+            logger.exception(f"Import follow-up failed for manuscript {manuscript_id}")
+            if task_id:
+                import_registry.fail_task(task_id, str(e))
+        finally:
+            db.close()
+        return summary
+
+    def _embed_chapters(self, db: Session, manuscript_id: str) -> int:
+        """Add every imported chapter to the scene embedding collection"""
+        try:
+            from app.services.embedding_service import embedding_service
+        except Exception as e:
+            logger.info(f"Skipping import embeddings (embedding service unavailable: {e})")
+            return 0
+
+        embedded = 0
+        chapters = db.query(Chapter.id, Chapter.title, Chapter.content).filter(
+            Chapter.manuscript_id == manuscript_id,
+            Chapter.is_folder == 0,
+        )
+        for chapter_id, chapter_title, content in chapters:
+            if not content:
+                continue
+            try:
+                embedding_service.add_scene_embedding(
+                    chapter_id, content, manuscript_id,
+                    metadata={"chapter_id": chapter_id, "title": chapter_title},
+                )
+                embedded += 1
+            except Exception as e:
+                logger.warning(f"Failed to embed chapter {chapter_id}: {e}")
+        return embedded
+
+    def _populate_wiki(self, db: Session, manuscript_id: str) -> int:
+        """Propose wiki changes for the manuscript's world, if it has one"""
+        from app.services.wiki_auto_populator import WikiAutoPopulator
+
+        populator = WikiAutoPopulator(db)
+        world_id = populator.get_world_for_manuscript(manuscript_id)
+        if not world_id:
+            return 0
+        result = populator.analyze_manuscript(manuscript_id=manuscript_id, world_id=world_id)
+        return result.get("total_changes", 0)
+
     def get_cached_result(self, parse_id: str) -> Optional[ImportResult]:
         """Get a cached parse result by ID."""
-        _clean_cache()
-        if parse_id in _parse_cache:
-            return _parse_cache[parse_id][0]
-        return None
+        return self.cache.get(parse_id)
 
     # --- Format Parsers ---
+    # In-process wrappers over the import_workers parsers, for content already in memory
 
     async def _parse_by_format(self, content: bytes, ext: str) -> ParsedDocument:
         """Route to the appropriate parser based on extension."""
@@ -304,331 +463,27 @@ class ImportService:
 
     async def _parse_docx(self, content: bytes) -> ParsedDocument:
         """Parse a DOCX file with formatting preserved."""
-        from docx import Document
-        from docx.enum.text import WD_BREAK
-
-        doc = Document(BytesIO(content))
-        paragraphs = []
-        page_breaks = []
-        title = None
-        author = None
-
-        # Try to extract title/author from core properties
-        try:
-            if doc.core_properties.title:
-                title = doc.core_properties.title
-            if doc.core_properties.author:
-                author = doc.core_properties.author
-        except Exception:
-            pass
-
-        for para in doc.paragraphs:
-            # Check for page breaks
-            for run in para.runs:
-                if run._element.xml and 'w:br' in run._element.xml and 'w:type="page"' in run._element.xml:
-                    page_breaks.append(len(paragraphs))
-                    break
-
-            # Determine heading level
-            heading_level = 0
-            style_name = para.style.name if para.style else ""
-            if style_name.startswith("Heading"):
-                try:
-                    heading_level = int(style_name.replace("Heading ", ""))
-                except ValueError:
-                    heading_level = 1
-
-            # Extract runs with formatting
-            runs = []
-            for run in para.runs:
-                if run.text:
-                    runs.append(TextRun(
-                        text=run.text,
-                        bold=run.bold or False,
-                        italic=run.italic or False,
-                        underline=run.underline or False,
-                    ))
-
-            if runs:  # Only add non-empty paragraphs
-                paragraphs.append(RichParagraph(runs=runs, heading_level=heading_level))
-
-        return ParsedDocument(
-            paragraphs=paragraphs,
-            title=title,
-            author=author,
-            page_breaks=page_breaks,
-        )
+        return parse_docx(BytesIO(content))
 
     async def _parse_rtf(self, content: bytes) -> ParsedDocument:
         """Parse an RTF file (plain text only)."""
-        from striprtf.striprtf import rtf_to_text
-
-        try:
-            # Decode RTF content
-            text = content.decode('utf-8', errors='replace')
-            plain_text = rtf_to_text(text)
-        except Exception as e:
-            raise ValueError(f"Failed to parse RTF file: {e}")
-
-        # Split into paragraphs
-        paragraphs = []
-        for line in plain_text.split('\n'):
-            if line.strip():
-                paragraphs.append(RichParagraph(
-                    runs=[TextRun(text=line.strip())],
-                    heading_level=0,
-                ))
-
-        return ParsedDocument(
-            paragraphs=paragraphs,
-            warnings=["RTF import extracts plain text only. Formatting was not preserved."],
-        )
+        return parse_rtf(content)
 
     async def _parse_odt(self, content: bytes) -> ParsedDocument:
         """Parse an ODT file with formatting preserved."""
-        from odf.opendocument import load
-        from odf.text import P, H, Span
-        from odf import text as odf_text
-
-        try:
-            doc = load(BytesIO(content))
-        except Exception as e:
-            raise ValueError(f"Failed to parse ODT file: {e}")
-
-        paragraphs = []
-        title = None
-        author = None
-
-        # Try to get metadata
-        try:
-            meta = doc.meta
-            if meta:
-                for child in meta.childNodes:
-                    if child.tagName == "dc:title" and child.firstChild:
-                        title = str(child.firstChild)
-                    elif child.tagName == "dc:creator" and child.firstChild:
-                        author = str(child.firstChild)
-        except Exception:
-            pass
-
-        def extract_text_with_formatting(element, default_bold=False, default_italic=False):
-            """Recursively extract text and formatting from ODT elements."""
-            runs = []
-
-            for node in element.childNodes:
-                if node.nodeType == node.TEXT_NODE:
-                    text = str(node)
-                    if text:
-                        runs.append(TextRun(
-                            text=text,
-                            bold=default_bold,
-                            italic=default_italic,
-                        ))
-                elif hasattr(node, 'tagName'):
-                    if node.tagName == "text:span":
-                        # Check style for formatting
-                        style_name = node.getAttribute("stylename") or ""
-                        is_bold = default_bold or "bold" in style_name.lower()
-                        is_italic = default_italic or "italic" in style_name.lower()
-                        runs.extend(extract_text_with_formatting(node, is_bold, is_italic))
-                    else:
-                        runs.extend(extract_text_with_formatting(node, default_bold, default_italic))
-
-            return runs
-
-        # Process document body
-        for elem in doc.text.childNodes:
-            if hasattr(elem, 'tagName'):
-                if elem.tagName == "text:p":
-                    runs = extract_text_with_formatting(elem)
-                    if runs:
-                        paragraphs.append(RichParagraph(runs=runs, heading_level=0))
-                elif elem.tagName == "text:h":
-                    # Heading
-                    level = 1
-                    outline_level = elem.getAttribute("outlinelevel")
-                    if outline_level:
-                        try:
-                            level = int(outline_level)
-                        except ValueError:
-                            pass
-                    runs = extract_text_with_formatting(elem)
-                    if runs:
-                        paragraphs.append(RichParagraph(runs=runs, heading_level=level))
-
-        return ParsedDocument(
-            paragraphs=paragraphs,
-            title=title,
-            author=author,
-        )
+        return parse_odt(content)
 
     async def _parse_txt(self, content: bytes) -> ParsedDocument:
         """Parse a plain text file."""
-        # Try different encodings - UTF-16 only with BOM to avoid false positives
-        text = None
-
-        # Check for UTF-16 BOM first
-        if content.startswith(b'\xff\xfe') or content.startswith(b'\xfe\xff'):
-            try:
-                text = content.decode('utf-16')
-            except UnicodeDecodeError:
-                pass
-
-        # Try other encodings if UTF-16 didn't work
-        if text is None:
-            for encoding in ['utf-8', 'latin-1', 'cp1252']:
-                try:
-                    text = content.decode(encoding)
-                    break
-                except UnicodeDecodeError:
-                    continue
-
-        if text is None:
-            text = content.decode('utf-8', errors='replace')
-
-        paragraphs = []
-        for line in text.split('\n'):
-            if line.strip():
-                paragraphs.append(RichParagraph(
-                    runs=[TextRun(text=line.strip())],
-                    heading_level=0,
-                ))
-
-        return ParsedDocument(paragraphs=paragraphs)
+        return parse_txt(content)
 
     async def _parse_markdown(self, content: bytes) -> ParsedDocument:
         """Parse a Markdown file with partial formatting support."""
-        from markdown_it import MarkdownIt
-
-        text = content.decode('utf-8', errors='replace')
-        md = MarkdownIt()
-        tokens = md.parse(text)
-
-        paragraphs = []
-        current_runs = []
-        current_heading_level = 0
-
-        def process_inline(inline_tokens, bold=False, italic=False):
-            """Process inline tokens recursively."""
-            runs = []
-            b, i = bold, italic
-
-            for token in inline_tokens:
-                if token.type == 'text':
-                    if token.content:
-                        runs.append(TextRun(text=token.content, bold=b, italic=i))
-                elif token.type == 'strong_open':
-                    b = True
-                elif token.type == 'strong_close':
-                    b = bold  # Reset to parent state
-                elif token.type == 'em_open':
-                    i = True
-                elif token.type == 'em_close':
-                    i = italic  # Reset to parent state
-                elif token.type == 'softbreak':
-                    runs.append(TextRun(text=' ', bold=b, italic=i))
-                elif token.children:
-                    runs.extend(process_inline(token.children, b, i))
-
-            return runs
-
-        i = 0
-        while i < len(tokens):
-            token = tokens[i]
-
-            if token.type == 'heading_open':
-                # Get heading level from tag (h1, h2, etc.)
-                current_heading_level = int(token.tag[1]) if token.tag and len(token.tag) == 2 else 1
-                i += 1
-            elif token.type == 'heading_close':
-                if current_runs:
-                    paragraphs.append(RichParagraph(runs=current_runs, heading_level=current_heading_level))
-                    current_runs = []
-                current_heading_level = 0
-                i += 1
-            elif token.type == 'paragraph_open':
-                i += 1
-            elif token.type == 'paragraph_close':
-                if current_runs:
-                    paragraphs.append(RichParagraph(runs=current_runs, heading_level=current_heading_level))
-                    current_runs = []
-                i += 1
-            elif token.type == 'inline' and token.children:
-                current_runs.extend(process_inline(token.children))
-                i += 1
-            else:
-                i += 1
-
-        # Handle any remaining runs
-        if current_runs:
-            paragraphs.append(RichParagraph(runs=current_runs, heading_level=0))
-
-        return ParsedDocument(
-            paragraphs=paragraphs,
-            warnings=["Markdown formatting support is partial. Complex elements may not be preserved."],
-        )
+        return parse_markdown(content)
 
     async def _parse_pdf(self, content: bytes) -> ParsedDocument:
         """Parse a PDF file (best-effort text extraction)."""
-        try:
-            import fitz  # pymupdf
-        except ImportError:
-            raise ValueError("PDF parsing requires pymupdf. Install with: pip install pymupdf")
-
-        try:
-            doc = fitz.open(stream=content, filetype="pdf")
-        except Exception as e:
-            raise ValueError(f"Failed to open PDF file: {e}")
-
-        paragraphs = []
-        page_breaks = []
-        warnings = [
-            "PDF import is lossy. Text extraction is best-effort.",
-            "Formatting (bold, italic) is extracted when font metadata is available.",
-        ]
-
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-
-            # Mark page break (except for first page)
-            if page_num > 0:
-                page_breaks.append(len(paragraphs))
-
-            # Extract text blocks with formatting
-            blocks = page.get_text("dict", flags=fitz.TEXT_PRESERVE_WHITESPACE)["blocks"]
-
-            for block in blocks:
-                if block.get("type") == 0:  # Text block
-                    for line in block.get("lines", []):
-                        runs = []
-                        for span in line.get("spans", []):
-                            text = span.get("text", "")
-                            if not text.strip():
-                                continue
-
-                            # Try to detect formatting from font
-                            font = span.get("font", "").lower()
-                            flags = span.get("flags", 0)
-
-                            is_bold = "bold" in font or (flags & 2 ** 4) != 0
-                            is_italic = "italic" in font or "oblique" in font or (flags & 2 ** 1) != 0
-
-                            runs.append(TextRun(
-                                text=text,
-                                bold=is_bold,
-                                italic=is_italic,
-                            ))
-
-                        if runs:
-                            paragraphs.append(RichParagraph(runs=runs, heading_level=0))
-
-        doc.close()
-
-        return ParsedDocument(
-            paragraphs=paragraphs,
-            page_breaks=page_breaks,
-            warnings=warnings,
-        )
+        return parse_pdf(content)
 
     # --- Chapter Detection ---
 
@@ -647,12 +502,16 @@ class ImportService:
         Returns:
             List of DetectedChapter objects
         """
+        return [self._create_chapter(*spec) for spec in self._chapter_specs(parsed, mode)]
+
+    def _chapter_specs(self, parsed: ParsedDocument, mode: str = "auto") -> List[ChapterSpec]:
+        """Chapter boundaries as (index, title, paragraphs), before Lexical conversion."""
         if not parsed.paragraphs:
             return []
 
         if mode == "single":
             # Treat entire document as one chapter
-            return [self._create_chapter(0, "Chapter 1", parsed.paragraphs)]
+            return [(0, "Chapter 1", parsed.paragraphs)]
 
         boundaries = []
 
@@ -663,9 +522,6 @@ class ImportService:
                 boundaries = self._detect_by_pattern(parsed)
             if not boundaries:
                 boundaries = self._detect_by_page_breaks(parsed)
-            if not boundaries:
-                # Fall back to single chapter
-                return [self._create_chapter(0, "Chapter 1", parsed.paragraphs)]
         elif mode == "headings":
             boundaries = self._detect_by_headings(parsed)
         elif mode == "pattern":
@@ -674,15 +530,13 @@ class ImportService:
             boundaries = self._detect_by_page_breaks(parsed)
 
         if not boundaries:
-            return [self._create_chapter(0, "Chapter 1", parsed.paragraphs)]
-
-        # Convert boundaries to chapters
-        chapters = []
-        for i, boundary in enumerate(boundaries):
-            paras = parsed.paragraphs[boundary.start_index:boundary.end_index]
-            chapters.append(self._create_chapter(i, boundary.title, paras))
+            # Fall back to single chapter
+            return [(0, "Chapter 1", parsed.paragraphs)]
 
-        return chapters
+        return [
+            (i, boundary.title, parsed.paragraphs[boundary.start_index:boundary.end_index])
+            for i, boundary in enumerate(boundaries)
+        ]
 
     def _detect_by_headings(self, parsed: ParsedDocument) -> List[ChapterBoundary]:
         """Detect chapters by heading styles (H1, H2)."""
@@ -783,28 +637,7 @@ class ImportService:
         paragraphs: List[RichParagraph]
     ) -> DetectedChapter:
         """Create a DetectedChapter from paragraphs."""
-        # Generate Lexical state
-        lexical_state = rich_paragraphs_to_lexical_json(paragraphs)
-
-        # Generate plain text
-        plain_text = '\n'.join(p.get_plain_text() for p in paragraphs)
-
-        # Count words
-        word_count = len(plain_text.split())
-
-        # Generate preview text (first 200 chars)
-        preview = plain_text[:200].strip()
-        if len(plain_text) > 200:
-            preview += "..."
-
-        return DetectedChapter(
-            index=index,
-            title=title,
-            paragraphs=paragraphs,
-            lexical_state=lexical_state,
-            plain_content=plain_text,
-            word_count=word_count,
-        )
+        return create_detected_chapter(index, title, paragraphs)
 
     def _get_detection_method(self, chapters: List[DetectedChapter]) -> str:
         """Get the detection method used for chapters."""
@@ -0,0 +1,117 @@
+"""
+Import Task Registry - In-memory singleton for tracking background document imports.
+
+Mirrors ScanTaskRegistry: the import routes create a task, a background job
+reports progress (pages or Scrivener documents parsed), and the frontend polls
+/api/import/tasks/{task_id} until it completes with a parse_id or manuscript_id.
+"""
+
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Optional, Dict
+import uuid
+
+# Finished tasks are dropped after this long
+FINISHED_TASK_TTL = timedelta(hours=1)
+
+
+@dataclass
+class ImportTask:
+    """Represents a background import with progress tracking"""
+    id: str
+    filename: str
+    kind: str = "document"  # document, scrivener, followup
+    status: str = "running"  # running, completed, failed
+    total_units: int = 0  # Pages (PDF), documents (Scrivener) or 1
+    units_completed: int = 0
+    current_stage: str = ""
+    progress_percent: float = 0.0
+    parse_id: Optional[str] = None
+    manuscript_id: Optional[str] = None
+    error: Optional[str] = None
+    started_at: datetime = field(default_factory=datetime.utcnow)
+    completed_at: Optional[datetime] = None
+
+
+class ImportTaskRegistry:
+    """Thread-safe singleton registry for import tasks"""
+
+    _instance: Optional["ImportTaskRegistry"] = None
+    _lock = threading.Lock()
+
+    def __new__(cls) -> "ImportTaskRegistry":
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._tasks: Dict[str, ImportTask] = {}
+                    cls._instance._task_lock = threading.Lock()
+        return cls._instance
+
+    def create_task(self, filename: str, kind: str = "document") -> ImportTask:
+        """Create a new import task"""
+        with self._task_lock:
+            self._prune()
+            task = ImportTask(id=str(uuid.uuid4()), filename=filename, kind=kind)
+            self._tasks[task.id] = task
+            return task
+
+    def get_task(self, task_id: str) -> Optional[ImportTask]:
+        """Get a task by ID"""
+        return self._tasks.get(task_id)
+
+    def update_progress(
+        self,
+        task_id: str,
+        units_completed: int = 0,
+        total_units: int = 0,
+        current_stage: str = "",
+    ) -> None:
+        """Update progress on a running task"""
+        task = self._tasks.get(task_id)
+        if not task:
+            return
+        task.units_completed = units_completed
+        task.total_units = total_units
+        task.current_stage = current_stage
+        task.progress_percent = (units_completed / total_units) * 100 if total_units else 0.0
+
+    def complete_task(
+        self,
+        task_id: str,
+        parse_id: Optional[str] = None,
+        manuscript_id: Optional[str] = None,
+    ) -> None:
+        """Mark a task as completed"""
+        with self._task_lock:
+            task = self._tasks.get(task_id)
+            if not task:
+                return
+            task.status = "completed"
+            task.parse_id = parse_id
+            task.manuscript_id = manuscript_id
+            task.progress_percent = 100.0
+            task.completed_at = datetime.utcnow()
+
+    def fail_task(self, task_id: str, error: str) -> None:
+        """Mark a task as failed"""
+        with self._task_lock:
+            task = self._tasks.get(task_id)
+            if not task:
+                return
+            task.status = "failed"
+            task.error = error
+            task.completed_at = datetime.utcnow()
+
+    def _prune(self):
+        cutoff = datetime.utcnow() - FINISHED_TASK_TTL
+        for task_id in [
+            t.id for t in self._tasks.values()
+            if t.completed_at is not None and t.completed_at < cutoff
+        ]:
+            del self._tasks[task_id]
+
+
+# Module-level singleton access
+import_registry = ImportTaskRegistry()
@@ -0,0 +1,699 @@
+"""
+Import Workers - Streaming document parsers and the process pool that runs them.
+
+Document import used to read the whole upload into memory and parse it
+inside the request coroutine. A 900-page PDF or a multi-gigabyte Scrivener
+archive pinned the event loop and held the file and its parse tree in RAM at
+once. The pieces here keep memory bounded and the loop free:
+
+- spool_upload: copies an UploadFile to a temp file in chunks, hashing as it
+  goes (the hash keys the parse cache)
+- Parsers take a path and read incrementally: DOCX paragraphs stream out of
+  word/document.xml with iterparse, PDFs parse a page range at a time
+- ImportWorkerPool: runs parsers in worker processes so CPU-bound parsing
+  never blocks the event loop; PDFs fan out one task per page range, and
+  detected chapters are converted to Lexical JSON in batches across workers
+
+Everything a worker returns (ParsedDocument, DetectedChapter, RichParagraph)
+is a plain dataclass, so results pickle cheaply back to the parent.
+
+Configuration:
+- IMPORT_PARSE_PROCESSES: worker processes (default 2; 0 = threads in this
+  process, for development and tests)
+- IMPORT_PDF_PAGES_PER_TASK: pages per PDF task (default 25)
+- IMPORT_CHAPTERS_PER_TASK: chapters converted per task (default 8)
+- IMPORT_MAX_UPLOAD_MB: largest accepted upload (default 2048)
+"""
+
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import tempfile
+import xml.etree.ElementTree as ET
+import zipfile
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple, Union
+
+from app.services.lexical_utils import TextRun, RichParagraph, rich_paragraphs_to_lexical_json
+
+logger = logging.getLogger(__name__)
+
+PROCESSES = int(os.getenv("IMPORT_PARSE_PROCESSES", "2"))
+PDF_PAGES_PER_TASK = int(os.getenv("IMPORT_PDF_PAGES_PER_TASK", "25"))
+CHAPTERS_PER_TASK = int(os.getenv("IMPORT_CHAPTERS_PER_TASK", "8"))
+MAX_UPLOAD_BYTES = int(os.getenv("IMPORT_MAX_UPLOAD_MB", "2048")) * 1024 * 1024
+
+# Upload copy chunk size
+SPOOL_CHUNK_BYTES = 1024 * 1024
+
+Source = Union[str, bytes, BinaryIO]  # Path, raw content or file object
+
+
+@dataclass
+class ParsedDocument:
+    """Result of parsing a document file."""
+    paragraphs: List[RichParagraph] = field(default_factory=list)
+    title: Optional[str] = None
+    author: Optional[str] = None
+    page_breaks: List[int] = field(default_factory=list)  # Paragraph indices after page breaks
+    warnings: List[str] = field(default_factory=list)
+
+
+@dataclass
+class DetectedChapter:
+    """A chapter detected from the imported document."""
+    index: int
+    title: str
+    paragraphs: List[RichParagraph]
+    lexical_state: str  # Pre-computed Lexical JSON
+    plain_content: str  # Plain text for word count
+    word_count: int
+
+
+ChapterSpec = Tuple[int, str, List[RichParagraph]]  # (index, title, paragraphs)
+
+
+@dataclass
+class SpooledUpload:
+    """An upload copied to disk"""
+    path: str
+    size: int
+    sha256: str
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+async def spool_upload(upload, suffix: str = "", max_bytes: int = MAX_UPLOAD_BYTES) -> SpooledUpload:
+    """
+    Copy an UploadFile to a named temp file in fixed-size chunks.
+
+    Raises ValueError when the upload is empty or larger than max_bytes. The
+    caller owns the file and must call remove().
+    """
+    digest = hashlib.sha256()
+    size = 0
+    handle = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    try:
+        with handle:
+            while True:
+                chunk = await upload.read(SPOOL_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ValueError(f"File is larger than the {max_bytes // (1024 * 1024)} MB import limit")
+                digest.update(chunk)
+                handle.write(chunk)
+        if size == 0:
+            raise ValueError("File is empty")
+    except BaseException:
+        os.remove(handle.name)
+        raise
+    return SpooledUpload(path=handle.name, size=size, sha256=digest.hexdigest())
+
+
+def _read_bytes(source: Source) -> bytes:
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            return f.read()
+    return source.read()
+
+
+# --- Plain text formats ---
+
+def _lines_to_paragraphs(text: str) -> List[RichParagraph]:
+    return [
+        RichParagraph(runs=[TextRun(text=line.strip())], heading_level=0)
+        for line in text.split('\n')
+        if line.strip()
+    ]
+
+
+def parse_txt(source: Source) -> ParsedDocument:
+    """Parse a plain text file."""
+    content = _read_bytes(source)
+    # Try different encodings - UTF-16 only with BOM to avoid false positives
+    text = None
+
+    # Check for UTF-16 BOM first
+    if content.startswith(b'\xff\xfe') or content.startswith(b'\xfe\xff'):
+        try:
+            text = content.decode('utf-16')
+        except UnicodeDecodeError:
+            pass
+
+    # Try other encodings if UTF-16 didn't work
+    if text is None:
+        for encoding in ['utf-8', 'latin-1', 'cp1252']:
+            try:
+                text = content.decode(encoding)
+                break
+            except UnicodeDecodeError:
+                continue
+
+    if text is None:
+        text = content.decode('utf-8', errors='replace')
+
+    return ParsedDocument(paragraphs=_lines_to_paragraphs(text))
+
+
+def parse_rtf(source: Source) -> ParsedDocument:
+    """Parse an RTF file (plain text only)."""
+    from striprtf.striprtf import rtf_to_text
+
+    try:
+        # Decode RTF content
+        text = _read_bytes(source).decode('utf-8', errors='replace')
+        plain_text = rtf_to_text(text)
+    except Exception as e:
+        raise ValueError(f"Failed to parse RTF file: {e}")
+
+    return ParsedDocument(
+        paragraphs=_lines_to_paragraphs(plain_text),
+        warnings=["RTF import extracts plain text only. Formatting was not preserved."],
+    )
+
+
+def parse_markdown(source: Source) -> ParsedDocument:
+    """Parse a Markdown file with partial formatting support."""
+    from markdown_it import MarkdownIt
+
+    text = _read_bytes(source).decode('utf-8', errors='replace')
+    tokens = MarkdownIt().parse(text)
+
+    paragraphs = []
+    current_runs = []
+    current_heading_level = 0
+
+    def process_inline(inline_tokens, bold=False, italic=False):
+        """Process inline tokens recursively."""
+        runs = []
+        b, i = bold, italic
+
+        for token in inline_tokens:
+            if token.type == 'text':
+                if token.content:
+                    runs.append(TextRun(text=token.content, bold=b, italic=i))
+            elif token.type == 'strong_open':
+                b = True
+            elif token.type == 'strong_close':
+                b = bold  # Reset to parent state
+            elif token.type == 'em_open':
+                i = True
+            elif token.type == 'em_close':
+                i = italic  # Reset to parent state
+            elif token.type == 'softbreak':
+                runs.append(TextRun(text=' ', bold=b, italic=i))
+            elif token.children:
+                runs.extend(process_inline(token.children, b, i))
+
+        return runs
+
+    for token in tokens:
+        if token.type == 'heading_open':
+            # Get heading level from tag (h1, h2, etc.)
+            current_heading_level = int(token.tag[1]) if token.tag and len(token.tag) == 2 else 1
+        elif token.type in ('heading_close', 'paragraph_close'):
+            if current_runs:
+                paragraphs.append(RichParagraph(runs=current_runs, heading_level=current_heading_level))
+                current_runs = []
+            if token.type == 'heading_close':
+                current_heading_level = 0
+        elif token.type == 'inline' and token.children:
+            current_runs.extend(process_inline(token.children))
+
+    # Handle any remaining runs
+    if current_runs:
+        paragraphs.append(RichParagraph(runs=current_runs, heading_level=0))
+
+    return ParsedDocument(
+        paragraphs=paragraphs,
+        warnings=["Markdown formatting support is partial. Complex elements may not be preserved."],
+    )
+
+
+# --- DOCX (streamed from the zip) ---
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_DC = "{http://purl.org/dc/elements/1.1/}"
+_FALSE_VALUES = {"0", "false", "off", "none"}
+
+
+def _on(props: Optional[ET.Element], tag: str) -> bool:
+    """Whether a run property (w:b, w:i, w:u) is switched on"""
+    if props is None:
+        return False
+    element = props.find(_W + tag)
+    if element is None:
+        return False
+    return element.get(_W + "val", "true").lower() not in _FALSE_VALUES
+
+
+def _docx_style_names(archive: zipfile.ZipFile) -> Dict[str, str]:
+    """styleId -> display name ("heading 1" -> "Heading 1", as python-docx reports it)"""
+    names: Dict[str, str] = {}
+    if "word/styles.xml" not in archive.namelist():
+        return names
+    with archive.open("word/styles.xml") as f:
+        for _, element in ET.iterparse(f):
+            if element.tag == _W + "style":
+                style_id = element.get(_W + "styleId")
+                name_element = element.find(_W + "name")
+                name = name_element.get(_W + "val") if name_element is not None else style_id
+                if name and name.lower().startswith("heading"):
+                    name = "Heading" + name[len("heading"):]
+                if style_id:
+                    names[style_id] = name or ""
+                element.clear()
+    return names
+
+
+def _docx_core_properties(archive: zipfile.ZipFile) -> Tuple[Optional[str], Optional[str]]:
+    if "docProps/core.xml" not in archive.namelist():
+        return None, None
+    try:
+        root = ET.fromstring(archive.read("docProps/core.xml"))
+    except ET.ParseError:
+        return None, None
+    title = root.findtext(_DC + "title") or None
+    author = root.findtext(_DC + "creator") or None
+    return title, author
+
+
+def _docx_run(run: ET.Element) -> Tuple[Optional[TextRun], bool]:
+    """Convert a w:r element; returns (run or None, has page break)"""
+    parts = []
+    page_break = False
+    for child in run:
+        if child.tag == _W + "t":
+            parts.append(child.text or "")
+        elif child.tag == _W + "tab":
+            parts.append("\t")
+        elif child.tag == _W + "br":
+            if child.get(_W + "type") == "page":
+                page_break = True
+            else:
+                parts.append("\n")
+        elif child.tag == _W + "cr":
+            parts.append("\n")
+    text = "".join(parts)
+    if not text:
+        return None, page_break
+    props = run.find(_W + "rPr")
+    return TextRun(
+        text=text,
+        bold=_on(props, "b"),
+        italic=_on(props, "i"),
+        underline=_on(props, "u"),
+    ), page_break
+
+
+def _heading_level(style_name: str) -> int:
+    if not style_name.startswith("Heading"):
+        return 0
+    try:
+        return int(style_name.replace("Heading ", ""))
+    except ValueError:
+        return 1
+
+
+def parse_docx(source: Source) -> ParsedDocument:
+    """
+    Parse a DOCX file with formatting preserved.
+
+    Paragraphs are read one at a time from word/document.xml and discarded
+    once converted, so memory follows the extracted text rather than the XML
+    tree. Like python-docx's Document.paragraphs, only body-level paragraphs
+    are read (not table cells or text boxes).
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = BytesIO(source)
+    try:
+        archive = zipfile.ZipFile(source)
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Failed to parse DOCX file: {e}")
+
+    with archive:
+        styles = _docx_style_names(archive)
+        default_style = styles.get("Normal", "Normal")
+        title, author = _docx_core_properties(archive)
+
+        paragraphs: List[RichParagraph] = []
+        page_breaks: List[int] = []
+        depth = 0
+        body = None
+        with archive.open("word/document.xml") as f:
+            for event, element in ET.iterparse(f, events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    if element.tag == _W + "body":
+                        body = element
+                    continue
+                depth -= 1
+                # Direct children of w:body end at depth 2 (document > body > child)
+                if depth != 2 or body is None:
+                    continue
+                if element.tag == _W + "p":
+                    runs = []
+                    broke_page = False
+                    for run in element.findall(_W + "r"):
+                        text_run, page_break = _docx_run(run)
+                        broke_page = broke_page or page_break
+                        if text_run is not None:
+                            runs.append(text_run)
+                    if broke_page:
+                        page_breaks.append(len(paragraphs))
+
+                    style = element.find(f"{_W}pPr/{_W}pStyle")
+                    style_name = styles.get(style.get(_W + "val"), "") if style is not None else default_style
+                    if runs:  # Only add non-empty paragraphs
+                        paragraphs.append(RichParagraph(runs=runs, heading_level=_heading_level(style_name)))
+                # Drop everything parsed so far
+                body.clear()
+
+    return ParsedDocument(
+        paragraphs=paragraphs,
+        title=title,
+        author=author,
+        page_breaks=page_breaks,
+    )
+
+
+# --- ODT ---
+
+def parse_odt(source: Source) -> ParsedDocument:
+    """Parse an ODT file with formatting preserved."""
+    from odf.opendocument import load
+
+    try:
+        doc = load(source if isinstance(source, str) else BytesIO(_read_bytes(source)))
+    except Exception as e:
+        raise ValueError(f"Failed to parse ODT file: {e}")
+
+    paragraphs = []
+    title = None
+    author = None
+
+    # Try to get metadata
+    try:
+        meta = doc.meta
+        if meta:
+            for child in meta.childNodes:
+                if child.tagName == "dc:title" and child.firstChild:
+                    title = str(child.firstChild)
+                elif child.tagName == "dc:creator" and child.firstChild:
+                    author = str(child.firstChild)
+    except Exception:
+        pass
+
+    def extract_text_with_formatting(element, default_bold=False, default_italic=False):
+        """Recursively extract text and formatting from ODT elements."""
+        runs = []
+
+        for node in element.childNodes:
+            if node.nodeType == node.TEXT_NODE:
+                text = str(node)
+                if text:
+                    runs.append(TextRun(
+                        text=text,
+                        bold=default_bold,
+                        italic=default_italic,
+                    ))
+            elif hasattr(node, 'tagName'):
+                if node.tagName == "text:span":
+                    # Check style for formatting
+                    style_name = node.getAttribute("stylename") or ""
+                    is_bold = default_bold or "bold" in style_name.lower()
+                    is_italic = default_italic or "italic" in style_name.lower()
+                    runs.extend(extract_text_with_formatting(node, is_bold, is_italic))
+                else:
+                    runs.extend(extract_text_with_formatting(node, default_bold, default_italic))
+
+        return runs
+
+    # Process document body
+    for elem in doc.text.childNodes:
+        if hasattr(elem, 'tagName'):
+            if elem.tagName == "text:p":
+                runs = extract_text_with_formatting(elem)
+                if runs:
+                    paragraphs.append(RichParagraph(runs=runs, heading_level=0))
+            elif elem.tagName == "text:h":
+                # Heading
+                level = 1
+                outline_level = elem.getAttribute("outlinelevel")
+                if outline_level:
+                    try:
+                        level = int(outline_level)
+                    except ValueError:
+                        pass
+                runs = extract_text_with_formatting(elem)
+                if runs:
+                    paragraphs.append(RichParagraph(runs=runs, heading_level=level))
+
+    return ParsedDocument(
+        paragraphs=paragraphs,
+        title=title,
+        author=author,
+    )
+
+
+# --- PDF (page ranges) ---
+
+PDF_WARNINGS = [
+    "PDF import is lossy. Text extraction is best-effort.",
+    "Formatting (bold, italic) is extracted when font metadata is available.",
+]
+
+
+def _open_pdf(source: Source):
+    try:
+        import fitz  # pymupdf
+    except ImportError:
+        raise ValueError("PDF parsing requires pymupdf. Install with: pip install pymupdf")
+
+    try:
+        if isinstance(source, str):
+            return fitz.open(source)
+        return fitz.open(stream=_read_bytes(source), filetype="pdf")
+    except Exception as e:
+        raise ValueError(f"Failed to open PDF file: {e}")
+
+
+def pdf_page_count(source: Source) -> int:
+    doc = _open_pdf(source)
+    try:
+        return len(doc)
+    finally:
+        doc.close()
+
+
+def parse_pdf_pages(source: Source, start: int, stop: int) -> List[List[RichParagraph]]:
+    """Paragraphs for pages [start, stop), one list per page"""
+    import fitz
+
+    doc = _open_pdf(source)
+    pages = []
+    try:
+        for page_num in range(start, min(stop, len(doc))):
+            page = doc[page_num]
+            paragraphs = []
+
+            # Extract text blocks with formatting
+            blocks = page.get_text("dict", flags=fitz.TEXT_PRESERVE_WHITESPACE)["blocks"]
+
+            for block in blocks:
+                if block.get("type") != 0:  # Text blocks only
+                    continue
+                for line in block.get("lines", []):
+                    runs = []
+                    for span in line.get("spans", []):
+                        text = span.get("text", "")
+                        if not text.strip():
+                            continue
+
+                        # Try to detect formatting from font
+                        font = span.get("font", "").lower()
+                        flags = span.get("flags", 0)
+
+                        is_bold = "bold" in font or (flags & 2 ** 4) != 0
+                        is_italic = "italic" in font or "oblique" in font or (flags & 2 ** 1) != 0
+
+                        runs.append(TextRun(
+                            text=text,
+                            bold=is_bold,
+                            italic=is_italic,
+                        ))
+
+                    if runs:
+                        paragraphs.append(RichParagraph(runs=runs, heading_level=0))
+            pages.append(paragraphs)
+    finally:
+        doc.close()
+    return pages
+
+
+def merge_pdf_pages(pages: List[List[RichParagraph]]) -> ParsedDocument:
+    """Join per-page paragraphs, marking a page break before every page but the first"""
+    paragraphs: List[RichParagraph] = []
+    page_breaks: List[int] = []
+    for page_num, page in enumerate(pages):
+        if page_num > 0:
+            page_breaks.append(len(paragraphs))
+        paragraphs.extend(page)
+    return ParsedDocument(paragraphs=paragraphs, page_breaks=page_breaks, warnings=list(PDF_WARNINGS))
+
+
+def parse_pdf(source: Source) -> ParsedDocument:
+    """Parse a whole PDF in this process (best-effort text extraction)."""
+    return merge_pdf_pages(parse_pdf_pages(source, 0, pdf_page_count(source)))
+
+
+# Single-task parsers by extension (PDF is split by ImportWorkerPool.parse)
+PARSERS: Dict[str, Callable[[Source], ParsedDocument]] = {
+    ".docx": parse_docx,
+    ".rtf": parse_rtf,
+    ".odt": parse_odt,
+    ".txt": parse_txt,
+    ".md": parse_markdown,
+    ".pdf": parse_pdf,
+}
+
+
+def parse_path(path: str, ext: str) -> ParsedDocument:
+    """Parse a file on disk in one task (worker process entry point)"""
+    parser = PARSERS.get(ext)
+    if not parser:
+        raise ValueError(f"No parser for format: {ext}")
+    return parser(path)
+
+
+# --- Chapters ---
+
+def create_detected_chapter(index: int, title: str, paragraphs: List[RichParagraph]) -> DetectedChapter:
+    """Create a DetectedChapter (Lexical JSON, plain text, word count) from paragraphs."""
+    # Generate Lexical state
+    lexical_state = rich_paragraphs_to_lexical_json(paragraphs)
+
+    # Generate plain text
+    plain_text = '\n'.join(p.get_plain_text() for p in paragraphs)
+
+    return DetectedChapter(
+        index=index,
+        title=title,
+        paragraphs=paragraphs,
+        lexical_state=lexical_state,
+        plain_content=plain_text,
+        word_count=len(plain_text.split()),
+    )
+
+
+def convert_chapters(specs: List[ChapterSpec]) -> List[DetectedChapter]:
+    """Convert a batch of detected chapters (worker process entry point)"""
+    return [create_detected_chapter(index, title, paragraphs) for index, title, paragraphs in specs]
+
+
+ProgressCallback = Callable[[int, int, str], None]  # (units_completed, total_units, stage)
+
+
+class ImportWorkerPool:
+    """Process pool for import parsing"""
+
+    def __init__(
+        self,
+        processes: int = PROCESSES,
+        pdf_pages_per_task: int = PDF_PAGES_PER_TASK,
+        chapters_per_task: int = CHAPTERS_PER_TASK,
+    ):
+        self.processes = processes
+        self.pdf_pages_per_task = pdf_pages_per_task
+        self.chapters_per_task = chapters_per_task
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.processes > 0:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="import-parse")
+        return self._executor
+
+    async def run(self, fn: Callable, *args: Any) -> Any:
+        """Run fn(*args) in the pool (fn must be a module-level function)"""
+        return await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+
+    async def parse(
+        self,
+        path: str,
+        ext: str,
+        progress: Optional[ProgressCallback] = None,
+    ) -> ParsedDocument:
+        """Parse a file on disk off the event loop; PDFs are split into page-range tasks"""
+        if ext != ".pdf":
+            if progress:
+                progress(0, 1, "Parsing document")
+            parsed = await self.run(parse_path, path, ext)
+            if progress:
+                progress(1, 1, "Parsed document")
+            return parsed
+
+        total_pages = await self.run(pdf_page_count, path)
+        step = max(self.pdf_pages_per_task, 1)
+        ranges = [(start, min(start + step, total_pages)) for start in range(0, total_pages, step)]
+        results: List[Optional[List[List[RichParagraph]]]] = [None] * len(ranges)
+        pages_done = 0
+        if progress:
+            progress(0, total_pages, "Parsing PDF pages")
+
+        async def parse_range(index: int, start: int, stop: int):
+            nonlocal pages_done
+            results[index] = await self.run(parse_pdf_pages, path, start, stop)
+            pages_done += stop - start
+            if progress:
+                progress(pages_done, total_pages, "Parsing PDF pages")
+
+        await asyncio.gather(*(parse_range(i, start, stop) for i, (start, stop) in enumerate(ranges)))
+        return merge_pdf_pages([page for chunk in results for page in chunk])
+
+    async def convert_chapters(
+        self,
+        specs: List[ChapterSpec],
+        progress: Optional[ProgressCallback] = None,
+    ) -> List[DetectedChapter]:
+        """Convert detected chapters to Lexical JSON, in batches across workers, keeping order"""
+        step = max(self.chapters_per_task, 1)
+        batches = [specs[i:i + step] for i in range(0, len(specs), step)]
+        results: List[Optional[List[DetectedChapter]]] = [None] * len(batches)
+        done = 0
+        if progress:
+            progress(0, len(specs), "Converting chapters")
+
+        async def convert_batch(index: int, batch: List[ChapterSpec]):
+            nonlocal done
+            results[index] = await self.run(convert_chapters, batch)
+            done += len(batch)
+            if progress:
+                progress(done, len(specs), "Converting chapters")
+
+        await asyncio.gather(*(convert_batch(i, batch) for i, batch in enumerate(batches)))
+        return [chapter for batch in results for chapter in batch]
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Module-level singleton
+import_pool = ImportWorkerPool()
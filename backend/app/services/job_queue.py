@@ -0,0 +1,688 @@
+"""
+Job Queue - Persisted background jobs with progress streaming.
+
+Long analyses (complete-manuscript reports, consistency scans, timeline
+extraction, wiki scans) used to run inside the request or in FastAPI
+BackgroundTasks, with progress - where there was any - in per-feature
+in-memory registries. The job queue runs them all the same way:
+
+- Jobs are rows in the jobs table. Handlers register a kind with
+  @job_handler; POST /api/jobs (or a feature's own route) submits one
+- Submitting a job identical to one that is queued or running (same kind,
+  user and identifying parameters) returns the existing job
+- A pool of worker threads runs queued jobs oldest first, at most
+  JOB_WORKERS at once and JOB_MAX_PER_USER for any one user. The user id is
+  whatever the client sent; jobs submitted without one share a single
+  anonymous allowance
+- Handlers report progress and partial results through their JobContext.
+  Subscribers (SSE at /api/jobs/{id}/events, WebSocket at /api/jobs/{id}/ws)
+  receive every update; the row is written at most once per
+  PROGRESS_WRITE_INTERVAL seconds while the job runs
+- Cancelling a queued job drops it from the queue. A running job stops at
+  its next progress report; async handlers are cancelled outright
+- On startup, jobs a restart interrupted are queued again, up to
+  JOB_MAX_ATTEMPTS runs. Secret parameters (API keys) are only kept in
+  memory, so jobs that need them fail and must be resubmitted
+
+Async handlers run on the application's event loop, sync handlers in the
+worker thread. Dispatch is per process: run one API worker per database.
+
+Configuration:
+- JOB_WORKERS: jobs running at once (default 4)
+- JOB_MAX_PER_USER: running jobs per user (default 2)
+- JOB_MAX_ATTEMPTS: runs before an interrupted job is failed (default 3)
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.job import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_PER_USER = int(os.getenv("JOB_MAX_PER_USER", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+# Per-user limit bucket for jobs submitted without a user id
+ANONYMOUS_USER = ""
+
+# Seconds between progress writes to a running job's row
+PROGRESS_WRITE_INTERVAL = 1.0
+
+# Events a slow subscriber may fall behind before the oldest are dropped
+SUBSCRIPTION_QUEUE_SIZE = 100
+
+# How often a worker waiting on an async handler checks for cancellation
+_ASYNC_POLL_SECONDS = 0.25
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler whose job was cancelled"""
+
+
+@dataclass(frozen=True)
+class JobHandler:
+    kind: str
+    run: Callable[..., Any]  # run(ctx, **params) -> JSON-serializable result
+    dedup_params: Optional[Tuple[str, ...]] = None  # Parameters that identify a job; None = all
+    secret_params: Tuple[str, ...] = ()  # Never persisted
+
+    @property
+    def is_async(self) -> bool:
+        return asyncio.iscoroutinefunction(self.run)
+
+
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+
+
+def job_handler(
+    kind: str,
+    dedup_params: Optional[Sequence[str]] = None,
+    secret_params: Sequence[str] = ()
+):
+    """Register fn(ctx, **params) as the handler for a kind of job"""
+    def register(fn):
+        JOB_HANDLERS[kind] = JobHandler(
+            kind=kind,
+            run=fn,
+            dedup_params=tuple(dedup_params) if dedup_params is not None else None,
+            secret_params=tuple(secret_params),
+        )
+        return fn
+    return register
+
+
+def dedup_key(handler: JobHandler, user_id: Optional[str], params: Dict[str, Any]) -> str:
+    """Hash of what makes two submissions the same job"""
+    if handler.dedup_params is not None:
+        params = {name: params.get(name) for name in handler.dedup_params}
+    payload = json.dumps([handler.kind, user_id, params], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _json_safe(value: Any) -> Any:
+    return json.loads(json.dumps(value, default=str))
+
+
+class JobSubscription:
+    """Events for one job, delivered to one listener on its event loop"""
+
+    def __init__(self, manager: "JobManager", job_id: str, max_queue: int = SUBSCRIPTION_QUEUE_SIZE):
+        self.job_id = job_id
+        self._manager = manager
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._held: Optional[List[Optional[Dict[str, Any]]]] = []  # Events that beat the snapshot
+        self.dropped = 0
+        self.closed = False
+
+    def deliver(self, event: Optional[Dict[str, Any]]):
+        """Queue an event from any thread; None ends the stream"""
+        try:
+            self._loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass  # The listener's loop is gone
+
+    def _put(self, event: Optional[Dict[str, Any]]):
+        if self._held is not None:
+            self._held.append(event)
+            return
+        if self.closed:
+            return
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(event)
+        if event is None:
+            self.closed = True
+
+    def _start(self, snapshot: Dict[str, Any], final: bool = False):
+        """
+        Queue the snapshot, then the events that arrived while it loaded (on
+        the loop). A final snapshot (finished job) ends the stream instead.
+        """
+        held, self._held = self._held or [], None
+        self._put(snapshot)
+        for event in ([None] if final else held):
+            self._put(event)
+
+    def close(self):
+        """Stop listening; a pending `async for` ends"""
+        self._manager._unsubscribe(self)
+        self.deliver(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        event = await self._queue.get()
+        if event is None:
+            raise StopAsyncIteration
+        return event
+
+
+class JobContext:
+    """A running job's parameters, progress reporting and cancellation"""
+
+    def __init__(
+        self,
+        manager: "JobManager",
+        job_id: str,
+        params: Dict[str, Any],
+        secrets: Dict[str, Any],
+        cancel_event: threading.Event
+    ):
+        self.job_id = job_id
+        self.params = params
+        self.secrets = secrets
+        self.progress_percent = 0.0
+        self.current_stage = ""
+        self.counters: Dict[str, Any] = {}
+        self.partial_results: List[Any] = []
+        self._manager = manager
+        self._cancel = cancel_event
+        self._last_write = 0.0
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def check_cancelled(self) -> None:
+        if self._cancel.is_set():
+            raise JobCancelled(self.job_id)
+
+    def report(self, progress_percent: Optional[float] = None, stage: Optional[str] = None, **counters) -> None:
+        """Update progress (and any kind-specific counters); raises JobCancelled once cancelled"""
+        self.check_cancelled()
+        if progress_percent is not None:
+            self.progress_percent = max(0.0, min(float(progress_percent), 100.0))
+        if stage is not None:
+            self.current_stage = stage
+        self.counters.update(_json_safe(counters))
+        self._manager._on_progress(self)
+
+    def partial(self, result: Any) -> None:
+        """Stream a piece of the result before the job finishes"""
+        self.check_cancelled()
+        result = _json_safe(result)
+        self.partial_results.append(result)
+        self._manager._on_progress(self, partial=result)
+
+    @contextmanager
+    def session(self) -> Iterator[Session]:
+        """A database session for the handler, closed when it's done"""
+        db = self._manager.session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+@dataclass
+class _RunningJob:
+    job_id: str
+    user_id: Optional[str]
+    cancel: threading.Event = field(default_factory=threading.Event)
+    context: Optional[JobContext] = None
+    future: Optional[Future] = None  # An async handler's coroutine on the event loop
+    interrupted: bool = False  # Stopped by shutdown; resumes after the restart
+
+
+class JobManager:
+    """Queues, runs, cancels and streams background jobs"""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        workers: int = JOB_WORKERS,
+        max_per_user: int = JOB_MAX_PER_USER,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        handlers: Optional[Dict[str, JobHandler]] = None
+    ):
+        self.session_factory = session_factory
+        self.workers = max(1, workers)
+        self.max_per_user = max(1, max_per_user)
+        self.max_attempts = max(1, max_attempts)
+        self.handlers = JOB_HANDLERS if handlers is None else handlers
+
+        self._lock = threading.RLock()
+        self._running: Dict[str, _RunningJob] = {}
+        self._secrets: Dict[str, Dict[str, Any]] = {}
+        self._subscriptions: Dict[str, Set[JobSubscription]] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._started = False
+
+        self.submitted = 0
+        self.deduplicated = 0
+        self.recovered = 0
+        self.finished: Counter = Counter()
+
+    @contextmanager
+    def _db(self) -> Iterator[Session]:
+        db = self.session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        return self._executor
+
+    # ==================== Lifecycle ====================
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """Recover jobs a restart interrupted, then start running queued jobs"""
+        if loop is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+        with self._lock:
+            self._loop = loop
+            if self._started:
+                return
+            self._started = True
+            self._recover()
+        self._dispatch()
+
+    def _recover(self) -> None:
+        now = datetime.utcnow()
+        with self._db() as db:
+            for job in db.query(Job).filter(Job.status.in_(JobStatus.ACTIVE)):
+                if job.id in self._running:
+                    continue
+                handler = self.handlers.get(job.kind)
+                error = None
+                if handler is None:
+                    error = f"Unknown job kind: {job.kind}"
+                elif job.cancel_requested:
+                    job.status = JobStatus.CANCELLED
+                elif any(name not in self._secrets.get(job.id, {}) for name in handler.secret_params):
+                    error = "Interrupted by a restart; submit the job again"
+                elif job.status == JobStatus.RUNNING and (job.attempts or 0) >= self.max_attempts:
+                    error = f"Interrupted {job.attempts} times"
+                elif job.status == JobStatus.RUNNING:
+                    job.status = JobStatus.QUEUED
+                    self.recovered += 1
+
+                if error is not None:
+                    job.status = JobStatus.FAILED
+                    job.error = error
+                if job.status in JobStatus.FINISHED:
+                    job.completed_at = now
+            db.commit()
+
+    def shutdown(self) -> None:
+        """Stop running jobs without finishing them; they resume on the next start"""
+        with self._lock:
+            self._started = False
+            for running in self._running.values():
+                running.interrupted = True
+                running.cancel.set()
+                if running.future is not None:
+                    running.future.cancel()
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    # ==================== Submission ====================
+
+    def submit(
+        self,
+        kind: str,
+        params: Optional[Dict[str, Any]] = None,
+        user_id: Optional[str] = None
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Queue a job: (job, created). If an identical job is queued or
+        running, that job is returned with created False.
+        """
+        handler = self.handlers.get(kind)
+        if handler is None:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        params = dict(params or {})
+        secrets = {name: params.pop(name) for name in handler.secret_params if name in params}
+        missing = [name for name in handler.secret_params if name not in secrets]
+        if missing:
+            raise ValueError(f"Missing job parameters: {', '.join(missing)}")
+        params = _json_safe(params)
+        key = dedup_key(handler, user_id, params)
+
+        with self._lock:
+            with self._db() as db:
+                existing = db.query(Job).filter(
+                    Job.status.in_(JobStatus.ACTIVE),
+                    Job.dedup_key == key
+                ).order_by(Job.created_at).first()
+                if existing is not None:
+                    self.deduplicated += 1
+                    return self._snapshot(existing), False
+
+                job = Job(
+                    kind=kind,
+                    user_id=user_id,
+                    dedup_key=key,
+                    params=params,
+                    status=JobStatus.QUEUED,
+                    progress={},
+                    partial_results=[],
+                )
+                db.add(job)
+                db.commit()
+                if secrets:
+                    self._secrets[job.id] = secrets
+                data = job.to_dict()
+                self.submitted += 1
+
+        self._dispatch()
+        return self.get(data["id"]) or data, True
+
+    def _dispatch(self) -> None:
+        """Start queued jobs, oldest first, within the worker and per-user limits"""
+        with self._lock:
+            if not self._started:
+                return
+            free = self.workers - len(self._running)
+            if free <= 0:
+                return
+            per_user = Counter(r.user_id or ANONYMOUS_USER for r in self._running.values())
+
+            starting = []
+            now = datetime.utcnow()
+            with self._db() as db:
+                for job in db.query(Job).filter(Job.status == JobStatus.QUEUED).order_by(Job.created_at, Job.id):
+                    if len(starting) == free:
+                        break
+                    bucket = job.user_id or ANONYMOUS_USER
+                    if per_user[bucket] >= self.max_per_user:
+                        continue
+                    per_user[bucket] += 1
+                    job.status = JobStatus.RUNNING
+                    job.started_at = now
+                    job.attempts = (job.attempts or 0) + 1
+                    starting.append((job.id, job.user_id, job.kind, dict(job.params or {})))
+                db.commit()
+
+            executor = self._get_executor()
+            for job_id, user_id, kind, params in starting:
+                running = _RunningJob(job_id=job_id, user_id=user_id)
+                running.context = JobContext(self, job_id, params, self._secrets.get(job_id, {}), running.cancel)
+                self._running[job_id] = running
+                self._publish(job_id, {"type": "status", "job": self._snapshot_running(running, kind, user_id)})
+                executor.submit(self._run, running, kind, params)
+
+    # ==================== Running ====================
+
+    def _run(self, running: _RunningJob, kind: str, params: Dict[str, Any]) -> None:
+        ctx = running.context
+        result, error = None, None
+        try:
+            handler = self.handlers[kind]
+            kwargs = {**params, **ctx.secrets}
+            if handler.is_async:
+                result = self._run_async(running, handler.run(ctx, **kwargs))
+            else:
+                result = handler.run(ctx, **kwargs)
+            status = JobStatus.COMPLETED
+        except (JobCancelled, CancelledError, asyncio.CancelledError):
+            status = JobStatus.CANCELLED
+        except Exception as e:
+            logger.exception(f"Job {running.job_id} ({kind}) failed")
+            status, error = JobStatus.FAILED, str(e)
+
+        if running.interrupted:
+            with self._lock:
+                self._running.pop(running.job_id, None)
+            return
+        self._finish(running, status, result, error)
+
+    def _run_async(self, running: _RunningJob, coroutine) -> Any:
+        """Run an async handler on the application's loop, waiting in this worker"""
+        loop = self._loop
+        if loop is None or loop.is_closed() or not loop.is_running():
+            return asyncio.run(coroutine)
+
+        future = asyncio.run_coroutine_threadsafe(coroutine, loop)
+        running.future = future
+        while True:
+            try:
+                return future.result(timeout=_ASYNC_POLL_SECONDS)
+            except FutureTimeoutError:
+                if running.cancel.is_set():
+                    future.cancel()
+
+    def _finish(self, running: _RunningJob, status: str, result: Any, error: Optional[str]) -> None:
+        ctx = running.context
+        data = None
+        with self._lock:
+            try:
+                with self._db() as db:
+                    job = db.get(Job, running.job_id)
+                    if job is not None:
+                        job.status = status
+                        job.result = _json_safe(result)
+                        job.error = error
+                        job.progress_percent = 100.0 if status == JobStatus.COMPLETED else ctx.progress_percent
+                        job.current_stage = ctx.current_stage
+                        job.progress = dict(ctx.counters)
+                        job.partial_results = list(ctx.partial_results)
+                        job.completed_at = datetime.utcnow()
+                        db.commit()
+                        data = job.to_dict()
+            except Exception:
+                logger.exception(f"Could not record the end of job {running.job_id}")
+            self._running.pop(running.job_id, None)
+            self._secrets.pop(running.job_id, None)
+            self.finished[status] += 1
+
+        if data is not None:
+            self._publish(running.job_id, {"type": "status", "job": data}, final=True)
+        self._dispatch()
+
+    def _on_progress(self, ctx: JobContext, partial: Any = None) -> None:
+        """A handler reported progress: stream it, and write it now and then"""
+        event = {
+            "type": "progress" if partial is None else "partial",
+            "job_id": ctx.job_id,
+            "progress_percent": round(ctx.progress_percent, 1),
+            "current_stage": ctx.current_stage,
+            "progress": dict(ctx.counters),
+        }
+        if partial is not None:
+            event["partial"] = partial
+        self._publish(ctx.job_id, event)
+
+        now = time.monotonic()
+        if now - ctx._last_write < PROGRESS_WRITE_INTERVAL:
+            return
+        ctx._last_write = now
+        try:
+            with self._db() as db:
+                job = db.get(Job, ctx.job_id)
+                if job is None:
+                    return
+                job.progress_percent = ctx.progress_percent
+                job.current_stage = ctx.current_stage
+                job.progress = dict(ctx.counters)
+                job.partial_results = list(ctx.partial_results)
+                if job.cancel_requested:
+                    ctx._cancel.set()
+                db.commit()
+        except Exception as e:
+            logger.warning(f"Could not save progress of job {ctx.job_id}: {e}")
+
+    # ==================== Queries & control ====================
+
+    def _snapshot(self, job: Job, include_results: bool = True) -> Dict[str, Any]:
+        """The job as stored, with a running job's latest in-memory progress"""
+        data = job.to_dict(include_results)
+        running = self._running.get(job.id)
+        if running is not None and running.context is not None:
+            ctx = running.context
+            data["progress_percent"] = round(ctx.progress_percent, 1)
+            data["current_stage"] = ctx.current_stage
+            data["progress"] = dict(ctx.counters)
+            if include_results:
+                data["partial_results"] = list(ctx.partial_results)
+        return data
+
+    def _snapshot_running(self, running: _RunningJob, kind: str, user_id: Optional[str]) -> Dict[str, Any]:
+        return {
+            "id": running.job_id,
+            "kind": kind,
+            "user_id": user_id,
+            "status": JobStatus.RUNNING,
+            "progress_percent": 0.0,
+            "current_stage": "",
+            "progress": {},
+        }
+
+    def get(self, job_id: str, include_results: bool = True) -> Optional[Dict[str, Any]]:
+        with self._lock, self._db() as db:
+            job = db.get(Job, job_id)
+            return self._snapshot(job, include_results) if job is not None else None
+
+    def list_jobs(
+        self,
+        user_id: Optional[str] = None,
+        status: Optional[str] = None,
+        kind: Optional[str] = None,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """Most recent jobs first, without their results"""
+        with self._lock, self._db() as db:
+            query = db.query(Job)
+            if user_id is not None:
+                query = query.filter(Job.user_id == user_id)
+            if status is not None:
+                query = query.filter(Job.status == status)
+            if kind is not None:
+                query = query.filter(Job.kind == kind)
+            return [
+                self._snapshot(job, include_results=False)
+                for job in query.order_by(Job.created_at.desc()).limit(limit)
+            ]
+
+    def find_active(self, kind: str, params: Dict[str, Any], user_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """The queued or running job a submission of (kind, params) would join"""
+        handler = self.handlers.get(kind)
+        if handler is None:
+            return None
+        key = dedup_key(handler, user_id, _json_safe(params))
+        with self._lock, self._db() as db:
+            job = db.query(Job).filter(
+                Job.status.in_(JobStatus.ACTIVE),
+                Job.dedup_key == key
+            ).order_by(Job.created_at).first()
+            return self._snapshot(job) if job is not None else None
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancel a queued or running job; finished jobs are returned unchanged"""
+        final = False
+        with self._lock:
+            with self._db() as db:
+                job = db.get(Job, job_id)
+                if job is None:
+                    return None
+                if job.status == JobStatus.QUEUED:
+                    job.status = JobStatus.CANCELLED
+                    job.completed_at = datetime.utcnow()
+                    self._secrets.pop(job_id, None)
+                    self.finished[JobStatus.CANCELLED] += 1
+                    final = True
+                elif job.status == JobStatus.RUNNING:
+                    job.cancel_requested = 1
+                    running = self._running.get(job_id)
+                    if running is not None:
+                        running.cancel.set()
+                        if running.future is not None:
+                            running.future.cancel()
+                db.commit()
+                data = self._snapshot(job)
+
+        if final:
+            self._publish(job_id, {"type": "status", "job": data}, final=True)
+        return data
+
+    # ==================== Streaming ====================
+
+    async def subscribe(self, job_id: str) -> Optional[JobSubscription]:
+        """
+        Stream a job's events. The first event is a snapshot of the job; the
+        stream ends after the job finishes.
+
+        The subscriber is registered before the snapshot loads (off the event
+        loop, without the manager lock), and events published meanwhile are
+        held until the snapshot is queued, so none are missed.
+        """
+        subscription = JobSubscription(self, job_id)
+        with self._lock:
+            self._subscriptions.setdefault(job_id, set()).add(subscription)
+        try:
+            data = await asyncio.to_thread(self.get, job_id)
+        except BaseException:
+            self._unsubscribe(subscription)
+            raise
+        if data is None:
+            self._unsubscribe(subscription)
+            return None
+        finished = data["status"] in JobStatus.FINISHED
+        if finished:
+            self._unsubscribe(subscription)
+        subscription._start({"type": "snapshot", "job": data}, final=finished)
+        return subscription
+
+    def _unsubscribe(self, subscription: JobSubscription) -> None:
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.job_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.job_id]
+
+    def _publish(self, job_id: str, event: Dict[str, Any], final: bool = False) -> None:
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(job_id, ()))
+            if final:
+                self._subscriptions.pop(job_id, None)
+        for subscription in subscriptions:
+            subscription.deliver(event)
+            if final:
+                subscription.deliver(None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_per_user": self.max_per_user,
+                "running": len(self._running),
+                "subscriptions": sum(len(s) for s in self._subscriptions.values()),
+                "submitted": self.submitted,
+                "deduplicated": self.deduplicated,
+                "recovered": self.recovered,
+                "finished": dict(self.finished),
+            }
+
+
+# Module-level singleton
+job_manager = JobManager()
@@ -2,11 +2,35 @@
 Lexical Editor Utilities
 Shared utilities for converting between Lexical editor JSON and other formats.
 Used by import/export services and chapter management.
+
+parse_lexical is the one place a Lexical state is read: it parses the JSON
+once (with orjson when installed), walks the tree iteratively and returns
+the plain text, rich paragraphs, paragraph offsets and word counts together.
+Results are memoized by a hash of the JSON string, so a save that extracts
+text, counts words, snapshots and exports walks a big chapter only once.
+
+Configuration:
+- LEXICAL_CACHE_ENTRIES: parsed documents kept in memory (default 256;
+  0 disables memoization)
 """
 
+import hashlib
 import json
+import os
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Any, List, Optional, Tuple, Union
+
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:  # Optional speedup
+    orjson = None
+    _json_loads = json.loads
+
+LEXICAL_CACHE_ENTRIES = int(os.getenv("LEXICAL_CACHE_ENTRIES", "256"))
 
 
 # Lexical format bitmask constants
@@ -65,10 +89,190 @@ class RichParagraph:
         return not self.runs or all(not run.text.strip() for run in self.runs)
 
 
+@dataclass
+class LexicalDocument:
+    """
+    Everything derived from one Lexical editor state, built in a single pass.
+
+    Memoized instances are shared between callers; treat them as read-only.
+    """
+    text: str = ""  # Plain text, blocks separated by newlines, stripped
+    paragraphs: List[RichParagraph] = field(default_factory=list)  # Top-level paragraphs/headings
+    paragraph_offsets: List[Tuple[int, int]] = field(default_factory=list)  # (start, end) of each paragraph in text
+    paragraph_word_counts: List[int] = field(default_factory=list)
+    word_count: int = 0
+    valid: bool = True  # False when the state wasn't parseable Lexical JSON
+
+
+# Blocks whose text ends with a newline in the plain text
+_BLOCK_TYPES = frozenset(("paragraph", "heading"))
+# Marks the end of a node's children on the traversal stack
+_CLOSE = object()
+
+
+def _heading_level(node: dict) -> int:
+    tag = node.get("tag", "h1")
+    if tag.startswith("h") and len(tag) == 2:
+        try:
+            return int(tag[1])
+        except ValueError:
+            return 1
+    return 0
+
+
+def _walk_lexical(state: dict) -> LexicalDocument:
+    """Iterative walk producing text, rich paragraphs, offsets and word counts"""
+    parts: List[str] = []
+    position = 0
+    paragraphs: List[RichParagraph] = []
+    spans: List[Tuple[int, int]] = []
+    current: Optional[RichParagraph] = None
+    current_node: Optional[dict] = None
+    current_start = 0
+
+    # (node, is_top_level_block) pairs, or (_CLOSE, node) after a node's children
+    stack: List[Tuple[Any, Any]] = [(state.get("root", {}), False)]
+    while stack:
+        node, info = stack.pop()
+        if node is _CLOSE:
+            if info is current_node:
+                spans.append((current_start, position))
+                current = current_node = None
+            if info.get("type") in _BLOCK_TYPES:
+                parts.append("\n")
+                position += 1
+            continue
+        if not isinstance(node, dict):
+            continue
+
+        node_type = node.get("type", "")
+        if node_type == "text" and "text" in node:
+            text = node["text"]
+            parts.append(text)
+            position += len(text)
+            if current is not None and text:
+                current.runs.append(TextRun.from_format_bitmask(text, node.get("format", 0)))
+
+        children = node.get("children")
+        starts_paragraph = info and node_type in _BLOCK_TYPES and current is None
+        if children is None:
+            if not starts_paragraph:
+                continue
+            children = []
+        if starts_paragraph:
+            current = RichParagraph(heading_level=_heading_level(node) if node_type == "heading" else 0)
+            current_node = node
+            current_start = position
+            paragraphs.append(current)
+        stack.append((_CLOSE, node))
+        # Children of a root (including a nested root) are top-level blocks
+        top_level = node_type == "root"
+        stack.extend((child, top_level) for child in reversed(children))
+
+    raw = "".join(parts)
+    text = raw.strip()
+    lead = len(raw) - len(raw.lstrip())
+    offsets = [
+        (min(max(start - lead, 0), len(text)), min(max(end - lead, 0), len(text)))
+        for start, end in spans
+    ]
+    paragraph_word_counts = [len(p.get_plain_text().split()) for p in paragraphs]
+    return LexicalDocument(
+        text=text,
+        paragraphs=paragraphs,
+        paragraph_offsets=offsets,
+        paragraph_word_counts=paragraph_word_counts,
+        word_count=len(text.split()),
+    )
+
+
+class LexicalDocumentCache:
+    """Parsed documents keyed by a hash of the JSON string, least recently used dropped"""
+
+    def __init__(self, max_entries: int = LEXICAL_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._documents: "OrderedDict[bytes, LexicalDocument]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: bytes) -> Optional[LexicalDocument]:
+        with self._lock:
+            document = self._documents.get(key)
+            if document is None:
+                self.misses += 1
+                return None
+            self._documents.move_to_end(key)
+            self.hits += 1
+            return document
+
+    def put(self, key: bytes, document: LexicalDocument):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._documents[key] = document
+            self._documents.move_to_end(key)
+            while len(self._documents) > self.max_entries:
+                self._documents.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._documents.clear()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._documents),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# Module-level singleton
+lexical_document_cache = LexicalDocumentCache()
+
+
+def parse_lexical(lexical_state: Union[str, bytes, dict, None]) -> LexicalDocument:
+    """
+    Parse a Lexical editor state once into text, rich paragraphs, offsets and word counts.
+
+    JSON strings are memoized by content hash, so every consumer of the same
+    state in a request (save, snapshot, export, analysis) shares one walk.
+    Unparseable input gives an empty document with valid=False.
+    """
+    if isinstance(lexical_state, dict):
+        try:
+            return _walk_lexical(lexical_state)
+        except Exception as e:
+            print(f"Failed to process lexical state: {e}")
+            return LexicalDocument(valid=False)
+
+    if not lexical_state or not lexical_state.strip():
+        return LexicalDocument()
+
+    raw = lexical_state.encode("utf-8") if isinstance(lexical_state, str) else lexical_state
+    key = hashlib.blake2b(raw, digest_size=16).digest()
+    document = lexical_document_cache.get(key)
+    if document is not None:
+        return document
+
+    try:
+        state = _json_loads(raw)
+        if not isinstance(state, dict):
+            raise ValueError("Lexical state is not a JSON object")
+        document = _walk_lexical(state)
+    except Exception as e:
+        print(f"Failed to process lexical state: {e}")
+        document = LexicalDocument(valid=False)
+    lexical_document_cache.put(key, document)
+    return document
+
+
 def extract_text_from_lexical(lexical_state_str: str) -> str:
     """
     Extract plain text from Lexical editor state JSON.
-    Recursively walks the node tree and concatenates text content.
+    Paragraphs and headings are separated by newlines.
 
     Args:
         lexical_state_str: JSON string containing Lexical editor state
@@ -76,43 +280,7 @@ def extract_text_from_lexical(lexical_state_str: str) -> str:
     Returns:
         Plain text extracted from the editor state
     """
-    try:
-        if not lexical_state_str or lexical_state_str.strip() == "":
-            return ""
-
-        state = json.loads(lexical_state_str)
-
-        def walk_nodes(node):
-            """Recursively extract text from Lexical nodes"""
-            text_parts = []
-
-            if isinstance(node, dict):
-                # Direct text content
-                if node.get("type") == "text" and "text" in node:
-                    text_parts.append(node["text"])
-
-                # Process children
-                if "children" in node:
-                    for child in node["children"]:
-                        text_parts.append(walk_nodes(child))
-
-                    # Add newline after paragraph
-                    if node.get("type") == "paragraph":
-                        text_parts.append("\n")
-
-            return "".join(text_parts)
-
-        # Start from root
-        root = state.get("root", {})
-        text = walk_nodes(root)
-
-        # Clean up extra newlines
-        text = text.strip()
-
-        return text
-    except Exception as e:
-        print(f"Failed to extract text from lexical state: {e}")
-        return ""
+    return parse_lexical(lexical_state_str).text
 
 
 def plain_text_to_lexical(text: str) -> dict:
@@ -248,80 +416,7 @@ def lexical_to_rich_paragraphs(lexical_state: str | dict) -> List[RichParagraph]
     Returns:
         List of RichParagraph objects with formatting preserved
     """
-    try:
-        if isinstance(lexical_state, str):
-            if not lexical_state or lexical_state.strip() == "":
-                return []
-            state = json.loads(lexical_state)
-        else:
-            state = lexical_state
-
-        paragraphs = []
-        root = state.get("root", {})
-
-        def extract_runs_from_node(node) -> List[TextRun]:
-            """Extract text runs from a node and its children."""
-            runs = []
-
-            if isinstance(node, dict):
-                node_type = node.get("type", "")
-
-                if node_type == "text":
-                    text = node.get("text", "")
-                    format_mask = node.get("format", 0)
-                    if text:
-                        runs.append(TextRun.from_format_bitmask(text, format_mask))
-
-                elif node_type == "linebreak":
-                    # Line breaks within a paragraph - could add as special run if needed
-                    pass
-
-                # Process children recursively
-                if "children" in node:
-                    for child in node["children"]:
-                        runs.extend(extract_runs_from_node(child))
-
-            return runs
-
-        # Process root children (paragraphs, headings, etc.)
-        for child in root.get("children", []):
-            child_type = child.get("type", "")
-
-            if child_type in ("paragraph", "heading"):
-                runs = extract_runs_from_node(child)
-
-                # Determine heading level
-                heading_level = 0
-                if child_type == "heading":
-                    tag = child.get("tag", "h1")
-                    if tag.startswith("h") and len(tag) == 2:
-                        try:
-                            heading_level = int(tag[1])
-                        except ValueError:
-                            heading_level = 1
-
-                paragraphs.append(RichParagraph(runs=runs, heading_level=heading_level))
-
-            elif child_type == "root":
-                # Nested root - process recursively
-                for nested_child in child.get("children", []):
-                    if nested_child.get("type") in ("paragraph", "heading"):
-                        runs = extract_runs_from_node(nested_child)
-                        heading_level = 0
-                        if nested_child.get("type") == "heading":
-                            tag = nested_child.get("tag", "h1")
-                            if tag.startswith("h") and len(tag) == 2:
-                                try:
-                                    heading_level = int(tag[1])
-                                except ValueError:
-                                    heading_level = 1
-                        paragraphs.append(RichParagraph(runs=runs, heading_level=heading_level))
-
-        return paragraphs
-
-    except Exception as e:
-        print(f"Failed to convert lexical state to rich paragraphs: {e}")
-        return []
+    return parse_lexical(lexical_state).paragraphs
 
 
 def plain_text_to_lexical_json(text: str) -> str:
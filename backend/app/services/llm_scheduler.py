@@ -0,0 +1,404 @@
+"""
+LLM Scheduler - Provider-aware concurrency limiting and retry for LLM traffic.
+
+Every outbound LLM call is routed through a lane keyed by (provider, API key).
+Each lane has:
+- A concurrency cap (max in-flight calls)
+- A token bucket (requests per minute with a small burst allowance)
+- A priority queue so interactive chat jumps ahead of background scans
+- A shared cooldown set from the provider's Retry-After header, so one 429
+  pauses the whole lane instead of every caller hammering the API
+
+Rate-limited and transient failures (429, 502, 503, 504, 529) are retried
+with jittered exponential backoff, honoring Retry-After when present.
+
+Limits can be tuned per provider with environment variables, e.g.
+LLM_OPENROUTER_MAX_CONCURRENT=4 or LLM_ANTHROPIC_RPM=50. The local lane
+defaults to 4 in flight (LLM_LOCAL_MAX_CONCURRENT=1 for strictly serial
+local calls); see local_inference_worker.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import time
+import heapq
+import itertools
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class RequestPriority(IntEnum):
+    """Scheduling priority - lower values are dispatched first"""
+    INTERACTIVE = 0  # Chat, brainstorm buttons, anything a writer is waiting on
+    ANALYSIS = 1  # Fast analysis (outline analysis, batch suggestions)
+    BACKGROUND = 2  # Scans, wiki merges, anything fire-and-forget
+
+
+# Status codes worth retrying. 529 is Anthropic's "overloaded".
+RETRYABLE_STATUS_CODES = {429, 502, 503, 504, 529}
+
+
+@dataclass
+class ProviderLimits:
+    """Concurrency and rate limits for one (provider, key) lane"""
+    max_concurrent: int = 4
+    requests_per_minute: float = 60.0
+    burst: int = 4
+    max_retries: int = 3
+    base_backoff_seconds: float = 1.0
+    max_backoff_seconds: float = 30.0
+
+
+DEFAULT_PROVIDER_LIMITS: Dict[str, ProviderLimits] = {
+    "openai": ProviderLimits(max_concurrent=8, requests_per_minute=120.0, burst=8),
+    "anthropic": ProviderLimits(max_concurrent=4, requests_per_minute=50.0, burst=4),
+    "openrouter": ProviderLimits(max_concurrent=6, requests_per_minute=60.0, burst=6),
+    # The local inference worker serializes per model; a few in flight lets it
+    # group requests that share a prompt prefix
+    "local": ProviderLimits(max_concurrent=4, requests_per_minute=0.0, burst=4, max_retries=0),
+}
+
+
+def _limits_from_env(provider: str, base: ProviderLimits) -> ProviderLimits:
+    """Apply LLM_<PROVIDER>_MAX_CONCURRENT / _RPM overrides"""
+    prefix = f"LLM_{provider.upper()}_"
+    max_concurrent = os.getenv(prefix + "MAX_CONCURRENT")
+    rpm = os.getenv(prefix + "RPM")
+    return ProviderLimits(
+        max_concurrent=int(max_concurrent) if max_concurrent else base.max_concurrent,
+        requests_per_minute=float(rpm) if rpm else base.requests_per_minute,
+        burst=base.burst,
+        max_retries=base.max_retries,
+        base_backoff_seconds=base.base_backoff_seconds,
+        max_backoff_seconds=base.max_backoff_seconds,
+    )
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header (delta-seconds or HTTP-date) into seconds.
+
+    Returns None if the header is missing or malformed.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def _status_and_retry_after(error: BaseException) -> Tuple[Optional[int], Optional[float]]:
+    """Pull an HTTP status and Retry-After from provider SDK / httpx exceptions"""
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        retry_after = parse_retry_after(headers.get("retry-after"))
+    except AttributeError:
+        retry_after = None
+    return status, retry_after
+
+
+@dataclass
+class LaneStats:
+    """Counters for one lane"""
+    dispatched: int = 0
+    retries: int = 0
+    rate_limited: int = 0
+    failures: int = 0
+    total_wait_seconds: float = 0.0
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    future: asyncio.Future = field(compare=False)
+    enqueued_at: float = field(compare=False, default=0.0)
+
+
+class ProviderLane:
+    """Priority-ordered slot dispenser for one (provider, key) pair"""
+
+    def __init__(self, provider: str, key_id: str, limits: ProviderLimits):
+        self.provider = provider
+        self.key_id = key_id
+        self.limits = limits
+        self.active = 0
+        self.stats = LaneStats()
+        self._queue: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._tokens = float(limits.burst)
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+
+    def _refill(self, now: float):
+        if self.limits.requests_per_minute <= 0:
+            self._tokens = float(self.limits.burst)
+            return
+        rate = self.limits.requests_per_minute / 60.0
+        self._tokens = min(
+            float(self.limits.burst),
+            self._tokens + (now - self._last_refill) * rate,
+        )
+        self._last_refill = now
+
+    def _schedule_wakeup(self, delay: float):
+        loop = asyncio.get_running_loop()
+        self._wakeup = loop.call_later(max(delay, 0.001), self._dispatch)
+
+    def _dispatch(self):
+        """Hand out slots to the highest-priority waiters that can run now"""
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+        now = time.monotonic()
+        self._refill(now)
+
+        while self._queue and self.active < self.limits.max_concurrent:
+            if self._queue[0].future.done():  # Cancelled while waiting
+                heapq.heappop(self._queue)
+                continue
+
+            if now < self._paused_until:
+                self._schedule_wakeup(self._paused_until - now)
+                return
+
+            if self._tokens < 1.0:
+                rate = self.limits.requests_per_minute / 60.0
+                self._schedule_wakeup((1.0 - self._tokens) / rate)
+                return
+
+            waiter = heapq.heappop(self._queue)
+            self._tokens -= 1.0
+            self.active += 1
+            self.stats.dispatched += 1
+            self.stats.total_wait_seconds += now - waiter.enqueued_at
+            waiter.future.set_result(None)
+
+    async def acquire(self, priority: int):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(
+            self._queue,
+            _Waiter(int(priority), next(self._seq), future, time.monotonic()),
+        )
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Slot was granted just as we were cancelled - give it back
+                self.release()
+            raise
+
+    def release(self):
+        self.active -= 1
+        self._dispatch()
+
+    def pause(self, seconds: float):
+        """Stop dispatching for this lane until the cooldown expires"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def queue_depth(self) -> Dict[str, int]:
+        depth = {p.name.lower(): 0 for p in RequestPriority}
+        for waiter in self._queue:
+            if waiter.future.done():
+                continue
+            try:
+                depth[RequestPriority(waiter.priority).name.lower()] += 1
+            except ValueError:
+                depth.setdefault("other", 0)
+                depth["other"] += 1
+        return depth
+
+    def get_metrics(self) -> Dict[str, Any]:
+        depth = self.queue_depth()
+        dispatched = self.stats.dispatched
+        return {
+            "provider": self.provider,
+            "key_id": self.key_id,
+            "active": self.active,
+            "max_concurrent": self.limits.max_concurrent,
+            "queue_depth": sum(depth.values()),
+            "queue_depth_by_priority": depth,
+            "paused_for_seconds": round(max(0.0, self._paused_until - time.monotonic()), 2),
+            "dispatched": dispatched,
+            "retries": self.stats.retries,
+            "rate_limited": self.stats.rate_limited,
+            "failures": self.stats.failures,
+            "avg_wait_seconds": round(self.stats.total_wait_seconds / dispatched, 4) if dispatched else 0.0,
+        }
+
+
+class LLMScheduler:
+    """
+    Routes LLM calls through per-(provider, key) lanes.
+
+    Usage:
+        result = await llm_scheduler.run(
+            "anthropic", api_key, lambda: model.ainvoke(messages),
+            priority=RequestPriority.INTERACTIVE,
+        )
+
+        response = await llm_scheduler.run_http(
+            "openrouter", api_key, lambda: client.post(url, json=payload),
+            priority=RequestPriority.ANALYSIS,
+        )
+    """
+
+    def __init__(self, limits: Optional[Dict[str, ProviderLimits]] = None):
+        self._limits = dict(limits or DEFAULT_PROVIDER_LIMITS)
+        self._lanes: Dict[Tuple[str, str], ProviderLane] = {}
+
+    def set_limits(self, provider: str, limits: ProviderLimits):
+        """Override limits for a provider (applies to lanes created afterwards)"""
+        self._limits[provider] = limits
+
+    def _lane(self, provider: str, api_key: Optional[str]) -> ProviderLane:
+        # Never keep raw keys in memory longer than needed - lanes use a digest
+        key_digest = hashlib.sha256((api_key or "").encode()).hexdigest()[:12]
+        lane_key = (provider, key_digest)
+        lane = self._lanes.get(lane_key)
+        if lane is None:
+            base = self._limits.get(provider, ProviderLimits())
+            lane = ProviderLane(provider, key_digest[:8], _limits_from_env(provider, base))
+            self._lanes[lane_key] = lane
+        return lane
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        provider: str,
+        api_key: Optional[str],
+        priority: int = RequestPriority.INTERACTIVE,
+    ):
+        """Hold one concurrency slot for the duration of the block"""
+        lane = self._lane(provider, api_key)
+        await lane.acquire(priority)
+        try:
+            yield lane
+        finally:
+            lane.release()
+
+    def _backoff(self, limits: ProviderLimits, attempt: int, retry_after: Optional[float]) -> float:
+        """Retry-After if the provider sent one, else full-jitter exponential backoff"""
+        if retry_after is not None:
+            return min(retry_after, limits.max_backoff_seconds)
+        ceiling = min(limits.max_backoff_seconds, limits.base_backoff_seconds * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def _on_retryable(self, lane: ProviderLane, status: int, retry_after: Optional[float], attempt: int) -> float:
+        delay = self._backoff(lane.limits, attempt, retry_after)
+        lane.stats.retries += 1
+        if status == 429:
+            lane.stats.rate_limited += 1
+            # Pause the whole lane so queued callers don't pile onto the limit
+            lane.pause(delay)
+        logger.warning(
+            f"{lane.provider} returned {status}; retry {attempt + 1}/{lane.limits.max_retries} in {delay:.2f}s"
+        )
+        return delay
+
+    async def run(
+        self,
+        provider: str,
+        api_key: Optional[str],
+        factory: Callable[[], Awaitable[Any]],
+        priority: int = RequestPriority.INTERACTIVE,
+    ) -> Any:
+        """
+        Run factory() under the lane's limits, retrying retryable exceptions.
+
+        Exceptions are classified by their status_code / response.status_code
+        (openai, anthropic and httpx errors all expose one).
+        """
+        lane = self._lane(provider, api_key)
+        attempt = 0
+        while True:
+            async with self.slot(provider, api_key, priority):
+                try:
+                    return await factory()
+                except Exception as e:
+                    status, retry_after = _status_and_retry_after(e)
+                    if status not in RETRYABLE_STATUS_CODES or attempt >= lane.limits.max_retries:
+                        lane.stats.failures += 1
+                        raise
+                    delay = self._on_retryable(lane, status, retry_after, attempt)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def run_http(
+        self,
+        provider: str,
+        api_key: Optional[str],
+        send: Callable[[], Awaitable[Any]],
+        priority: int = RequestPriority.INTERACTIVE,
+    ) -> Any:
+        """
+        Run an httpx request under the lane's limits.
+
+        Retryable status codes are retried; the final response is returned
+        as-is so callers keep their existing status handling.
+        """
+        lane = self._lane(provider, api_key)
+        attempt = 0
+        while True:
+            async with self.slot(provider, api_key, priority):
+                response = await send()
+                status = response.status_code
+                if status not in RETRYABLE_STATUS_CODES or attempt >= lane.limits.max_retries:
+                    if status in RETRYABLE_STATUS_CODES:
+                        lane.stats.failures += 1
+                    return response
+                retry_after = parse_retry_after(response.headers.get("retry-after"))
+                delay = self._on_retryable(lane, status, retry_after, attempt)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Queue depth and counters for every lane, plus per-provider totals"""
+        lanes = [lane.get_metrics() for lane in self._lanes.values()]
+        providers: Dict[str, Dict[str, int]] = {}
+        for lane in lanes:
+            totals = providers.setdefault(
+                lane["provider"],
+                {"lanes": 0, "active": 0, "queue_depth": 0, "retries": 0, "rate_limited": 0},
+            )
+            totals["lanes"] += 1
+            totals["active"] += lane["active"]
+            totals["queue_depth"] += lane["queue_depth"]
+            totals["retries"] += lane["retries"]
+            totals["rate_limited"] += lane["rate_limited"]
+        return {
+            "total_queue_depth": sum(lane["queue_depth"] for lane in lanes),
+            "total_active": sum(lane["active"] for lane in lanes),
+            "providers": providers,
+            "lanes": lanes,
+        }
+
+    def reset(self):
+        """Drop all lanes (tests only - in-flight holders keep their lane object)"""
+        self._lanes.clear()
+
+
+# Module-level singleton
+llm_scheduler = LLMScheduler()
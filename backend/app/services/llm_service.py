@@ -21,8 +21,9 @@ explicit opt-out headers, content sanitization, and audit logging.
 """
 
 import json
+import hashlib
 from typing import Optional, Dict, Any, List, AsyncGenerator
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from enum import Enum
 import asyncio
 
@@ -32,6 +33,15 @@ from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
 from langchain_core.callbacks import AsyncCallbackHandler
 
+from app.services.request_coalescer import llm_request_coalescer, make_request_key
+from app.services.llm_scheduler import llm_scheduler, RequestPriority
+from app.services.prompt_cache import (
+    MIN_CACHEABLE_CHARS,
+    extract_cache_usage,
+    supports_cache_markers,
+    to_cached_content,
+)
+
 
 class LLMProvider(str, Enum):
     """Supported LLM providers"""
@@ -50,6 +60,7 @@ class LLMResponse:
     usage: Dict[str, int]  # prompt_tokens, completion_tokens, total_tokens
     cost: float  # Estimated cost in USD
     raw_response: Optional[Any] = None
+    coalesced: bool = False  # True if this reused an identical in-flight request
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary"""
@@ -58,7 +69,8 @@ class LLMResponse:
             "model": self.model,
             "provider": self.provider.value,
             "usage": self.usage,
-            "cost": self.cost
+            "cost": self.cost,
+            "coalesced": self.coalesced,
         }
 
 
@@ -78,6 +90,9 @@ class LLMConfig:
     n_ctx: int = 4096
     n_gpu_layers: int = -1
 
+    # Scheduling priority within the provider's rate-limited lane
+    priority: RequestPriority = RequestPriority.INTERACTIVE
+
 
 # Pricing per 1M tokens (input, output)
 PRICING = {
@@ -200,23 +215,55 @@ class LLMService:
         """Public wrapper for _get_langchain_model - used by agents for tool calling"""
         return self._get_langchain_model(config)
 
-    def convert_messages(self, messages: List[Dict[str, str]]):
+    def convert_messages(self, messages: List[Dict[str, str]], config: Optional[LLMConfig] = None):
         """Public wrapper for _convert_messages - used by agents for tool calling"""
-        return self._convert_messages(messages)
+        return self._convert_messages(messages, config)
+
+    async def invoke_model(self, config: LLMConfig, model: Any, messages: List[Any]) -> Any:
+        """
+        Invoke a LangChain model through the provider scheduler.
+
+        Used by agents that drive tool-calling loops on a model from
+        get_langchain_model(), so those calls share the same per-provider
+        concurrency limits and 429 retry handling as generate().
+        """
+        provider = config.provider.value if hasattr(config.provider, "value") else str(config.provider)
+        return await llm_scheduler.run(
+            provider,
+            config.api_key,
+            lambda: model.ainvoke(messages),
+            priority=config.priority,
+        )
 
     def _get_local_model(self, config: LLMConfig):
         """Get or initialize local llama-cpp model"""
-        from app.services.local_llm_service import LocalLLMService
-        local_service = LocalLLMService()
-        return local_service.get_langchain_model(config)
+        # Use the shared service so the loaded model (and its KV cache) survives
+        # between calls instead of being reloaded every time
+        from app.services.local_llm_service import local_llm_service
+        return local_llm_service.get_langchain_model(config)
+
+    def _convert_messages(self, messages: List[Dict[str, str]], config: Optional[LLMConfig] = None):
+        """
+        Convert dict messages to LangChain message objects
+
+        A message with "cache": True ends a cacheable prompt prefix. For
+        providers with explicit prompt caching (Anthropic, Anthropic models via
+        OpenRouter) its content gets a cache_control breakpoint; elsewhere the
+        flag is ignored and the stable prefix benefits from automatic caching.
+        """
+        use_markers = config is not None and supports_cache_markers(
+            config.provider.value if hasattr(config.provider, "value") else str(config.provider),
+            config.model,
+        )
 
-    def _convert_messages(self, messages: List[Dict[str, str]]):
-        """Convert dict messages to LangChain message objects"""
         converted = []
         for msg in messages:
             role = msg.get("role", "user")
             content = msg.get("content", "")
 
+            if use_markers and msg.get("cache") and len(content) >= MIN_CACHEABLE_CHARS:
+                content = to_cached_content(content)
+
             if role == "system":
                 converted.append(SystemMessage(content=content))
             elif role == "assistant":
@@ -226,28 +273,74 @@ class LLMService:
 
         return converted
 
+    def _make_coalescing_key(self, config: LLMConfig, messages: List[Dict[str, str]]) -> str:
+        """Key identifying requests that would produce interchangeable responses"""
+        # Hash the API key so two users with the same prompt never share a key slot
+        key_digest = hashlib.sha256((config.api_key or "").encode()).hexdigest()[:16]
+        provider = config.provider.value if hasattr(config.provider, "value") else str(config.provider)
+        return make_request_key(
+            provider,
+            config.model,
+            config.temperature,
+            config.max_tokens,
+            config.response_format,
+            config.base_url,
+            config.model_path,
+            key_digest,
+            messages,
+        )
+
     async def generate(
         self,
         config: LLMConfig,
         messages: List[Dict[str, str]],
-        stream: bool = False
+        stream: bool = False,
+        coalesce: bool = True,
     ) -> LLMResponse:
         """
         Generate a response from the configured LLM
 
+        Identical concurrent requests (same config, API key and messages) are
+        coalesced: only one call reaches the provider and every caller gets
+        its result. Followers receive a copy with coalesced=True.
+
         Args:
             config: LLM configuration with provider, model, and API key
             messages: List of message dicts with 'role' and 'content'
             stream: Whether to stream the response (not yet implemented)
+            coalesce: Share in-flight results with identical concurrent requests
 
         Returns:
             LLMResponse with content, usage, and cost information
         """
+        if not coalesce:
+            return await self._generate(config, messages)
+
+        key = self._make_coalescing_key(config, messages)
+        # Snapshot messages so a caller mutating its list can't alter the shared call
+        frozen_messages = [dict(m) for m in messages]
+        response, was_follower = await llm_request_coalescer.run(
+            key, lambda: self._generate(config, frozen_messages)
+        )
+        if was_follower:
+            return replace(response, coalesced=True)
+        return response
+
+    def get_coalescing_stats(self) -> Dict[str, Any]:
+        """Counters for in-flight request deduplication"""
+        return llm_request_coalescer.get_stats()
+
+    async def _generate(
+        self,
+        config: LLMConfig,
+        messages: List[Dict[str, str]],
+    ) -> LLMResponse:
+        """Invoke the provider (no coalescing) under its scheduler lane"""
         model = self._get_langchain_model(config)
-        langchain_messages = self._convert_messages(messages)
+        langchain_messages = self._convert_messages(messages, config)
 
-        # Invoke the model
-        response = await model.ainvoke(langchain_messages)
+        # Invoke the model, waiting for a slot in the provider's lane
+        response = await self.invoke_model(config, model, langchain_messages)
 
         # Extract usage info
         usage = {
@@ -264,6 +357,13 @@ class LLMService:
             elif "token_usage" in metadata:
                 usage = metadata["token_usage"]
 
+        # Report prompt-cache reuse (provider cache reads / writes) when present
+        cache_read, cache_write = extract_cache_usage(response)
+        if cache_read or cache_write:
+            usage = dict(usage)
+            usage["cached_prompt_tokens"] = cache_read
+            usage["cache_creation_tokens"] = cache_write
+
         # Calculate cost
         cost = calculate_cost(
             config.model,
@@ -309,6 +409,7 @@ class LLMService:
             model_path=config.model_path,
             n_ctx=config.n_ctx,
             n_gpu_layers=config.n_gpu_layers,
+            priority=config.priority,
         )
 
         # Add schema to system message if provided
@@ -0,0 +1,457 @@
+"""
+Local Inference Worker - Dedicated execution for llama.cpp models.
+
+A llama-cpp-python `Llama` object is not thread-safe and evaluates one
+sequence at a time. Calling it from several `asyncio.to_thread` workers makes
+concurrent agents race on the same KV cache. This module owns every loaded
+model and gives each one:
+- A dedicated worker thread that drains a request queue, one call at a time
+- Prefix-affinity scheduling: when several requests are waiting, the one
+  sharing the last request's prompt prefix (e.g. the same agent's system
+  prompt) runs next, so llama.cpp only evaluates the new suffix. This is the
+  nearest thing to continuous batching the high-level llama-cpp-python API
+  allows (it has no multi-sequence batch decode)
+- LRU residency bounded by a RAM budget, so switching between a few models
+  doesn't reload weights on every call. acquire() pins a model until the
+  matching release(), and pinned models are never evicted. Models are keyed
+  by (path, n_ctx): a caller needing a larger context window gets its own
+  instance rather than tearing down one in use. Weights load outside the
+  worker lock; concurrent callers for the same model wait on that load
+- Warm-up on startup (LOCAL_LLM_WARM_MODELS)
+- Queue-wait and tokens/sec metrics
+
+Configuration:
+- LOCAL_LLM_MAX_RESIDENT_MB: RAM budget for resident models
+  (default: half of physical memory)
+- LOCAL_LLM_WARM_MODELS: comma-separated GGUF paths to load at startup, or
+  "recommended" for LocalLLMService.get_recommended_model()
+- LLM_LOCAL_MAX_CONCURRENT (llm_scheduler): local calls in flight across
+  models (default 4). More than one lets requests queue here, where prefix
+  affinity can reorder them; set 1 for strictly one call at a time
+"""
+
+import asyncio
+import concurrent.futures
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Prompt characters used to group requests by shared prefix
+PREFIX_AFFINITY_CHARS = 2048
+
+# How far past the queue head affinity scheduling may look
+AFFINITY_LOOKAHEAD = 8
+
+# Consecutive out-of-order picks before the queue head must run (no starvation)
+MAX_AFFINITY_STREAK = 4
+
+# Weights are mmapped; KV cache and scratch buffers come on top of the file size
+RESIDENT_OVERHEAD_RATIO = 1.2
+
+# RAM budget for llama.cpp prompt-state cache (KV snapshots keyed by prompt prefix)
+PROMPT_CACHE_MB = int(os.getenv("LOCAL_LLM_PROMPT_CACHE_MB", "512"))
+
+
+def _default_resident_budget() -> int:
+    configured = os.getenv("LOCAL_LLM_MAX_RESIDENT_MB")
+    if configured:
+        return int(configured) * 1024 * 1024
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // 2
+    except (ValueError, OSError, AttributeError):
+        return 8 * 1024 ** 3
+
+
+def _load_llama(model_path: str, n_ctx: int, n_gpu_layers: int) -> Any:
+    """Load a llama-cpp model, auto-detecting GPU offload when n_gpu_layers is -1"""
+    from llama_cpp import Llama
+
+    n_gpu = n_gpu_layers
+    if n_gpu == -1:
+        try:
+            import torch
+            if torch.cuda.is_available():
+                n_gpu = 999  # Offload all layers to GPU
+            elif hasattr(torch.backends, 'mps') and torch.backends.mps.is_available():
+                n_gpu = 999  # Apple Metal
+            else:
+                n_gpu = 0
+        except ImportError:
+            n_gpu = 0  # CPU only
+
+    llm = Llama(model_path=model_path, n_ctx=n_ctx, n_gpu_layers=n_gpu, verbose=False)
+
+    # Keep KV snapshots of recent prompt prefixes in RAM (if supported)
+    if PROMPT_CACHE_MB > 0:
+        try:
+            from llama_cpp import LlamaRAMCache
+            llm.set_cache(LlamaRAMCache(capacity_bytes=PROMPT_CACHE_MB * 1024 * 1024))
+        except (ImportError, AttributeError):
+            # Older llama-cpp-python builds - in-place prefix reuse still applies
+            pass
+    return llm
+
+
+def common_prefix_length(a: List[int], b: List[int]) -> int:
+    """Number of leading tokens two token sequences share"""
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+@dataclass
+class InferenceRequest:
+    """One queued completion"""
+    prompt: str
+    params: Dict[str, Any]
+    future: concurrent.futures.Future
+    prefix_key: str
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class ModelMetrics:
+    """Counters for one resident model"""
+    requests: int = 0
+    failures: int = 0
+    queue_wait_seconds_total: float = 0.0
+    queue_wait_seconds_max: float = 0.0
+    generation_seconds_total: float = 0.0
+    completion_tokens_total: int = 0
+    prompt_tokens_total: int = 0
+    cached_prompt_tokens_total: int = 0
+    affinity_picks: int = 0  # Requests pulled forward to reuse the prefix
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "avg_queue_wait_ms": round(1000 * self.queue_wait_seconds_total / self.requests, 1) if self.requests else 0.0,
+            "max_queue_wait_ms": round(1000 * self.queue_wait_seconds_max, 1),
+            "tokens_per_second": round(self.completion_tokens_total / self.generation_seconds_total, 2)
+            if self.generation_seconds_total else 0.0,
+            "completion_tokens": self.completion_tokens_total,
+            "prompt_tokens": self.prompt_tokens_total,
+            "cached_prompt_tokens": self.cached_prompt_tokens_total,
+            "affinity_picks": self.affinity_picks,
+        }
+
+
+class ResidentModel:
+    """A loaded model plus the thread that serializes calls into it"""
+
+    def __init__(self, model_path: str, llm: Any, size_bytes: int, n_ctx: int):
+        self.model_path = model_path
+        self.llm = llm
+        self.size_bytes = size_bytes
+        self.n_ctx = n_ctx
+        self.metrics = ModelMetrics()
+        self.last_used = time.monotonic()
+        self.busy = False
+        self.pins = 0  # Callers between acquire() and release() (guarded by the worker lock)
+        self._queue: Deque[InferenceRequest] = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._last_prefix_key: Optional[str] = None
+        self._last_prompt_tokens: List[int] = []
+        self._affinity_streak = 0
+        self._thread = threading.Thread(
+            target=self._run, name=f"local-llm:{os.path.basename(model_path)}", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    @property
+    def idle(self) -> bool:
+        return not self.pins and not self.busy and not self._queue
+
+    def submit(self, request: InferenceRequest):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"Model {self.model_path} was unloaded")
+            self._queue.append(request)
+            self._cond.notify()
+
+    def close(self):
+        """Stop accepting work; queued requests fail, the running one finishes"""
+        with self._cond:
+            self._closed = True
+            pending = list(self._queue)
+            self._queue.clear()
+            self._cond.notify()
+        for request in pending:
+            request.future.set_exception(RuntimeError(f"Model {self.model_path} was unloaded"))
+
+    def _next_request(self) -> InferenceRequest:
+        """Prefer a waiting request with the same prefix as the last one run"""
+        head = self._queue[0]
+        if (
+            self._last_prefix_key is not None
+            and head.prefix_key != self._last_prefix_key
+            and self._affinity_streak < MAX_AFFINITY_STREAK
+        ):
+            for index in range(1, min(len(self._queue), AFFINITY_LOOKAHEAD)):
+                if self._queue[index].prefix_key == self._last_prefix_key:
+                    request = self._queue[index]
+                    del self._queue[index]
+                    self._affinity_streak += 1
+                    self.metrics.affinity_picks += 1
+                    return request
+        self._affinity_streak = 0
+        return self._queue.popleft()
+
+    def _count_reused_prefix(self, prompt: str) -> int:
+        """Tokens of this prompt already evaluated by the previous call"""
+        try:
+            tokens = self.llm.tokenize(prompt.encode("utf-8"))
+        except Exception:
+            return 0
+        reused = common_prefix_length(self._last_prompt_tokens, tokens)
+        self._last_prompt_tokens = tokens
+        return reused
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                request = self._next_request()
+                self.busy = True
+
+            started = time.monotonic()
+            wait = started - request.enqueued_at
+            self.metrics.queue_wait_seconds_total += wait
+            self.metrics.queue_wait_seconds_max = max(self.metrics.queue_wait_seconds_max, wait)
+            self.metrics.requests += 1
+            try:
+                if request.future.set_running_or_notify_cancel():
+                    cached = self._count_reused_prefix(request.prompt)
+                    response = self.llm(request.prompt, echo=False, **request.params)
+                    elapsed = time.monotonic() - started
+                    usage = response.setdefault("usage", {})
+                    usage["cached_prompt_tokens"] = cached
+                    self.metrics.generation_seconds_total += elapsed
+                    self.metrics.completion_tokens_total += usage.get("completion_tokens", 0)
+                    self.metrics.prompt_tokens_total += usage.get("prompt_tokens", 0)
+                    self.metrics.cached_prompt_tokens_total += cached
+                    self._last_prefix_key = request.prefix_key
+                    request.future.set_result(response)
+            except Exception as e:
+                self.metrics.failures += 1
+                # A failed eval leaves the KV state unknown
+                self._last_prompt_tokens = []
+                self._last_prefix_key = None
+                request.future.set_exception(e)
+            finally:
+                self.last_used = time.monotonic()
+                self.busy = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "model_path": self.model_path,
+            "size_mb": round(self.size_bytes / (1024 * 1024), 1),
+            "n_ctx": self.n_ctx,
+            "queue_depth": self.queue_depth,
+            "busy": self.busy,
+            "pins": self.pins,
+            **self.metrics.to_dict(),
+        }
+
+
+class LocalInferenceWorker:
+    """
+    Owns every resident local model and routes completions to it
+
+    Usage:
+        response = await local_inference_worker.generate(model_path, prompt, max_tokens=256)
+    """
+
+    def __init__(
+        self,
+        max_resident_bytes: Optional[int] = None,
+        loader: Callable[[str, int, int], Any] = _load_llama,
+        size_of: Callable[[str], int] = os.path.getsize,
+    ):
+        self.max_resident_bytes = max_resident_bytes if max_resident_bytes is not None else _default_resident_budget()
+        self._loader = loader
+        self._size_of = size_of
+        # (path, n_ctx) -> model, least recently used first
+        self._models: "OrderedDict[Tuple[str, int], ResidentModel]" = OrderedDict()
+        # (path, n_ctx) -> (load finished, estimated bytes) for loads in progress
+        self._loading: Dict[Tuple[str, int], Tuple[concurrent.futures.Future, int]] = {}
+        self._lock = threading.RLock()
+        self._loads = 0
+        self._evictions = 0
+
+    def _estimated_size(self, model_path: str) -> int:
+        try:
+            return int(self._size_of(model_path) * RESIDENT_OVERHEAD_RATIO)
+        except OSError:
+            return 0
+
+    def _evict_for(self, needed: int):
+        """Unload least-recently-used idle models until `needed` bytes fit"""
+        resident = sum(m.size_bytes for m in self._models.values())
+        resident += sum(size for _, size in self._loading.values())
+        for key in list(self._models):
+            if resident + needed <= self.max_resident_bytes:
+                return
+            model = self._models[key]
+            if not model.idle:
+                continue
+            self._unload(key)
+            resident -= model.size_bytes
+        if resident + needed > self.max_resident_bytes:
+            logger.warning(
+                "Local model RAM budget exceeded (%d MB resident + %d MB needed > %d MB)",
+                resident // 2**20, needed // 2**20, self.max_resident_bytes // 2**20,
+            )
+
+    def acquire(self, model_path: str, n_ctx: int = 4096, n_gpu_layers: int = -1) -> ResidentModel:
+        """
+        Return the resident model for a path, loading (and evicting) as needed.
+
+        The model is pinned against eviction until release() is called.
+        Blocks while the weights load (or while another caller loads them).
+        """
+        key = (model_path, n_ctx)
+        while True:
+            with self._lock:
+                for resident_key, model in self._models.items():
+                    if resident_key[0] == model_path and model.n_ctx >= n_ctx:
+                        self._models.move_to_end(resident_key)
+                        model.pins += 1
+                        return model
+                pending = next(
+                    (loading for (path, ctx), (loading, _) in self._loading.items()
+                     if path == model_path and ctx >= n_ctx),
+                    None,
+                )
+                if pending is None:
+                    size = self._estimated_size(model_path)
+                    self._evict_for(size)
+                    loaded: concurrent.futures.Future = concurrent.futures.Future()
+                    self._loading[key] = (loaded, size)
+                    break
+            # Someone else is loading it; pin it once it's resident (or share their error)
+            pending.result()
+
+        try:
+            llm = self._loader(model_path, n_ctx, n_gpu_layers)
+        except BaseException as e:
+            with self._lock:
+                del self._loading[key]
+            loaded.set_exception(e)
+            raise
+        model = ResidentModel(model_path, llm, size, n_ctx)
+        model.pins = 1
+        with self._lock:
+            del self._loading[key]
+            self._models[key] = model
+            self._loads += 1
+        loaded.set_result(None)
+        return model
+
+    def release(self, model: ResidentModel):
+        """Unpin a model returned by acquire(); it becomes evictable once its queue drains"""
+        with self._lock:
+            model.pins = max(model.pins - 1, 0)
+            model.last_used = time.monotonic()
+
+    def _unload(self, key: Tuple[str, int]):
+        model = self._models.pop(key, None)
+        if model is None:
+            return
+        model.close()
+        model.llm = None
+        self._evictions += 1
+
+    def unload(self, model_path: Optional[str] = None):
+        """Unload one model (every context size of it), or every model when no path is given"""
+        with self._lock:
+            for key in list(self._models):
+                if model_path is None or key[0] == model_path:
+                    self._unload(key)
+        import gc
+        gc.collect()
+
+    def submit(self, model: ResidentModel, prompt: str, **params) -> concurrent.futures.Future:
+        """Queue a completion on a resident model"""
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        prefix_key = hashlib.sha256(prompt[:PREFIX_AFFINITY_CHARS].encode("utf-8")).hexdigest()[:16]
+        model.last_used = time.monotonic()
+        model.submit(InferenceRequest(prompt=prompt, params=params, future=future, prefix_key=prefix_key))
+        return future
+
+    async def generate(self, model_path: str, prompt: str, n_ctx: int = 4096, n_gpu_layers: int = -1, **params) -> Dict[str, Any]:
+        """Load if needed, queue, and await a completion"""
+        model = await asyncio.to_thread(self.acquire, model_path, n_ctx, n_gpu_layers)
+        try:
+            return await asyncio.wrap_future(self.submit(model, prompt, **params))
+        finally:
+            self.release(model)
+
+    def warm_up(self, model_paths: List[str], n_ctx: int = 4096, n_gpu_layers: int = -1) -> List[str]:
+        """
+        Load models and run a one-token completion so weights are paged in.
+
+        Returns the paths that warmed successfully.
+        """
+        warmed = []
+        for path in model_paths:
+            try:
+                model = self.acquire(path, n_ctx, n_gpu_layers)
+                try:
+                    self.submit(model, "Hello", max_tokens=1, temperature=0.0).result()
+                finally:
+                    self.release(model)
+                warmed.append(path)
+            except Exception as e:
+                logger.warning("Failed to warm local model %s: %s", path, e)
+        return warmed
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            models = [m.to_dict() for m in self._models.values()]
+        return {
+            "resident_models": len(models),
+            "resident_mb": round(sum(m["size_mb"] for m in models), 1),
+            "max_resident_mb": round(self.max_resident_bytes / (1024 * 1024), 1),
+            "total_queue_depth": sum(m["queue_depth"] for m in models),
+            "loads": self._loads,
+            "evictions": self._evictions,
+            "models": models,
+        }
+
+
+def warm_models_from_env(worker: "LocalInferenceWorker") -> List[str]:
+    """Warm the models listed in LOCAL_LLM_WARM_MODELS (blocking)"""
+    configured = os.getenv("LOCAL_LLM_WARM_MODELS", "").strip()
+    if not configured:
+        return []
+    if configured == "recommended":
+        from app.services.local_llm_service import local_llm_service
+        recommended = local_llm_service.get_recommended_model()
+        paths = [recommended.path] if recommended else []
+    else:
+        paths = [p.strip() for p in configured.split(",") if p.strip()]
+    return worker.warm_up(paths)
+
+
+# Module-level singleton
+local_inference_worker = LocalInferenceWorker()
@@ -15,6 +15,8 @@ from langchain_core.language_models import BaseChatModel
 from langchain_core.messages import BaseMessage, AIMessage
 from langchain_core.outputs import ChatResult, ChatGeneration
 
+from app.services.local_inference_worker import local_inference_worker
+
 
 # Default models directory
 MODELS_DIR = Path(os.getenv("MODELS_DIR", "./models"))
@@ -105,14 +107,25 @@ def detect_context_length(filename: str) -> int:
 
 
 class LocalLLM(BaseChatModel):
-    """LangChain-compatible wrapper for llama-cpp-python"""
+    """
+    LangChain-compatible wrapper for llama-cpp-python
+
+    The wrapper is cheap: the loaded model lives in the local inference
+    worker, which serializes calls into it, keeps it resident between
+    requests, and schedules requests sharing a prompt prefix back to back.
+
+    Prompt-prefix reuse: llama.cpp keeps the KV state of the last evaluated
+    prompt and only evaluates the tokens after the longest shared prefix.
+    A LlamaRAMCache additionally keeps KV snapshots for several recent
+    prefixes, so alternating agents (each with its own system prompt) don't
+    evict each other's preamble.
+    """
 
     model_path: str
     n_ctx: int = 4096
     n_gpu_layers: int = -1  # -1 for auto
     temperature: float = 0.7
     max_tokens: int = 2048
-    _llm: Any = None
 
     class Config:
         arbitrary_types_allowed = True
@@ -122,31 +135,13 @@ class LocalLLM(BaseChatModel):
         self._load_model()
 
     def _load_model(self):
-        """Load the llama-cpp model"""
-        try:
-            from llama_cpp import Llama
+        """Make the model resident in the inference worker, so load errors surface here"""
+        local_inference_worker.release(self._acquire())
 
-            # Determine GPU layers
-            n_gpu = self.n_gpu_layers
-            if n_gpu == -1:
-                # Auto-detect GPU
-                try:
-                    import torch
-                    if torch.cuda.is_available():
-                        n_gpu = 999  # Offload all layers to GPU
-                    elif hasattr(torch.backends, 'mps') and torch.backends.mps.is_available():
-                        n_gpu = 999  # Apple Metal
-                    else:
-                        n_gpu = 0
-                except ImportError:
-                    n_gpu = 0  # CPU only
-
-            self._llm = Llama(
-                model_path=self.model_path,
-                n_ctx=self.n_ctx,
-                n_gpu_layers=n_gpu,
-                verbose=False
-            )
+    def _acquire(self):
+        """Pin the resident model (loading it if it was evicted) until release()"""
+        try:
+            return local_inference_worker.acquire(self.model_path, self.n_ctx, self.n_gpu_layers)
         except ImportError:
             raise ImportError(
                 "llama-cpp-python is not installed. "
@@ -155,6 +150,23 @@ class LocalLLM(BaseChatModel):
         except Exception as e:
             raise RuntimeError(f"Failed to load model: {e}")
 
+    def _submit(self, messages: List[BaseMessage], stop: Optional[List[str]]):
+        """Queue a completion; the model stays pinned until it finishes"""
+        model = self._acquire()
+        try:
+            future = local_inference_worker.submit(
+                model,
+                self._format_messages(messages),
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                stop=stop,
+            )
+        except Exception:
+            local_inference_worker.release(model)
+            raise
+        future.add_done_callback(lambda _: local_inference_worker.release(model))
+        return future
+
     @property
     def _llm_type(self) -> str:
         return "local-llama"
@@ -165,44 +177,58 @@ class LocalLLM(BaseChatModel):
         stop: Optional[List[str]] = None,
         **kwargs
     ) -> ChatResult:
-        """Generate response from messages"""
-        # Format messages for llama
-        prompt = self._format_messages(messages)
-
-        # Generate
-        response = self._llm(
-            prompt,
-            max_tokens=self.max_tokens,
-            temperature=self.temperature,
-            stop=stop,
-            echo=False
-        )
+        """Generate response from messages (blocks until the worker runs it)"""
+        return self._to_chat_result(self._submit(messages, stop).result())
 
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        **kwargs
+    ) -> ChatResult:
+        """Async generate - queued on the model's worker thread"""
+        import asyncio
+        # Acquiring may load weights from disk - keep it off the event loop
+        future = await asyncio.to_thread(self._submit, messages, stop)
+        response = await asyncio.wrap_future(future)
+        return self._to_chat_result(response)
+
+    @staticmethod
+    def _to_chat_result(response: Dict[str, Any]) -> ChatResult:
+        """Convert a llama.cpp completion into a LangChain ChatResult"""
         # Extract text
         text = response["choices"][0]["text"].strip()
+        usage = response.get("usage", {})
+        prompt_tokens = usage.get("prompt_tokens", 0)
+        completion_tokens = usage.get("completion_tokens", 0)
+        cached_prompt_tokens = usage.get("cached_prompt_tokens", 0)
 
         return ChatResult(
             generations=[
                 ChatGeneration(
                     message=AIMessage(content=text),
                     generation_info={
-                        "prompt_tokens": response.get("usage", {}).get("prompt_tokens", 0),
-                        "completion_tokens": response.get("usage", {}).get("completion_tokens", 0),
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "usage": {
+                            "prompt_tokens": prompt_tokens,
+                            "completion_tokens": completion_tokens,
+                            "total_tokens": prompt_tokens + completion_tokens,
+                            "cached_prompt_tokens": cached_prompt_tokens,
+                        },
                     }
                 )
             ]
         )
 
-    async def _agenerate(
-        self,
-        messages: List[BaseMessage],
-        stop: Optional[List[str]] = None,
-        **kwargs
-    ) -> ChatResult:
-        """Async generate - wraps sync for now"""
-        import asyncio
-        return await asyncio.to_thread(
-            self._generate, messages, stop, **kwargs
+    @staticmethod
+    def _message_text(msg: BaseMessage) -> str:
+        """Flatten content blocks (e.g. cache-marked system prompts) to text"""
+        if isinstance(msg.content, str):
+            return msg.content
+        return "".join(
+            block.get("text", "") if isinstance(block, dict) else str(block)
+            for block in msg.content
         )
 
     def _format_messages(self, messages: List[BaseMessage]) -> str:
@@ -211,12 +237,13 @@ class LocalLLM(BaseChatModel):
         prompt_parts = []
 
         for msg in messages:
+            content = self._message_text(msg)
             if msg.type == "system":
-                prompt_parts.append(f"<|im_start|>system\n{msg.content}<|im_end|>")
+                prompt_parts.append(f"<|im_start|>system\n{content}<|im_end|>")
             elif msg.type == "human":
-                prompt_parts.append(f"<|im_start|>user\n{msg.content}<|im_end|>")
+                prompt_parts.append(f"<|im_start|>user\n{content}<|im_end|>")
             elif msg.type == "ai":
-                prompt_parts.append(f"<|im_start|>assistant\n{msg.content}<|im_end|>")
+                prompt_parts.append(f"<|im_start|>assistant\n{content}<|im_end|>")
 
         prompt_parts.append("<|im_start|>assistant\n")
         return "\n".join(prompt_parts)
@@ -235,8 +262,6 @@ class LocalLLMService:
 
     def __init__(self, models_dir: Optional[Path] = None):
         self.models_dir = models_dir or MODELS_DIR
-        self._current_model: Optional[LocalLLM] = None
-        self._current_model_path: Optional[str] = None
 
     def is_available(self) -> bool:
         """Check if local LLM support is available"""
@@ -303,7 +328,9 @@ class LocalLLMService:
         """
         Get or create a LangChain-compatible local model
 
-        Reuses loaded model if same path to avoid reloading.
+        The wrapper carries this config's sampling settings; the loaded
+        weights are shared through the inference worker, which keeps
+        recently used models resident.
         """
         model_path = config.model_path
 
@@ -316,32 +343,17 @@ class LocalLLMService:
                 )
             model_path = models[0].path
 
-        # Check if we can reuse current model
-        if self._current_model and self._current_model_path == model_path:
-            return self._current_model
-
-        # Load new model
-        self._current_model = LocalLLM(
+        return LocalLLM(
             model_path=model_path,
             n_ctx=config.n_ctx,
             n_gpu_layers=config.n_gpu_layers,
             temperature=config.temperature,
             max_tokens=config.max_tokens
         )
-        self._current_model_path = model_path
-
-        return self._current_model
-
-    def unload_model(self):
-        """Unload current model to free memory"""
-        if self._current_model:
-            del self._current_model._llm
-            self._current_model = None
-            self._current_model_path = None
 
-            # Force garbage collection
-            import gc
-            gc.collect()
+    def unload_model(self, model_path: Optional[str] = None):
+        """Unload a resident model (or all of them) to free memory"""
+        local_inference_worker.unload(model_path)
 
     def get_recommended_model(self) -> Optional[LocalModelInfo]:
         """
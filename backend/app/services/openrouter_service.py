@@ -3,10 +3,13 @@ OpenRouter Service - AI-powered writing suggestions using OpenRouter API
 Implements BYOK (Bring Your Own Key) pattern for user control
 """
 
+import asyncio
 import httpx
 from typing import Optional, Dict, Any, List
 import logging
 
+from app.services.llm_scheduler import llm_scheduler, RequestPriority
+
 logger = logging.getLogger(__name__)
 
 
@@ -71,7 +74,8 @@ class OpenRouterService:
         suggestion_type: str = "general",
         max_tokens: int = 500,
         temperature: float = 0.7,
-        response_format: Optional[Dict[str, str]] = None
+        response_format: Optional[Dict[str, str]] = None,
+        priority: RequestPriority = RequestPriority.INTERACTIVE
     ) -> Dict[str, Any]:
         """
         Get AI-powered writing suggestion
@@ -85,6 +89,7 @@ class OpenRouterService:
                         are better for structured output like JSON. Default 0.7.
             response_format: Optional response format constraint. Use {"type": "json_object"}
                            to enforce JSON output at the API level.
+            priority: Scheduling priority within this API key's rate-limited lane
 
         Returns:
             Dict with suggestion and usage info
@@ -120,11 +125,17 @@ class OpenRouterService:
 
                 logger.info(f"Sending OpenRouter request with temperature={temperature}, max_tokens={max_tokens}")
 
-                response = await client.post(
-                    f"{self.BASE_URL}/chat/completions",
-                    headers=self.headers,
-                    json=payload,
-                    timeout=30.0
+                # Scheduler caps concurrency per key and retries 429/5xx with backoff
+                response = await llm_scheduler.run_http(
+                    "openrouter",
+                    self.api_key,
+                    lambda: client.post(
+                        f"{self.BASE_URL}/chat/completions",
+                        headers=self.headers,
+                        json=payload,
+                        timeout=30.0
+                    ),
+                    priority=priority,
                 )
 
                 logger.info(f"OpenRouter response status: {response.status_code}")
@@ -184,9 +195,7 @@ class OpenRouterService:
         Returns:
             List of enhanced suggestions with AI insights
         """
-        suggestions = []
-
-        for analysis in analyses:
+        async def enhance(analysis: Dict[str, Any]) -> Optional[Dict[str, Any]]:
             suggestion_type = analysis.get("type", "general")
             text = analysis.get("text", "")
             issue = analysis.get("issue", "")
@@ -198,17 +207,22 @@ class OpenRouterService:
                 text=text,
                 context=context,
                 suggestion_type=suggestion_type,
-                max_tokens=300
+                max_tokens=300,
+                priority=RequestPriority.ANALYSIS
             )
 
             if result["success"]:
-                suggestions.append({
+                return {
                     "original_analysis": analysis,
                     "ai_suggestion": result["suggestion"],
                     "usage": result["usage"]
-                })
+                }
+            return None
+
+        # Fan out concurrently - the scheduler bounds in-flight calls per key
+        results = await asyncio.gather(*(enhance(analysis) for analysis in analyses))
 
-        return suggestions
+        return [result for result in results if result is not None]
 
     def _build_system_prompt(self, suggestion_type: str) -> str:
         """Build system prompt based on suggestion type"""
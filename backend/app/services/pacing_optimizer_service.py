@@ -16,6 +16,7 @@ import re
 
 from app.models.manuscript import Manuscript, Chapter
 from app.services.scene_purpose_service import ScenePurposeService
+from app.services.pattern_bank import PatternBank
 
 
 # ==================== Pacing Metrics ====================
@@ -68,6 +69,46 @@ GENRE_PACING = {
 }
 
 
+# Pacing signals, scored case-insensitively in one pass (weight 1 unless given)
+PACING_PATTERNS = {
+    # Action verbs and phrases
+    "action": [
+        r'\b(?:ran|run|running)\b', r'\b(?:fought|fight|fighting)\b',
+        r'\b(?:jumped|jump|jumping)\b', r'\b(?:grabbed|grab)\b',
+        r'\b(?:threw|throw)\b', r'\b(?:hit|struck|strike)\b',
+        r'\b(?:dodged|dodge)\b', r'\b(?:blocked|block)\b',
+        r'\b(?:attacked|attack)\b', r'\b(?:escaped|escape)\b',
+        r'\b(?:chased|chase)\b', r'\b(?:rushed|rush)\b',
+        r'\b(?:shot|shoot)\b', r'\b(?:kicked|kick)\b'
+    ],
+    # Adjectives and descriptive phrases
+    "description": [
+        r'\b(?:beautiful|gorgeous|stunning|lovely)\b',
+        r'\b(?:vast|enormous|tiny|massive)\b',
+        r'\b(?:ancient|old|weathered|worn)\b',
+        r'\b(?:dark|bright|dim|glowing)\b',
+        r'\bthe\s+\w+\s+was\s+\w+\b',  # "The X was Y" patterns
+        r'\b(?:seemed|appeared|looked)\b'
+    ],
+    # Tension markers
+    "tension": [
+        (r'\b(?:danger|dangerous)\b', 3),
+        (r'\b(?:fear|afraid|terrified)\b', 3),
+        (r'\b(?:threat|threatening)\b', 2),
+        (r'\b(?:urgent|urgently|hurry)\b', 2),
+        (r'\b(?:suddenly|abruptly)\b', 1),
+        (r'\b(?:heart\s+(?:pounded|raced|hammered))\b', 2),
+        (r'\b(?:couldn\'t\s+breathe)\b', 2),
+        (r'[!?]{2,}', 1),  # Multiple exclamation/question marks
+        (r'\b(?:dead|death|dying|die)\b', 2),
+        (r'\b(?:blood|bleeding)\b', 2),
+        (r'\b(?:scream|screamed|screaming)\b', 2),
+    ],
+}
+
+PACING_BANK = PatternBank(PACING_PATTERNS, re.IGNORECASE)
+
+
 class PacingOptimizerService:
     """Analyzes pacing and provides optimization suggestions"""
 
@@ -86,14 +127,24 @@ class PacingOptimizerService:
         if not chapter.content:
             return {"error": "No content to analyze"}
 
-        text = chapter.content
+        return self.analyze_chapter_text(chapter_id, chapter.title, chapter.order_index, chapter.content)
+
+    def analyze_chapter_text(
+        self,
+        chapter_id: str,
+        chapter_title: Optional[str],
+        chapter_index: int,
+        text: str
+    ) -> Dict[str, Any]:
+        """Pacing metrics for one chapter's text (no database access)"""
         word_count = len(text.split())
 
         # Calculate metrics
+        signals = PACING_BANK.scores(text)
         dialogue_ratio = self._calculate_dialogue_ratio(text)
-        action_density = self._calculate_action_density(text)
-        description_density = self._calculate_description_density(text)
-        tension_level = self._estimate_tension_level(text)
+        action_density = self._calculate_action_density(text, signals)
+        description_density = self._calculate_description_density(text, signals)
+        tension_level = self._estimate_tension_level(text, signals)
         sentence_variety = self._analyze_sentence_variety(text)
 
         # Identify issues
@@ -134,8 +185,8 @@ class PacingOptimizerService:
 
         return {
             "chapter_id": chapter_id,
-            "chapter_title": chapter.title,
-            "chapter_index": chapter.order_index,
+            "chapter_title": chapter_title,
+            "chapter_index": chapter_index,
             "metrics": {
                 "word_count": word_count,
                 "dialogue_ratio": round(dialogue_ratio, 2),
@@ -157,64 +208,30 @@ class PacingOptimizerService:
 
         return dialogue_words / total_words if total_words > 0 else 0
 
-    def _calculate_action_density(self, text: str) -> float:
+    def _calculate_action_density(self, text: str, signals: Optional[Dict[str, float]] = None) -> float:
         """Calculate density of action verbs and phrases"""
-        action_patterns = [
-            r'\b(?:ran|run|running)\b', r'\b(?:fought|fight|fighting)\b',
-            r'\b(?:jumped|jump|jumping)\b', r'\b(?:grabbed|grab)\b',
-            r'\b(?:threw|throw)\b', r'\b(?:hit|struck|strike)\b',
-            r'\b(?:dodged|dodge)\b', r'\b(?:blocked|block)\b',
-            r'\b(?:attacked|attack)\b', r'\b(?:escaped|escape)\b',
-            r'\b(?:chased|chase)\b', r'\b(?:rushed|rush)\b',
-            r'\b(?:shot|shoot)\b', r'\b(?:kicked|kick)\b'
-        ]
-
-        action_count = 0
-        for pattern in action_patterns:
-            action_count += len(re.findall(pattern, text, re.IGNORECASE))
+        if signals is None:
+            signals = PACING_BANK.scores(text)
+        action_count = signals.get("action", 0)
 
         word_count = len(text.split())
         return action_count / (word_count / 100) if word_count > 0 else 0
 
-    def _calculate_description_density(self, text: str) -> float:
+    def _calculate_description_density(self, text: str, signals: Optional[Dict[str, float]] = None) -> float:
         """Calculate density of descriptive passages"""
         # Count adjectives and descriptive phrases
-        description_patterns = [
-            r'\b(?:beautiful|gorgeous|stunning|lovely)\b',
-            r'\b(?:vast|enormous|tiny|massive)\b',
-            r'\b(?:ancient|old|weathered|worn)\b',
-            r'\b(?:dark|bright|dim|glowing)\b',
-            r'\bthe\s+\w+\s+was\s+\w+\b',  # "The X was Y" patterns
-            r'\b(?:seemed|appeared|looked)\b'
-        ]
-
-        desc_count = 0
-        for pattern in description_patterns:
-            desc_count += len(re.findall(pattern, text, re.IGNORECASE))
+        if signals is None:
+            signals = PACING_BANK.scores(text)
+        desc_count = signals.get("description", 0)
 
         word_count = len(text.split())
         return desc_count / (word_count / 100) if word_count > 0 else 0
 
-    def _estimate_tension_level(self, text: str) -> float:
+    def _estimate_tension_level(self, text: str, signals: Optional[Dict[str, float]] = None) -> float:
         """Estimate tension level from text markers"""
-        tension_patterns = [
-            (r'\b(?:danger|dangerous)\b', 3),
-            (r'\b(?:fear|afraid|terrified)\b', 3),
-            (r'\b(?:threat|threatening)\b', 2),
-            (r'\b(?:urgent|urgently|hurry)\b', 2),
-            (r'\b(?:suddenly|abruptly)\b', 1),
-            (r'\b(?:heart\s+(?:pounded|raced|hammered))\b', 2),
-            (r'\b(?:couldn\'t\s+breathe)\b', 2),
-            (r'[!?]{2,}', 1),  # Multiple exclamation/question marks
-            (r'\b(?:dead|death|dying|die)\b', 2),
-            (r'\b(?:blood|bleeding)\b', 2),
-            (r'\b(?:scream|screamed|screaming)\b', 2),
-        ]
-
-        tension_score = 0
-        for pattern, weight in tension_patterns:
-            matches = len(re.findall(pattern, text, re.IGNORECASE))
-            tension_score += matches * weight
+        if signals is None:
+            signals = PACING_BANK.scores(text)
+        tension_score = signals.get("tension", 0)
 
         word_count = len(text.split())
         # Normalize to 0-1 scale
@@ -275,22 +292,37 @@ class PacingOptimizerService:
         if not chapters:
             return {"error": "No chapters found"}
 
-        chapter_analyses = []
+        chapter_analyses = [
+            self.analyze_chapter_text(chapter.id, chapter.title, chapter.order_index, chapter.content)
+            for chapter in chapters
+            if chapter.content
+        ]
+        return self.summarize_manuscript(manuscript_id, genre, chapter_analyses, chapters)
+
+    def summarize_manuscript(
+        self,
+        manuscript_id: str,
+        genre: Optional[str],
+        chapter_analyses: List[Dict[str, Any]],
+        chapters: List[Any]
+    ) -> Dict[str, Any]:
+        """
+        Combine per-chapter pacing analyses (in chapter order) into the manuscript report.
+
+        chapters is every chapter of the manuscript in order (only titles are read).
+        """
         word_counts = []
         dialogue_ratios = []
         tension_levels = []
         all_issues = []
 
-        for chapter in chapters:
-            analysis = self.analyze_chapter_pacing(chapter.id)
-            if "error" not in analysis:
-                chapter_analyses.append(analysis)
-                metrics = analysis.get("metrics", {})
+        for analysis in chapter_analyses:
+            metrics = analysis.get("metrics", {})
 
-                word_counts.append(metrics.get("word_count", 0))
-                dialogue_ratios.append(metrics.get("dialogue_ratio", 0))
-                tension_levels.append(metrics.get("tension_level", 0))
-                all_issues.extend(analysis.get("issues", []))
+            word_counts.append(metrics.get("word_count", 0))
+            dialogue_ratios.append(metrics.get("dialogue_ratio", 0))
+            tension_levels.append(metrics.get("tension_level", 0))
+            all_issues.extend(analysis.get("issues", []))
 
         # Calculate manuscript-level metrics
         manuscript_metrics = self._calculate_manuscript_metrics(
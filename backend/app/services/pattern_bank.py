@@ -0,0 +1,526 @@
+"""
+Pattern Bank - Compiled, single-pass scoring of weighted regex pattern tables.
+
+The narrative analysis services score text against tables of patterns
+(emotional beats, scene purposes, subplots, pacing signals, POV markers,
+foreshadowing setups), and used to call re.findall once per pattern, so
+every chapter was scanned 60-100 times. A PatternBank compiles a table once
+and splits it in two:
+
+- Word patterns can only match inside a single word: word characters, \\b,
+  groups, alternation and ?/+ (e.g. r'fear(?:ful)?', r'\\b(?:ran|run)\\b').
+  The text is tokenized in one pass and each distinct word is scored once;
+  a word's per-pattern counts are memoized across texts, and one combined
+  regex rejects the (many) words no pattern matches
+- Phrase patterns (anything that can span whitespace or punctuation) are
+  precompiled and scanned with findall, skipping any pattern whose required
+  literals (e.g. "thought" in r'(he|she)\\s+thought') are absent from the
+  text. On ASCII text, case-insensitive phrase patterns without capitals
+  scan the lowercased text instead, keeping re's fast literal search
+
+Counts are identical to calling re.findall per pattern: a word pattern can't
+match across a non-word character, so its matches in the text are exactly
+its matches in each word, and the phrase shortcuts only skip scans that
+can't match or rewrite them for the same matches.
+
+Run `python -m app.services.pattern_bank` for a per-service microbenchmark
+against the per-pattern scan.
+
+Configuration:
+- PATTERN_BANK_WORD_CACHE: memoized words per bank (default 50000; the memo
+  is cleared when full)
+"""
+
+import os
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+WORD_CACHE_SIZE = int(os.getenv("PATTERN_BANK_WORD_CACHE", "50000"))
+
+# Patterns built only from word characters, \b, (?:...), (...), | ? and +
+_WORD_PATTERN = re.compile(r"^(?:\w|\\b|\(\?:|[()|?+])+$")
+
+# Inline flags change what a pattern's literals match
+_INLINE_FLAGS = re.compile(r"\(\?[aiLmsux-]+[:)]")
+
+# A pattern table: category -> patterns, each a regex or (regex, weight)
+PatternTable = Mapping[Hashable, Sequence[Union[str, Tuple[str, float]]]]
+
+
+@dataclass(frozen=True)
+class BankPattern:
+    """One compiled pattern of a bank"""
+    index: int
+    category: Hashable
+    pattern: str
+    weight: float
+    regex: re.Pattern
+    is_word: bool
+    # Every match contains one literal of each tuple (lowercased if case-insensitive)
+    required: Tuple[Tuple[str, ...], ...] = ()
+    # Same matches on lowercased ASCII text, without re.IGNORECASE
+    folded_regex: Optional[re.Pattern] = None
+
+
+def _is_word_pattern(pattern: str, regex: re.Pattern) -> bool:
+    if not _WORD_PATTERN.match(pattern):
+        return False
+    # Zero-length matches would count once per position, not once per word
+    return not any(m.start() == m.end() for m in regex.finditer("a _ 0"))
+
+
+_META = set(".^$*+?{}[]|()\\")
+
+
+def _skip_class(pattern: str, i: int) -> int:
+    """Index after the character class starting at pattern[i] == '['"""
+    i += 1
+    if i < len(pattern) and pattern[i] == "^":
+        i += 1
+    if i < len(pattern) and pattern[i] == "]":
+        i += 1
+    while i < len(pattern) and pattern[i] != "]":
+        i += 2 if pattern[i] == "\\" else 1
+    return i + 1
+
+
+def _group_end(pattern: str, i: int) -> int:
+    """Index of the ')' closing the group opened at pattern[i] == '('"""
+    depth = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == "[":
+            i = _skip_class(pattern, i)
+            continue
+        if c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    raise ValueError("unbalanced group")
+
+
+def _literal_text(fragment: str) -> Optional[str]:
+    """fragment as plain text if it has no regex syntax (escaped punctuation allowed)"""
+    text = []
+    i = 0
+    while i < len(fragment):
+        c = fragment[i]
+        if c == "\\":
+            if i + 1 >= len(fragment) or fragment[i + 1].isalnum():
+                return None
+            text.append(fragment[i + 1])
+            i += 2
+        elif c in _META:
+            return None
+        else:
+            text.append(c)
+            i += 1
+    return "".join(text)
+
+
+def _skip_quantifier(pattern: str, i: int) -> Tuple[int, bool]:
+    """(index after a quantifier at pattern[i], whether it allows zero repetitions)"""
+    if i >= len(pattern) or pattern[i] not in "?*+{":
+        return i, False
+    optional = pattern[i] != "+"
+    if pattern[i] == "{":
+        close = pattern.find("}", i)
+        if close < 0:
+            return i, False
+        optional = not pattern[i + 1:close].split(",")[0].strip().isdigit() or \
+            int(pattern[i + 1:close].split(",")[0]) == 0
+        i = close
+    i += 1
+    if i < len(pattern) and pattern[i] in "?+":  # Lazy / possessive
+        i += 1
+    return i, optional
+
+
+def required_literals(pattern: str) -> Tuple[Tuple[str, ...], ...]:
+    """
+    Literals every match of pattern must contain: one from each tuple.
+
+    Only top-level literal runs and top-level groups of literal alternatives
+    are considered; anything else just contributes no requirement. Patterns
+    with top-level alternation have none.
+    """
+    requirements: List[Tuple[str, ...]] = []
+    run: List[str] = []
+
+    def flush():
+        if len("".join(run).strip()) >= 3:
+            requirements.append(("".join(run),))
+        run.clear()
+
+    try:
+        i = 0
+        while i < len(pattern):
+            c = pattern[i]
+            if c == "|":
+                return ()
+            if c == "[":
+                flush()
+                i, _ = _skip_quantifier(pattern, _skip_class(pattern, i))
+                continue
+            if c == "(":
+                flush()
+                end = _group_end(pattern, i)
+                body = pattern[i + 1:end]
+                i, optional = _skip_quantifier(pattern, end + 1)
+                if body.startswith("?:"):
+                    body = body[2:]
+                elif body.startswith("?"):
+                    continue  # Lookaround, named group, inline flags
+                alternatives = [_literal_text(alt) for alt in body.split("|")]
+                if not optional and all(alt and alt.strip() for alt in alternatives):
+                    requirements.append(tuple(alternatives))
+                continue
+            if c in ".^$":
+                flush()
+                i, _ = _skip_quantifier(pattern, i + 1)
+                continue
+            if c == "\\":
+                literal = _literal_text(pattern[i:i + 2])
+                i += 2
+                if literal is None:
+                    flush()  # \b, \s, \w, backreferences...
+                    i, _ = _skip_quantifier(pattern, i)
+                    continue
+            else:
+                literal = c
+                i += 1
+            after, optional = _skip_quantifier(pattern, i)
+            if after == i:
+                run.append(literal)
+            elif optional:
+                flush()
+            else:
+                # 'ab+c' doesn't contain 'abc': end the run after a repeated literal
+                run.append(literal)
+                flush()
+            i = after
+        flush()
+    except ValueError:
+        return ()
+    return tuple(requirements)
+
+
+class PatternBank:
+    """A weighted pattern table compiled for single-pass scoring"""
+
+    def __init__(self, table: PatternTable, flags: int = 0, word_cache_size: int = WORD_CACHE_SIZE):
+        self.flags = flags
+        self.ignorecase = bool(flags & re.IGNORECASE)
+        self.categories: List[Hashable] = list(table)
+        self.patterns: List[BankPattern] = []
+        for category, entries in table.items():
+            for entry in entries:
+                pattern, weight = entry if isinstance(entry, tuple) else (entry, 1)
+                regex = re.compile(pattern, flags)
+                is_word = _is_word_pattern(pattern, regex)
+                required: Tuple[Tuple[str, ...], ...] = ()
+                folded_regex = None
+                if not is_word and not flags & re.VERBOSE and not _INLINE_FLAGS.search(pattern):
+                    required = required_literals(pattern)
+                    if self.ignorecase:
+                        # Non-ASCII literals may match ASCII text case-insensitively (e.g. 'ſ')
+                        required = tuple(
+                            tuple(literal.lower() for literal in literals)
+                            for literals in required
+                            if all(literal.isascii() for literal in literals)
+                        )
+                        if pattern == pattern.lower():
+                            folded_regex = re.compile(pattern, flags & ~re.IGNORECASE)
+                self.patterns.append(BankPattern(
+                    index=len(self.patterns),
+                    category=category,
+                    pattern=pattern,
+                    weight=weight,
+                    regex=regex,
+                    is_word=is_word,
+                    required=required,
+                    folded_regex=folded_regex,
+                ))
+
+        self._word_patterns = [p for p in self.patterns if p.is_word]
+        self._phrase_patterns = [p for p in self.patterns if not p.is_word]
+        self._tokenizer = re.compile(r"\w+", flags & re.ASCII)
+        # Matches somewhere in a word iff at least one word pattern does
+        self._any_word = re.compile(
+            "|".join(f"(?:{p.pattern})" for p in self._word_patterns), flags
+        ) if self._word_patterns else None
+
+        self.word_cache_size = word_cache_size
+        # word -> ((pattern index, matches), ...); empty for most words
+        self._word_hits: Dict[str, Tuple[Tuple[int, int], ...]] = {}
+        self._lock = threading.Lock()
+        self.words_scored = 0
+        self.words_reused = 0
+
+    def _score_word(self, word: str) -> Tuple[Tuple[int, int], ...]:
+        if self._any_word is None or not self._any_word.search(word):
+            return ()
+        hits = []
+        for pattern in self._word_patterns:
+            matches = len(pattern.regex.findall(word))
+            if matches:
+                hits.append((pattern.index, matches))
+        return tuple(hits)
+
+    def pattern_counts(self, text: str) -> List[int]:
+        """Matches of every pattern in text (as re.findall would count them), in table order"""
+        counts = [0] * len(self.patterns)
+        if not text:
+            return counts
+
+        if self._word_patterns:
+            word_hits = self._word_hits
+            scored = reused = 0
+            for word, occurrences in Counter(self._tokenizer.findall(text)).items():
+                hits = word_hits.get(word)
+                if hits is None:
+                    hits = self._score_word(word)
+                    scored += 1
+                    if len(word_hits) >= self.word_cache_size:
+                        word_hits.clear()
+                    word_hits[word] = hits
+                else:
+                    reused += 1
+                for index, matches in hits:
+                    counts[index] += matches * occurrences
+            with self._lock:
+                self.words_scored += scored
+                self.words_reused += reused
+
+        view = _TextView(text, self.ignorecase)
+        for pattern in self._phrase_patterns:
+            if not view.may_match(pattern):
+                continue
+            if pattern.folded_regex is not None and view.is_ascii:
+                counts[pattern.index] = len(pattern.folded_regex.findall(view.folded))
+            else:
+                counts[pattern.index] = len(pattern.regex.findall(text))
+        return counts
+
+    def counts(self, text: str) -> Dict[Hashable, int]:
+        """Unweighted matches per category, leaving out categories without any"""
+        totals: Dict[Hashable, int] = {}
+        for pattern, matches in zip(self.patterns, self.pattern_counts(text)):
+            if matches:
+                totals[pattern.category] = totals.get(pattern.category, 0) + matches
+        return totals
+
+    def scores(self, text: str) -> Dict[Hashable, float]:
+        """Weighted matches (matches * weight) per category, leaving out categories without any"""
+        totals: Dict[Hashable, float] = {}
+        for pattern, matches in zip(self.patterns, self.pattern_counts(text)):
+            if matches:
+                totals[pattern.category] = totals.get(pattern.category, 0) + matches * pattern.weight
+        return totals
+
+    def finditer(
+        self,
+        text: str,
+        categories: Optional[Iterable[Hashable]] = None,
+    ) -> Iterator[Tuple[BankPattern, re.Match]]:
+        """(pattern, match) for every match, pattern by pattern in table order"""
+        wanted = set(categories) if categories is not None else None
+        view = _TextView(text, self.ignorecase)
+        for pattern in self.patterns:
+            if (wanted is None or pattern.category in wanted) and view.may_match(pattern):
+                for match in pattern.regex.finditer(text):
+                    yield pattern, match
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "patterns": len(self.patterns),
+                "word_patterns": len(self._word_patterns),
+                "phrase_patterns": len(self._phrase_patterns),
+                "cached_words": len(self._word_hits),
+                "words_scored": self.words_scored,
+                "words_reused": self.words_reused,
+            }
+
+
+class _TextView:
+    """A text being scored, with its lowercased form computed on first use"""
+
+    def __init__(self, text: str, ignorecase: bool):
+        self.text = text
+        self.ignorecase = ignorecase
+        self.is_ascii = text.isascii()
+        self._folded: Optional[str] = None
+
+    @property
+    def folded(self) -> str:
+        if self._folded is None:
+            self._folded = self.text.lower()
+        return self._folded
+
+    def may_match(self, pattern: BankPattern) -> bool:
+        """False only if one of the pattern's required literals is missing"""
+        if not pattern.required:
+            return True
+        if self.ignorecase:
+            # Lowercasing only preserves case-insensitive matches on ASCII text
+            if not self.is_ascii:
+                return True
+            haystack = self.folded
+        else:
+            haystack = self.text
+        return all(
+            any(literal in haystack for literal in literals)
+            for literals in pattern.required
+        )
+
+
+def trie_pattern(strings: Sequence[str]) -> str:
+    """
+    Regex alternation of literal strings, factored into a trie.
+
+    Each position branches on one character instead of trying every
+    alternative, and greedy optionals prefer the longest string that
+    matches, like a longest-first alternation.
+    """
+    trie: Dict[str, dict] = {}
+    for string in strings:
+        node = trie
+        for char in string:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" not in node:
+            return body
+        # A string ends here; the greedy ? still prefers the longest one
+        return f"(?:{body})?" if len(branches) == 1 else f"{body}?"
+
+    return build(trie)
+
+
+# ==================== Microbenchmark ====================
+
+def per_pattern_counts(bank: PatternBank, text: str) -> List[int]:
+    """The per-pattern re.findall scan a bank replaces (benchmark baseline)"""
+    return [len(re.findall(p.pattern, text, bank.flags)) for p in bank.patterns]
+
+
+def benchmark_texts(chapters: int = 20, words_per_chapter: int = 3000, seed: int = 7) -> List[str]:
+    """
+    Synthetic chapters: filler words from a Zipf-like vocabulary mixed with
+    words and phrases from the service pattern tables.
+    """
+    import random
+
+    rng = random.Random(seed)
+    syllables = ["ka", "lo", "ren", "tha", "mi", "sor", "el", "dan", "vi", "ur", "ost", "ne", "bri", "ga"]
+    vocabulary = [
+        "".join(rng.choice(syllables) for _ in range(rng.randint(1, 4)))
+        for _ in range(6000)
+    ]
+    signal = (
+        "the fear she felt was ancient . he thought about the secret , her heart raced . "
+        "suddenly they ran , fighting ; blood on the snow !! they laughed and hoped . "
+        "little did he know the truth all along . the kingdom was vast , its legend old . "
+        "I remember my mother , we trusted our friends . she realized the danger at last ."
+    ).split()
+    texts = []
+    for _ in range(chapters):
+        words = [
+            rng.choice(signal) if rng.random() < 0.15 else vocabulary[min(int(rng.paretovariate(1.1)) - 1, 5999)]
+            for _ in range(words_per_chapter)
+        ]
+        texts.append(" ".join(words).capitalize())
+    return texts
+
+
+def _service_banks() -> Dict[str, Tuple[PatternBank, bool]]:
+    """Each service's bank and whether the service lowercases text before scoring"""
+    from app.services.emotional_beat_service import BEAT_BANK
+    from app.services.foreshadowing_detector_service import SETUP_BANK
+    from app.services.pacing_optimizer_service import PACING_BANK
+    from app.services.pov_consistency_service import POV_MARKER_BANK
+    from app.services.scene_purpose_service import PURPOSE_BANK
+    from app.services.subplot_tracker_service import SUBPLOT_BANK
+
+    return {
+        "pacing": (PACING_BANK, False),
+        "emotional_beats": (BEAT_BANK, True),
+        "scene_purpose": (PURPOSE_BANK, True),
+        "subplots": (SUBPLOT_BANK, True),
+        "pov": (POV_MARKER_BANK, False),
+        "foreshadowing": (SETUP_BANK, False),
+    }
+
+
+def _table_of(bank: PatternBank) -> Dict[Hashable, List[Tuple[str, float]]]:
+    table: Dict[Hashable, List[Tuple[str, float]]] = {}
+    for pattern in bank.patterns:
+        table.setdefault(pattern.category, []).append((pattern.pattern, pattern.weight))
+    return table
+
+
+def benchmark(chapters: int = 20, words_per_chapter: int = 3000, repeat: int = 3) -> Dict[str, Dict[str, Any]]:
+    """
+    Time each service's bank against the per-pattern scan over the same
+    chapters. "cold" is the first pass with an empty word memo, "warm" the
+    best of `repeat` later passes (a re-analysis). Raises AssertionError if
+    any count differs.
+    """
+    import time
+
+    texts = benchmark_texts(chapters, words_per_chapter)
+    results = {}
+    for name, (shared_bank, lowercase) in _service_banks().items():
+        # A private copy, so the benchmark neither reads nor fills the service's memo
+        bank = PatternBank(_table_of(shared_bank), shared_bank.flags)
+        inputs = [text.lower() for text in texts] if lowercase else texts
+
+        started = time.perf_counter()
+        expected = [per_pattern_counts(bank, text) for text in inputs]
+        baseline = time.perf_counter() - started
+
+        started = time.perf_counter()
+        cold = [bank.pattern_counts(text) for text in inputs]
+        cold_time = time.perf_counter() - started
+
+        warm_time = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            warm = [bank.pattern_counts(text) for text in inputs]
+            warm_time = min(warm_time, time.perf_counter() - started)
+
+        assert cold == expected and warm == expected, f"{name}: pattern bank counts differ from re.findall"
+        results[name] = {
+            "patterns": len(bank.patterns),
+            "word_patterns": len(bank._word_patterns),
+            "per_pattern_ms": round(baseline * 1000, 2),
+            "cold_ms": round(cold_time * 1000, 2),
+            "warm_ms": round(warm_time * 1000, 2),
+            "speedup_warm": round(baseline / warm_time, 1) if warm_time else None,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    for service, result in benchmark().items():
+        print(
+            f"{service:16} {result['patterns']:3} patterns ({result['word_patterns']} word)  "
+            f"per-pattern {result['per_pattern_ms']:8.2f} ms  "
+            f"bank cold {result['cold_ms']:8.2f} ms  warm {result['warm_ms']:8.2f} ms  "
+            f"x{result['speedup_warm']}"
+        )
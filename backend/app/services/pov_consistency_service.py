@@ -16,7 +16,7 @@ import uuid
 
 from app.models.manuscript import Chapter
 from app.models.entity import Entity
-from app.services.nlp_service import nlp_service
+from app.services.pattern_bank import PatternBank
 
 
 # ==================== POV Indicators ====================
@@ -45,6 +45,14 @@ OMNISCIENT_MARKERS = [
     r'had (he|she) known'
 ]
 
+# Every marker table, scored case-insensitively in one pass
+POV_MARKER_BANK = PatternBank({
+    'first_person': FIRST_PERSON_MARKERS,
+    'second_person': [r'\byou\b'],
+    'third_limited': THIRD_PERSON_INTERNAL,
+    'third_omniscient': OMNISCIENT_MARKERS,
+}, re.IGNORECASE)
+
 # POV Type enum-like
 POV_TYPES = {
     'first_person': 'First Person',
@@ -85,29 +93,28 @@ class POVConsistencyService:
 
         found_markers = []
 
-        # Check first person markers
-        for pattern in FIRST_PERSON_MARKERS:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            if matches:
-                indicators['first_person'] += len(matches)
+        marker_counts = POV_MARKER_BANK.pattern_counts(text)
+        for marker, matches in zip(POV_MARKER_BANK.patterns, marker_counts):
+            if not matches:
+                continue
+            pattern = marker.pattern
+
+            if marker.category == 'first_person':
+                indicators['first_person'] += matches
                 if pattern in [r'\bI\b', r'\bmy\b', r'\bme\b']:
                     found_markers.append(f"First person pronoun: {pattern}")
 
-        # Check second person
-        second_person_count = len(re.findall(r'\byou\b', text, re.IGNORECASE))
-        if second_person_count > 5:  # Threshold for second person
-            indicators['second_person'] = second_person_count
-            found_markers.append("Second person 'you'")
+            elif marker.category == 'second_person':
+                if matches > 5:  # Threshold for second person
+                    indicators['second_person'] = matches
+                    found_markers.append("Second person 'you'")
 
-        # Check third person internal thought markers
-        for pattern in THIRD_PERSON_INTERNAL:
-            if re.search(pattern, text, re.IGNORECASE):
+            elif marker.category == 'third_limited':
+                # Third person internal thought markers
                 indicators['third_limited'] += 3  # Weight internal thought higher
                 found_markers.append(f"Internal thought: {pattern[:30]}")
 
-        # Check omniscient markers
-        for pattern in OMNISCIENT_MARKERS:
-            if re.search(pattern, text, re.IGNORECASE):
+            else:
                 indicators['third_omniscient'] += 5  # Weight omniscient markers higher
                 found_markers.append(f"Omniscient marker: {pattern[:30]}")
 
@@ -335,23 +342,34 @@ class POVConsistencyService:
         if not chapter.content:
             return {"error": "No content to analyze"}
 
-        text = chapter.content
+        # Get characters from entities if available
+        characters = []
+        if chapter.manuscript_id:
+            characters = self._character_names(chapter.manuscript_id)
+
+        return self.analyze_chapter_text(chapter_id, chapter.title, chapter.content, characters)
+
+    def _character_names(self, manuscript_id: str) -> List[str]:
+        entities = self.db.query(Entity).filter(
+            Entity.manuscript_id == manuscript_id,
+            Entity.type == "CHARACTER"
+        ).all()
+        return [e.name for e in entities]
 
+    def analyze_chapter_text(
+        self,
+        chapter_id: str,
+        chapter_title: Optional[str],
+        text: str,
+        characters: List[str]
+    ) -> Dict[str, Any]:
+        """POV analysis of one chapter's text (no database access)"""
         # Detect POV type
         pov_info = self.detect_pov_type(text)
 
         # Detect head-hopping
         head_hopping = self.detect_head_hopping(text)
 
-        # Get characters from entities if available
-        characters = []
-        if chapter.manuscript_id:
-            entities = self.db.query(Entity).filter(
-                Entity.manuscript_id == chapter.manuscript_id,
-                Entity.entity_type == "CHARACTER"
-            ).all()
-            characters = [e.name for e in entities]
-
         # Detect inappropriate knowledge if POV character identified
         knowledge_issues = {}
         if pov_info['pov_character'] and characters:
@@ -377,7 +395,7 @@ class POVConsistencyService:
 
         return {
             "chapter_id": chapter_id,
-            "chapter_title": chapter.title,
+            "chapter_title": chapter_title,
             "pov_info": pov_info,
             "head_hopping": head_hopping,
             "knowledge_issues": knowledge_issues,
@@ -399,22 +417,31 @@ class POVConsistencyService:
         if not chapters:
             return {"error": "No chapters found"}
 
-        chapter_analyses = []
+        characters = self._character_names(manuscript_id)
+        chapter_analyses = [
+            self.analyze_chapter_text(chapter.id, chapter.title, chapter.content, characters)
+            for chapter in chapters
+            if chapter.content
+        ]
+        return self.summarize_manuscript(manuscript_id, chapter_analyses)
+
+    def summarize_manuscript(
+        self,
+        manuscript_id: str,
+        chapter_analyses: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Combine per-chapter POV analyses (in chapter order) into the manuscript report"""
         pov_types_found = {}
         total_head_hopping = 0
         total_knowledge_issues = 0
 
-        for chapter in chapters:
-            analysis = self.analyze_chapter(chapter.id)
-            if 'error' not in analysis:
-                chapter_analyses.append(analysis)
-
-                # Track POV types across chapters
-                pov_type = analysis['pov_info'].get('pov_type', 'unknown')
-                pov_types_found[pov_type] = pov_types_found.get(pov_type, 0) + 1
+        for analysis in chapter_analyses:
+            # Track POV types across chapters
+            pov_type = analysis['pov_info'].get('pov_type', 'unknown')
+            pov_types_found[pov_type] = pov_types_found.get(pov_type, 0) + 1
 
-                total_head_hopping += len(analysis.get('head_hopping', {}).get('pov_switches', []))
-                total_knowledge_issues += analysis.get('knowledge_issues', {}).get('issues_found', 0)
+            total_head_hopping += len(analysis.get('head_hopping', {}).get('pov_switches', []))
+            total_knowledge_issues += analysis.get('knowledge_issues', {}).get('issues_found', 0)
 
         # Determine consistency
         dominant_pov = max(pov_types_found.items(), key=lambda x: x[1]) if pov_types_found else (None, 0)
@@ -0,0 +1,150 @@
+"""
+Prompt Cache - Stable prompt prefixes and provider prompt-caching support.
+
+Agent calls repeat the same multi-thousand-token preamble (agent instructions
+plus world/manuscript context) with only the final user message changing.
+Providers can skip re-processing a repeated prefix:
+- Anthropic: explicit cache_control breakpoints on content blocks
+- OpenAI: automatic prefix caching for prompts over ~1024 tokens
+- OpenRouter: forwards cache_control to Anthropic models
+- Local (llama.cpp): KV-state reuse, handled in LocalLLM
+
+This module provides:
+1. A message convention - a message dict with "cache": True marks the end of
+   a cacheable prefix
+2. Conversion of that marker into provider-specific content blocks
+3. Extraction of cached-token counts from provider responses
+4. A process-wide tracker of prefix reuse for statistics
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+
+
+# Anthropic's ephemeral cache lives ~5 minutes; mirror that for local stats
+PREFIX_TTL_SECONDS = 300
+
+# Anthropic won't cache prefixes shorter than this (Haiku needs 2048; 1024 is the floor)
+MIN_CACHEABLE_CHARS = 1024 * 4
+
+CACHE_CONTROL_BLOCK = {"type": "ephemeral"}
+
+
+def supports_cache_markers(provider: str, model: str) -> bool:
+    """Whether the provider accepts explicit cache_control breakpoints"""
+    if provider == "anthropic":
+        return True
+    if provider == "openrouter":
+        # OpenRouter passes cache_control through to Anthropic models only
+        return model.lower().startswith("anthropic/")
+    return False
+
+
+def to_cached_content(content: str) -> List[Dict[str, Any]]:
+    """Wrap text as a single content block ending in a cache breakpoint"""
+    return [{"type": "text", "text": content, "cache_control": dict(CACHE_CONTROL_BLOCK)}]
+
+
+def prefix_hash(text: str) -> str:
+    """Short stable identifier for a prompt prefix"""
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+def extract_cache_usage(response: Any) -> Tuple[int, int]:
+    """
+    Pull (cache_read_tokens, cache_write_tokens) from a LangChain AIMessage.
+
+    Handles the normalized usage_metadata as well as raw Anthropic
+    (cache_read_input_tokens) and OpenAI (prompt_tokens_details.cached_tokens)
+    metadata shapes. Returns (0, 0) when the provider reports nothing.
+    """
+    usage_metadata = getattr(response, "usage_metadata", None)
+    if not isinstance(usage_metadata, dict):
+        usage_metadata = {}
+    details = usage_metadata.get("input_token_details")
+    if not isinstance(details, dict):
+        details = {}
+    cache_read = details.get("cache_read") or 0
+    cache_write = details.get("cache_creation") or 0
+    if cache_read or cache_write:
+        return int(cache_read), int(cache_write)
+
+    metadata = getattr(response, "response_metadata", None)
+    if not isinstance(metadata, dict):
+        return 0, 0
+    usage = metadata.get("usage") or metadata.get("token_usage") or {}
+    if not isinstance(usage, dict):
+        return 0, 0
+    cache_read = usage.get("cache_read_input_tokens") or 0
+    cache_write = usage.get("cache_creation_input_tokens") or 0
+    prompt_details = usage.get("prompt_tokens_details") or {}
+    if isinstance(prompt_details, dict):
+        cache_read = cache_read or prompt_details.get("cached_tokens") or 0
+    # llama.cpp wrapper reports KV reuse here
+    cache_read = cache_read or usage.get("cached_prompt_tokens") or 0
+    return int(cache_read), int(cache_write)
+
+
+@dataclass
+class PrefixStats:
+    """Prefix reuse statistics for one call"""
+    prefix_hash: str
+    prefix_chars: int
+    seen_before: bool  # Same prefix sent within PREFIX_TTL_SECONDS
+    cached_prompt_tokens: int = 0  # Provider-reported cache reads
+    cache_write_tokens: int = 0  # Provider-reported cache writes
+    prompt_tokens: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "prefix_hash": self.prefix_hash,
+            "prefix_chars": self.prefix_chars,
+            "seen_before": self.seen_before,
+            "cached_prompt_tokens": self.cached_prompt_tokens,
+            "cache_write_tokens": self.cache_write_tokens,
+            "prompt_tokens": self.prompt_tokens,
+            "hit_rate": round(self.cached_prompt_tokens / self.prompt_tokens, 4) if self.prompt_tokens else 0.0,
+        }
+
+
+class PromptPrefixTracker:
+    """Process-wide record of recently sent prompt prefixes"""
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = PREFIX_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+
+    def record(self, prefix: str) -> PrefixStats:
+        """Record a prefix being sent; report whether it was sent recently"""
+        key = prefix_hash(prefix)
+        now = time.monotonic()
+        with self._lock:
+            self.lookups += 1
+            last_seen = self._seen.pop(key, None)
+            seen_before = last_seen is not None and now - last_seen <= self.ttl_seconds
+            if seen_before:
+                self.hits += 1
+            self._seen[key] = now
+            while len(self._seen) > self.max_entries:
+                self._seen.popitem(last=False)
+        return PrefixStats(prefix_hash=key, prefix_chars=len(prefix), seen_before=seen_before)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "tracked_prefixes": len(self._seen),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+        }
+
+
+# Module-level singleton
+prompt_prefix_tracker = PromptPrefixTracker()
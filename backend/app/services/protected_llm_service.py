@@ -6,6 +6,9 @@ A wrapper around the LLM service that integrates:
 2. Carbon tracking via CarbonTracker
 3. Response caching for efficiency
 
+Identical concurrent requests are coalesced by LLMService, so a burst of
+duplicate calls (double-clicks, two tabs) reaches the provider only once.
+
 This is the recommended way to make AI calls for manuscript content.
 """
 
@@ -42,6 +45,9 @@ class ProtectedLLMResponse:
     # Cost
     estimated_cost_usd: float
 
+    # True if the response was shared from an identical in-flight request
+    was_coalesced: bool = False
+
     def to_dict(self) -> Dict[str, Any]:
         return {
             "content": self.content,
@@ -51,6 +57,7 @@ class ProtectedLLMResponse:
             "tokens_used": self.tokens_used,
             "emissions_gco2": self.emissions_micro_gco2 / 1_000_000,
             "was_cached": self.was_cached,
+            "was_coalesced": self.was_coalesced,
             "estimated_cost_usd": self.estimated_cost_usd,
         }
 
@@ -234,14 +241,19 @@ class ProtectedLLMService:
             {"role": "user", "content": safe_request.content},
         ]
 
-        # 4. Make the LLM call
+        # 4. Make the LLM call (identical in-flight requests share one provider call)
         llm_response = await self.llm_service.generate(llm_config, messages)
 
-        # 5. Track carbon emissions
-        total_tokens = (
-            llm_response.usage.get("prompt_tokens", 0) +
-            llm_response.usage.get("completion_tokens", 0)
-        )
+        # 5. Track carbon emissions - a coalesced follower consumed no extra tokens
+        if llm_response.coalesced:
+            total_tokens = 0
+            cost_usd = 0.0
+        else:
+            total_tokens = (
+                llm_response.usage.get("prompt_tokens", 0) +
+                llm_response.usage.get("completion_tokens", 0)
+            )
+            cost_usd = llm_response.cost
 
         carbon_result = await self.carbon_tracker.track_ai_operation(
             provider=llm_config.provider.value if hasattr(llm_config.provider, 'value') else str(llm_config.provider),
@@ -249,7 +261,7 @@ class ProtectedLLMService:
             tokens=total_tokens,
             manuscript_id=manuscript_id,
             request_type=request_type,
-            cache_hit=False,
+            cache_hit=llm_response.coalesced,
         )
 
         # 6. Audit the interaction
@@ -258,11 +270,11 @@ class ProtectedLLMService:
             request_type=request_type,
             provider=llm_config.provider.value if hasattr(llm_config.provider, 'value') else str(llm_config.provider),
             model=llm_config.model,
-            tokens_sent=llm_response.usage.get("prompt_tokens", 0),
-            tokens_received=llm_response.usage.get("completion_tokens", 0),
+            tokens_sent=0 if llm_response.coalesced else llm_response.usage.get("prompt_tokens", 0),
+            tokens_received=0 if llm_response.coalesced else llm_response.usage.get("completion_tokens", 0),
             content_hash=safe_request.content_hash,
             chapter_id=chapter_id,
-            cost_usd=llm_response.cost,
+            cost_usd=cost_usd,
         )
 
         # 7. Cache the response if appropriate
@@ -283,7 +295,8 @@ class ProtectedLLMService:
             tokens_used=total_tokens,
             emissions_micro_gco2=carbon_result.emissions_micro_gco2,
             was_cached=False,
-            estimated_cost_usd=llm_response.cost,
+            estimated_cost_usd=cost_usd,
+            was_coalesced=llm_response.coalesced,
         )
 
     async def generate_with_context(
@@ -357,6 +370,10 @@ class ProtectedLLMService:
         # Default
         return "claude-3-haiku-20240307"
 
+    def get_coalescing_stats(self) -> Dict[str, Any]:
+        """Counters for in-flight request deduplication (shared across instances)"""
+        return self.llm_service.get_coalescing_stats()
+
 
 # Factory function
 def get_protected_llm_service(
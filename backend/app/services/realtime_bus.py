@@ -0,0 +1,539 @@
+"""
+Realtime Bus - Session registry and per-manuscript broadcast for realtime editors.
+
+RealtimeNLPService used to count connections and hold locks in per-process
+dicts. With several uvicorn workers each process saw only its own sockets, so
+the connections-per-manuscript limit didn't hold. A suggestion or Codex
+approval in one worker also never reached editors connected to another. This
+module puts both behind one interface:
+
+- register/unregister: an atomic check-and-add against the per-manuscript
+  limit, shared by every worker
+- publish/subscribe: messages for a manuscript reach every local subscriber
+  in every worker (the publishing worker included)
+
+Backends (REALTIME_BACKEND):
+- memory (default): dicts in this process, for a single worker
+- sqlite: a small SQLite file shared by the workers on one host
+  (REALTIME_SQLITE_PATH, default DATA_DIR/realtime.db). Registration runs in
+  a BEGIN IMMEDIATE transaction. Messages are rows that one poller task per
+  process reads every REALTIME_POLL_INTERVAL seconds
+- redis: sorted sets for sessions and PUBLISH/PSUBSCRIBE for messages
+  (REALTIME_REDIS_URL; needs the optional `redis` package, otherwise falls
+  back to memory)
+
+subscribe() is a coroutine: it returns once the backend is listening (the
+SQLite start position is read off the event loop, the Redis PSUBSCRIBE is
+acknowledged), so a message published after it returns is never missed.
+
+A worker that dies can't unregister its sockets, so shared sessions expire
+after REALTIME_SESSION_TTL seconds. Each worker refreshes its live sessions
+from a heartbeat task.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+REALTIME_BACKEND = os.getenv("REALTIME_BACKEND", "memory")
+MAX_CONNECTIONS_PER_MANUSCRIPT = int(os.getenv("REALTIME_MAX_CONNECTIONS", "2"))
+SESSION_TTL = float(os.getenv("REALTIME_SESSION_TTL", "60"))
+POLL_INTERVAL = float(os.getenv("REALTIME_POLL_INTERVAL", "0.25"))
+SQLITE_PATH = os.getenv(
+    "REALTIME_SQLITE_PATH",
+    str(Path(os.getenv("DATA_DIR", "./data")) / "realtime.db")
+)
+REDIS_URL = os.getenv("REALTIME_REDIS_URL", "redis://localhost:6379/0")
+
+# How long published messages stay in the SQLite table
+MESSAGE_RETENTION_SECONDS = 60.0
+
+# Messages a slow subscriber may fall behind before the oldest are dropped
+SUBSCRIPTION_QUEUE_SIZE = 100
+
+
+class Subscription:
+    """Messages for one manuscript, delivered to one local listener"""
+
+    def __init__(self, bus: "RealtimeBus", manuscript_id: str, max_queue: int = SUBSCRIPTION_QUEUE_SIZE):
+        self.manuscript_id = manuscript_id
+        self._bus = bus
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.closed = False
+
+    def deliver(self, message: Dict[str, Any]):
+        if self.closed:
+            return
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(message)
+
+    def close(self):
+        """Stop listening; a pending `async for` ends"""
+        if self.closed:
+            return
+        self.closed = True
+        self._bus._unsubscribe(self)
+        if self._queue.full():
+            self._queue.get_nowait()
+        self._queue.put_nowait(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        message = await self._queue.get()
+        if message is None:
+            raise StopAsyncIteration
+        return message
+
+
+class RealtimeBus(ABC):
+    """Shared session registry plus per-manuscript broadcast"""
+
+    name = "base"
+    # Shared backends expire sessions, so live ones need refreshing
+    needs_heartbeat = True
+
+    def __init__(
+        self,
+        max_connections: int = MAX_CONNECTIONS_PER_MANUSCRIPT,
+        session_ttl: float = SESSION_TTL,
+    ):
+        self.max_connections = max_connections
+        self.session_ttl = session_ttl
+        self._local_sessions: Dict[str, str] = {}  # connection_id -> manuscript_id
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._listener_task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.delivered = 0
+        self.rejected = 0
+
+    # Backend operations
+
+    @abstractmethod
+    async def _try_register(self, manuscript_id: str, connection_id: str, expires_at: float) -> bool:
+        """Add the session unless the manuscript is at its limit (atomically)"""
+
+    @abstractmethod
+    async def _remove_session(self, manuscript_id: str, connection_id: str):
+        """Remove one session"""
+
+    @abstractmethod
+    async def _refresh_sessions(self, sessions: Dict[str, str], expires_at: float):
+        """Push back the expiry of this worker's live sessions"""
+
+    @abstractmethod
+    async def connection_count(self, manuscript_id: str) -> int:
+        """Live connections for a manuscript across all workers"""
+
+    @abstractmethod
+    async def total_connections(self) -> int:
+        """Live connections across all workers"""
+
+    @abstractmethod
+    async def publish(self, manuscript_id: str, message: Dict[str, Any]):
+        """Send a message to every subscriber of the manuscript, in every worker"""
+
+    async def _listen(self):
+        """Receive messages from other workers and fan them out (shared backends)"""
+
+    # Sessions
+
+    def new_connection_id(self) -> str:
+        return f"{os.getpid()}-{uuid.uuid4().hex[:12]}"
+
+    async def register(self, manuscript_id: str, connection_id: str) -> bool:
+        """Claim a connection slot; False when the manuscript already has the maximum"""
+        accepted = await self._try_register(manuscript_id, connection_id, time.time() + self.session_ttl)
+        if not accepted:
+            self.rejected += 1
+            return False
+        self._local_sessions[connection_id] = manuscript_id
+        if self.needs_heartbeat:
+            self._heartbeat_task = self._ensure_task(self._heartbeat_task, self._heartbeat_loop)
+        return True
+
+    async def unregister(self, manuscript_id: str, connection_id: str) -> int:
+        """Release a connection slot; returns the manuscript's remaining connections"""
+        self._local_sessions.pop(connection_id, None)
+        await self._remove_session(manuscript_id, connection_id)
+        return await self.connection_count(manuscript_id)
+
+    def local_connections(self, manuscript_id: str) -> int:
+        """Connections for a manuscript held by this worker"""
+        return sum(1 for m in self._local_sessions.values() if m == manuscript_id)
+
+    async def _heartbeat_loop(self):
+        while self._local_sessions:
+            await asyncio.sleep(self.session_ttl / 3)
+            try:
+                await self._refresh_sessions(dict(self._local_sessions), time.time() + self.session_ttl)
+            except Exception as e:
+                logger.warning("Realtime session heartbeat failed: %s", e)
+
+    # Broadcast
+
+    async def subscribe(self, manuscript_id: str) -> Subscription:
+        subscription = Subscription(self, manuscript_id)
+        self._subscriptions.setdefault(manuscript_id, set()).add(subscription)
+        await self._start_listening()
+        return subscription
+
+    async def _start_listening(self):
+        """Start the listener task; shared backends first make sure nothing published from here on is missed"""
+        self._listener_task = self._ensure_task(self._listener_task, self._listen)
+
+    def _unsubscribe(self, subscription: Subscription):
+        subscriptions = self._subscriptions.get(subscription.manuscript_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.manuscript_id]
+
+    def _fanout(self, manuscript_id: str, message: Dict[str, Any]):
+        for subscription in list(self._subscriptions.get(manuscript_id, ())):
+            subscription.deliver(message)
+            self.delivered += 1
+
+    def _ensure_task(self, task: Optional[asyncio.Task], factory) -> asyncio.Task:
+        loop = asyncio.get_running_loop()
+        if task is None or task.done() or task.get_loop() is not loop:
+            task = loop.create_task(factory())
+        return task
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "max_connections_per_manuscript": self.max_connections,
+            "local_sessions": len(self._local_sessions),
+            "subscriptions": sum(len(s) for s in self._subscriptions.values()),
+            "published": self.published,
+            "delivered": self.delivered,
+            "rejected": self.rejected,
+        }
+
+    async def close(self):
+        for task in (self._heartbeat_task, self._listener_task):
+            if task is not None:
+                task.cancel()
+        self._heartbeat_task = self._listener_task = None
+        for subscriptions in list(self._subscriptions.values()):
+            for subscription in list(subscriptions):
+                subscription.close()
+
+
+class InMemoryRealtimeBus(RealtimeBus):
+    """Single-process registry and broadcast"""
+
+    name = "memory"
+    needs_heartbeat = False
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._sessions: Dict[str, Set[str]] = {}
+
+    async def _try_register(self, manuscript_id: str, connection_id: str, expires_at: float) -> bool:
+        # No await between check and add, so this is atomic on the event loop
+        sessions = self._sessions.setdefault(manuscript_id, set())
+        if len(sessions) >= self.max_connections:
+            return False
+        sessions.add(connection_id)
+        return True
+
+    async def _remove_session(self, manuscript_id: str, connection_id: str):
+        sessions = self._sessions.get(manuscript_id)
+        if sessions is not None:
+            sessions.discard(connection_id)
+            if not sessions:
+                del self._sessions[manuscript_id]
+
+    async def _refresh_sessions(self, sessions: Dict[str, str], expires_at: float):
+        pass
+
+    async def connection_count(self, manuscript_id: str) -> int:
+        return len(self._sessions.get(manuscript_id, ()))
+
+    async def total_connections(self) -> int:
+        return sum(len(s) for s in self._sessions.values())
+
+    async def publish(self, manuscript_id: str, message: Dict[str, Any]):
+        self.published += 1
+        self._fanout(manuscript_id, message)
+
+
+class SQLiteRealtimeBus(RealtimeBus):
+    """Registry and broadcast shared through a SQLite file (workers on one host)"""
+
+    name = "sqlite"
+
+    def __init__(self, path: str = SQLITE_PATH, poll_interval: float = POLL_INTERVAL, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.poll_interval = poll_interval
+        self._last_message_id: Optional[int] = None
+        self._schema_ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        if not self._schema_ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS realtime_sessions ("
+                "connection_id TEXT PRIMARY KEY, manuscript_id TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_realtime_sessions_manuscript "
+                "ON realtime_sessions (manuscript_id)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS realtime_messages ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, manuscript_id TEXT NOT NULL, "
+                "payload TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._schema_ready = True
+        return conn
+
+    def _run(self, fn, *args):
+        """Run fn(conn, *args) on a short-lived connection"""
+        conn = self._connect()
+        try:
+            return fn(conn, *args)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _register_sync(conn, manuscript_id, connection_id, expires_at, max_connections):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM realtime_sessions WHERE expires_at < ?", (time.time(),))
+            (count,) = conn.execute(
+                "SELECT COUNT(*) FROM realtime_sessions WHERE manuscript_id = ?", (manuscript_id,)
+            ).fetchone()
+            if count >= max_connections:
+                conn.execute("ROLLBACK")
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO realtime_sessions VALUES (?, ?, ?)",
+                (connection_id, manuscript_id, expires_at),
+            )
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    async def _try_register(self, manuscript_id: str, connection_id: str, expires_at: float) -> bool:
+        return await asyncio.to_thread(
+            self._run, self._register_sync, manuscript_id, connection_id, expires_at, self.max_connections
+        )
+
+    async def _remove_session(self, manuscript_id: str, connection_id: str):
+        await asyncio.to_thread(
+            self._run,
+            lambda conn: conn.execute("DELETE FROM realtime_sessions WHERE connection_id = ?", (connection_id,)),
+        )
+
+    async def _refresh_sessions(self, sessions: Dict[str, str], expires_at: float):
+        await asyncio.to_thread(
+            self._run,
+            lambda conn: conn.executemany(
+                "UPDATE realtime_sessions SET expires_at = ? WHERE connection_id = ?",
+                [(expires_at, connection_id) for connection_id in sessions],
+            ),
+        )
+
+    async def connection_count(self, manuscript_id: str) -> int:
+        return await asyncio.to_thread(
+            self._run,
+            lambda conn: conn.execute(
+                "SELECT COUNT(*) FROM realtime_sessions WHERE manuscript_id = ? AND expires_at >= ?",
+                (manuscript_id, time.time()),
+            ).fetchone()[0],
+        )
+
+    async def total_connections(self) -> int:
+        return await asyncio.to_thread(
+            self._run,
+            lambda conn: conn.execute(
+                "SELECT COUNT(*) FROM realtime_sessions WHERE expires_at >= ?", (time.time(),)
+            ).fetchone()[0],
+        )
+
+    async def publish(self, manuscript_id: str, message: Dict[str, Any]):
+        payload = json.dumps(message, default=str)
+        await asyncio.to_thread(
+            self._run,
+            lambda conn: conn.execute(
+                "INSERT INTO realtime_messages (manuscript_id, payload, created_at) VALUES (?, ?, ?)",
+                (manuscript_id, payload, time.time()),
+            ),
+        )
+        self.published += 1
+
+    async def _start_listening(self):
+        if self._last_message_id is None:
+            # Start after the newest message so history isn't replayed; read
+            # before subscribe() returns so nothing published after it is missed
+            last_message_id = await asyncio.to_thread(
+                self._run,
+                lambda conn: conn.execute("SELECT COALESCE(MAX(id), 0) FROM realtime_messages").fetchone()[0],
+            )
+            if self._last_message_id is None:
+                self._last_message_id = last_message_id
+        await super()._start_listening()
+
+    @staticmethod
+    def _poll_sync(conn, after_id: int, prune: bool) -> List[tuple]:
+        if prune:
+            conn.execute(
+                "DELETE FROM realtime_messages WHERE created_at < ?",
+                (time.time() - MESSAGE_RETENTION_SECONDS,),
+            )
+        return conn.execute(
+            "SELECT id, manuscript_id, payload FROM realtime_messages WHERE id > ? ORDER BY id",
+            (after_id,),
+        ).fetchall()
+
+    async def _listen(self):
+        polls = 0
+        while self._subscriptions:
+            await asyncio.sleep(self.poll_interval)
+            polls += 1
+            prune = polls % max(int(MESSAGE_RETENTION_SECONDS / self.poll_interval), 1) == 0
+            try:
+                rows = await asyncio.to_thread(self._run, self._poll_sync, self._last_message_id, prune)
+            except Exception as e:
+                logger.warning("Realtime message poll failed: %s", e)
+                continue
+            for message_id, manuscript_id, payload in rows:
+                self._last_message_id = message_id
+                if manuscript_id in self._subscriptions:
+                    self._fanout(manuscript_id, json.loads(payload))
+        # Resume from the newest message the next time someone subscribes
+        self._last_message_id = None
+
+
+class RedisRealtimeBus(RealtimeBus):
+    """Registry and broadcast through Redis (workers on any host)"""
+
+    name = "redis"
+
+    # ZREMRANGEBYSCORE + ZCARD + ZADD in one step, so two workers can't both take the last slot
+    _REGISTER_SCRIPT = """
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+    if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[2]) then
+        return 0
+    end
+    redis.call('ZADD', KEYS[1], ARGV[3], ARGV[4])
+    redis.call('EXPIRE', KEYS[1], ARGV[5])
+    return 1
+    """
+
+    def __init__(self, url: str = REDIS_URL, prefix: str = "maxwell:realtime", **kwargs):
+        import redis.asyncio as redis  # Optional dependency
+
+        super().__init__(**kwargs)
+        self.prefix = prefix
+        self._redis = redis.from_url(url, decode_responses=True)
+        self._register = self._redis.register_script(self._REGISTER_SCRIPT)
+        self._pubsub = None
+
+    def _sessions_key(self, manuscript_id: str) -> str:
+        return f"{self.prefix}:sessions:{manuscript_id}"
+
+    def _channel(self, manuscript_id: str) -> str:
+        return f"{self.prefix}:manuscript:{manuscript_id}"
+
+    async def _try_register(self, manuscript_id: str, connection_id: str, expires_at: float) -> bool:
+        accepted = await self._register(
+            keys=[self._sessions_key(manuscript_id)],
+            args=[time.time(), self.max_connections, expires_at, connection_id, int(self.session_ttl * 2)],
+        )
+        return bool(accepted)
+
+    async def _remove_session(self, manuscript_id: str, connection_id: str):
+        await self._redis.zrem(self._sessions_key(manuscript_id), connection_id)
+
+    async def _refresh_sessions(self, sessions: Dict[str, str], expires_at: float):
+        pipeline = self._redis.pipeline()
+        for connection_id, manuscript_id in sessions.items():
+            key = self._sessions_key(manuscript_id)
+            pipeline.zadd(key, {connection_id: expires_at}, xx=True)
+            pipeline.expire(key, int(self.session_ttl * 2))
+        await pipeline.execute()
+
+    async def connection_count(self, manuscript_id: str) -> int:
+        return await self._redis.zcount(self._sessions_key(manuscript_id), time.time(), "+inf")
+
+    async def total_connections(self) -> int:
+        now = time.time()
+        total = 0
+        async for key in self._redis.scan_iter(match=f"{self.prefix}:sessions:*"):
+            total += await self._redis.zcount(key, now, "+inf")
+        return total
+
+    async def publish(self, manuscript_id: str, message: Dict[str, Any]):
+        await self._redis.publish(self._channel(manuscript_id), json.dumps(message, default=str))
+        self.published += 1
+
+    async def _start_listening(self):
+        if self._pubsub is None:
+            # PSUBSCRIBE before subscribe() returns; messages published in
+            # between would otherwise never reach this worker
+            pubsub = self._redis.pubsub()
+            await pubsub.psubscribe(f"{self._channel('')}*")
+            if self._pubsub is None:
+                self._pubsub = pubsub
+            else:
+                await pubsub.close()
+        await super()._start_listening()
+
+    async def _listen(self):
+        pubsub = self._pubsub
+        channel_prefix = self._channel("")
+        try:
+            while self._subscriptions:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is None or message.get("type") != "pmessage":
+                    continue
+                manuscript_id = message["channel"][len(channel_prefix):]
+                self._fanout(manuscript_id, json.loads(message["data"]))
+        finally:
+            # Detach first, so a subscribe() from here on opens a fresh pubsub
+            if self._pubsub is pubsub:
+                self._pubsub = None
+            await pubsub.punsubscribe()
+            await pubsub.close()
+
+
+def create_realtime_bus(backend: str = REALTIME_BACKEND) -> RealtimeBus:
+    """Build the configured bus; unknown or unavailable backends fall back to memory"""
+    backend = backend.lower()
+    if backend == "sqlite":
+        Path(SQLITE_PATH).parent.mkdir(parents=True, exist_ok=True)
+        return SQLiteRealtimeBus()
+    if backend == "redis":
+        try:
+            return RedisRealtimeBus()
+        except ImportError:
+            logger.warning("REALTIME_BACKEND=redis but the redis package is not installed; using memory")
+    elif backend != "memory":
+        logger.warning("Unknown REALTIME_BACKEND %r; using memory", backend)
+    return InMemoryRealtimeBus()
+
+
+# Module-level singleton
+realtime_bus = create_realtime_bus()
@@ -9,6 +9,7 @@ from typing import Dict, List, Set, Optional
 from datetime import datetime
 
 from app.services.nlp_service import nlp_service
+from app.services.realtime_nlp_worker import realtime_nlp_worker
 from app.models.entity import Entity
 
 
@@ -26,9 +27,7 @@ class RealtimeNLPService:
         self.debounce_delay = 2.0  # seconds - wait for user to stop typing
         self.max_text_size = 5000  # Max chars to analyze at once
         self.max_buffer_size = 10000  # Max chars in buffer before dropping
-        self.processing_lock: Dict[str, asyncio.Lock] = {}  # One analysis at a time per manuscript
-        self.active_connections: Dict[str, int] = {}  # Track connection count per manuscript
-        self.max_connections_per_manuscript = 2  # Limit concurrent connections
+        # Connection limits and cross-worker broadcast live in realtime_bus
 
         # Common words to exclude (false positives)
         self.EXCLUDE_WORDS = {
@@ -45,25 +44,6 @@ class RealtimeNLPService:
             'i', 'he', 'she', 'they', 'we', 'you', 'it', 'this', 'that', 'these', 'those',
         }
 
-    def can_accept_connection(self, manuscript_id: str) -> bool:
-        """Check if a new connection can be accepted for this manuscript"""
-        return self.active_connections.get(manuscript_id, 0) < self.max_connections_per_manuscript
-
-    def register_connection(self, manuscript_id: str):
-        """Register a new connection for this manuscript"""
-        self.active_connections[manuscript_id] = self.active_connections.get(manuscript_id, 0) + 1
-        if manuscript_id not in self.processing_lock:
-            self.processing_lock[manuscript_id] = asyncio.Lock()
-
-    def unregister_connection(self, manuscript_id: str):
-        """Unregister a connection for this manuscript"""
-        if manuscript_id in self.active_connections:
-            self.active_connections[manuscript_id] -= 1
-            if self.active_connections[manuscript_id] <= 0:
-                del self.active_connections[manuscript_id]
-                if manuscript_id in self.processing_lock:
-                    del self.processing_lock[manuscript_id]
-
     async def analyze_text_chunk(
         self,
         text: str,
@@ -90,74 +70,76 @@ class RealtimeNLPService:
         if len(text) > self.max_text_size:
             text = text[-self.max_text_size:]  # Take last N chars
 
-        # Get or create lock for this manuscript
-        if manuscript_id not in self.processing_lock:
-            self.processing_lock[manuscript_id] = asyncio.Lock()
+        try:
+            # Parsed off the event loop, batched with other connections' chunks
+            candidates = await realtime_nlp_worker.analyze(text)
+        except Exception as e:
+            print(f"Error in analyze_text_chunk: {e}")
+            return {"new_entities": []}
 
-        # Only process one chunk at a time per manuscript
-        async with self.processing_lock[manuscript_id]:
-            try:
-                # Use spaCy to extract entities from new text
-                doc = nlp_service.nlp(text)
+        return {
+            "new_entities": self.filter_candidates(
+                candidates, existing_entities, confidence_threshold
+            ),
+            "timestamp": datetime.utcnow().isoformat()
+        }
 
-                detected_entities = []
-                existing_set = set(e.lower() for e in existing_entities)
+    def candidates_from_doc(self, doc) -> List[Dict]:
+        """
+        All entity candidates in a parsed doc, before per-connection filtering.
 
-                # Get numeric threshold value
-                threshold_value = self.CONFIDENCE_THRESHOLDS.get(confidence_threshold, 0.7)
+        Runs in the realtime NLP worker process, so it returns plain dicts.
+        Known-name and confidence filtering happen in filter_candidates.
+        """
+        detected_entities = []
 
-                # Extract named entities
-                for ent in doc.ents:
-                    entity_name = ent.text.strip()
+        # Extract named entities
+        for ent in doc.ents:
+            entity_name = ent.text.strip()
 
-                    # Skip if already exists, too short, or in exclude list
-                    if (entity_name.lower() in existing_set or
-                        len(entity_name) < 2 or
-                        entity_name.lower() in self.EXCLUDE_WORDS):
-                        continue
+            # Skip if too short or in exclude list
+            if len(entity_name) < 2 or entity_name.lower() in self.EXCLUDE_WORDS:
+                continue
+
+            # Map spaCy entity types to our types
+            entity_type = self._map_entity_type(ent.label_)
 
-                    # Map spaCy entity types to our types
-                    entity_type = self._map_entity_type(ent.label_)
-
-                    # Only include relevant entity types
-                    if entity_type:
-                        # Calculate confidence score based on entity characteristics
-                        confidence_score = self._calculate_confidence(ent, entity_type)
-
-                        # Skip if below threshold
-                        if confidence_score < threshold_value:
-                            continue
-
-                        detected_entities.append({
-                            "name": entity_name,
-                            "type": entity_type,
-                            "context": ent.sent.text if ent.sent else text[:200],
-                            "confidence": "spacy_ner",
-                            "confidence_score": confidence_score
-                        })
-
-                # Also look for capitalized multi-word phrases (potential names/places)
-                capitalized_phrases = self._extract_capitalized_phrases(doc, existing_set, threshold_value)
-                detected_entities.extend(capitalized_phrases)
-
-                # Remove duplicates (keep first occurrence, prioritize spaCy detections)
-                seen = set()
-                unique_entities = []
-                for entity in detected_entities:
-                    # Use just the name as key to avoid duplicate entities with different types
-                    key = entity['name'].lower()
-                    if key not in seen:
-                        seen.add(key)
-                        unique_entities.append(entity)
-
-                return {
-                    "new_entities": unique_entities[:5],  # Limit to 5 suggestions at a time
-                    "timestamp": datetime.utcnow().isoformat()
-                }
-
-            except Exception as e:
-                print(f"Error in analyze_text_chunk: {e}")
-                return {"new_entities": []}
+            # Only include relevant entity types
+            if entity_type:
+                detected_entities.append({
+                    "name": entity_name,
+                    "type": entity_type,
+                    "context": ent.sent.text if ent.sent else doc.text[:200],
+                    "confidence": "spacy_ner",
+                    "confidence_score": self._calculate_confidence(ent, entity_type)
+                })
+
+        # Also look for capitalized multi-word phrases (potential names/places)
+        detected_entities.extend(self._extract_capitalized_phrases(doc, set(), 0.0))
+        return detected_entities
+
+    def filter_candidates(
+        self,
+        candidates: List[Dict],
+        existing_entities: List[str],
+        confidence_threshold: str = 'medium'
+    ) -> List[Dict]:
+        """Drop known names and low-confidence candidates, dedupe, cap at 5"""
+        existing_set = set(e.lower() for e in existing_entities)
+        threshold_value = self.CONFIDENCE_THRESHOLDS.get(confidence_threshold, 0.7)
+
+        # Remove duplicates (keep first occurrence, prioritize spaCy detections)
+        seen = set()
+        unique_entities = []
+        for entity in candidates:
+            # Use just the name as key to avoid duplicate entities with different types
+            key = entity['name'].lower()
+            if key in existing_set or key in seen or entity['confidence_score'] < threshold_value:
+                continue
+            seen.add(key)
+            unique_entities.append(entity)
+
+        return unique_entities[:5]  # Limit to 5 suggestions at a time
 
     def _map_entity_type(self, spacy_label: str) -> Optional[str]:
         """Map spaCy entity labels to our EntityType"""
@@ -300,70 +282,150 @@ class RealtimeNLPService:
 
         return entities
 
-    async def process_text_stream(
+    def create_session(
         self,
         manuscript_id: str,
         existing_entities: List[str],
-        text_queue: asyncio.Queue,
         confidence_threshold: str = 'medium'
+    ) -> "RealtimeStreamSession":
+        """Create a stream processor for one WebSocket connection"""
+        return RealtimeStreamSession(
+            service=self,
+            manuscript_id=manuscript_id,
+            existing_entities=existing_entities,
+            debounce_delay=self.debounce_delay,
+            confidence_threshold=confidence_threshold,
+        )
+
+
+class RealtimeStreamSession:
+    """
+    Per-connection debounce and coalescing for streamed text deltas.
+
+    Deltas are appended to a pending buffer. Each delta restarts this
+    session's debounce timer, so a typing burst becomes a single analysis
+    window and the earlier (superseded) windows are never parsed. The
+    high-water mark records how much of the stream has been analyzed, so
+    no text is parsed twice; deltas arriving during an analysis start the
+    next window.
+    """
+
+    def __init__(
+        self,
+        service: RealtimeNLPService,
+        manuscript_id: str,
+        existing_entities: List[str],
+        debounce_delay: float = 2.0,
+        confidence_threshold: str = 'medium',
+        idle_timeout: float = 300.0
     ):
-        """
-        Process incoming text deltas with debouncing and backpressure
-
-        Args:
-            manuscript_id: ID of the manuscript
-            existing_entities: List of existing entity names
-            text_queue: Queue receiving text deltas from client
-            confidence_threshold: 'low', 'medium', or 'high' - filters detected entities
-        """
-        buffer = ""
-        last_activity = time.time()
-        idle_timeout = 300.0  # 5 minutes of inactivity before stopping
-
-        while True:
-            try:
-                # Non-blocking check for new text
+        self.service = service
+        self.manuscript_id = manuscript_id
+        self.existing_entities = existing_entities
+        self.debounce_delay = debounce_delay
+        self.confidence_threshold = confidence_threshold
+        self.idle_timeout = idle_timeout
+
+        self._buffer = ""
+        self._buffer_start = 0  # Stream offset of _buffer[0]
+        self.high_water_mark = 0  # Stream offset up to which text has been analyzed
+        self.received_chars = 0
+        self._last_push = time.monotonic()
+        self._changed = asyncio.Event()
+        self._closed = False
+
+        self.deltas_received = 0
+        self.windows_analyzed = 0
+        self.windows_superseded = 0  # Debounce restarts that folded a window into a later one
+        self.chars_dropped = 0
+
+    def configure(self, debounce_delay: Optional[float] = None, confidence_threshold: Optional[str] = None):
+        """Apply client settings to this session only"""
+        if debounce_delay is not None:
+            self.debounce_delay = max(0.0, float(debounce_delay))
+        if confidence_threshold is not None:
+            self.confidence_threshold = confidence_threshold
+        self._changed.set()
+
+    def push(self, text_delta: str):
+        """Add newly typed text; restarts the debounce timer"""
+        if not text_delta:
+            return
+        self.deltas_received += 1
+        self.received_chars += len(text_delta)
+        self._buffer += text_delta
+
+        # Backpressure: drop the oldest unanalyzed text
+        overflow = len(self._buffer) - self.service.max_buffer_size
+        if overflow > 0:
+            self._buffer = self._buffer[overflow:]
+            self._buffer_start += overflow
+            self.chars_dropped += overflow
+            self.high_water_mark = max(self.high_water_mark, self._buffer_start)
+            print(f"⚠️  Buffer overflow for {self.manuscript_id}, dropping {overflow} chars")
+
+        self._last_push = time.monotonic()
+        self._changed.set()
+
+    def close(self):
+        self._closed = True
+        self._changed.set()
+
+    def take_window(self) -> str:
+        """Remove and return all pending text, advancing the high-water mark"""
+        window, self._buffer = self._buffer, ""
+        self._buffer_start += len(window)
+        self.high_water_mark = self._buffer_start
+        return window
+
+    async def _wait_for_quiet(self) -> bool:
+        """Wait until no delta has arrived for debounce_delay; False if closed"""
+        while not self._closed:
+            remaining = self._last_push + self.debounce_delay - time.monotonic()
+            if remaining <= 0:
+                return True
+            pushes_before = self.deltas_received
+            await asyncio.sleep(remaining)
+            if self.deltas_received != pushes_before:
+                self.windows_superseded += 1
+        return False
+
+    async def results(self):
+        """Yield entity results, at most one analysis per typing burst"""
+        while not self._closed:
+            self._changed.clear()
+            if not self._buffer.strip():
                 try:
-                    text_delta = await asyncio.wait_for(text_queue.get(), timeout=0.5)
-
-                    # Enforce buffer size limit (backpressure)
-                    if len(buffer) + len(text_delta) > self.max_buffer_size:
-                        # Drop oldest text to make room
-                        overflow = (len(buffer) + len(text_delta)) - self.max_buffer_size
-                        buffer = buffer[overflow:]
-                        print(f"⚠️  Buffer overflow for {manuscript_id}, dropping {overflow} chars")
-
-                    buffer += text_delta
-                    last_activity = time.time()
+                    await asyncio.wait_for(self._changed.wait(), timeout=self.idle_timeout)
                 except asyncio.TimeoutError:
-                    pass
-
-                # Check for idle timeout (cleanup inactive connections)
-                time_since_activity = time.time() - last_activity
-                if time_since_activity > idle_timeout:
-                    print(f"⏱️  Idle timeout for {manuscript_id}, closing stream")
-                    break
-
-                # Check if enough time has passed since last activity (debounce)
-                if buffer and time_since_activity >= self.debounce_delay:
-                    # Analyze the buffered text
-                    result = await self.analyze_text_chunk(
-                        buffer,
-                        manuscript_id,
-                        existing_entities,
-                        confidence_threshold
-                    )
-
-                    # Clear buffer after analysis
-                    buffer = ""
-
-                    # Return detected entities
-                    if result['new_entities']:
-                        yield result
-
-            except Exception as e:
-                print(f"Error in process_text_stream: {e}")
-                break
+                    print(f"⏱️  Idle timeout for {self.manuscript_id}, closing stream")
+                    return
+                continue
+
+            if not await self._wait_for_quiet():
+                return
+
+            window = self.take_window()
+            self.windows_analyzed += 1
+            result = await self.service.analyze_text_chunk(
+                window,
+                self.manuscript_id,
+                self.existing_entities,
+                self.confidence_threshold
+            )
+            if result['new_entities']:
+                yield result
+
+    def get_stats(self) -> Dict:
+        return {
+            "debounce_delay": self.debounce_delay,
+            "deltas_received": self.deltas_received,
+            "windows_analyzed": self.windows_analyzed,
+            "windows_superseded": self.windows_superseded,
+            "high_water_mark": self.high_water_mark,
+            "pending_chars": len(self._buffer),
+            "chars_dropped": self.chars_dropped,
+        }
 
 
 # Singleton instance
@@ -0,0 +1,220 @@
+"""
+Realtime NLP Worker - Micro-batched spaCy inference for the realtime WebSocket.
+
+Each /api/realtime/nlp connection used to run `nlp(text)` inline on the
+event loop. Parses queued behind each other and blocked heartbeats for every
+other socket. This worker collects pending chunks from all connections for a
+few milliseconds, then parses them together with `nlp.pipe` in a process
+pool. Each caller gets its result through a future, so throughput grows with
+batch efficiency rather than connection count.
+
+Worker processes load spaCy once (via nlp_service at import) and return
+plain candidate dicts. Per-connection filtering (known names, confidence
+threshold, entity types) stays in the parent, so a batch carries only text.
+
+Configuration:
+- REALTIME_NLP_PROCESSES: worker processes (default 1; 0 = a thread in this
+  process, for development)
+- REALTIME_NLP_BATCH_WINDOW_MS: how long to wait for more chunks (default 5)
+- REALTIME_NLP_MAX_BATCH: max chunks per nlp.pipe call (default 32)
+"""
+
+import asyncio
+import bisect
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+PROCESSES = int(os.getenv("REALTIME_NLP_PROCESSES", "1"))
+BATCH_WINDOW_MS = float(os.getenv("REALTIME_NLP_BATCH_WINDOW_MS", "5"))
+MAX_BATCH = int(os.getenv("REALTIME_NLP_MAX_BATCH", "32"))
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class Histogram:
+    """Fixed-bucket histogram (cumulative counts, Prometheus-style 'le' buckets)"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def to_dict(self) -> Dict[str, Any]:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {
+            "count": self.count,
+            "sum": round(self.total, 3),
+            "mean": round(self.total / self.count, 3) if self.count else 0.0,
+            "buckets": buckets,
+        }
+
+
+def analyze_batch(texts: List[str]) -> List[List[Dict[str, Any]]]:
+    """
+    Parse texts with one nlp.pipe call and return entity candidates per text.
+
+    Runs inside worker processes; spaCy is loaded once per process when
+    nlp_service is first imported there.
+    """
+    from app.services.nlp_service import nlp_service
+    from app.services.realtime_nlp_service import realtime_nlp_service
+
+    if not nlp_service.is_available():
+        return [[] for _ in texts]
+    return [
+        realtime_nlp_service.candidates_from_doc(doc)
+        for doc in nlp_service.nlp.pipe(texts, batch_size=len(texts))
+    ]
+
+
+def _warm_worker():
+    """Process initializer: import (and so load) spaCy before the first batch"""
+    import app.services.nlp_service  # noqa: F401
+
+
+@dataclass
+class _Pending:
+    text: str
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class RealtimeNLPWorker:
+    """Collects chunks from all connections and parses them in micro-batches"""
+
+    def __init__(
+        self,
+        processes: int = PROCESSES,
+        batch_window_ms: float = BATCH_WINDOW_MS,
+        max_batch: int = MAX_BATCH,
+        batch_fn: Callable[[List[str]], List[Any]] = analyze_batch,
+    ):
+        self.processes = processes
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch = max_batch
+        self._batch_fn = batch_fn
+        self._executor: Optional[Executor] = None
+        self._pending: List[_Pending] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop_task: Optional[asyncio.Task] = None
+        self._running_batches = 0
+        self.batches = 0
+        self.failures = 0
+        self.batch_size = Histogram(BATCH_SIZE_BUCKETS)
+        self.batch_latency_ms = Histogram(LATENCY_BUCKETS_MS)  # One nlp.pipe call
+        self.request_latency_ms = Histogram(LATENCY_BUCKETS_MS)  # Enqueue to result
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.processes > 0:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_warm_worker,
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="realtime-nlp")
+        return self._executor
+
+    def _ensure_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop_task is None or self._loop_task.done() or self._loop_task.get_loop() is not loop:
+            self._wakeup = asyncio.Event()
+            self._pending = [p for p in self._pending if p.future.get_loop() is loop]
+            self._running_batches = 0
+            self._loop_task = loop.create_task(self._batch_loop())
+
+    async def analyze(self, text: str) -> List[Dict[str, Any]]:
+        """Queue one chunk; resolves with its entity candidates"""
+        self._ensure_loop()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(_Pending(text=text, future=future))
+        self._wakeup.set()
+        return await future
+
+    async def _batch_loop(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if not self._pending:
+                continue
+            # Give other connections a moment to add their chunks
+            if len(self._pending) < self.max_batch and self.batch_window > 0:
+                await asyncio.sleep(self.batch_window)
+            # One batch in flight per worker; chunks arriving meanwhile form the
+            # next batch, which is dispatched when a worker frees up
+            while self._pending and self._running_batches < max(self.processes, 1):
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+                self._running_batches += 1
+                asyncio.get_running_loop().create_task(self._run_batch(batch))
+
+    async def _run_batch(self, batch: List[_Pending]):
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            results = await loop.run_in_executor(
+                self._get_executor(), self._batch_fn, [p.text for p in batch]
+            )
+        except Exception as e:
+            self.failures += 1
+            logger.warning("Realtime NLP batch of %d failed: %s", len(batch), e)
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+            return
+        finally:
+            self._running_batches -= 1
+            if self._pending and self._wakeup is not None:
+                self._wakeup.set()
+
+        finished = time.perf_counter()
+        self.batches += 1
+        self.batch_size.observe(len(batch))
+        self.batch_latency_ms.observe((finished - started) * 1000)
+        for pending, result in zip(batch, results):
+            self.request_latency_ms.observe((finished - pending.enqueued_at) * 1000)
+            if not pending.future.done():
+                pending.future.set_result(result)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "processes": self.processes,
+            "pending": len(self._pending),
+            "running_batches": self._running_batches,
+            "batches": self.batches,
+            "failures": self.failures,
+            "batch_size": self.batch_size.to_dict(),
+            "batch_latency_ms": self.batch_latency_ms.to_dict(),
+            "request_latency_ms": self.request_latency_ms.to_dict(),
+        }
+
+    def shutdown(self):
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            self._loop_task = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Module-level singleton
+realtime_nlp_worker = RealtimeNLPWorker()
@@ -6,17 +6,26 @@ Analyzes:
 - Unearned relationship shifts
 - Relationship timeline visualization data
 - Wiki integration for relationship tracking
+
+Manuscript-wide timelines are built in one pass per chapter: a compiled
+name/alias matcher counts every character's mentions, the relationship
+state patterns are scored once per chapter (they don't depend on the pair),
+and each pair's timeline is read off the chapters x characters mention
+matrix. Cost grows with the text, not with pairs x text.
 """
 
-from typing import List, Optional, Dict, Any, Tuple
+from collections import Counter
+from typing import List, Optional, Dict, Any, Sequence, Tuple
 from datetime import datetime
 from sqlalchemy.orm import Session
+import numpy as np
 import re
 import uuid
 
 from app.models.manuscript import Chapter
 from app.models.entity import Entity, Relationship
 from app.models.wiki import WikiEntry, WikiEntryType, WikiCrossReference
+from app.services.pattern_bank import PatternBank, trie_pattern
 from app.services.wiki_service import WikiService
 
 
@@ -195,6 +204,64 @@ STATE_PATTERNS = {
     ],
 }
 
+STATE_BANK = PatternBank(STATE_PATTERNS)
+
+# Detection for a passage that doesn't mention both characters
+ABSENT_DETECTION = {
+    "detected_state": None,
+    "confidence": 0.0,
+    "indicators_found": [],
+    "context_excerpts": [],
+    "note": "Both characters not present in text"
+}
+
+
+class CharacterMatcher:
+    """
+    Counts every character's mentions in one scan of a text.
+
+    Names and aliases are lowercased and compiled into a single trie-shaped
+    regex inside a lookahead, so every position is tried once and overlapping
+    mentions ("Ann" inside "Anna") are all found. Like detect_relationship_state
+    this matches substrings of the lowercased text.
+    """
+
+    def __init__(self, names: Sequence[str], aliases: Optional[Dict[str, Sequence[str]]] = None):
+        self.names = list(dict.fromkeys(names))
+        self.index = {name: i for i, name in enumerate(self.names)}
+
+        owners: Dict[str, set] = {}
+        for i, name in enumerate(self.names):
+            for surface in [name, *((aliases or {}).get(name) or [])]:
+                if isinstance(surface, str) and surface:
+                    owners.setdefault(surface.lower(), set()).add(i)
+
+        # The lookahead reports the longest surface starting at a position;
+        # every shorter surface starting there is one of its prefixes
+        self._owners = {}
+        for surface in owners:
+            found = set()
+            for end in range(1, len(surface) + 1):
+                found |= owners.get(surface[:end], set())
+            self._owners[surface] = np.array(sorted(found), dtype=np.intp)
+
+        self._regex = re.compile(f"(?=({trie_pattern(list(owners))}))") if owners else None
+
+    def mentions(self, text_lower: str) -> np.ndarray:
+        """Mentions per character (in names order) in already-lowercased text"""
+        counts = np.zeros(len(self.names), dtype=np.int64)
+        if self._regex is None:
+            return counts
+        for surface, found in Counter(match.group(1) for match in self._regex.finditer(text_lower)).items():
+            counts[self._owners[surface]] += found
+        return counts
+
+    def pair_index(self, pairs: Sequence[Tuple[str, ...]]) -> np.ndarray:
+        """(len(pairs), 2) array of character positions for (char_a, char_b, ...) pairs"""
+        return np.array(
+            [[self.index[pair[0]], self.index[pair[1]]] for pair in pairs], dtype=np.intp
+        ).reshape(len(pairs), 2)
+
 
 class RelationshipEvolutionService:
     """Tracks relationship evolution through a manuscript"""
@@ -202,6 +269,7 @@ class RelationshipEvolutionService:
     def __init__(self, db: Session):
         self.db = db
         self.wiki_service = WikiService(db)
+        self._matcher: Optional[Tuple[Any, CharacterMatcher]] = None
 
     # ==================== State Detection ====================
 
@@ -223,40 +291,34 @@ class RelationshipEvolutionService:
         }
         """
         text_lower = text.lower()
-        state_scores = {}
-        indicators = []
-        excerpts = []
 
         # Check if both characters are mentioned
         char_a_present = char_a.lower() in text_lower
         char_b_present = char_b.lower() in text_lower
 
         if not (char_a_present and char_b_present):
-            return {
-                "detected_state": None,
-                "confidence": 0.0,
-                "indicators_found": [],
-                "context_excerpts": [],
-                "note": "Both characters not present in text"
-            }
+            return dict(ABSENT_DETECTION)
+
+        return self._detect_state(text, text_lower)
+
+    def _detect_state(self, text: str, text_lower: str) -> Dict[str, Any]:
+        """State scores for a passage both characters appear in (same for every pair)"""
+        state_scores = {}
+        indicators = []
+        excerpts = []
 
         # Score each state based on patterns
-        for state, patterns in STATE_PATTERNS.items():
-            score = 0
-            for pattern in patterns:
-                matches = re.findall(pattern, text_lower)
-                if matches:
-                    score += len(matches)
-                    indicators.append(f"{state}: {pattern[:30]}")
-
-                    # Get context excerpt
-                    for match in re.finditer(pattern, text_lower):
-                        start = max(0, match.start() - 50)
-                        end = min(len(text), match.end() + 50)
-                        excerpts.append(text[start:end])
-
-            if score > 0:
-                state_scores[state] = score
+        for pattern, matches in zip(STATE_BANK.patterns, STATE_BANK.pattern_counts(text_lower)):
+            if matches:
+                state = pattern.category
+                state_scores[state] = state_scores.get(state, 0) + matches
+                indicators.append(f"{state}: {pattern.pattern[:30]}")
+
+                # Get context excerpt
+                for match in pattern.regex.finditer(text_lower):
+                    start = max(0, match.start() - 50)
+                    end = min(len(text), match.end() + 50)
+                    excerpts.append(text[start:end])
 
         if not state_scores:
             return {
@@ -280,6 +342,72 @@ class RelationshipEvolutionService:
             "context_excerpts": excerpts[:3]
         }
 
+    def character_matcher(
+        self,
+        pairs: Sequence[Tuple[str, ...]],
+        aliases: Optional[Dict[str, Sequence[str]]] = None
+    ) -> CharacterMatcher:
+        """Matcher for the characters in pairs, reused while pairs and aliases stay the same"""
+        names = [name for pair in pairs for name in pair[:2]]
+        key = (tuple(names), repr(sorted((aliases or {}).items())))
+        if self._matcher is None or self._matcher[0] != key:
+            self._matcher = (key, CharacterMatcher(names, aliases))
+        return self._matcher[1]
+
+    def chapter_signals(
+        self,
+        text: str,
+        matcher: CharacterMatcher,
+        pair_index: np.ndarray
+    ) -> Dict[str, Any]:
+        """
+        One chapter's relationship inputs in a single pass over its text.
+
+        Returns {"mentions": mentions per matcher character, "detection":
+        state detection shared by every co-present pair, or None if no pair
+        appears together}.
+        """
+        text_lower = text.lower()
+        mentions = matcher.mentions(text_lower)
+        detection = None
+        if ((mentions[pair_index[:, 0]] > 0) & (mentions[pair_index[:, 1]] > 0)).any():
+            detection = self._detect_state(text, text_lower)
+        return {"mentions": mentions.tolist(), "detection": detection}
+
+    def pair_evolutions(
+        self,
+        manuscript_id: str,
+        pairs: Sequence[Tuple[str, ...]],
+        matcher: CharacterMatcher,
+        chapter_signals: List[Tuple[Any, Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Each pair's evolution from (chapter, chapter_signals result) in chapter order.
+
+        The chapters x characters mention matrix gives, for every pair at
+        once, the chapters both characters appear in; those chapters carry
+        the chapter's shared state detection, the rest count as absent.
+        """
+        if not pairs:
+            return []
+        index = matcher.pair_index(pairs)
+        mentions = np.array(
+            [signals["mentions"] for _, signals in chapter_signals], dtype=np.int64
+        ).reshape(len(chapter_signals), len(matcher.names))
+        together = (mentions[:, index[:, 0]] > 0) & (mentions[:, index[:, 1]] > 0)
+        shared = np.minimum(mentions[:, index[:, 0]], mentions[:, index[:, 1]]).sum(axis=0)
+
+        evolutions = []
+        for k, pair in enumerate(pairs):
+            evolution = self.summarize_evolution(manuscript_id, pair[0], pair[1], [
+                (chapter, signals["detection"] if together[c, k] else ABSENT_DETECTION)
+                for c, (chapter, signals) in enumerate(chapter_signals)
+            ])
+            evolution["chapters_together"] = int(together[:, k].sum())
+            evolution["shared_mentions"] = int(shared[k])
+            evolutions.append(evolution)
+        return evolutions
+
     # ==================== Evolution Tracking ====================
 
     def track_relationship_evolution(
@@ -293,28 +421,54 @@ class RelationshipEvolutionService:
 
         Returns timeline of relationship states with chapter positions.
         """
-        chapters = self.db.query(Chapter).filter(
+        chapters = self._load_chapters(manuscript_id)
+
+        if not chapters:
+            return {"error": "No chapters found"}
+
+        pairs = [(char_a, char_b)]
+        return self._evolve_pairs(manuscript_id, pairs, chapters)[0]
+
+    def _evolve_pairs(
+        self,
+        manuscript_id: str,
+        pairs: Sequence[Tuple[str, ...]],
+        chapters: List[Chapter]
+    ) -> List[Dict[str, Any]]:
+        """Evolutions for pairs from one pass over the chapters"""
+        names = [name for pair in pairs for name in pair[:2]]
+        matcher = self.character_matcher(pairs, self.character_aliases(manuscript_id, names))
+        index = matcher.pair_index(pairs)
+        return self.pair_evolutions(manuscript_id, pairs, matcher, [
+            (chapter, self.chapter_signals(chapter.content, matcher, index))
+            for chapter in chapters
+            if chapter.content
+        ])
+
+    def _load_chapters(self, manuscript_id: str) -> List[Chapter]:
+        return self.db.query(Chapter).filter(
             Chapter.manuscript_id == manuscript_id,
             Chapter.document_type == "CHAPTER"
         ).order_by(Chapter.order_index).all()
 
-        if not chapters:
-            return {"error": "No chapters found"}
+    def summarize_evolution(
+        self,
+        manuscript_id: str,
+        char_a: str,
+        char_b: str,
+        chapter_detections: List[Tuple[Any, Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Build a relationship timeline from per-chapter state detections.
 
+        chapter_detections are (chapter, detect_relationship_state result)
+        pairs in chapter order; the chapter only needs id, title and order_index.
+        """
         evolution = []
         previous_state = RelationshipState.STRANGERS
         state_changes = []
 
-        for chapter in chapters:
-            if not chapter.content:
-                continue
-
-            detection = self.detect_relationship_state(
-                chapter.content,
-                char_a,
-                char_b
-            )
-
+        for chapter, detection in chapter_detections:
             current_state = detection.get('detected_state')
 
             if current_state and current_state != previous_state:
@@ -395,41 +549,62 @@ class RelationshipEvolutionService:
         world_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """Analyze all character relationships in a manuscript"""
+        pairs = self.relationship_pairs(manuscript_id)
+        if pairs is None:
+            return {"error": "Need at least 2 characters for relationship analysis"}
+
+        chapters = self._load_chapters(manuscript_id)
+        all_evolutions = []
+        if chapters:
+            for (_, _, is_tracked), evolution in zip(pairs, self._evolve_pairs(manuscript_id, pairs, chapters)):
+                if is_tracked or evolution.get('total_state_changes', 0) > 0:
+                    all_evolutions.append(evolution)
+
+        return self.summarize_relationships(manuscript_id, all_evolutions)
+
+    def relationship_pairs(self, manuscript_id: str) -> Optional[List[Tuple[str, str, bool]]]:
+        """
+        Character pairs to analyze as (char_a, char_b, is_tracked).
+
+        Pairs with a stored Relationship come first (is_tracked=True, always
+        reported), then pairs among the first five characters (only reported
+        if their state changes). None when the manuscript has fewer than 2
+        characters.
+        """
         # Get all characters
         characters = self.db.query(Entity).filter(
             Entity.manuscript_id == manuscript_id,
-            Entity.entity_type == "CHARACTER"
+            Entity.type == "CHARACTER"
         ).all()
 
         if len(characters) < 2:
-            return {"error": "Need at least 2 characters for relationship analysis"}
+            return None
 
         character_names = [c.name for c in characters]
 
         # Get existing relationships from database
+        manuscript_entity_ids = self.db.query(Entity.id).filter(Entity.manuscript_id == manuscript_id)
         relationships = self.db.query(Relationship).filter(
-            Relationship.manuscript_id == manuscript_id
+            Relationship.source_entity_id.in_(manuscript_entity_ids)
         ).all()
+        entity_ids = {rel.source_entity_id for rel in relationships} | {rel.target_entity_id for rel in relationships}
+        names_by_id = dict(
+            self.db.query(Entity.id, Entity.name).filter(Entity.id.in_(entity_ids)).all()
+        ) if entity_ids else {}
 
         # Track pairs we've analyzed
         analyzed_pairs = set()
-        all_evolutions = []
+        pairs = []
 
         # First analyze existing relationships
         for rel in relationships:
-            source = self.db.query(Entity).filter(Entity.id == rel.source_entity_id).first()
-            target = self.db.query(Entity).filter(Entity.id == rel.target_entity_id).first()
+            source = names_by_id.get(rel.source_entity_id)
+            target = names_by_id.get(rel.target_entity_id)
 
             if source and target:
-                pair_key = tuple(sorted([source.name, target.name]))
+                pair_key = tuple(sorted([source, target]))
                 if pair_key not in analyzed_pairs:
-                    evolution = self.track_relationship_evolution(
-                        manuscript_id,
-                        source.name,
-                        target.name
-                    )
-                    if 'error' not in evolution:
-                        all_evolutions.append(evolution)
+                    pairs.append((source, target, True))
                     analyzed_pairs.add(pair_key)
 
         # Analyze remaining important pairs (main characters)
@@ -438,15 +613,33 @@ class RelationshipEvolutionService:
             for char_b in main_chars[i + 1:]:
                 pair_key = tuple(sorted([char_a, char_b]))
                 if pair_key not in analyzed_pairs:
-                    evolution = self.track_relationship_evolution(
-                        manuscript_id,
-                        char_a,
-                        char_b
-                    )
-                    if 'error' not in evolution and evolution.get('total_state_changes', 0) > 0:
-                        all_evolutions.append(evolution)
+                    pairs.append((char_a, char_b, False))
                     analyzed_pairs.add(pair_key)
 
+        return pairs
+
+    def character_aliases(self, manuscript_id: str, names: Sequence[str]) -> Dict[str, List[str]]:
+        """Aliases of the manuscript's characters with the given names"""
+        aliases: Dict[str, List[str]] = {}
+        if self.db is None or not names:
+            return aliases
+        rows = self.db.query(Entity.name, Entity.aliases).filter(
+            Entity.manuscript_id == manuscript_id,
+            Entity.type == "CHARACTER",
+            Entity.name.in_(set(names))
+        )
+        for name, entity_aliases in rows:
+            for alias in entity_aliases or []:
+                if isinstance(alias, str) and alias and alias not in aliases.get(name, []):
+                    aliases.setdefault(name, []).append(alias)
+        return aliases
+
+    def summarize_relationships(
+        self,
+        manuscript_id: str,
+        all_evolutions: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Manuscript-wide relationship report from per-pair evolutions"""
         # Summary statistics
         total_unearned = sum(e.get('unearned_changes', 0) for e in all_evolutions)
         total_changes = sum(e.get('total_state_changes', 0) for e in all_evolutions)
@@ -0,0 +1,113 @@
+"""
+Request Coalescer - Single-flight deduplication for in-flight async work.
+
+When several callers ask for the same thing at the same moment (double-clicks
+on brainstorm buttons, two tabs open on one chapter, orchestrator re-runs),
+only the first caller (the "leader") does the work. Everyone else arriving
+while it is still in flight (the "followers") awaits the leader's future and
+receives the same result or exception.
+
+Nothing is cached once the call completes - that is ResponseCache's job.
+"""
+
+import asyncio
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+@dataclass
+class CoalescingStats:
+    """Counters describing coalescer activity"""
+    leaders: int = 0  # Calls that actually executed
+    followers: int = 0  # Calls that awaited an in-flight leader
+    failures: int = 0  # Leader calls that raised
+
+    def to_dict(self) -> Dict[str, Any]:
+        total = self.leaders + self.followers
+        return {
+            "leaders": self.leaders,
+            "followers": self.followers,
+            "failures": self.failures,
+            "total_requests": total,
+            "dedup_ratio": round(self.followers / total, 4) if total else 0.0,
+        }
+
+
+class RequestCoalescer:
+    """
+    Single-flight group keyed by an opaque string.
+
+    Usage:
+        coalescer = RequestCoalescer()
+        result, was_follower = await coalescer.run(key, lambda: expensive_call())
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.stats = CoalescingStats()
+
+    @property
+    def in_flight_count(self) -> int:
+        """Number of distinct keys currently being executed"""
+        return len(self._in_flight)
+
+    async def run(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable[Any]],
+    ) -> Tuple[Any, bool]:
+        """
+        Execute factory() once per key among concurrent callers.
+
+        Returns:
+            (result, was_follower) - was_follower is True when this caller
+            reused another caller's in-flight result.
+        """
+        existing = self._in_flight.get(key)
+        if existing is not None:
+            self.stats.followers += 1
+            # shield() so a cancelled caller doesn't cancel the shared work
+            return await asyncio.shield(existing), True
+
+        # Run the work as its own task so cancelling the leader (e.g. a client
+        # disconnect) doesn't fail every follower waiting on the same result.
+        task = asyncio.ensure_future(factory())
+        self._in_flight[key] = task
+        self.stats.leaders += 1
+        task.add_done_callback(lambda t: self._on_done(key, t))
+
+        return await asyncio.shield(task), False
+
+    def _on_done(self, key: str, task: asyncio.Future):
+        """Drop the finished task from the in-flight table"""
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.stats.failures += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Snapshot of counters plus current in-flight count"""
+        data = self.stats.to_dict()
+        data["in_flight"] = self.in_flight_count
+        return data
+
+    def reset_stats(self):
+        """Reset counters (in-flight calls are unaffected)"""
+        self.stats = CoalescingStats()
+
+
+def make_request_key(*parts: Any) -> str:
+    """
+    Build a stable coalescing key from JSON-serializable parts.
+
+    Secrets (API keys) should be hashed by the caller before being passed in.
+    """
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+# Module-level singleton shared by every LLMService instance, so requests from
+# short-lived ProtectedLLMService objects still coalesce with each other.
+llm_request_coalescer = RequestCoalescer()
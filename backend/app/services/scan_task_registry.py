@@ -1,14 +1,20 @@
 """
-Scan Task Registry - In-memory singleton for tracking background wiki scan tasks.
+Scan Task Registry - Wiki scan tasks, backed by the job queue.
 
-Provides thread-safe tracking of scan progress so the frontend can poll for updates.
+A wiki scan is a "wiki.scan" job (see app.services.job_queue), so it is
+persisted, survives restarts and streams progress like any other job. This
+registry keeps the ScanTask view the wiki routes and frontend poll for.
+Manuscripts are scanned in parallel (see world_scan); while they are,
+current_manuscript_title lists every manuscript a worker is on.
 """
 
-import threading
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional, Dict
-import uuid
+from typing import Any, Dict, Optional
+
+from app.models.job import JobStatus
+
+WIKI_SCAN_JOB = "wiki.scan"
 
 
 @dataclass
@@ -21,6 +27,7 @@ class ScanTask:
     manuscripts_completed: int = 0
     current_manuscript_title: str = ""
     current_stage: str = ""
+    workers: int = 0  # Manuscripts scanned at once
     progress_percent: float = 0.0
     total_changes: int = 0
     error: Optional[str] = None
@@ -28,101 +35,73 @@ class ScanTask:
     completed_at: Optional[datetime] = None
 
 
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def scan_task_from_job(job: Dict[str, Any]) -> ScanTask:
+    """The ScanTask view of a wiki.scan job"""
+    status = job["status"]
+    if status in JobStatus.ACTIVE:
+        status = "running"
+    elif status == JobStatus.CANCELLED:
+        status = "failed"
+
+    progress = job.get("progress") or {}
+    result = job.get("result") or {}
+    error = job.get("error")
+    if job["status"] == JobStatus.CANCELLED and not error:
+        error = "Scan cancelled"
+
+    return ScanTask(
+        id=job["id"],
+        world_id=job["params"].get("world_id", ""),
+        status=status,
+        total_manuscripts=progress.get("total_manuscripts", 0),
+        manuscripts_completed=progress.get("manuscripts_completed", 0),
+        current_manuscript_title=progress.get("current_manuscript_title", ""),
+        current_stage=job.get("current_stage", ""),
+        workers=progress.get("workers", 0),
+        progress_percent=job.get("progress_percent", 0.0),
+        total_changes=result.get("total_changes", progress.get("total_changes", 0)),
+        error=error,
+        started_at=_parse_time(job.get("started_at") or job.get("created_at")) or datetime.utcnow(),
+        completed_at=_parse_time(job.get("completed_at")),
+    )
+
+
 class ScanTaskRegistry:
-    """Thread-safe singleton registry for scan tasks"""
-
-    _instance: Optional["ScanTaskRegistry"] = None
-    _lock = threading.Lock()
-
-    def __new__(cls) -> "ScanTaskRegistry":
-        if cls._instance is None:
-            with cls._lock:
-                if cls._instance is None:
-                    cls._instance = super().__new__(cls)
-                    cls._instance._tasks: Dict[str, ScanTask] = {}
-                    cls._instance._active_world_scans: Dict[str, str] = {}  # world_id -> task_id
-                    cls._instance._task_lock = threading.Lock()
-        return cls._instance
-
-    def create_task(self, world_id: str, total_manuscripts: int) -> ScanTask:
-        """Create a new scan task. Returns None-equivalent if world already has an active scan."""
-        with self._task_lock:
-            # Prevent duplicate scans per world
-            if world_id in self._active_world_scans:
-                existing_id = self._active_world_scans[world_id]
-                existing = self._tasks.get(existing_id)
-                if existing and existing.status == "running":
-                    return existing
-
-            task_id = str(uuid.uuid4())
-            task = ScanTask(
-                id=task_id,
-                world_id=world_id,
-                total_manuscripts=total_manuscripts,
-            )
-            self._tasks[task_id] = task
-            self._active_world_scans[world_id] = task_id
-            return task
+    """Wiki scan tasks as jobs; one in-flight scan per world"""
+
+    def __init__(self, manager=None):
+        self._manager = manager
+
+    @property
+    def manager(self):
+        if self._manager is None:
+            from app.services.job_queue import job_manager
+            return job_manager
+        return self._manager
+
+    def start_scan(self, world_id: str, manuscript_id: Optional[str] = None) -> ScanTask:
+        """Queue a scan of one manuscript, or every manuscript in the world; joins a running scan of the world"""
+        params: Dict[str, Any] = {"world_id": world_id}
+        if manuscript_id:
+            params["manuscript_id"] = manuscript_id
+        job, _ = self.manager.submit(WIKI_SCAN_JOB, params)
+        return scan_task_from_job(job)
 
     def get_task(self, task_id: str) -> Optional[ScanTask]:
         """Get a task by ID"""
-        return self._tasks.get(task_id)
-
-    def get_active_task_for_world(self, world_id: str) -> Optional[ScanTask]:
-        """Get the active (running) scan task for a world, if any"""
-        with self._task_lock:
-            task_id = self._active_world_scans.get(world_id)
-            if not task_id:
-                return None
-            task = self._tasks.get(task_id)
-            if task and task.status == "running":
-                return task
+        job = self.manager.get(task_id)
+        if job is None or job["kind"] != WIKI_SCAN_JOB:
             return None
+        return scan_task_from_job(job)
 
-    def update_progress(
-        self,
-        task_id: str,
-        manuscripts_completed: int = 0,
-        current_manuscript_title: str = "",
-        current_stage: str = "",
-        progress_percent: float = 0.0,
-        changes_so_far: int = 0,
-    ) -> None:
-        """Update progress on a running task"""
-        task = self._tasks.get(task_id)
-        if not task:
-            return
-        task.manuscripts_completed = manuscripts_completed
-        task.current_manuscript_title = current_manuscript_title
-        task.current_stage = current_stage
-        task.progress_percent = progress_percent
-        task.total_changes = changes_so_far
-
-    def complete_task(self, task_id: str, total_changes: int) -> None:
-        """Mark a task as completed"""
-        with self._task_lock:
-            task = self._tasks.get(task_id)
-            if not task:
-                return
-            task.status = "completed"
-            task.total_changes = total_changes
-            task.progress_percent = 100.0
-            task.completed_at = datetime.utcnow()
-            # Remove from active scans
-            if self._active_world_scans.get(task.world_id) == task_id:
-                del self._active_world_scans[task.world_id]
-
-    def fail_task(self, task_id: str, error: str) -> None:
-        """Mark a task as failed"""
-        with self._task_lock:
-            task = self._tasks.get(task_id)
-            if not task:
-                return
-            task.status = "failed"
-            task.error = error
-            task.completed_at = datetime.utcnow()
-            if self._active_world_scans.get(task.world_id) == task_id:
-                del self._active_world_scans[task.world_id]
+    def get_active_task_for_world(self, world_id: str) -> Optional[ScanTask]:
+        """Get the active (queued or running) scan task for a world, if any"""
+        job = self.manager.find_active(WIKI_SCAN_JOB, {"world_id": world_id})
+        return scan_task_from_job(job) if job is not None else None
 
 
 # Module-level singleton access
@@ -15,7 +15,7 @@ import re
 import uuid
 
 from app.models.manuscript import Chapter, Scene
-from app.services.nlp_service import nlp_service
+from app.services.pattern_bank import PatternBank
 
 
 # ==================== Scene Purpose Types ====================
@@ -161,6 +161,8 @@ PURPOSE_PATTERNS = {
     ],
 }
 
+PURPOSE_BANK = PatternBank(PURPOSE_PATTERNS)
+
 # Genre-expected scene types
 GENRE_SCENE_EXPECTATIONS = {
     "romance": [
@@ -227,17 +229,8 @@ class ScenePurposeService:
             }
 
         text_lower = text.lower()
-        purpose_scores = {}
-
-        # Score each purpose type
-        for purpose, patterns in PURPOSE_PATTERNS.items():
-            score = 0
-            for pattern in patterns:
-                matches = re.findall(pattern, text_lower)
-                score += len(matches)
-
-            if score > 0:
-                purpose_scores[purpose] = score
+        # Score every purpose type in one pass
+        purpose_scores = PURPOSE_BANK.counts(text_lower)
 
         if not purpose_scores:
             return {
@@ -314,13 +307,17 @@ class ScenePurposeService:
         if not chapter.content:
             return {"error": "No content to analyze"}
 
+        return self.analyze_chapter_text(chapter_id, chapter.title, chapter.content)
+
+    def analyze_chapter_text(self, chapter_id: str, chapter_title: Optional[str], content: str) -> Dict[str, Any]:
+        """Scene purpose analysis of one chapter's text (no database access)"""
         # Split into scenes (using common scene break patterns)
         scene_break_pattern = r'\n\s*(?:\*\s*\*\s*\*|\#\s*\#\s*\#|~~~)\s*\n'
-        scenes = re.split(scene_break_pattern, chapter.content)
+        scenes = re.split(scene_break_pattern, content)
 
         # If no scene breaks, treat entire chapter as one scene
         if len(scenes) == 1:
-            scenes = [chapter.content]
+            scenes = [content]
 
         scene_analyses = []
         purposes_found = {}
@@ -343,7 +340,7 @@ class ScenePurposeService:
 
         return {
             "chapter_id": chapter_id,
-            "chapter_title": chapter.title,
+            "chapter_title": chapter_title,
             "total_scenes": len(scene_analyses),
             "purposes_found": purposes_found,
             "purposeless_scenes": purposeless_count,
@@ -376,20 +373,30 @@ class ScenePurposeService:
         if not chapters:
             return {"error": "No chapters found"}
 
-        chapter_analyses = []
+        chapter_analyses = [
+            self.analyze_chapter_text(chapter.id, chapter.title, chapter.content)
+            for chapter in chapters
+            if chapter.content
+        ]
+        return self.summarize_manuscript(manuscript_id, genre, chapter_analyses)
+
+    def summarize_manuscript(
+        self,
+        manuscript_id: str,
+        genre: Optional[str],
+        chapter_analyses: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Combine per-chapter scene purpose analyses (in chapter order) into the manuscript report"""
         all_purposes = {}
         total_purposeless = 0
         total_scenes = 0
 
-        for chapter in chapters:
-            analysis = self.analyze_chapter(chapter.id)
-            if 'error' not in analysis:
-                chapter_analyses.append(analysis)
-                total_scenes += analysis.get('total_scenes', 0)
-                total_purposeless += analysis.get('purposeless_scenes', 0)
+        for analysis in chapter_analyses:
+            total_scenes += analysis.get('total_scenes', 0)
+            total_purposeless += analysis.get('purposeless_scenes', 0)
 
-                for purpose, count in analysis.get('purposes_found', {}).items():
-                    all_purposes[purpose] = all_purposes.get(purpose, 0) + count
+            for purpose, count in analysis.get('purposes_found', {}).items():
+                all_purposes[purpose] = all_purposes.get(purpose, 0) + count
 
         # Check for missing genre-expected purposes
         missing_purposes = []
@@ -7,21 +7,31 @@ Supports importing:
 - Character sheets as Codex entities
 - Location documents as Codex entities
 - Research folder as notes (optional)
+
+Zipped projects are read in place: the .scrivx manifest and each document's
+content.rtf are opened as zip members, never extracted. Documents are read
+and converted from RTF in batches in the import worker pool.
 """
 
+import asyncio
 import os
 import re
 import xml.etree.ElementTree as ET
 import zipfile
 from dataclasses import dataclass, field
-from typing import List, Optional, Dict, Any, Tuple
-from pathlib import Path
-import tempfile
-import shutil
+from typing import Callable, List, Optional, Dict, Any, Tuple
 import logging
 
+from app.services.import_workers import ImportWorkerPool, import_pool
+
 logger = logging.getLogger(__name__)
 
+# Documents read per worker task
+DOCUMENTS_PER_TASK = int(os.getenv("SCRIVENER_DOCUMENTS_PER_TASK", "50"))
+
+# Binder item types that hold other items rather than text
+FOLDER_TYPES = ['Folder', 'DraftFolder', 'ResearchFolder', 'TrashFolder', 'Root']
+
 
 @dataclass
 class ScrivenerDocument:
@@ -32,7 +42,6 @@ class ScrivenerDocument:
     parent_uuid: Optional[str] = None
     children: List[str] = field(default_factory=list)
     synopsis: Optional[str] = None
-    content_rtf: Optional[str] = None
     content_plain: Optional[str] = None
     order: int = 0
     metadata: Dict[str, Any] = field(default_factory=dict)
@@ -58,6 +67,177 @@ class ScrivenerProject:
     settings: Dict[str, Any] = field(default_factory=dict)
 
 
+class ScrivenerFiles:
+    """Read access to a Scrivener project inside a zip archive or a folder on disk"""
+
+    def __init__(self, path: str, is_zip: bool = True):
+        self.path = path
+        self.is_zip = is_zip
+        self._zip: Optional[zipfile.ZipFile] = None
+        self._names: List[str] = []
+        if is_zip:
+            try:
+                self._zip = zipfile.ZipFile(path, 'r')
+            except zipfile.BadZipFile:
+                raise ValueError("Invalid zip file - file may be corrupted")
+            self._names = [n for n in self._zip.namelist() if not n.startswith('__MACOSX/')]
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+
+    def __enter__(self) -> "ScrivenerFiles":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def join(self, *parts: str) -> str:
+        if self.is_zip:
+            return '/'.join(p.strip('/') for p in parts if p)
+        return os.path.join(*parts)
+
+    def find_project_root(self) -> Optional[str]:
+        """Folder holding the .scrivx manifest (a zip prefix or a path on disk)"""
+        if not self.is_zip:
+            return self.path
+        # A .scriv folder anywhere in the archive
+        for name in self._names:
+            parts = name.split('/')
+            for i, part in enumerate(parts[:-1]):
+                if part.endswith('.scriv'):
+                    return '/'.join(parts[:i + 1])
+        # Or the archive is the inside of a .scriv folder (.scrivx next to Files/)
+        for name in self._names:
+            if name.endswith('.scrivx'):
+                root = name.rsplit('/', 1)[0] if '/' in name else ''
+                if any(n.startswith(self.join(root, 'Files') + '/') for n in self._names):
+                    return root
+        return None
+
+    def find_scrivx(self, root: str) -> Optional[str]:
+        if self.is_zip:
+            for name in self._names:
+                directory, _, filename = name.rpartition('/')
+                if directory == root and filename.endswith('.scrivx'):
+                    return name
+            return None
+        for f in os.listdir(root):
+            if f.endswith('.scrivx'):
+                return os.path.join(root, f)
+        return None
+
+    def exists(self, path: str) -> bool:
+        if self.is_zip:
+            prefix = path.rstrip('/') + '/'
+            return any(n == path or n.startswith(prefix) for n in self._names)
+        return os.path.exists(path)
+
+    def is_file(self, path: str) -> bool:
+        if self.is_zip:
+            return path in self._zip.NameToInfo
+        return os.path.isfile(path)
+
+    def open(self, path: str):
+        if self.is_zip:
+            return self._zip.open(path)
+        return open(path, 'rb')
+
+    def read_text(self, path: str) -> str:
+        with self.open(path) as f:
+            return f.read().decode('utf-8', errors='ignore')
+
+    def content_dir(self, root: str) -> Optional[str]:
+        """Files/Data (Scrivener 3) or Files/Docs (Scrivener 2)"""
+        for candidate in (self.join(root, 'Files', 'Data'), self.join(root, 'Files', 'Docs')):
+            if self.exists(candidate):
+                return candidate
+        return None
+
+
+def rtf_to_text(rtf_content: str) -> str:
+    """
+    Convert RTF content to plain text.
+
+    Uses striprtf if available, otherwise falls back to basic regex stripping.
+    """
+    try:
+        # Try using striprtf library
+        from striprtf.striprtf import rtf_to_text as striprtf_to_text
+        return striprtf_to_text(rtf_content)
+    except ImportError:
+        # Fallback: basic RTF stripping
+        logger.warning("striprtf not installed, using basic RTF conversion")
+        return basic_rtf_strip(rtf_content)
+    except Exception as e:
+        logger.error(f"RTF conversion error: {e}")
+        return basic_rtf_strip(rtf_content)
+
+
+def basic_rtf_strip(rtf: str) -> str:
+    """Basic RTF to text conversion using regex"""
+    # Remove RTF control words
+    text = re.sub(r'\\[a-z]+\d*\s?', '', rtf)
+    # Remove braces
+    text = re.sub(r'[{}]', '', text)
+    # Remove escaped characters
+    text = text.replace('\\\\', '\\')
+    text = text.replace('\\{', '{')
+    text = text.replace('\\}', '}')
+    # Clean up extra whitespace
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+
+def read_documents(
+    project_path: str,
+    is_zip: bool,
+    content_dir: str,
+    uuids: List[str],
+) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+    """
+    Read (plain content, synopsis) for a batch of documents.
+
+    Worker process entry point: opens the project itself and reads only the
+    members it needs, one at a time.
+    """
+    results = {}
+    with ScrivenerFiles(project_path, is_zip) as files:
+        for uuid in uuids:
+            doc_path = files.join(content_dir, uuid)
+            content_plain = None
+            synopsis = None
+
+            # Try to read RTF content (Scrivener 3 default)
+            rtf_path = files.join(doc_path, 'content.rtf')
+            if files.is_file(rtf_path):
+                try:
+                    content_plain = rtf_to_text(files.read_text(rtf_path))
+                except Exception as e:
+                    logger.error(f"Error reading RTF for {uuid}: {e}")
+
+            # Try plain text fallback
+            if not content_plain:
+                txt_path = files.join(doc_path, 'content.txt')
+                if files.is_file(txt_path):
+                    try:
+                        content_plain = files.read_text(txt_path)
+                    except Exception as e:
+                        logger.error(f"Error reading text for {uuid}: {e}")
+
+            # Try to read synopsis
+            synopsis_path = files.join(doc_path, 'synopsis.txt')
+            if files.is_file(synopsis_path):
+                try:
+                    synopsis = files.read_text(synopsis_path).strip()
+                except Exception as e:
+                    logger.error(f"Error reading synopsis for {uuid}: {e}")
+
+            results[uuid] = (content_plain, synopsis)
+    return results
+
+
 class ScrivenerImportService:
     """
     Service for importing Scrivener projects into Maxwell.
@@ -68,86 +248,52 @@ class ScrivenerImportService:
     - RTF and plain text content extraction
     """
 
-    def __init__(self):
-        self.temp_dir = None
+    def __init__(self, pool: Optional[ImportWorkerPool] = None):
+        self.pool = pool or import_pool
 
     async def parse_scrivener_project(
         self,
         file_path: str,
-        is_zip: bool = True
+        is_zip: bool = True,
+        progress: Optional[Callable[[int, int, str], None]] = None,
     ) -> ScrivenerProject:
         """
         Parse Scrivener project from .zip or extracted folder.
 
         Args:
             file_path: Path to .zip file or .scriv folder
-            is_zip: If True, extract from zip first
+            is_zip: If True, read members straight from the zip
+            progress: Optional callback(documents_read, total_documents, stage)
 
         Returns:
             ScrivenerProject with all documents parsed
         """
-        if is_zip:
-            # Extract to temp directory
-            self.temp_dir = tempfile.mkdtemp()
-            try:
-                with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                    zip_ref.extractall(self.temp_dir)
-            except zipfile.BadZipFile:
-                raise ValueError("Invalid zip file - file may be corrupted")
-
-            # Find .scriv folder
-            scriv_path = self._find_scriv_folder(self.temp_dir)
-            if not scriv_path:
+        with ScrivenerFiles(file_path, is_zip) as files:
+            scriv_path = files.find_project_root()
+            if scriv_path is None:
                 raise ValueError("No .scriv folder found in zip file")
-        else:
-            scriv_path = file_path
 
-        try:
             # Parse the project
-            project = self._parse_scrivx(scriv_path)
-
-            # Extract content for each document
-            await self._extract_all_content(project, scriv_path)
-
-            return project
-        finally:
-            # Cleanup temp directory
-            if self.temp_dir and os.path.exists(self.temp_dir):
-                shutil.rmtree(self.temp_dir)
-                self.temp_dir = None
-
-    def _find_scriv_folder(self, base_path: str) -> Optional[str]:
-        """Find .scriv folder in extracted zip"""
-        for root, dirs, files in os.walk(base_path):
-            # Check for .scriv directories
-            for d in dirs:
-                if d.endswith('.scriv'):
-                    return os.path.join(root, d)
-
-            # Also check if we're already inside the scriv folder
-            # (has Files directory and a .scrivx file)
-            if 'Files' in dirs and any(f.endswith('.scrivx') for f in files):
-                return root
+            project = self._parse_scrivx(files, scriv_path)
+            content_dir = files.content_dir(scriv_path)
 
-        return None
+        # Extract content for each document
+        await self._extract_all_content(project, file_path, is_zip, content_dir, progress)
+        return project
 
-    def _parse_scrivx(self, scriv_path: str) -> ScrivenerProject:
+    def _parse_scrivx(self, files: ScrivenerFiles, scriv_path: str) -> ScrivenerProject:
         """
         Parse the .scrivx XML manifest file.
 
         This is the main index file for Scrivener projects.
         """
         # Find .scrivx file
-        scrivx_file = None
-        for f in os.listdir(scriv_path):
-            if f.endswith('.scrivx'):
-                scrivx_file = os.path.join(scriv_path, f)
-                break
-
+        scrivx_file = files.find_scrivx(scriv_path)
         if not scrivx_file:
             raise ValueError("No .scrivx file found in project folder")
 
-        tree = ET.parse(scrivx_file)
+        with files.open(scrivx_file) as f:
+            tree = ET.parse(f)
         root = tree.getroot()
 
         # Get project title from filename or Title attribute
@@ -274,90 +420,46 @@ class ScrivenerImportService:
     async def _extract_all_content(
         self,
         project: ScrivenerProject,
-        scriv_path: str
+        file_path: str,
+        is_zip: bool,
+        content_dir: Optional[str],
+        progress: Optional[Callable[[int, int, str], None]] = None,
     ):
-        """Extract content for all documents from Files/Data directory"""
-        # Scrivener 3 stores content in Files/Data/{UUID}/
-        files_path = os.path.join(scriv_path, 'Files', 'Data')
-
-        if not os.path.exists(files_path):
-            # Try Scrivener 2 path
-            files_path = os.path.join(scriv_path, 'Files', 'Docs')
-
-        if not os.path.exists(files_path):
-            logger.warning(f"Could not find content directory in {scriv_path}")
+        """Read content for all text documents, in batches across the worker pool"""
+        if content_dir is None:
+            logger.warning(f"Could not find content directory in {file_path}")
             return
 
-        for uuid, doc in project.documents.items():
-            # Skip folders
-            if doc.doc_type in ['Folder', 'DraftFolder', 'ResearchFolder', 'TrashFolder', 'Root']:
-                continue
-
-            doc_path = os.path.join(files_path, uuid)
-            if not os.path.exists(doc_path):
-                continue
-
-            # Try to read RTF content (Scrivener 3 default)
-            rtf_path = os.path.join(doc_path, 'content.rtf')
-            if os.path.exists(rtf_path):
-                try:
-                    with open(rtf_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        doc.content_rtf = f.read()
-                    # Convert to plain text
-                    doc.content_plain = self._rtf_to_text(doc.content_rtf)
-                except Exception as e:
-                    logger.error(f"Error reading RTF for {uuid}: {e}")
-
-            # Try plain text fallback
-            if not doc.content_plain:
-                txt_path = os.path.join(doc_path, 'content.txt')
-                if os.path.exists(txt_path):
-                    try:
-                        with open(txt_path, 'r', encoding='utf-8', errors='ignore') as f:
-                            doc.content_plain = f.read()
-                    except Exception as e:
-                        logger.error(f"Error reading text for {uuid}: {e}")
-
-            # Try to read synopsis
-            synopsis_path = os.path.join(doc_path, 'synopsis.txt')
-            if os.path.exists(synopsis_path):
-                try:
-                    with open(synopsis_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        doc.synopsis = f.read().strip()
-                except Exception as e:
-                    logger.error(f"Error reading synopsis for {uuid}: {e}")
+        uuids = [
+            uuid for uuid, doc in project.documents.items()
+            if doc.doc_type not in FOLDER_TYPES
+        ]
+        total = len(uuids)
+        done = 0
+        if progress:
+            progress(0, total, "Reading documents")
+
+        async def read_batch(batch: List[str]):
+            nonlocal done
+            contents = await self.pool.run(read_documents, file_path, is_zip, content_dir, batch)
+            for uuid, (content_plain, synopsis) in contents.items():
+                doc = project.documents[uuid]
+                doc.content_plain = content_plain
+                doc.synopsis = synopsis
+            done += len(batch)
+            if progress:
+                progress(done, total, "Reading documents")
+
+        step = max(DOCUMENTS_PER_TASK, 1)
+        await asyncio.gather(*(read_batch(uuids[i:i + step]) for i in range(0, total, step)))
 
     def _rtf_to_text(self, rtf_content: str) -> str:
-        """
-        Convert RTF content to plain text.
-
-        Uses striprtf if available, otherwise falls back to basic regex stripping.
-        """
-        try:
-            # Try using striprtf library
-            from striprtf.striprtf import rtf_to_text
-            return rtf_to_text(rtf_content)
-        except ImportError:
-            # Fallback: basic RTF stripping
-            logger.warning("striprtf not installed, using basic RTF conversion")
-            return self._basic_rtf_strip(rtf_content)
-        except Exception as e:
-            logger.error(f"RTF conversion error: {e}")
-            return self._basic_rtf_strip(rtf_content)
+        """Convert RTF content to plain text."""
+        return rtf_to_text(rtf_content)
 
     def _basic_rtf_strip(self, rtf: str) -> str:
         """Basic RTF to text conversion using regex"""
-        # Remove RTF control words
-        text = re.sub(r'\\[a-z]+\d*\s?', '', rtf)
-        # Remove braces
-        text = re.sub(r'[{}]', '', text)
-        # Remove escaped characters
-        text = text.replace('\\\\', '\\')
-        text = text.replace('\\{', '{')
-        text = text.replace('\\}', '}')
-        # Clean up extra whitespace
-        text = re.sub(r'\s+', ' ', text)
-        return text.strip()
+        return basic_rtf_strip(rtf)
 
     def convert_to_maxwell(
         self,
@@ -11,11 +11,11 @@ Analyzes:
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from sqlalchemy.orm import Session
-import re
 import uuid
 
 from app.models.manuscript import Manuscript, Chapter
 from app.models.wiki import WikiEntry, WikiEntryType
+from app.services.pattern_bank import PatternBank
 
 
 # ==================== Subplot Types ====================
@@ -94,6 +94,8 @@ SUBPLOT_PATTERNS = {
     ],
 }
 
+SUBPLOT_BANK = PatternBank(SUBPLOT_PATTERNS)
+
 
 class SubplotTrackerService:
     """Tracks subplot threads through a manuscript"""
@@ -126,18 +128,10 @@ class SubplotTrackerService:
             }
 
         text_lower = text.lower()
-        type_scores = {}
         char_associations = {}
 
-        # Score each subplot type
-        for subplot_type, patterns in SUBPLOT_PATTERNS.items():
-            score = 0
-            for pattern in patterns:
-                matches = re.findall(pattern, text_lower)
-                score += len(matches)
-
-            if score > 0:
-                type_scores[subplot_type] = score
+        # Score every subplot type in one pass
+        type_scores = SUBPLOT_BANK.counts(text_lower)
 
         if not type_scores:
             return {
@@ -160,17 +154,13 @@ class SubplotTrackerService:
                 if char_lower in text_lower:
                     char_associations[char] = []
                     # Find which subplots mention this character nearby
-                    for subplot_type, patterns in SUBPLOT_PATTERNS.items():
-                        if subplot_type not in detected:
-                            continue
-                        for pattern in patterns:
-                            # Look for character name within 100 chars of pattern
-                            for match in re.finditer(pattern, text_lower):
-                                start = max(0, match.start() - 100)
-                                end = min(len(text_lower), match.end() + 100)
-                                if char_lower in text_lower[start:end]:
-                                    if subplot_type not in char_associations[char]:
-                                        char_associations[char].append(subplot_type)
+                    for pattern, match in SUBPLOT_BANK.finditer(text_lower, detected):
+                        # Look for character name within 100 chars of pattern
+                        start = max(0, match.start() - 100)
+                        end = min(len(text_lower), match.end() + 100)
+                        if char_lower in text_lower[start:end]:
+                            if pattern.category not in char_associations[char]:
+                                char_associations[char].append(pattern.category)
 
         return {
             "detected_types": detected,
@@ -195,19 +185,35 @@ class SubplotTrackerService:
 
         # Get characters if not provided
         if not characters:
-            from app.models.entity import Entity
-            entities = self.db.query(Entity).filter(
-                Entity.manuscript_id == chapter.manuscript_id,
-                Entity.entity_type == "CHARACTER"
-            ).all()
-            characters = [e.name for e in entities]
+            characters = self._character_names(chapter.manuscript_id)
+
+        return self.analyze_chapter_text(
+            chapter_id, chapter.title, chapter.order_index, chapter.content, characters
+        )
 
-        detection = self.detect_subplots_in_text(chapter.content, characters)
+    def _character_names(self, manuscript_id: str) -> List[str]:
+        from app.models.entity import Entity
+        entities = self.db.query(Entity).filter(
+            Entity.manuscript_id == manuscript_id,
+            Entity.type == "CHARACTER"
+        ).all()
+        return [e.name for e in entities]
+
+    def analyze_chapter_text(
+        self,
+        chapter_id: str,
+        chapter_title: Optional[str],
+        chapter_index: int,
+        content: str,
+        characters: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Subplot analysis of one chapter's text (no database access)"""
+        detection = self.detect_subplots_in_text(content, characters)
 
         return {
             "chapter_id": chapter_id,
-            "chapter_title": chapter.title,
-            "chapter_index": chapter.order_index,
+            "chapter_title": chapter_title,
+            "chapter_index": chapter_index,
             "subplots_present": detection["detected_types"],
             "subplot_scores": detection["type_scores"],
             "character_associations": detection["character_associations"],
@@ -237,37 +243,40 @@ class SubplotTrackerService:
             return {"error": "No chapters found"}
 
         # Get characters for association tracking
-        from app.models.entity import Entity
-        entities = self.db.query(Entity).filter(
-            Entity.manuscript_id == manuscript_id,
-            Entity.entity_type == "CHARACTER"
-        ).all()
-        characters = [e.name for e in entities]
+        characters = self._character_names(manuscript_id)
+
+        chapter_analyses = [
+            self.analyze_chapter_text(chapter.id, chapter.title, chapter.order_index, chapter.content, characters)
+            for chapter in chapters
+            if chapter.content
+        ]
+        return self.summarize_manuscript(manuscript_id, len(chapters), chapter_analyses)
 
-        chapter_analyses = []
+    def summarize_manuscript(
+        self,
+        manuscript_id: str,
+        total_chapters: int,
+        chapter_analyses: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Combine per-chapter subplot analyses (in chapter order) into the manuscript report"""
         subplot_timeline = {}  # subplot_type -> list of chapter indices
         subplot_characters = {}  # subplot_type -> set of characters
 
-        for chapter in chapters:
-            analysis = self.analyze_chapter(chapter.id, characters)
-            if "error" not in analysis:
-                chapter_analyses.append(analysis)
-
-                # Track subplot presence
-                for subplot in analysis.get("subplots_present", []):
-                    if subplot not in subplot_timeline:
-                        subplot_timeline[subplot] = []
-                        subplot_characters[subplot] = set()
+        for analysis in chapter_analyses:
+            # Track subplot presence
+            for subplot in analysis.get("subplots_present", []):
+                if subplot not in subplot_timeline:
+                    subplot_timeline[subplot] = []
+                    subplot_characters[subplot] = set()
 
-                    subplot_timeline[subplot].append(chapter.order_index)
+                subplot_timeline[subplot].append(analysis["chapter_index"])
 
-                    # Track character associations
-                    for char, assoc_subplots in analysis.get("character_associations", {}).items():
-                        if subplot in assoc_subplots:
-                            subplot_characters[subplot].add(char)
+                # Track character associations
+                for char, assoc_subplots in analysis.get("character_associations", {}).items():
+                    if subplot in assoc_subplots:
+                        subplot_characters[subplot].add(char)
 
         # Analyze subplot health
-        total_chapters = len(chapters)
         subplot_health = {}
 
         for subplot, chapter_indices in subplot_timeline.items():
@@ -0,0 +1,279 @@
+"""
+Token Budget - Shared token counting and relevance-ranked context packing.
+
+Used wherever text has to fit a model's context window:
+- AgentContext.to_prompt_context (hierarchical agent context)
+- ContentGateway (privacy token budget on outgoing content)
+
+Token counting uses tiktoken's cl100k_base encoder when it is available
+(loaded once per process). Otherwise it falls back to a regex word/punctuation
+heuristic, which stays within ~10% of BPE counts for English prose.
+len(text) / 4 is much less accurate on dialogue, names and markdown lists.
+
+Packing works on small ContextItems (one entity, one rule, one chapter line)
+rather than whole sections. When the budget is tight, the least relevant
+items are dropped instead of the tail of whichever section rendered last.
+"""
+
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# BPE encoding to use; "heuristic" skips tiktoken entirely
+TOKENIZER_ENCODING = os.getenv("TOKEN_BUDGET_ENCODING", "cl100k_base")
+
+# Words, runs of digits, and individual punctuation marks each cost ~1 token
+_TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]")
+
+# Long words split into several BPE tokens
+_LONG_WORD_CHARS = 8
+
+# Don't bother keeping a truncated item shorter than this
+MIN_TRUNCATED_ITEM_TOKENS = 48
+
+# Counts of texts up to this long are memoized; longer ones (whole chapters)
+# are recounted rather than kept alive by the cache
+MEMO_MAX_CHARS = 2048
+
+
+@lru_cache(maxsize=1)
+def get_encoder() -> Optional[Any]:
+    """Load the tiktoken encoder once; None when unavailable (offline, not installed)"""
+    if TOKENIZER_ENCODING == "heuristic":
+        return None
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(TOKENIZER_ENCODING)
+    except Exception as e:
+        logger.info("tiktoken unavailable (%s); using heuristic token counts", e)
+        return None
+
+
+def tokenizer_name() -> str:
+    """Name of the active tokenizer, for budget reports"""
+    return TOKENIZER_ENCODING if get_encoder() is not None else "heuristic"
+
+
+def _heuristic_count(text: str) -> int:
+    count = 0
+    for match in _TOKEN_PATTERN.finditer(text):
+        piece = match.group()
+        count += 1 + (len(piece) - 1) // _LONG_WORD_CHARS if piece.isalpha() else 1
+    return count
+
+
+def _count(text: str) -> int:
+    encoder = get_encoder()
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    return _heuristic_count(text)
+
+
+_count_short = lru_cache(maxsize=8192)(_count)
+
+
+def count_tokens(text: str) -> int:
+    """Token count for text (short texts are memoized; context lines repeat across calls)"""
+    if not text:
+        return 0
+    if len(text) <= MEMO_MAX_CHARS:
+        return _count_short(text)
+    return _count(text)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, marker: str = "") -> str:
+    """
+    Cut text to at most max_tokens, including the marker appended on truncation.
+
+    Prefers to cut at a line or sentence boundary in the last 20% of the kept text.
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    available = max(max_tokens - count_tokens(marker), 0)
+    encoder = get_encoder()
+    if encoder is not None:
+        tokens = encoder.encode(text, disallowed_special=())
+        kept = encoder.decode(tokens[:available])
+    else:
+        # Binary search on character length against the heuristic count
+        low, high = 0, len(text)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if _heuristic_count(text[:mid]) <= available:
+                low = mid
+            else:
+                high = mid - 1
+        kept = text[:low]
+
+    boundary = max(kept.rfind("\n"), kept.rfind(". "))
+    if boundary >= int(len(kept) * 0.8):
+        kept = kept[:boundary + 1]
+    return kept.rstrip() + marker
+
+
+@dataclass
+class ContextItem:
+    """One unit of context that is either kept whole or dropped"""
+    text: str
+    relevance: float = 1.0
+    group: str = ""  # Sub-heading the item renders under (emitted once, only if an item survives)
+    truncatable: bool = False  # Long prose (descriptions) may be cut instead of dropped
+
+
+@dataclass
+class ContextSection:
+    """A titled block of context items with an importance weight"""
+    name: str
+    header: str
+    items: List[ContextItem] = field(default_factory=list)
+    weight: float = 1.0
+
+
+@dataclass
+class SectionBudget:
+    """How one section fared against the budget"""
+    name: str
+    weight: float
+    tokens_used: int = 0
+    items_included: int = 0
+    items_dropped: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "weight": self.weight,
+            "tokens_used": self.tokens_used,
+            "items_included": self.items_included,
+            "items_dropped": self.items_dropped,
+        }
+
+
+@dataclass
+class BudgetReport:
+    """Per-section accounting for one packing pass"""
+    max_tokens: int
+    tokens_used: int = 0
+    tokenizer: str = "heuristic"
+    sections: List[SectionBudget] = field(default_factory=list)
+
+    @property
+    def items_dropped(self) -> int:
+        return sum(s.items_dropped for s in self.sections)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "max_tokens": self.max_tokens,
+            "tokens_used": self.tokens_used,
+            "tokenizer": self.tokenizer,
+            "items_dropped": self.items_dropped,
+            "sections": [s.to_dict() for s in self.sections],
+        }
+
+
+@dataclass
+class PackedContext:
+    """Rendered context text plus its budget report"""
+    text: str
+    report: BudgetReport
+
+
+def render_section(section: ContextSection, keep: Optional[set] = None) -> str:
+    """Render a section's header, groups and items (all items when keep is None)"""
+    parts = [section.header]
+    current_group = None
+    for index, item in enumerate(section.items):
+        if keep is not None and index not in keep:
+            continue
+        if item.group and item.group != current_group:
+            parts.append(item.group)
+        current_group = item.group
+        parts.append(item.text)
+    return "\n".join(parts)
+
+
+def pack_sections(
+    sections: List[ContextSection],
+    max_tokens: int,
+    title: str = "",
+    truncation_marker: str = "\n[Context truncated]",
+) -> PackedContext:
+    """
+    Fit sections into max_tokens, keeping the most relevant items.
+
+    Every section header is reserved first (highest weight first). Items from all
+    sections then compete on weight * relevance. An item's cost includes its group
+    heading the first time that group is opened. Sections render highest weight
+    first; within a section, items keep document order, so when everything fits
+    the text is identical no matter how items were scored.
+    """
+    # Shallow copies: truncated items replace their originals without touching the caller's
+    sections = [
+        ContextSection(name=s.name, header=s.header, items=list(s.items), weight=s.weight)
+        for s in sorted(sections, key=lambda s: s.weight, reverse=True)
+    ]
+    report = BudgetReport(max_tokens=max_tokens, tokenizer=tokenizer_name())
+    budgets = [SectionBudget(name=s.name, weight=s.weight) for s in sections]
+    report.sections = budgets
+
+    # The marker is reserved up front so a truncated context still fits
+    used = count_tokens(title) + count_tokens(truncation_marker)
+    truncated = False
+    live: List[int] = []
+    for index, section in enumerate(sections):
+        cost = count_tokens(section.header) + 1
+        if used + cost > max_tokens:
+            budgets[index].items_dropped = len(section.items)
+            continue
+        used += cost
+        budgets[index].tokens_used = cost
+        live.append(index)
+
+    candidates = [
+        (sections[s].weight * item.relevance, s, i)
+        for s in live
+        for i, item in enumerate(sections[s].items)
+    ]
+    # Highest score first; ties keep document order
+    candidates.sort(key=lambda c: (-c[0], c[1], c[2]))
+
+    kept: Dict[int, set] = {s: set() for s in live}
+    opened_groups: Dict[int, set] = {s: set() for s in live}
+    for _, s, i in candidates:
+        item = sections[s].items[i]
+        overhead = 1
+        if item.group and item.group not in opened_groups[s]:
+            overhead += count_tokens(item.group) + 1
+        cost = count_tokens(item.text) + overhead
+        if used + cost > max_tokens:
+            remaining = max_tokens - used - overhead
+            if not item.truncatable or remaining < MIN_TRUNCATED_ITEM_TOKENS:
+                budgets[s].items_dropped += 1
+                continue
+            item = sections[s].items[i] = ContextItem(
+                text=truncate_to_tokens(item.text, remaining, " [...]"),
+                relevance=item.relevance,
+                group=item.group,
+            )
+            cost = count_tokens(item.text) + overhead
+            truncated = True
+        used += cost
+        budgets[s].tokens_used += cost
+        budgets[s].items_included += 1
+        kept[s].add(i)
+        if item.group:
+            opened_groups[s].add(item.group)
+
+    parts = [title] if title else []
+    parts.extend(render_section(sections[s], kept[s]) for s in live)
+    text = "\n\n".join(parts)
+    if truncated or report.items_dropped:
+        text += truncation_marker
+
+    report.tokens_used = count_tokens(text)
+    return PackedContext(text=text, report=report)
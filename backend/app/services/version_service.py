@@ -12,6 +12,7 @@ import os
 
 from app.models.versioning import Snapshot
 from app.database import SessionLocal
+from app.services.lexical_utils import parse_lexical
 
 # Data directory
 DATA_DIR = Path(os.getenv("DATA_DIR", "./data"))
@@ -81,38 +82,11 @@ class VersionService:
         Returns:
             Plain text content
         """
-        try:
-            # Parse the Lexical JSON
-            state = json.loads(content)
-
-            def extract_text_recursive(node):
-                """Recursively extract text from Lexical nodes"""
-                text_parts = []
-
-                # If this node has text, add it
-                if isinstance(node, dict) and "text" in node:
-                    text_parts.append(node["text"])
-
-                # If this node has children, recurse
-                if isinstance(node, dict) and "children" in node:
-                    for child in node["children"]:
-                        text_parts.append(extract_text_recursive(child))
-
-                # Join with spaces, preserving paragraph breaks
-                if isinstance(node, dict) and node.get("type") == "paragraph":
-                    return "\n".join(text_parts) + "\n"
-
-                return " ".join(text_parts)
-
-            # Extract from root
-            if "root" in state:
-                return extract_text_recursive(state["root"]).strip()
-
-            return content  # Fallback to raw content
-
-        except (json.JSONDecodeError, KeyError, TypeError):
+        document = parse_lexical(content)
+        if not document.valid:
             # If parsing fails, return content as-is
             return content
+        return document.text
 
     def create_snapshot(
         self,
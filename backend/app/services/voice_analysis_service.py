@@ -3,39 +3,34 @@ Voice Analysis Service
 
 Analyzes character dialogue to build voice profiles and detect inconsistencies.
 Helps writers maintain consistent, distinct character voices.
+
+Dialogue comes from the persisted dialogue index (see dialogue_index), which
+attributes every speaker's quotes in one pass per chapter, and voice metrics
+are computed for all speakers (or dialogue samples) at once with NumPy.
 """
 
 import re
 import uuid
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple, Any
+from typing import List, Dict, Optional, Tuple, Any, Hashable, Sequence
 from collections import Counter
 from dataclasses import dataclass, field
 import logging
 
+import numpy as np
 from sqlalchemy.orm import Session
 
 from app.models.entity import Entity
-from app.models.manuscript import Manuscript, Chapter
 from app.models.voice_profile import (
     CharacterVoiceProfile,
     VoiceInconsistency,
     VoiceComparison
 )
+from app.services.dialogue_index import DialogueExtractor, DialogueSample, Speaker, dialogue_index
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
-class DialogueSample:
-    """A single piece of dialogue attributed to a character"""
-    text: str
-    chapter_id: str
-    start_offset: int
-    end_offset: int
-    context: str = ""  # Surrounding text for context
-
-
 @dataclass
 class VoiceMetrics:
     """Computed metrics for a character's voice"""
@@ -145,45 +140,7 @@ class VoiceAnalysisService:
         Uses entity mentions and dialogue attribution patterns to find
         dialogue that belongs to this character.
         """
-        dialogue_samples = []
-
-        # Get character entity
-        character = self.db.query(Entity).filter(
-            Entity.id == character_id
-        ).first()
-
-        if not character:
-            return []
-
-        # Get all chapters
-        chapters = self.db.query(Chapter).filter(
-            Chapter.manuscript_id == manuscript_id,
-            Chapter.document_type == "CHAPTER"
-        ).all()
-
-        # Character name variants for attribution detection
-        name_variants = [character.name.lower()]
-        if character.aliases:
-            name_variants.extend([a.lower() for a in character.aliases])
-
-        # Also add first name if full name
-        name_parts = character.name.split()
-        if len(name_parts) > 1:
-            name_variants.append(name_parts[0].lower())
-
-        for chapter in chapters:
-            if not chapter.content:
-                continue
-
-            # Find dialogue with attribution
-            samples = self._extract_attributed_dialogue(
-                chapter.content,
-                chapter.id,
-                name_variants
-            )
-            dialogue_samples.extend(samples)
-
-        return dialogue_samples
+        return dialogue_index.samples(self.db, manuscript_id, [character_id]).get(character_id, [])
 
     def _extract_attributed_dialogue(
         self,
@@ -200,45 +157,8 @@ class VoiceAnalysisService:
         - "Hello." John smiled.
         - "Hello," John replied.
         """
-        samples = []
-
-        # Pattern for dialogue with attribution after
-        # "dialogue," name verb  OR  "dialogue." Name verb
-        pattern_after = r'["""]([^"""]+)["""][,.]?\s*(' + '|'.join(
-            re.escape(n) for n in name_variants
-        ) + r')\s+\w+'
-
-        # Pattern for attribution before dialogue
-        # name verb, "dialogue"
-        pattern_before = r'(' + '|'.join(
-            re.escape(n) for n in name_variants
-        ) + r')\s+\w+[,]?\s*["""]([^"""]+)["""]'
-
-        # Find dialogue with attribution after
-        for match in re.finditer(pattern_after, text, re.IGNORECASE):
-            dialogue = match.group(1).strip()
-            if len(dialogue) > 5:  # Skip very short dialogue
-                samples.append(DialogueSample(
-                    text=dialogue,
-                    chapter_id=chapter_id,
-                    start_offset=match.start(),
-                    end_offset=match.end(),
-                    context=text[max(0, match.start()-50):match.end()+50]
-                ))
-
-        # Find dialogue with attribution before
-        for match in re.finditer(pattern_before, text, re.IGNORECASE):
-            dialogue = match.group(2).strip()
-            if len(dialogue) > 5:
-                samples.append(DialogueSample(
-                    text=dialogue,
-                    chapter_id=chapter_id,
-                    start_offset=match.start(),
-                    end_offset=match.end(),
-                    context=text[max(0, match.start()-50):match.end()+50]
-                ))
-
-        return samples
+        extractor = DialogueExtractor([Speaker(id="", variants=tuple(name_variants))])
+        return [sample for _, sample in extractor.extract(text, chapter_id)]
 
     def compute_voice_metrics(
         self,
@@ -249,99 +169,151 @@ class VoiceAnalysisService:
 
         Analyzes vocabulary, sentence structure, formality, and speech patterns.
         """
-        if not dialogue_samples:
-            return VoiceMetrics()
-
-        metrics = VoiceMetrics()
-        metrics.dialogue_samples = len(dialogue_samples)
-
-        all_text = " ".join(s.text for s in dialogue_samples)
-        all_words = re.findall(r'\b\w+\b', all_text.lower())
-        metrics.total_words = len(all_words)
-
-        if not all_words:
-            return metrics
-
-        # Sentence analysis
-        sentences = []
-        for sample in dialogue_samples:
-            sample_sentences = re.split(r'[.!?]+', sample.text)
-            sentences.extend([s.strip() for s in sample_sentences if s.strip()])
-
-        if sentences:
-            sentence_lengths = [len(s.split()) for s in sentences]
-            metrics.avg_sentence_length = sum(sentence_lengths) / len(sentence_lengths)
-
-            # Variance
-            mean = metrics.avg_sentence_length
-            variance = sum((x - mean) ** 2 for x in sentence_lengths) / len(sentence_lengths)
-            metrics.sentence_length_variance = variance ** 0.5
-
-            # Question rate
-            questions = sum(1 for s in sentences if '?' in s)
-            metrics.question_rate = questions / len(sentences)
-
-            # Exclamation rate
-            exclamations = sum(1 for sample in dialogue_samples if '!' in sample.text)
-            metrics.exclamation_rate = exclamations / len(dialogue_samples)
-
-        # Vocabulary complexity (syllables per word)
-        total_syllables = sum(self._count_syllables(w) for w in all_words)
-        metrics.vocabulary_complexity = total_syllables / len(all_words)
-
-        # Vocabulary richness (type-token ratio)
-        unique_words = set(all_words)
-        metrics.vocabulary_richness = len(unique_words) / len(all_words)
-
-        # Contraction rate
-        contractions_used = sum(1 for w in all_words if w in self.CONTRACTIONS)
-        metrics.contraction_rate = contractions_used / len(all_words)
-
-        # Filler words
-        for filler in self.FILLER_WORDS:
-            count = all_text.lower().count(filler)
-            if count > 0:
-                metrics.filler_words[filler] = count
-
-        # Formality score
-        formal_count = sum(1 for w in all_words if w in self.FORMAL_INDICATORS)
-        informal_count = sum(1 for w in all_words if w in self.INFORMAL_INDICATORS)
-        informal_count += contractions_used
-        informal_count += sum(metrics.filler_words.values())
-
-        total_markers = formal_count + informal_count
-        if total_markers > 0:
-            metrics.formality_score = formal_count / total_markers
-        else:
-            metrics.formality_score = 0.5  # Neutral
-
-        # Common phrases (2-4 word sequences that appear multiple times)
-        metrics.common_phrases = self._find_common_phrases(all_text)
-
-        # Signature words (words used more than average)
-        word_counts = Counter(all_words)
-        avg_count = len(all_words) / len(unique_words)
-        signature = [
-            word for word, count in word_counts.most_common(30)
-            if count > avg_count * 2 and len(word) > 3
-            and word not in {'that', 'this', 'with', 'have', 'from', 'they', 'been', 'were', 'said'}
-        ]
-        metrics.signature_words = signature[:15]
-
-        # Emotion markers
-        positive = sum(1 for w in all_words if w in self.POSITIVE_EMOTIONS)
-        negative = sum(1 for w in all_words if w in self.NEGATIVE_EMOTIONS)
-        total_emotion = positive + negative
-        if total_emotion > 0:
-            metrics.emotion_markers = {
-                "positive": positive / total_emotion,
-                "negative": negative / total_emotion,
-                "neutral": 1 - (positive + negative) / len(all_words)
-            }
-        else:
-            metrics.emotion_markers = {"positive": 0, "negative": 0, "neutral": 1}
+        return self.compute_voice_metrics_batch({None: dialogue_samples})[None]
 
-        return metrics
+    def compute_voice_metrics_batch(
+        self,
+        samples_by_key: Dict[Hashable, List[DialogueSample]]
+    ) -> Dict[Hashable, VoiceMetrics]:
+        """
+        compute_voice_metrics for many speakers (or single samples) at once.
+
+        Every key's words and sentences go into shared arrays tagged with the
+        key's position; per-word features are looked up once per distinct
+        word and summed per key with np.bincount.
+        """
+        keys = list(samples_by_key)
+        size = len(keys)
+        results = {key: VoiceMetrics() for key in keys}
+
+        all_texts = {}
+        word_owner, word_tokens = [], []
+        sentence_owner, sentence_lengths, sentence_questions = [], [], []
+        sample_owner, sample_exclaims = [], []
+        for k, key in enumerate(keys):
+            samples = samples_by_key[key]
+            if not samples:
+                continue
+            metrics = results[key]
+            metrics.dialogue_samples = len(samples)
+
+            all_text = " ".join(s.text for s in samples)
+            all_words = re.findall(r'\b\w+\b', all_text.lower())
+            metrics.total_words = len(all_words)
+            if not all_words:
+                continue
+            all_texts[key] = (all_text, all_words)
+            word_owner.extend([k] * len(all_words))
+            word_tokens.extend(all_words)
+
+            # Sentence analysis
+            for sample in samples:
+                sample_sentences = [t.strip() for t in re.split(r'[.!?]+', sample.text) if t.strip()]
+                sentence_owner.extend([k] * len(sample_sentences))
+                sentence_lengths.extend(len(t.split()) for t in sample_sentences)
+                sentence_questions.extend('?' in t for t in sample_sentences)
+                sample_owner.append(k)
+                sample_exclaims.append('!' in sample.text)
+
+        if not all_texts:
+            return results
+
+        # Per-word features, computed once per distinct word
+        vocabulary: Dict[str, int] = {}
+        word_ids = np.array([vocabulary.setdefault(w, len(vocabulary)) for w in word_tokens], dtype=np.int64)
+        words = list(vocabulary)
+        owner = np.array(word_owner, dtype=np.int64)
+
+        def per_key(feature: List[float]) -> np.ndarray:
+            return np.bincount(owner, weights=np.array(feature, dtype=np.float64)[word_ids], minlength=size)
+
+        word_totals = np.bincount(owner, minlength=size)
+        syllables = per_key([self._count_syllables(w) for w in words])
+        contractions = per_key([w in self.CONTRACTIONS for w in words])
+        formal = per_key([w in self.FORMAL_INDICATORS for w in words])
+        informal = per_key([w in self.INFORMAL_INDICATORS for w in words])
+        positive = per_key([w in self.POSITIVE_EMOTIONS for w in words])
+        negative = per_key([w in self.NEGATIVE_EMOTIONS for w in words])
+        unique_words = np.bincount(np.unique(owner * len(words) + word_ids) // len(words), minlength=size)
+
+        sentence_owner = np.array(sentence_owner, dtype=np.int64)
+        lengths = np.array(sentence_lengths, dtype=np.float64)
+        sentence_counts = np.bincount(sentence_owner, minlength=size)
+        length_sums = np.bincount(sentence_owner, weights=lengths, minlength=size)
+        mean_lengths = np.divide(length_sums, sentence_counts, out=np.zeros(size), where=sentence_counts > 0)
+        squared_deviations = np.bincount(
+            sentence_owner, weights=(lengths - mean_lengths[sentence_owner]) ** 2, minlength=size
+        )
+        questions = np.bincount(sentence_owner, weights=np.array(sentence_questions, dtype=np.float64), minlength=size)
+        sample_counts = np.bincount(np.array(sample_owner, dtype=np.int64), minlength=size)
+        exclamations = np.bincount(
+            np.array(sample_owner, dtype=np.int64), weights=np.array(sample_exclaims, dtype=np.float64), minlength=size
+        )
+
+        for k, key in enumerate(keys):
+            if key not in all_texts:
+                continue
+            metrics = results[key]
+            all_text, all_words = all_texts[key]
+            total_words = int(word_totals[k])
+
+            if sentence_counts[k]:
+                metrics.avg_sentence_length = float(mean_lengths[k])
+                metrics.sentence_length_variance = float(squared_deviations[k] / sentence_counts[k]) ** 0.5
+                metrics.question_rate = float(questions[k] / sentence_counts[k])
+                metrics.exclamation_rate = float(exclamations[k] / sample_counts[k])
+
+            # Vocabulary complexity (syllables per word) and richness (type-token ratio)
+            metrics.vocabulary_complexity = float(syllables[k] / total_words)
+            metrics.vocabulary_richness = float(unique_words[k] / total_words)
+
+            # Contraction rate
+            contractions_used = int(contractions[k])
+            metrics.contraction_rate = contractions_used / total_words
+
+            # Filler words
+            lowered = all_text.lower()
+            for filler in self.FILLER_WORDS:
+                count = lowered.count(filler)
+                if count > 0:
+                    metrics.filler_words[filler] = count
+
+            # Formality score
+            formal_count = int(formal[k])
+            informal_count = int(informal[k]) + contractions_used + sum(metrics.filler_words.values())
+            total_markers = formal_count + informal_count
+            if total_markers > 0:
+                metrics.formality_score = formal_count / total_markers
+            else:
+                metrics.formality_score = 0.5  # Neutral
+
+            # Common phrases (2-4 word sequences that appear multiple times)
+            metrics.common_phrases = self._find_common_phrases(all_text)
+
+            # Signature words (words used more than average)
+            word_counts = Counter(all_words)
+            avg_count = total_words / int(unique_words[k])
+            signature = [
+                word for word, count in word_counts.most_common(30)
+                if count > avg_count * 2 and len(word) > 3
+                and word not in {'that', 'this', 'with', 'have', 'from', 'they', 'been', 'were', 'said'}
+            ]
+            metrics.signature_words = signature[:15]
+
+            # Emotion markers
+            positive_count = int(positive[k])
+            negative_count = int(negative[k])
+            total_emotion = positive_count + negative_count
+            if total_emotion > 0:
+                metrics.emotion_markers = {
+                    "positive": positive_count / total_emotion,
+                    "negative": negative_count / total_emotion,
+                    "neutral": 1 - total_emotion / total_words
+                }
+            else:
+                metrics.emotion_markers = {"positive": 0, "negative": 0, "neutral": 1}
+
+        return results
 
     def _count_syllables(self, word: str) -> int:
         """Count syllables in a word"""
@@ -381,49 +353,68 @@ class VoiceAnalysisService:
 
         Returns the profile with computed metrics from all dialogue.
         """
-        # Check for existing profile
-        existing = self.db.query(CharacterVoiceProfile).filter(
-            CharacterVoiceProfile.manuscript_id == manuscript_id,
-            CharacterVoiceProfile.character_id == character_id
-        ).first()
-
-        if existing and not force_rebuild:
-            # Profile exists and not forcing rebuild
-            return existing
-
-        # Extract dialogue
-        dialogue_samples = self.extract_character_dialogue(
-            manuscript_id, character_id
-        )
+        return self.build_voice_profiles(manuscript_id, [character_id], force_rebuild)[character_id]
 
-        # Compute metrics
-        metrics = self.compute_voice_metrics(dialogue_samples)
+    def build_voice_profiles(
+        self,
+        manuscript_id: str,
+        character_ids: Sequence[str],
+        force_rebuild: bool = False
+    ) -> Dict[str, CharacterVoiceProfile]:
+        """
+        Build or update voice profiles for several characters at once.
 
-        # Calculate confidence based on sample size
-        # More samples = higher confidence
-        confidence = min(1.0, metrics.dialogue_samples / 20)
+        Existing profiles are kept unless force_rebuild; the rest are computed
+        from one dialogue index read and one batched metrics pass.
+        """
+        character_ids = list(dict.fromkeys(character_ids))
 
-        if existing:
-            # Update existing profile
-            existing.profile_data = metrics.to_dict()
-            existing.confidence_score = confidence
-            existing.calculated_at = datetime.utcnow()
-            existing.updated_at = datetime.utcnow()
-            self.db.commit()
-            return existing
-        else:
-            # Create new profile
-            profile = CharacterVoiceProfile(
-                id=str(uuid.uuid4()),
-                character_id=character_id,
-                manuscript_id=manuscript_id,
-                profile_data=metrics.to_dict(),
-                confidence_score=confidence,
-                calculated_at=datetime.utcnow()
+        # Check for existing profiles
+        profiles = {
+            profile.character_id: profile
+            for profile in self.db.query(CharacterVoiceProfile).filter(
+                CharacterVoiceProfile.manuscript_id == manuscript_id,
+                CharacterVoiceProfile.character_id.in_(character_ids)
             )
-            self.db.add(profile)
-            self.db.commit()
-            return profile
+        } if character_ids else {}
+
+        to_build = [cid for cid in character_ids if force_rebuild or cid not in profiles]
+        if not to_build:
+            return profiles
+
+        # Extract dialogue and compute metrics
+        samples = dialogue_index.samples(self.db, manuscript_id, to_build)
+        all_metrics = self.compute_voice_metrics_batch({cid: samples.get(cid, []) for cid in to_build})
+
+        now = datetime.utcnow()
+        for character_id in to_build:
+            metrics = all_metrics[character_id]
+
+            # Calculate confidence based on sample size
+            # More samples = higher confidence
+            confidence = min(1.0, metrics.dialogue_samples / 20)
+
+            existing = profiles.get(character_id)
+            if existing:
+                # Update existing profile
+                existing.profile_data = metrics.to_dict()
+                existing.confidence_score = confidence
+                existing.calculated_at = now
+                existing.updated_at = now
+            else:
+                # Create new profile
+                profiles[character_id] = CharacterVoiceProfile(
+                    id=str(uuid.uuid4()),
+                    character_id=character_id,
+                    manuscript_id=manuscript_id,
+                    profile_data=metrics.to_dict(),
+                    confidence_score=confidence,
+                    calculated_at=now
+                )
+                self.db.add(profiles[character_id])
+
+        self.db.commit()
+        return profiles
 
     def detect_inconsistencies(
         self,
@@ -437,53 +428,56 @@ class VoiceAnalysisService:
         Compares dialogue in the specified chapter (or all chapters)
         against the established voice profile.
         """
-        # Get or build profile
-        profile = self.build_voice_profile(manuscript_id, character_id)
+        return self.detect_all_inconsistencies(manuscript_id, [character_id], chapter_id)
 
-        if not profile.profile_data or profile.confidence_score < 0.3:
-            # Not enough data for reliable detection
-            return []
-
-        profile_metrics = profile.profile_data
-        inconsistencies = []
-
-        # Get character for name variants
-        character = self.db.query(Entity).filter(
-            Entity.id == character_id
-        ).first()
-
-        if not character:
+    def detect_all_inconsistencies(
+        self,
+        manuscript_id: str,
+        character_ids: Optional[Sequence[str]] = None,
+        chapter_id: Optional[str] = None
+    ) -> List[VoiceInconsistency]:
+        """
+        Detect voice inconsistencies for several characters (default: every
+        character in the manuscript) from one dialogue index read.
+        """
+        character_query = self.db.query(Entity)
+        if character_ids is None:
+            character_query = character_query.filter(
+                Entity.manuscript_id == manuscript_id,
+                Entity.type == "CHARACTER"
+            )
+        else:
+            character_query = character_query.filter(Entity.id.in_(character_ids))
+        characters = {character.id: character for character in character_query}
+        ordered_ids = [cid for cid in (character_ids or list(characters)) if cid in characters]
+
+        # Get or build profiles
+        profiles = self.build_voice_profiles(manuscript_id, ordered_ids)
+        # Not enough data for reliable detection without a confident profile
+        checked = [
+            cid for cid in ordered_ids
+            if profiles[cid].profile_data and profiles[cid].confidence_score >= 0.3
+        ]
+        if not checked:
             return []
 
-        name_variants = [character.name.lower()]
-        if character.aliases:
-            name_variants.extend([a.lower() for a in character.aliases])
-
-        # Get chapters to analyze
-        chapter_query = self.db.query(Chapter).filter(
-            Chapter.manuscript_id == manuscript_id,
-            Chapter.document_type == "CHAPTER"
-        )
-        if chapter_id:
-            chapter_query = chapter_query.filter(Chapter.id == chapter_id)
-
-        chapters = chapter_query.all()
-
-        for chapter in chapters:
-            if not chapter.content:
-                continue
-
-            # Extract dialogue from this chapter
-            samples = self._extract_attributed_dialogue(
-                chapter.content, chapter.id, name_variants
-            )
+        samples = dialogue_index.samples(self.db, manuscript_id, checked, chapter_id)
+        to_check = [
+            (character_id, sample)
+            for character_id in checked
+            for sample in samples.get(character_id, [])
+        ]
+        sample_metrics = self.compute_voice_metrics_batch({
+            i: [sample] for i, (_, sample) in enumerate(to_check)
+        })
 
-            for sample in samples:
-                # Analyze this sample against profile
-                sample_issues = self._check_sample_consistency(
-                    sample, profile_metrics, character, chapter.id
-                )
-                inconsistencies.extend(sample_issues)
+        inconsistencies = []
+        for i, (character_id, sample) in enumerate(to_check):
+            # Analyze this sample against profile
+            inconsistencies.extend(self._check_sample_consistency(
+                sample, profiles[character_id].profile_data, characters[character_id],
+                sample.chapter_id, sample_metrics[i]
+            ))
 
         # Save inconsistencies to database
         for issue in inconsistencies:
@@ -499,7 +493,8 @@ class VoiceAnalysisService:
         sample: DialogueSample,
         profile: Dict[str, Any],
         character: Entity,
-        chapter_id: str
+        chapter_id: str,
+        sample_metrics: Optional[VoiceMetrics] = None
     ) -> List[VoiceInconsistency]:
         """
         Check a single dialogue sample against the voice profile.
@@ -507,7 +502,8 @@ class VoiceAnalysisService:
         issues = []
 
         # Compute metrics for this sample
-        sample_metrics = self.compute_voice_metrics([sample])
+        if sample_metrics is None:
+            sample_metrics = self.compute_voice_metrics([sample])
 
         # Check sentence length (if significantly different)
         if profile.get("avg_sentence_length", 0) > 0:
@@ -630,12 +626,17 @@ class VoiceAnalysisService:
         Returns a comparison showing how similar/different their voices are.
         """
         # Build profiles for both characters
-        profile_a = self.build_voice_profile(manuscript_id, character_a_id)
-        profile_b = self.build_voice_profile(manuscript_id, character_b_id)
+        profiles = self.build_voice_profiles(manuscript_id, [character_a_id, character_b_id])
+        profile_a = profiles[character_a_id]
+        profile_b = profiles[character_b_id]
 
         # Get character names
-        char_a = self.db.query(Entity).filter(Entity.id == character_a_id).first()
-        char_b = self.db.query(Entity).filter(Entity.id == character_b_id).first()
+        characters = {
+            character.id: character
+            for character in self.db.query(Entity).filter(Entity.id.in_([character_a_id, character_b_id]))
+        }
+        char_a = characters.get(character_a_id)
+        char_b = characters.get(character_b_id)
 
         metrics_a = profile_a.profile_data or {}
         metrics_b = profile_b.profile_data or {}
@@ -774,12 +775,17 @@ class VoiceAnalysisService:
             Entity.type == "CHARACTER"
         ).all()
 
+        stored = {
+            profile.character_id: profile
+            for profile in self.db.query(CharacterVoiceProfile).filter(
+                CharacterVoiceProfile.manuscript_id == manuscript_id,
+                CharacterVoiceProfile.character_id.in_([char.id for char in characters])
+            )
+        } if characters else {}
+
         profiles = []
         for char in characters:
-            profile = self.db.query(CharacterVoiceProfile).filter(
-                CharacterVoiceProfile.manuscript_id == manuscript_id,
-                CharacterVoiceProfile.character_id == char.id
-            ).first()
+            profile = stored.get(char.id)
 
             profiles.append({
                 "character_id": char.id,
@@ -3,11 +3,32 @@ Wiki Auto-Populator Service - AI-powered wiki population.
 
 Analyzes manuscripts and suggests Wiki updates.
 All changes go to approval queue for author review.
+
+Population is incremental. The paragraph hashes and revision of each
+chapter it processed are stored (chapter_analysis_cache, analyzer
+"wiki_populate"), so analyzing a manuscript or saving a chapter only runs
+the extraction pipelines over new and changed paragraphs. Proposals are
+reconciled with the world's pending changes: a proposal that is already
+pending is not queued again, and pending changes whose source text was
+edited out of its chapter are withdrawn.
+
+A run is planned, then applied. Planning only reads: it diffs chapters,
+runs extraction and returns a PopulationPlan of proposals, withdrawals and
+chapter state. Applying writes a plan under a process-wide lock against a
+freshly loaded pending-change index, so plans computed concurrently (e.g.
+one per manuscript in a parallel world scan, see world_scan) never queue
+the same proposal twice.
 """
 
-from typing import List, Optional, Dict, Any, Tuple, Callable
+from typing import List, Optional, Dict, Any, Sequence, Set, Tuple, Callable
+from dataclasses import dataclass, field
 from datetime import datetime
 from sqlalchemy.orm import Session
+import copy
+import hashlib
+import json
+import logging
+import threading
 import uuid
 import re
 
@@ -18,9 +39,25 @@ from app.models.world_rule import WorldRule, RuleType, RuleSeverity
 from app.models.manuscript import Manuscript, Chapter
 from app.models.entity import Entity
 from app.models.world import World, Series
+from app.services.chapter_analysis_store import chapter_analysis_store
 from app.services.wiki_service import WikiService
 from app.services.nlp_service import nlp_service
 
+logger = logging.getLogger(__name__)
+
+# Stored per-chapter processing state; bump the version when the extraction
+# patterns change so every paragraph is extracted again
+POPULATE_ANALYZER = "wiki_populate"
+POPULATE_VERSION = 1
+
+# Source text shorter than this is too generic to tell whether it was edited out
+MIN_SOURCE_PIECE_CHARS = 20
+
+_PARAGRAPH_SPLIT = re.compile(r"\n+")
+
+# WikiChange writes from concurrent runs are applied one plan at a time
+_write_lock = threading.Lock()
+
 
 # ==================== Extraction Patterns ====================
 
@@ -75,6 +112,129 @@ CHARACTER_TRAIT_PATTERNS = [
 ]
 
 
+# ==================== Chapter Diffs ====================
+
+def _normalize_space(text: str) -> str:
+    return " ".join(text.split())
+
+
+def split_paragraphs(text: str) -> List[str]:
+    """Non-empty paragraphs (lines) of chapter text"""
+    return [p.strip() for p in _PARAGRAPH_SPLIT.split(text or "") if p.strip()]
+
+
+def paragraph_hash(paragraph: str) -> str:
+    """Hash of a paragraph, ignoring whitespace changes"""
+    return hashlib.sha1(_normalize_space(paragraph).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class ChapterDelta:
+    """What changed in a chapter since the populator last processed it"""
+    chapter: Chapter
+    content_hash: str
+    paragraph_hashes: List[str]
+    changed_paragraphs: List[str]
+    previously_processed: bool
+
+    @property
+    def text(self) -> str:
+        return "\n\n".join(self.changed_paragraphs)
+
+
+# ==================== Pending Change Reconciliation ====================
+
+def _item_signature(item: Any) -> str:
+    if isinstance(item, dict) and "relationship_type" in item:
+        # The context differs every time the same relationship is found
+        return json.dumps([item.get("relationship_type"), item.get("related_to")])
+    return json.dumps(item, sort_keys=True, default=str)
+
+
+def proposal_keys(
+    change_type: str,
+    wiki_entry_id: Optional[str] = None,
+    field_changed: Optional[str] = None,
+    old_value: Optional[Dict] = None,
+    new_value: Optional[Dict] = None,
+    proposed_entry: Optional[Dict] = None
+) -> Set[Tuple]:
+    """
+    What a change proposes: the title of a new entry, or each value an
+    update adds to an entry's field. Two changes sharing a key propose the
+    same thing.
+    """
+    if change_type == WikiChangeType.CREATE.value:
+        title = (proposed_entry or new_value or {}).get("title")
+        return {("create", title.strip().lower())} if title else set()
+
+    if change_type != WikiChangeType.UPDATE.value or not isinstance(new_value, dict):
+        return set()
+
+    old_value = old_value if isinstance(old_value, dict) else {}
+    keys = set()
+    for name, value in new_value.items():
+        before = old_value.get(name)
+        if value == before:
+            continue
+        if isinstance(value, list):
+            for item in value:
+                if not (isinstance(before, list) and item in before):
+                    keys.add(("update", wiki_entry_id, field_changed, name, _item_signature(item)))
+        else:
+            keys.add(("update", wiki_entry_id, field_changed, name, _item_signature(value)))
+    return keys
+
+
+class PendingChangeIndex:
+    """A world's pending changes, indexed by what they propose"""
+
+    def __init__(self, db: Session, world_id: str, exclude: Sequence[str] = ()):
+        self.keys: Set[Tuple] = set()
+        pending = db.query(WikiChange).filter(
+            WikiChange.world_id == world_id,
+            WikiChange.status == WikiChangeStatus.PENDING.value
+        ).all()
+        exclude = set(exclude)
+        for change in pending:
+            if change.id in exclude:
+                continue
+            self.keys |= proposal_keys(
+                change.change_type, change.wiki_entry_id, change.field_changed,
+                change.old_value, change.new_value, change.proposed_entry
+            )
+
+    def contains(self, keys: Set[Tuple]) -> bool:
+        return bool(keys) and keys <= self.keys
+
+    def add(self, keys: Set[Tuple]) -> None:
+        self.keys |= keys
+
+
+@dataclass
+class PopulationPlan:
+    """Everything a population run will write, computed without writing"""
+    manuscript_id: str
+    world_id: str
+    chapters_analyzed: int = 0
+    chapters_changed: int = 0
+    paragraphs_analyzed: int = 0
+    duplicates_skipped: int = 0
+    proposals: List[Tuple[str, Dict[str, Any]]] = field(default_factory=list)  # (extraction, create_change kwargs)
+    withdrawals: List[str] = field(default_factory=list)  # Pending change ids whose source was edited out
+    chapter_state: List[Tuple[str, str, int, str, Any]] = field(default_factory=list)  # chapter_analysis_store entries
+    error: Optional[str] = None
+
+
+EXTRACTION_STAGES = [
+    ("entities", "Extracting entities"),
+    ("world_rules", "Extracting world rules"),
+    ("relationships", "Extracting relationships"),
+    ("locations", "Extracting locations"),
+    ("character_traits", "Extracting character traits"),
+]
+
+
 class WikiAutoPopulator:
     """
     Analyzes manuscripts and suggests Wiki updates.
@@ -84,6 +244,11 @@ class WikiAutoPopulator:
     def __init__(self, db: Session):
         self.db = db
         self.wiki_service = WikiService(db)
+        self._pending: Dict[str, PendingChangeIndex] = {}
+        self._working_data: Dict[str, Dict[str, Any]] = {}
+        self._plan: Optional[PopulationPlan] = None  # Set while planning: proposals are recorded, not written
+        self._stage: Optional[str] = None
+        self.duplicates_skipped = 0
 
     def get_world_for_manuscript(self, manuscript_id: str) -> Optional[str]:
         """Get world_id for a manuscript through its series"""
@@ -109,22 +274,66 @@ class WikiAutoPopulator:
         self,
         manuscript_id: str,
         world_id: Optional[str] = None,
-        progress_callback: Optional[Callable[[str, int], None]] = None
+        progress_callback: Optional[Callable[[str, int], None]] = None,
+        full_rescan: bool = False
     ) -> Dict[str, Any]:
         """
-        Full manuscript analysis for wiki updates.
+        Manuscript analysis for wiki updates: new and changed paragraphs only.
         Returns summary of proposed changes.
 
         Args:
             progress_callback: Optional callback(stage_name, stage_index) called before each extraction stage.
+            full_rescan: Extract every paragraph, not just the changed ones.
         """
+        plan = self.plan_manuscript(manuscript_id, world_id, progress_callback, full_rescan)
+        if plan.error:
+            return {"error": plan.error, "changes": []}
+        return self.apply_plan(plan)
+
+    def analyze_chapter(
+        self,
+        chapter_id: str,
+        world_id: Optional[str] = None,
+        full_rescan: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Analyze a single chapter for wiki updates.
+        Only paragraphs added or changed since it was last analyzed are extracted.
+        """
+        chapter = self.db.query(Chapter).filter(Chapter.id == chapter_id).first()
+        if not chapter:
+            return {"error": "Chapter not found"}
+
+        if not chapter.content or not chapter.content.strip():
+            return {"error": "No content to analyze", "changes": []}
+
         # Get world_id if not provided
         if not world_id:
-            world_id = self.get_world_for_manuscript(manuscript_id)
+            world_id = self.get_world_for_manuscript(chapter.manuscript_id)
 
         if not world_id:
             return {"error": "No world found for manuscript"}
 
+        plan = self.plan_chapters([chapter], world_id, chapter.manuscript_id, full_rescan=full_rescan)
+        results = {"chapter_id": chapter_id}
+        results.update(self.apply_plan(plan))
+        return results
+
+    def plan_manuscript(
+        self,
+        manuscript_id: str,
+        world_id: Optional[str] = None,
+        progress_callback: Optional[Callable[[str, int], None]] = None,
+        full_rescan: bool = False
+    ) -> PopulationPlan:
+        """Plan a manuscript's wiki updates without writing anything"""
+        # Get world_id if not provided
+        if not world_id:
+            world_id = self.get_world_for_manuscript(manuscript_id)
+
+        if not world_id:
+            return PopulationPlan(manuscript_id, "", error="No world found for manuscript")
+
         # Get all chapters for this manuscript
         chapters = self.db.query(Chapter).filter(
             Chapter.manuscript_id == manuscript_id,
@@ -132,116 +341,241 @@ class WikiAutoPopulator:
         ).order_by(Chapter.order_index).all()
 
         if not chapters:
-            return {"error": "No chapters found", "changes": []}
+            return PopulationPlan(manuscript_id, world_id, error="No chapters found")
 
-        # Combine all chapter content
-        full_text = "\n\n".join(
-            chapter.content or "" for chapter in chapters if chapter.content
-        )
+        if not any((chapter.content or "").strip() for chapter in chapters):
+            return PopulationPlan(manuscript_id, world_id, error="No content to analyze")
 
-        if not full_text.strip():
-            return {"error": "No content to analyze", "changes": []}
+        return self.plan_chapters(chapters, world_id, manuscript_id, progress_callback, full_rescan)
 
-        # Run all extraction pipelines
-        results = {
-            "manuscript_id": manuscript_id,
-            "world_id": world_id,
-            "chapters_analyzed": len(chapters),
-            "extractions": {}
+    def plan_chapters(
+        self,
+        chapters: List[Chapter],
+        world_id: str,
+        manuscript_id: str,
+        progress_callback: Optional[Callable[[str, int], None]] = None,
+        full_rescan: bool = False
+    ) -> PopulationPlan:
+        """Diff chapters against their stored state and extract from the changes"""
+        plan = PopulationPlan(manuscript_id, world_id, chapters_analyzed=len(chapters))
+        deltas = self.get_chapter_deltas(chapters, world_id, full_rescan)
+        changed = [delta for delta in deltas if delta.changed_paragraphs]
+
+        # Pending proposals whose source text was edited out no longer apply
+        for delta in deltas:
+            if delta.previously_processed:
+                plan.withdrawals.extend(
+                    change.id for change in self._stale_changes(delta.chapter, world_id)
+                )
+        self._pending[world_id] = PendingChangeIndex(self.db, world_id, exclude=plan.withdrawals)
+
+        extractors = {
+            "entities": self.extract_entities_for_wiki,
+            "world_rules": self.extract_world_rules,
+            "relationships": self.extract_relationships,
+            "locations": self.extract_location_details,
+            "character_traits": self.extract_character_traits,
         }
+        duplicates_before = self.duplicates_skipped
+        self._plan = plan
+        try:
+            for stage_index, (name, stage_name) in enumerate(EXTRACTION_STAGES):
+                if progress_callback:
+                    progress_callback(stage_name, stage_index)
+                self._stage = name
+                for delta in changed:
+                    extractors[name](delta.text, world_id, manuscript_id, delta.chapter.id)
+        finally:
+            self._plan = None
+            self._stage = None
+            self._working_data.clear()
+
+        plan.chapters_changed = len(changed)
+        plan.paragraphs_analyzed = sum(len(delta.changed_paragraphs) for delta in changed)
+        plan.duplicates_skipped = self.duplicates_skipped - duplicates_before
+        plan.chapter_state = self._chapter_state(deltas, world_id)
+        return plan
+
+    def apply_plan(self, plan: PopulationPlan) -> Dict[str, Any]:
+        """
+        Write a plan: withdraw stale changes, queue its proposals (skipping
+        any now pending) and store the chapter state. Plans are applied one
+        at a time.
+        """
+        extractions = {name: 0 for name, _ in EXTRACTION_STAGES}
+        duplicates_before = self.duplicates_skipped
 
-        # 1. Extract entities
-        if progress_callback:
-            progress_callback("Extracting entities", 0)
-        entity_changes = self.extract_entities_for_wiki(
-            full_text, world_id, manuscript_id
-        )
-        results["extractions"]["entities"] = len(entity_changes)
-
-        # 2. Extract world rules
-        if progress_callback:
-            progress_callback("Extracting world rules", 1)
-        rule_changes = self.extract_world_rules(
-            full_text, world_id, manuscript_id
-        )
-        results["extractions"]["world_rules"] = len(rule_changes)
+        with _write_lock:
+            withdrawn = self._withdraw_changes(plan.world_id, plan.withdrawals)
 
-        # 3. Extract relationships
-        if progress_callback:
-            progress_callback("Extracting relationships", 2)
-        relationship_changes = self.extract_relationships(
-            full_text, world_id, manuscript_id
-        )
-        results["extractions"]["relationships"] = len(relationship_changes)
+            # Reload: other plans may have been applied since this one was made
+            self._pending.pop(plan.world_id, None)
+            for name, change in plan.proposals:
+                if self._propose(**change):
+                    extractions[name] += 1
 
-        # 4. Extract location details
-        if progress_callback:
-            progress_callback("Extracting locations", 3)
-        location_changes = self.extract_location_details(
-            full_text, world_id, manuscript_id
-        )
-        results["extractions"]["locations"] = len(location_changes)
+            chapter_analysis_store.put_many(self.db, plan.manuscript_id, plan.chapter_state)
+            self.db.commit()
 
-        # 5. Extract character traits
-        if progress_callback:
-            progress_callback("Extracting character traits", 4)
-        trait_changes = self.extract_character_traits(
-            full_text, world_id, manuscript_id
-        )
-        results["extractions"]["character_traits"] = len(trait_changes)
+        return {
+            "manuscript_id": plan.manuscript_id,
+            "world_id": plan.world_id,
+            "chapters_analyzed": plan.chapters_analyzed,
+            "extractions": extractions,
+            "total_changes": sum(extractions.values()),
+            "chapters_changed": plan.chapters_changed,
+            "paragraphs_analyzed": plan.paragraphs_analyzed,
+            "duplicates_skipped": plan.duplicates_skipped + self.duplicates_skipped - duplicates_before,
+            "changes_withdrawn": withdrawn,
+        }
 
-        # Count total changes created
-        total_changes = sum(results["extractions"].values())
-        results["total_changes"] = total_changes
+    # ==================== Incremental State ====================
 
-        return results
+    def _content_hash(self, chapter: Chapter, world_id: str) -> str:
+        payload = f"{world_id}\0{chapter.content or ''}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
-    def analyze_chapter(
+    def get_chapter_deltas(
         self,
-        chapter_id: str,
-        world_id: Optional[str] = None
-    ) -> Dict[str, Any]:
+        chapters: List[Chapter],
+        world_id: str,
+        full_rescan: bool = False
+    ) -> List[ChapterDelta]:
         """
-        Analyze a single chapter for wiki updates.
-        Lightweight version for incremental updates.
+        Each chapter's paragraphs that are new since it was last processed
+        for this world. Unchanged chapters get an empty delta.
         """
-        chapter = self.db.query(Chapter).filter(Chapter.id == chapter_id).first()
-        if not chapter:
-            return {"error": "Chapter not found"}
-
-        if not chapter.content or not chapter.content.strip():
-            return {"error": "No content to analyze", "changes": []}
-
-        # Get world_id if not provided
-        if not world_id:
-            world_id = self.get_world_for_manuscript(chapter.manuscript_id)
+        stored = {}
+        if not full_rescan:
+            try:
+                stored = chapter_analysis_store.get_latest(
+                    self.db, [chapter.id for chapter in chapters], POPULATE_ANALYZER
+                )
+            except Exception as e:
+                logger.warning(f"Could not load wiki population state: {e}")
+
+        deltas = []
+        for chapter in chapters:
+            content_hash = self._content_hash(chapter, world_id)
+            paragraphs = split_paragraphs(chapter.content or "")
+            hashes = [paragraph_hash(p) for p in paragraphs]
+
+            version, previous_hash, state = stored.get(chapter.id, (None, None, None))
+            previous = None
+            if version == POPULATE_VERSION and isinstance(state, dict) and state.get("world_id") == world_id:
+                previous = state
+
+            if previous is not None and previous_hash == content_hash:
+                changed = []
+            else:
+                seen = set(previous.get("paragraphs", [])) if previous is not None else set()
+                changed = []
+                for paragraph, digest in zip(paragraphs, hashes):
+                    if digest not in seen:
+                        changed.append(paragraph)
+                        seen.add(digest)  # Repeated paragraphs are extracted once
+
+            deltas.append(ChapterDelta(
+                chapter=chapter,
+                content_hash=content_hash,
+                paragraph_hashes=hashes,
+                changed_paragraphs=changed,
+                previously_processed=previous is not None and previous_hash != content_hash,
+            ))
+        return deltas
+
+    def _chapter_state(self, deltas: List[ChapterDelta], world_id: str) -> List[Tuple[str, str, int, str, Any]]:
+        """chapter_analysis_store entries recording each processed chapter's paragraph hashes and revision"""
+        return [
+            (
+                delta.chapter.id,
+                POPULATE_ANALYZER,
+                POPULATE_VERSION,
+                delta.content_hash,
+                {
+                    "world_id": world_id,
+                    "paragraphs": delta.paragraph_hashes,
+                    "revision": delta.chapter.updated_at.isoformat() if delta.chapter.updated_at else None,
+                    "processed_at": datetime.utcnow().isoformat(),
+                },
+            )
+            for delta in deltas
+            if delta.changed_paragraphs or delta.previously_processed
+        ]
 
-        if not world_id:
-            return {"error": "No world found for manuscript"}
+    # ==================== Pending Change Reconciliation ====================
 
-        text = chapter.content
-        manuscript_id = chapter.manuscript_id
+    def _pending_index(self, world_id: str) -> PendingChangeIndex:
+        if world_id not in self._pending:
+            self._pending[world_id] = PendingChangeIndex(self.db, world_id)
+        return self._pending[world_id]
 
-        results = {
-            "chapter_id": chapter_id,
-            "world_id": world_id,
-            "extractions": {}
-        }
+    def _propose(self, keys: Optional[Set[Tuple]] = None, **change) -> Optional[WikiChange]:
+        """
+        Queue a change unless an identical one is already pending. While
+        planning, the change is added to the plan and returned unsaved.
 
-        # Run lightweight extraction (fewer patterns)
-        entity_changes = self.extract_entities_for_wiki(
-            text, world_id, manuscript_id, chapter_id
-        )
-        results["extractions"]["entities"] = len(entity_changes)
+        keys defaults to what the change proposes (see proposal_keys).
+        """
+        if keys is None:
+            keys = proposal_keys(
+                change["change_type"], change.get("wiki_entry_id"), change.get("field_changed"),
+                change.get("old_value"), change.get("new_value"), change.get("proposed_entry")
+            )
+        pending = self._pending_index(change["world_id"])
+        if pending.contains(keys):
+            self.duplicates_skipped += 1
+            return None
+        pending.add(keys)
+        if self._plan is not None:
+            self._plan.proposals.append((self._stage, change))
+            return WikiChange(status=WikiChangeStatus.PENDING.value, **change)
+        return self.wiki_service.create_change(**change)
 
-        rule_changes = self.extract_world_rules(
-            text, world_id, manuscript_id, chapter_id
-        )
-        results["extractions"]["world_rules"] = len(rule_changes)
+    def _entry_data(self, entry: WikiEntry) -> Dict[str, Any]:
+        """
+        The entry's structured data including changes proposed earlier in
+        this run, so successive proposals for one entry build on each other
+        """
+        if entry.id not in self._working_data:
+            self._working_data[entry.id] = copy.deepcopy(entry.structured_data or {})
+        return self._working_data[entry.id]
 
-        results["total_changes"] = sum(results["extractions"].values())
+    def _stale_changes(self, chapter: Chapter, world_id: str) -> List[WikiChange]:
+        """The chapter's pending changes whose source text is no longer in it"""
+        content = _normalize_space(chapter.content or "")
+        pending = self.db.query(WikiChange).filter(
+            WikiChange.world_id == world_id,
+            WikiChange.source_chapter_id == chapter.id,
+            WikiChange.status == WikiChangeStatus.PENDING.value
+        ).all()
 
-        return results
+        stale = []
+        for change in pending:
+            # Source context reaches a little into neighbouring paragraphs;
+            # its longest line is the one holding the match
+            lines = [_normalize_space(line) for line in (change.source_text or "").split("\n")]
+            matched = max(lines, key=len, default="")
+            if len(matched) >= MIN_SOURCE_PIECE_CHARS and matched not in content:
+                stale.append(change)
+        return stale
+
+    def _withdraw_changes(self, world_id: str, change_ids: Sequence[str]) -> int:
+        """Reject the given changes that are still pending"""
+        if not change_ids:
+            return 0
+        changes = self.db.query(WikiChange).filter(
+            WikiChange.id.in_(list(change_ids)),
+            WikiChange.status == WikiChangeStatus.PENDING.value
+        ).all()
+        for change in changes:
+            change.status = WikiChangeStatus.REJECTED.value
+            change.reviewed_at = datetime.utcnow()
+            change.reviewer_note = "Withdrawn automatically: the source text was edited out of the chapter"
+        if changes:
+            self.db.commit()
+            self._pending.pop(world_id, None)
+        return len(changes)
 
     # ==================== Entity Extraction ====================
 
@@ -303,17 +637,7 @@ class WikiAutoPopulator:
             if not wiki_type:
                 continue
 
-            # Check for duplicates in pending changes
-            pending = self.db.query(WikiChange).filter(
-                WikiChange.world_id == world_id,
-                WikiChange.status == WikiChangeStatus.PENDING.value,
-                WikiChange.proposed_entry.contains({"title": name})
-            ).first()
-
-            if pending:
-                continue
-
-            # Create change proposal
+            # Create change proposal (skipped if already pending)
             proposed_entry = {
                 "entry_type": wiki_type,
                 "title": name,
@@ -322,7 +646,7 @@ class WikiAutoPopulator:
                 "structured_data": entity_data.get("extracted_attributes", {}),
             }
 
-            change = self.wiki_service.create_change(
+            change = self._propose(
                 world_id=world_id,
                 change_type=WikiChangeType.CREATE.value,
                 new_value=proposed_entry,
@@ -333,7 +657,8 @@ class WikiAutoPopulator:
                 source_manuscript_id=manuscript_id,
                 confidence=entity_data.get("confidence", 0.7)
             )
-            changes.append(change)
+            if change:
+                changes.append(change)
 
         return changes
 
@@ -423,8 +748,8 @@ class WikiAutoPopulator:
                     },
                 }
 
-                # Create change proposal
-                change = self.wiki_service.create_change(
+                # Create change proposal (skipped if already pending)
+                change = self._propose(
                     world_id=world_id,
                     change_type=WikiChangeType.CREATE.value,
                     new_value=proposed_entry,
@@ -435,7 +760,8 @@ class WikiAutoPopulator:
                     source_manuscript_id=manuscript_id,
                     confidence=0.65  # Lower confidence for rules
                 )
-                changes.append(change)
+                if change:
+                    changes.append(change)
 
         return changes
 
@@ -545,26 +871,28 @@ class WikiAutoPopulator:
                 }
 
                 # Update structured_data with relationship
-                current_data = char_a_entry.structured_data or {}
+                current_data = self._entry_data(char_a_entry)
                 relationships = current_data.get("relationships", [])
 
                 # Skip if relationship already exists
                 existing = any(
-                    r.get("relationship_type") == rel_type and r.get("related_to") == char_b
+                    r.get("relationship_type") == rel_type
+                    and r.get("related_to") == relationship_data["related_to"]
                     for r in relationships
                 )
                 if existing:
                     continue
 
-                relationships.append(relationship_data)
-                new_data = {**current_data, "relationships": relationships}
+                old_data = copy.deepcopy(current_data)
+                current_data["relationships"] = relationships + [relationship_data]
+                new_data = copy.deepcopy(current_data)
 
-                change = self.wiki_service.create_change(
+                change = self._propose(
                     world_id=world_id,
                     change_type=WikiChangeType.UPDATE.value,
                     wiki_entry_id=char_a_entry.id,
                     field_changed="structured_data",
-                    old_value=current_data,
+                    old_value=old_data,
                     new_value=new_data,
                     reason=f"Relationship detected: {rel_type}",
                     source_text=context,
@@ -572,7 +900,8 @@ class WikiAutoPopulator:
                     source_manuscript_id=manuscript_id,
                     confidence=0.7
                 )
-                changes.append(change)
+                if change:
+                    changes.append(change)
 
         return changes
 
@@ -619,22 +948,23 @@ class WikiAutoPopulator:
                 context = text[start:end]
 
                 # Update structured_data with detail
-                current_data = location_entry.structured_data or {}
+                current_data = self._entry_data(location_entry)
                 details = current_data.get(detail_type, [])
 
                 # Skip if detail already exists
                 if detail in details:
                     continue
 
-                details.append(detail)
-                new_data = {**current_data, detail_type: details}
+                old_data = copy.deepcopy(current_data)
+                current_data[detail_type] = details + [detail]
+                new_data = copy.deepcopy(current_data)
 
-                change = self.wiki_service.create_change(
+                change = self._propose(
                     world_id=world_id,
                     change_type=WikiChangeType.UPDATE.value,
                     wiki_entry_id=location_entry.id,
                     field_changed="structured_data",
-                    old_value=current_data,
+                    old_value=old_data,
                     new_value=new_data,
                     reason=f"Location detail detected: {detail_type}",
                     source_text=context,
@@ -642,7 +972,8 @@ class WikiAutoPopulator:
                     source_manuscript_id=manuscript_id,
                     confidence=0.65
                 )
-                changes.append(change)
+                if change:
+                    changes.append(change)
 
         return changes
 
@@ -689,22 +1020,23 @@ class WikiAutoPopulator:
                 context = text[start:end]
 
                 # Update structured_data with trait
-                current_data = char_entry.structured_data or {}
+                current_data = self._entry_data(char_entry)
                 traits = current_data.get(trait_type, [])
 
                 # Skip if trait already exists
                 if trait in traits:
                     continue
 
-                traits.append(trait)
-                new_data = {**current_data, trait_type: traits}
+                old_data = copy.deepcopy(current_data)
+                current_data[trait_type] = traits + [trait]
+                new_data = copy.deepcopy(current_data)
 
-                change = self.wiki_service.create_change(
+                change = self._propose(
                     world_id=world_id,
                     change_type=WikiChangeType.UPDATE.value,
                     wiki_entry_id=char_entry.id,
                     field_changed="structured_data",
-                    old_value=current_data,
+                    old_value=old_data,
                     new_value=new_data,
                     reason=f"Character trait detected: {trait_type}",
                     source_text=context,
@@ -712,7 +1044,8 @@ class WikiAutoPopulator:
                     source_manuscript_id=manuscript_id,
                     confidence=0.6
                 )
-                changes.append(change)
+                if change:
+                    changes.append(change)
 
         return changes
 
@@ -725,7 +1058,7 @@ class WikiAutoPopulator:
     ) -> Dict[str, Any]:
         """
         Called when a chapter is saved.
-        Runs lightweight analysis and queues changes.
+        Extracts from the paragraphs the save changed and queues changes.
         """
         return self.analyze_chapter(chapter_id, world_id)
 
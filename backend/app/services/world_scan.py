@@ -0,0 +1,203 @@
+"""
+World Scan - Wiki auto-population for every manuscript in a world, in parallel.
+
+A world scan used to populate its manuscripts one after another in the job's
+thread, although the books are independent. Manuscripts are now sharded
+across a process pool: each worker process loads its own spaCy model (via
+nlp_service at import) and keeps its own database session, and plans one
+manuscript at a time (see WikiAutoPopulator.plan_manuscript). Planning only
+reads, so workers never contend for the database.
+
+The parent applies each plan as it arrives, one at a time and against the
+pending changes already written, so two books that mention the same new
+character produce a single proposal. At most one manuscript per worker is
+submitted at a time, so cancelling a scan stops it after the manuscripts
+already running.
+
+Configuration:
+- WIKI_SCAN_PROCESSES: max worker processes (default 4; 0 = plan in this
+  process). Worlds with a single manuscript are always scanned in-process.
+"""
+
+import logging
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+from app.models.manuscript import Manuscript
+from app.services.wiki_auto_populator import PopulationPlan, WikiAutoPopulator
+
+logger = logging.getLogger(__name__)
+
+PROCESSES = int(os.getenv("WIKI_SCAN_PROCESSES", "4"))
+
+# Extraction stages per manuscript (see EXTRACTION_STAGES)
+STAGES_PER_MANUSCRIPT = 5
+
+# The worker process's own session (set by _init_worker)
+_worker_db: Optional[Session] = None
+
+
+def _init_worker():
+    """Process initializer: load spaCy and open this worker's database session"""
+    global _worker_db
+    import app.services.nlp_service  # noqa: F401
+    from app.database import SessionLocal
+    _worker_db = SessionLocal()
+
+
+def plan_manuscript_scan(world_id: str, manuscript_id: str, full_rescan: bool = False) -> PopulationPlan:
+    """Plan one manuscript's wiki changes (worker process entry point)"""
+    if _worker_db is None:
+        from app.database import SessionLocal
+        db = SessionLocal()
+    else:
+        db = _worker_db
+    try:
+        return WikiAutoPopulator(db).plan_manuscript(manuscript_id, world_id, full_rescan=full_rescan)
+    finally:
+        if db is _worker_db:
+            db.rollback()  # Expire everything, so the next manuscript reads fresh rows
+        else:
+            db.close()
+
+
+ProgressCallback = Callable[..., None]  # (progress_percent=None, stage=None, **counters)
+
+
+class WorldScanner:
+    """Populates a world's wiki from its manuscripts, sharded across worker processes"""
+
+    def __init__(self, processes: int = PROCESSES):
+        self.processes = processes
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return self._executor
+
+    def scan(
+        self,
+        db: Session,
+        world_id: str,
+        manuscripts: Sequence[Manuscript],
+        progress_callback: Optional[ProgressCallback] = None,
+        full_rescan: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Populate the wiki from each manuscript.
+
+        progress_callback gets the same fields as JobContext.report
+        (progress_percent, stage, total_manuscripts, manuscripts_completed,
+        current_manuscript_title, total_changes, workers); an exception it
+        raises stops the scan.
+        """
+        report = progress_callback or (lambda **fields: None)
+        populator = WikiAutoPopulator(db)
+        total = len(manuscripts)
+        totals = {"total_changes": 0, "duplicates_skipped": 0, "changes_withdrawn": 0}
+
+        def apply(plan: PopulationPlan):
+            if plan.error:
+                return
+            result = populator.apply_plan(plan)
+            for name in totals:
+                totals[name] += result[name]
+
+        if self.processes <= 0 or total <= 1:
+            self._scan_in_process(populator, world_id, manuscripts, report, apply, full_rescan, totals)
+        else:
+            self._scan_in_pool(world_id, manuscripts, report, apply, full_rescan, totals)
+
+        report(progress_percent=100, manuscripts_completed=total, current_manuscript_title="", **totals)
+        return totals
+
+    def _scan_in_process(self, populator, world_id, manuscripts, report, apply, full_rescan, totals):
+        total = len(manuscripts)
+        for i, manuscript in enumerate(manuscripts):
+            title = manuscript.title or f"Manuscript {i+1}"
+            report(
+                progress_percent=(i / max(total, 1)) * 100,
+                stage="Starting analysis",
+                total_manuscripts=total,
+                manuscripts_completed=i,
+                current_manuscript_title=title,
+                total_changes=totals["total_changes"],
+                workers=1,
+            )
+
+            def on_stage(stage_name: str, stage_index: int):
+                report(
+                    progress_percent=(i + (stage_index / STAGES_PER_MANUSCRIPT)) / max(total, 1) * 100,
+                    stage=stage_name,
+                )
+
+            apply(populator.plan_manuscript(manuscript.id, world_id, on_stage, full_rescan))
+
+    def _scan_in_pool(self, world_id, manuscripts, report, apply, full_rescan, totals):
+        total = len(manuscripts)
+        workers = min(self.processes, total)
+        titles = {m.id: m.title or f"Manuscript {i+1}" for i, m in enumerate(manuscripts)}
+        executor = self._get_executor()
+        waiting = deque(m.id for m in manuscripts)
+        futures: Dict[Future, str] = {}
+
+        def submit_next():
+            manuscript_id = waiting.popleft()
+            futures[executor.submit(plan_manuscript_scan, world_id, manuscript_id, full_rescan)] = manuscript_id
+
+        def running_titles() -> str:
+            return ", ".join(titles[manuscript_id] for manuscript_id in futures.values())
+
+        while waiting and len(futures) < workers:
+            submit_next()
+
+        report(
+            progress_percent=0,
+            stage=f"Analyzing manuscripts in {workers} workers",
+            total_manuscripts=total,
+            manuscripts_completed=0,
+            current_manuscript_title=running_titles(),
+            total_changes=0,
+            workers=workers,
+        )
+        completed = 0
+        try:
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    manuscript_id = futures.pop(future)
+                    apply(future.result())
+                    completed += 1
+                    report(
+                        progress_percent=completed / total * 100,
+                        stage=f"Applied changes from {titles[manuscript_id]}",
+                        manuscripts_completed=completed,
+                        current_manuscript_title=running_titles(),
+                        total_changes=totals["total_changes"],
+                    )
+                    # Only after the report, which raises when the scan is cancelled
+                    if waiting:
+                        submit_next()
+        finally:
+            # Cancelled or failed: drop anything submitted that hasn't started
+            for future in futures:
+                future.cancel()
+
+    def shutdown(self, wait: bool = False):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+# Module-level singleton
+world_scanner = WorldScanner()
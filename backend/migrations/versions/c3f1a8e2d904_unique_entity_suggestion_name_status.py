@@ -0,0 +1,46 @@
+"""Unique entity suggestion per manuscript, name and status
+
+Revision ID: c3f1a8e2d904
+Revises: 329badabeec0
+Create Date: 2026-10-18 10:12:31.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f1a8e2d904'
+down_revision: Union[str, Sequence[str], None] = '329badabeec0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Drop duplicate suggestions, then enforce (manuscript_id, lower(name), status)."""
+
+    # Per-entity persistence raced between connections and left duplicates behind
+    op.execute("""
+        DELETE FROM entity_suggestions
+        WHERE status IS NOT NULL
+          AND id NOT IN (
+            SELECT MIN(id) FROM entity_suggestions
+            WHERE status IS NOT NULL
+            GROUP BY manuscript_id, lower(name), status
+          )
+    """)
+
+    # Conflict target for the realtime bulk upsert (INSERT ... ON CONFLICT DO NOTHING)
+    op.create_index(
+        'uq_entity_suggestions_manuscript_name_status',
+        'entity_suggestions',
+        ['manuscript_id', sa.text('lower(name)'), 'status'],
+        unique=True
+    )
+
+
+def downgrade() -> None:
+    """Remove the unique suggestion index."""
+    op.drop_index('uq_entity_suggestions_manuscript_name_status', table_name='entity_suggestions')
@@ -0,0 +1,48 @@
+"""Add chapter_analysis_cache table
+
+Revision ID: d5e2b7c91a40
+Revises: c3f1a8e2d904
+Create Date: 2026-10-18 14:03:52.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5e2b7c91a40'
+down_revision: Union[str, Sequence[str], None] = 'c3f1a8e2d904'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('chapter_analysis_cache',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('chapter_id', sa.String(), nullable=False),
+    sa.Column('manuscript_id', sa.String(), nullable=False),
+    sa.Column('analyzer', sa.String(), nullable=False),
+    sa.Column('analyzer_version', sa.Integer(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('result', sa.JSON(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['chapter_id'], ['chapters.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_chapter_analysis_cache_manuscript_id'), 'chapter_analysis_cache', ['manuscript_id'], unique=False)
+    op.create_index(
+        'uq_chapter_analysis_cache_chapter_analyzer',
+        'chapter_analysis_cache',
+        ['chapter_id', 'analyzer'],
+        unique=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_chapter_analysis_cache_chapter_analyzer', table_name='chapter_analysis_cache')
+    op.drop_index(op.f('ix_chapter_analysis_cache_manuscript_id'), table_name='chapter_analysis_cache')
+    op.drop_table('chapter_analysis_cache')
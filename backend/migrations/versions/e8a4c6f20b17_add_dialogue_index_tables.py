@@ -0,0 +1,56 @@
+"""Add dialogue index tables
+
+Revision ID: e8a4c6f20b17
+Revises: d5e2b7c91a40
+Create Date: 2026-10-18 16:21:07.402915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8a4c6f20b17'
+down_revision: Union[str, Sequence[str], None] = 'd5e2b7c91a40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('dialogue_index_chapters',
+    sa.Column('chapter_id', sa.String(), nullable=False),
+    sa.Column('manuscript_id', sa.String(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('span_count', sa.Integer(), nullable=True),
+    sa.Column('indexed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['chapter_id'], ['chapters.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('chapter_id')
+    )
+    op.create_index(op.f('ix_dialogue_index_chapters_manuscript_id'), 'dialogue_index_chapters', ['manuscript_id'], unique=False)
+    op.create_table('dialogue_spans',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('manuscript_id', sa.String(), nullable=False),
+    sa.Column('chapter_id', sa.String(), nullable=False),
+    sa.Column('character_id', sa.String(), nullable=False),
+    sa.Column('text', sa.Text(), nullable=False),
+    sa.Column('context', sa.Text(), nullable=True),
+    sa.Column('start_offset', sa.Integer(), nullable=False),
+    sa.Column('end_offset', sa.Integer(), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['chapter_id'], ['chapters.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_dialogue_spans_chapter_id'), 'dialogue_spans', ['chapter_id'], unique=False)
+    op.create_index('ix_dialogue_spans_manuscript_character', 'dialogue_spans', ['manuscript_id', 'character_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_dialogue_spans_manuscript_character', table_name='dialogue_spans')
+    op.drop_index(op.f('ix_dialogue_spans_chapter_id'), table_name='dialogue_spans')
+    op.drop_table('dialogue_spans')
+    op.drop_index(op.f('ix_dialogue_index_chapters_manuscript_id'), table_name='dialogue_index_chapters')
+    op.drop_table('dialogue_index_chapters')
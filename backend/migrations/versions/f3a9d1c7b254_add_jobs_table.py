@@ -0,0 +1,54 @@
+"""Add jobs table
+
+Revision ID: f3a9d1c7b254
+Revises: e8a4c6f20b17
+Create Date: 2026-10-18 18:02:44.118203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a9d1c7b254'
+down_revision: Union[str, Sequence[str], None] = 'e8a4c6f20b17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('jobs',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('user_id', sa.String(), nullable=True),
+    sa.Column('dedup_key', sa.String(length=64), nullable=False),
+    sa.Column('params', sa.JSON(), nullable=True),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('progress_percent', sa.Float(), nullable=True),
+    sa.Column('current_stage', sa.String(), nullable=True),
+    sa.Column('progress', sa.JSON(), nullable=True),
+    sa.Column('partial_results', sa.JSON(), nullable=True),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=True),
+    sa.Column('cancel_requested', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_jobs_kind'), 'jobs', ['kind'], unique=False)
+    op.create_index(op.f('ix_jobs_user_id'), 'jobs', ['user_id'], unique=False)
+    op.create_index('ix_jobs_status_dedup_key', 'jobs', ['status', 'dedup_key'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_jobs_status_dedup_key', table_name='jobs')
+    op.drop_index(op.f('ix_jobs_user_id'), table_name='jobs')
+    op.drop_index(op.f('ix_jobs_kind'), table_name='jobs')
+    op.drop_table('jobs')
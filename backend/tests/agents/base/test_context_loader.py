@@ -517,3 +517,59 @@ class TestContextLoader:
             # Author should not be loaded
             mock_author.assert_not_called()
             assert result.author is None
+
+
+class TestAgentContextBudget:
+    """Tests for token-budgeted, relevance-ranked context packing"""
+
+    def _context(self):
+        manuscript = ManuscriptContext(
+            manuscript_id="ms-1",
+            title="Budget Novel",
+            entities=[
+                {"name": f"Bystander {i}", "type": "CHARACTER", "aliases": []}
+                for i in range(9)
+            ] + [{"name": "Elara", "type": "CHARACTER", "aliases": ["The Wanderer"]}] + [
+                {"name": f"Bystander {i}", "type": "CHARACTER", "aliases": []}
+                for i in range(9, 30)
+            ] + [{"name": "Oren", "type": "CHARACTER", "aliases": []}],
+        )
+        author = AuthorContext(user_id="budget-user", strengths=["dialogue"])
+        return AgentContext(author=author, manuscript=manuscript)
+
+    def test_focus_entities_survive_tight_budget(self):
+        """Test entities named in the analyzed text are kept first"""
+        ctx = self._context()
+
+        text = ctx.to_prompt_context(max_tokens=60, focus_text="The Wanderer drew her sword.")
+
+        assert "Elara" in text
+        assert "[Context truncated]" in text
+
+    def test_focus_does_not_change_capped_lists(self):
+        """Test capped lists keep their order, so the prompt stays cacheable"""
+        ctx = self._context()
+
+        text = ctx.to_prompt_context(focus_text="Oren smiled.")
+
+        assert "Oren" not in text
+        assert text == ctx.to_prompt_context(focus_text="Bystander 3 frowned.")
+
+    def test_focus_does_not_change_output_when_everything_fits(self):
+        """Test output is stable (cacheable) when no items are dropped"""
+        ctx = self._context()
+        ctx.manuscript.entities = ctx.manuscript.entities[-5:]
+
+        assert ctx.to_prompt_context(focus_text="Elara") == ctx.to_prompt_context(focus_text="")
+
+    def test_budget_report_recorded(self):
+        """Test the last packing pass leaves a per-section report"""
+        ctx = self._context()
+
+        ctx.to_prompt_context(max_tokens=60)
+
+        report = ctx.budget_report.to_dict()
+        assert report["max_tokens"] == 60
+        assert report["tokens_used"] <= 60
+        assert {s["name"] for s in report["sections"]} == {"author", "manuscript"}
+        assert report["items_dropped"] > 0
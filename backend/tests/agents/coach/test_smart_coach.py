@@ -16,6 +16,11 @@ from app.agents.base.agent_config import ModelConfig, ModelProvider
 from app.services.llm_service import LLMResponse, LLMProvider
 
 
+async def invoke_directly(config, model, messages):
+    """Stands in for llm_service.invoke_model: calls the model without the scheduler"""
+    return await model.ainvoke(messages)
+
+
 @pytest.fixture
 def mock_llm_response():
     """Create a mock LLM response"""
@@ -279,6 +284,7 @@ class TestSmartCoachAgent:
 
             mock_llm.get_langchain_model = MagicMock(return_value=mock_model)
             mock_llm.convert_messages = MagicMock(return_value=[])
+            mock_llm.invoke_model = AsyncMock(side_effect=invoke_directly)
 
             with patch.object(coach, '_context_loader') as mock_loader:
                 mock_context = MagicMock()
@@ -348,6 +354,7 @@ class TestSmartCoachAgent:
 
             mock_llm.get_langchain_model = MagicMock(return_value=mock_model)
             mock_llm.convert_messages = MagicMock(return_value=[])
+            mock_llm.invoke_model = AsyncMock(side_effect=invoke_directly)
 
             with patch.object(coach, '_context_loader') as mock_loader:
                 mock_context = MagicMock()
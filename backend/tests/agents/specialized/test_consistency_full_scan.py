@@ -0,0 +1,216 @@
+"""
+Tests for the map-reduce full consistency scan
+"""
+import asyncio
+import json
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.agents.base.agent_config import AgentType, AgentConfig
+from app.agents.specialized import consistency_agent as consistency_module
+from app.agents.specialized.consistency_agent import (
+    ConsistencyAgent,
+    ConsistencyIssue,
+    build_scan_windows,
+    dedupe_issues,
+    split_to_token_budget,
+)
+from app.models.manuscript import Manuscript, Chapter
+from app.services.llm_service import LLMResponse, LLMProvider
+from app.services.token_budget import count_tokens
+
+
+def issue(issue_type="character_contradiction", severity="medium", description="Eye color changed",
+          source_text="His blue eyes", location=None):
+    return ConsistencyIssue(
+        issue_type=issue_type, severity=severity, description=description,
+        source_text=source_text, conflicting_fact="Brown eyes", location=location,
+    )
+
+
+class TestScanWindows:
+    """Chapters are packed into token-budgeted windows"""
+
+    def test_split_respects_budget_and_keeps_text(self):
+        text = "\n\n".join(" ".join(f"word{i}x{j}" for j in range(30)) for i in range(6))
+        text += "\n\n" + " ".join(f"long{j}" for j in range(400))
+        pieces = split_to_token_budget(text, 120)
+
+        assert len(pieces) > 1
+        assert all(count_tokens(piece) <= 120 for piece in pieces)
+        assert " ".join(pieces).split() == text.split()
+
+    def test_short_chapters_share_windows_long_ones_split(self):
+        short = "The keep stood silent. " * 5
+        long = "\n\n".join("Rain fell on the old road for hours. " * 6 for _ in range(12))
+        chapters = [
+            {"id": "a", "content": short},
+            {"id": "b", "content": short},
+            {"id": "empty", "content": ""},
+            {"id": "c", "content": long},
+        ]
+        budget = count_tokens(long) // 3
+
+        windows = build_scan_windows(chapters, budget)
+        assert [s.chapter_index for s in windows[0]][:2] == [0, 1]
+        long_parts = [s for window in windows for s in window if s.chapter_index == 3]
+        assert len(long_parts) > 1
+        assert [s.part for s in long_parts] == list(range(1, len(long_parts) + 1))
+        assert all(s.parts == len(long_parts) for s in long_parts)
+        assert all(sum(s.tokens for s in window) <= budget for window in windows)
+        assert all(s.chapter_index != 2 for window in windows for s in window)
+
+
+class TestDedupeIssues:
+    """The reduce step merges issues reported more than once"""
+
+    def test_same_source_text_merges(self):
+        merged = dedupe_issues([
+            issue(severity="low", location="Chapter 1"),
+            issue(severity="high", description="Eyes are now blue", source_text="his BLUE eyes!", location="Chapter 2"),
+            issue(issue_type="timeline_error", location="Chapter 2"),
+        ])
+        assert len(merged) == 2
+        assert merged[0].severity == "high"
+        assert merged[0].location == "Chapter 1, Chapter 2"
+        assert merged[1].issue_type == "timeline_error"
+
+    def test_same_description_merges(self):
+        merged = dedupe_issues([
+            issue(source_text="blue eyes", location="Chapter 1"),
+            issue(source_text="azure gaze", location="Chapter 1"),
+        ])
+        assert len(merged) == 1
+        assert merged[0].location == "Chapter 1"
+
+    def test_inputs_are_not_mutated(self):
+        first = issue(severity="low", location="Chapter 1")
+        dedupe_issues([first, issue(severity="high", location="Chapter 2")])
+        assert (first.severity, first.location) == ("low", "Chapter 1")
+
+
+@pytest.fixture
+def session_factory(test_db):
+    return sessionmaker(bind=test_db.get_bind())
+
+
+@pytest.fixture
+def scanned_manuscript(test_db, session_factory, monkeypatch):
+    monkeypatch.setattr("app.database.SessionLocal", session_factory)  # Chapter and canon loaders
+    manuscript = Manuscript(id=str(uuid.uuid4()), title="Scan", word_count=0)
+    test_db.add(manuscript)
+    chapters = [
+        Chapter(
+            id=str(uuid.uuid4()), manuscript_id=manuscript.id, title=f"Chapter {i + 1}",
+            order_index=i, is_folder=0, content=f"Chapter {i + 1} text. His blue eyes shone.",
+        )
+        for i in range(5)
+    ]
+    test_db.add_all(chapters)
+    test_db.commit()
+    return manuscript, chapters
+
+
+def make_agent(session_factory):
+    agent = ConsistencyAgent(
+        config=AgentConfig.for_agent_type(AgentType.CONTINUITY), api_key="test-key", session_factory=session_factory
+    )
+    for loader in ("_load_character_profiles", "_load_full_timeline", "_load_world_context",
+                   "_load_relationships", "_load_culture_context"):
+        setattr(agent, loader, AsyncMock(return_value=f"{loader} canon"))
+    context = MagicMock()
+    context.to_prompt_context.return_value = "Hierarchical context"
+    agent._context_loader = MagicMock()
+    agent._context_loader.load_full_context = MagicMock(return_value=context)
+    return agent
+
+
+class FakeModel:
+    """Reports the same eye-color issue in every section it is sent"""
+
+    def __init__(self):
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, messages, priority=None):
+        self.calls.append(messages)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        labels = [line.split("]")[0][5:] for line in messages[1]["content"].splitlines() if line.startswith("### [")]
+        issues = [
+            {"issue_type": "character_contradiction", "severity": "high", "chapter": label,
+             "description": "Eye color changed", "source_text": "His blue eyes", "conflicting_fact": "Brown"}
+            for label in labels
+        ]
+        return LLMResponse(
+            content=json.dumps({"issues": issues}), model="m", provider=LLMProvider.ANTHROPIC,
+            usage={"prompt_tokens": 100, "completion_tokens": 10, "total_tokens": 110}, cost=0.001,
+        )
+
+
+class TestFullScan:
+    """Windows share one cached system prompt and run concurrently"""
+
+    @pytest.mark.asyncio
+    async def test_windows_share_cached_prompt(self, scanned_manuscript, session_factory, monkeypatch):
+        manuscript, chapters = scanned_manuscript
+        monkeypatch.setattr(consistency_module, "FULL_SCAN_WINDOW_TOKENS", count_tokens(chapters[0].content) * 2)
+        monkeypatch.setattr(consistency_module, "FULL_SCAN_CONCURRENCY", 2)
+        model = FakeModel()
+        agent = make_agent(session_factory)
+        agent._run_direct = model
+        progress = []
+
+        result = await agent.full_scan("user", manuscript.id, progress_callback=lambda d, t: progress.append((d, t)))
+
+        assert result.success
+        assert result.windows == 3 and len(model.calls) == 3
+        assert model.max_in_flight == 2
+        assert len({messages[0]["content"] for messages in model.calls}) == 1
+        assert all(messages[0]["cache"] for messages in model.calls)
+        assert "_load_relationships canon" in model.calls[0][0]["content"]
+        assert progress[-1] == (3, 3)
+        assert result.cost == pytest.approx(0.003)
+
+        # One eye-color issue, found in every chapter
+        [merged] = result.issues
+        assert merged.location == ", ".join(c.title for c in chapters)
+
+    @pytest.mark.asyncio
+    async def test_unchanged_chapters_are_reused(self, test_db, scanned_manuscript, session_factory):
+        manuscript, chapters = scanned_manuscript
+        model = FakeModel()
+        agent = make_agent(session_factory)
+        agent._run_direct = model
+
+        first = await agent.full_scan("user", manuscript.id)
+        assert (first.chapters_analyzed, first.chapters_reused) == (5, 0)
+
+        chapters[2].content = "Chapter 3 rewritten. Nothing amiss."
+        test_db.commit()
+        second = await agent.full_scan("user", manuscript.id)
+
+        assert (second.chapters_analyzed, second.chapters_reused) == (1, 4)
+        assert "Chapter 3 rewritten" in model.calls[-1][1]["content"]
+        assert "Chapter 1 text" not in model.calls[-1][1]["content"]
+        assert [i.to_dict() for i in second.issues] == [i.to_dict() for i in first.issues]
+
+    @pytest.mark.asyncio
+    async def test_failed_windows_are_not_stored(self, scanned_manuscript, session_factory):
+        manuscript, _ = scanned_manuscript
+        agent = make_agent(session_factory)
+        agent._run_direct = AsyncMock(side_effect=RuntimeError("overloaded"))
+
+        result = await agent.full_scan("user", manuscript.id)
+        assert result.success is False
+        assert "overloaded" in result.warnings[0]
+
+        agent._run_direct = FakeModel()
+        retried = await agent.full_scan("user", manuscript.id)
+        assert retried.success and retried.chapters_reused == 0
@@ -7,6 +7,8 @@ import pytest
 import json
 from unittest.mock import AsyncMock, MagicMock, patch
 
+from sqlalchemy.orm import sessionmaker
+
 from app.agents.base.agent_config import AgentType, AgentConfig
 from app.agents.specialized.consistency_agent import (
     ConsistencyAgent,
@@ -292,10 +294,12 @@ class TestConsistencyAgent:
             assert "Context error" in result.warnings[0]
 
     @pytest.mark.asyncio
-    async def test_full_scan(self, mock_llm_response):
+    async def test_full_scan(self, mock_llm_response, test_db):
         """Test full_scan method"""
         config = AgentConfig.for_agent_type(AgentType.CONTINUITY)
-        agent = ConsistencyAgent(config=config, api_key="test-key")
+        agent = ConsistencyAgent(
+            config=config, api_key="test-key", session_factory=sessionmaker(bind=test_db.get_bind())
+        )
 
         with patch.object(agent, '_context_loader') as mock_loader, \
              patch.object(agent, '_load_character_profiles', new_callable=AsyncMock, return_value="Character profiles"), \
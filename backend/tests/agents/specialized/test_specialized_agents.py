@@ -15,6 +15,11 @@ from app.agents.specialized.voice_agent import VoiceAgent, create_voice_agent
 from app.services.llm_service import LLMResponse, LLMProvider
 
 
+async def invoke_directly(config, model, messages):
+    """Stands in for llm_service.invoke_model: calls the model without the scheduler"""
+    return await model.ainvoke(messages)
+
+
 @pytest.fixture
 def default_config():
     """Create a default agent configuration"""
@@ -121,6 +126,7 @@ class TestStyleAgent:
             mock_model.bind_tools = MagicMock(return_value=mock_model_with_tools)
             mock_service.get_langchain_model = MagicMock(return_value=mock_model)
             mock_service.convert_messages = MagicMock(return_value=[])
+            mock_service.invoke_model = AsyncMock(side_effect=invoke_directly)
 
             result = await agent.analyze(
                 text="She walked very slowly into the room.",
@@ -213,6 +219,7 @@ class TestContinuityAgent:
             mock_model.bind_tools = MagicMock(return_value=mock_model_with_tools)
             mock_service.get_langchain_model = MagicMock(return_value=mock_model)
             mock_service.convert_messages = MagicMock(return_value=[])
+            mock_service.invoke_model = AsyncMock(side_effect=invoke_directly)
 
             result = await agent.analyze(
                 text="John's green eyes sparkled.",
@@ -304,6 +311,7 @@ class TestStructureAgent:
             mock_model.bind_tools = MagicMock(return_value=mock_model_with_tools)
             mock_service.get_langchain_model = MagicMock(return_value=mock_model)
             mock_service.convert_messages = MagicMock(return_value=[])
+            mock_service.invoke_model = AsyncMock(side_effect=invoke_directly)
 
             result = await agent.analyze(
                 text="The hero wandered through the forest thinking about nothing in particular.",
@@ -395,6 +403,7 @@ class TestVoiceAgent:
             mock_model.bind_tools = MagicMock(return_value=mock_model_with_tools)
             mock_service.get_langchain_model = MagicMock(return_value=mock_model)
             mock_service.convert_messages = MagicMock(return_value=[])
+            mock_service.invoke_model = AsyncMock(side_effect=invoke_directly)
 
             result = await agent.analyze(
                 text='"I think we should go," said Alice.\n"I think you might be right," said Bob.',
@@ -443,6 +452,7 @@ class TestAgentCostTracking:
             mock_model.bind_tools = MagicMock(return_value=mock_model_with_tools)
             mock_service.get_langchain_model = MagicMock(return_value=mock_model)
             mock_service.convert_messages = MagicMock(return_value=[])
+            mock_service.invoke_model = AsyncMock(side_effect=invoke_directly)
 
             await agent.analyze(
                 text="Test text",
@@ -22,6 +22,16 @@ from app.models.wiki import WikiEntry, WikiEntryType, WikiEntryStatus
 from app.models.character_arc import CharacterArc, ArcTemplate
 
 
+@pytest.fixture(autouse=True)
+def isolated_disk_caches(tmp_path, monkeypatch):
+    """Keep the import/export cache singletons out of the real data directory"""
+    from app.services.import_parse_cache import import_parse_cache
+    from app.services.export_cache import export_cache
+
+    monkeypatch.setattr(import_parse_cache, "directory", tmp_path / "import_cache")
+    monkeypatch.setattr(export_cache, "directory", tmp_path / "export_cache")
+
+
 # Create test database engine
 @pytest.fixture(scope="function")
 def test_db():
@@ -524,6 +534,20 @@ def event_loop():
     loop.close()
 
 
+@pytest.fixture(autouse=True)
+def unthrottled_llm_scheduler(monkeypatch):
+    """Disable provider rate limits so mocked LLM calls never wait on the token bucket"""
+    from app.services.llm_scheduler import llm_scheduler, ProviderLimits
+
+    monkeypatch.setattr(llm_scheduler, "_limits", {
+        provider: ProviderLimits(max_concurrent=64, requests_per_minute=0.0, burst=64, max_retries=0)
+        for provider in ("openai", "anthropic", "openrouter", "local")
+    })
+    llm_scheduler.reset()
+    yield llm_scheduler
+    llm_scheduler.reset()
+
+
 @pytest.fixture
 def async_client(test_db):
     """Create an async test client"""
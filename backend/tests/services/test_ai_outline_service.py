@@ -0,0 +1,60 @@
+"""
+Tests for ai_outline_service - full outline analysis fan-out
+"""
+
+import asyncio
+
+import pytest
+
+from app.models.manuscript import Manuscript, Chapter
+from app.models.outline import Outline, PlotBeat
+from app.services.ai_outline_service import AIOutlineService
+
+
+@pytest.fixture
+def outline(test_db):
+    manuscript = Manuscript(id="ms-1", title="The Docks")
+    test_db.add(manuscript)
+    test_db.add(Chapter(
+        id="ch-1", manuscript_id="ms-1", title="Chapter 1", order_index=0,
+        content="Mara met Tomas at the docks.", word_count=6,
+    ))
+    outline = Outline(id="outline-1", manuscript_id="ms-1", structure_type="3-act", premise="A stranger arrives")
+    test_db.add(outline)
+    test_db.add(PlotBeat(
+        id="beat-1", outline_id="outline-1", beat_name="hook", beat_label="Hook",
+        target_position_percent=0.0, order_index=0, chapter_id="ch-1",
+    ))
+    test_db.commit()
+    return outline
+
+
+def test_full_analysis_loads_context_before_running_analyses_concurrently(test_db, outline):
+    """The concurrent analyses get pre-loaded data instead of sharing the session"""
+    service = AIOutlineService(api_key="test-key")
+    calls = {}
+
+    async def fake_descriptions(outline, beats, db, feedback=None, manuscript_context=None):
+        calls["beat_descriptions"] = (db, manuscript_context)
+        await asyncio.sleep(0)
+        return {"success": True, "beat_descriptions": [], "usage": {"total_tokens": 1}}
+
+    async def fake_plot_holes(outline, beats, db, dismissed_holes=None, manuscript_context=None):
+        calls["plot_holes"] = (db, manuscript_context)
+        await asyncio.sleep(0)
+        return {"success": True, "plot_holes": [], "usage": {"total_tokens": 2}}
+
+    async def fake_pacing(outline, beats):
+        return {"success": True, "pacing_analysis": {}, "usage": {"total_tokens": 3}}
+
+    service.generate_beat_descriptions = fake_descriptions
+    service.detect_plot_holes = fake_plot_holes
+    service.analyze_pacing = fake_pacing
+
+    result = asyncio.run(service.run_full_analysis("outline-1", test_db))
+
+    assert result["success"]
+    assert result["usage"]["total_tokens"] == 6
+    for db, manuscript_context in calls.values():
+        assert db is None
+        assert "Mara met Tomas" in manuscript_context
@@ -134,6 +134,14 @@ class TestCodexSuggestions:
         # Should return existing
         assert s1.id == s2.id
 
+    def test_create_suggestion_matches_any_case_and_type(self, codex_service, sample_manuscript, test_db):
+        s1 = codex_service.create_suggestion(sample_manuscript.id, "Alice", "CHARACTER", "ctx1")
+        s2 = codex_service.create_suggestion(sample_manuscript.id, "ALICE", "LOCATION", "ctx2")
+        # One suggestion per name: a second type would violate the unique index
+        assert s2.id == s1.id
+        assert s2.type == "CHARACTER"
+        assert test_db.query(EntitySuggestion).filter_by(manuscript_id=sample_manuscript.id).count() == 1
+
     def test_create_suggestion_existing_entity(self, codex_service, sample_manuscript):
         codex_service.create_entity(sample_manuscript.id, "CHARACTER", "Alice")
         suggestion = codex_service.create_suggestion(sample_manuscript.id, "Alice", "CHARACTER", "ctx")
@@ -150,6 +158,18 @@ class TestCodexSuggestions:
         suggestion = codex_service.create_suggestion(sample_manuscript.id, "Alice", "CHARACTER", "ctx")
         assert codex_service.reject_suggestion(suggestion.id) is True
 
+    def test_reject_same_name_twice(self, codex_service, sample_manuscript, test_db):
+        first = codex_service.create_suggestion(sample_manuscript.id, "Alice", "CHARACTER", "ctx")
+        codex_service.reject_suggestion(first.id)
+        # Realtime detection re-suggests a rejected name as a new pending row
+        second = EntitySuggestion(manuscript_id=sample_manuscript.id, name="alice", type="CHARACTER")
+        test_db.add(second)
+        test_db.commit()
+
+        assert codex_service.reject_suggestion(second.id) is True
+        rejected = codex_service.get_suggestions(sample_manuscript.id, status="REJECTED")
+        assert [s.id for s in rejected] == [second.id]
+
 
 class TestCodexMerge:
     """Tests for entity merging."""
@@ -0,0 +1,102 @@
+"""
+Tests for batched realtime entity suggestion persistence
+"""
+import pytest
+
+from app.models.entity import Entity, EntitySuggestion
+from app.services.entity_suggestion_store import KnownNameCache, persist_entity_suggestions
+
+
+@pytest.fixture
+def persist(test_db):
+    """persist_entity_suggestions bound to the test session and a fresh name cache"""
+    known = KnownNameCache()
+    original_close = test_db.close
+    test_db.close = lambda: None
+
+    def run(manuscript_id, entities):
+        return persist_entity_suggestions(
+            manuscript_id, entities, session_factory=lambda: test_db, known_names=known
+        )
+
+    run.known = known
+    yield run
+    test_db.close = original_close
+
+
+def detected(*names, entity_type="CHARACTER"):
+    return [{"name": name, "type": entity_type, "context": f"{name} was here"} for name in names]
+
+
+class TestPersistEntitySuggestions:
+    """Tests for the one-transaction upsert"""
+
+    def test_creates_pending_suggestions(self, persist, test_db, sample_manuscript):
+        """Test a result set becomes pending suggestions with ids"""
+        persisted = persist(sample_manuscript.id, detected("Elara", "Thorne"))
+
+        assert [e["name"] for e in persisted] == ["Elara", "Thorne"]
+        assert all(e["is_new"] and e["suggestion_id"] for e in persisted)
+        assert test_db.query(EntitySuggestion).count() == 2
+
+    def test_skips_codex_entities_case_insensitively(self, persist, test_db, sample_manuscript):
+        """Test names already in the Codex get no suggestion"""
+        test_db.add(Entity(manuscript_id=sample_manuscript.id, type="CHARACTER", name="Elara"))
+        test_db.commit()
+
+        persisted = persist(sample_manuscript.id, detected("ELARA", "Thorne"))
+
+        assert [e["name"] for e in persisted] == ["Thorne"]
+
+    def test_existing_pending_suggestion_is_reused(self, persist, test_db, sample_manuscript):
+        """Test a pending suggestion from another connection is returned, not duplicated"""
+        existing = EntitySuggestion(manuscript_id=sample_manuscript.id, name="elara", type="CHARACTER")
+        test_db.add(existing)
+        test_db.commit()
+
+        persisted = persist(sample_manuscript.id, detected("Elara"))
+
+        assert persisted[0]["suggestion_id"] == existing.id
+        assert persisted[0]["is_new"] is False
+        assert test_db.query(EntitySuggestion).count() == 1
+
+    def test_known_names_skip_the_database(self, persist, test_db, sample_manuscript):
+        """Test repeat detections are dropped by the known-name cache"""
+        persist(sample_manuscript.id, detected("Elara"))
+        persist.known.seed(sample_manuscript.id, ["Elara"])
+
+        def fail():
+            raise AssertionError("database should not be touched")
+
+        assert persist_entity_suggestions(
+            sample_manuscript.id, detected("elara"), session_factory=fail, known_names=persist.known
+        ) == []
+        assert persist.known.hits == 1
+
+    def test_duplicates_within_a_batch_collapse(self, persist, test_db, sample_manuscript):
+        """Test the same name twice in one result set is inserted once"""
+        persisted = persist(sample_manuscript.id, detected("Elara", "elara"))
+
+        assert len(persisted) == 1
+        assert test_db.query(EntitySuggestion).count() == 1
+
+
+class TestKnownNameCache:
+    """Tests for the per-manuscript name sets"""
+
+    def test_least_recent_manuscript_is_evicted(self):
+        cache = KnownNameCache(max_manuscripts=2)
+        cache.seed("a", ["Elara"])
+        cache.seed("b", ["Thorne"])
+        cache.unknown("a", [])
+        cache.seed("c", ["Mira"])
+
+        assert cache.unknown("b", detected("Thorne")) != []
+        assert cache.unknown("a", detected("Elara")) == []
+
+    def test_forget_drops_names(self):
+        cache = KnownNameCache()
+        cache.seed("a", ["Elara"])
+        cache.forget("a")
+
+        assert cache.unknown("a", detected("Elara")) != []
@@ -0,0 +1,270 @@
+"""
+Tests for LLM Scheduler (per-provider concurrency limits, priorities, retries)
+"""
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from app.services.llm_scheduler import (
+    LLMScheduler,
+    ProviderLimits,
+    RequestPriority,
+    parse_retry_after,
+)
+from app.services.openrouter_service import OpenRouterService
+
+
+FAST_LIMITS = ProviderLimits(
+    max_concurrent=1,
+    requests_per_minute=0.0,
+    burst=1,
+    max_retries=2,
+    base_backoff_seconds=0.01,
+    max_backoff_seconds=0.05,
+)
+
+
+class TestParseRetryAfter:
+    """Tests for Retry-After header parsing"""
+
+    def test_seconds(self):
+        assert parse_retry_after("3") == 3.0
+
+    def test_missing(self):
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("") is None
+
+    def test_malformed(self):
+        assert parse_retry_after("soon") is None
+
+    def test_http_date_in_past_is_zero(self):
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+class TestLLMScheduler:
+    """Tests for lane scheduling"""
+
+    @pytest.mark.asyncio
+    async def test_concurrency_cap(self):
+        """Test no more than max_concurrent calls run at once per lane"""
+        scheduler = LLMScheduler({"openai": ProviderLimits(max_concurrent=2, requests_per_minute=0.0, burst=2)})
+        running = 0
+        peak = 0
+
+        async def call():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.02)
+            running -= 1
+            return "ok"
+
+        results = await asyncio.gather(*[scheduler.run("openai", "key", call) for _ in range(6)])
+
+        assert results == ["ok"] * 6
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_separate_keys_get_separate_lanes(self):
+        """Test different API keys are limited independently"""
+        scheduler = LLMScheduler({"openai": ProviderLimits(max_concurrent=1, requests_per_minute=0.0, burst=1)})
+        running = 0
+        peak = 0
+
+        async def call():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.02)
+            running -= 1
+
+        await asyncio.gather(
+            scheduler.run("openai", "key-a", call),
+            scheduler.run("openai", "key-b", call),
+        )
+
+        assert peak == 2
+        assert len(scheduler.get_metrics()["lanes"]) == 2
+
+    @pytest.mark.asyncio
+    async def test_priority_order(self):
+        """Test interactive requests are dispatched before queued background work"""
+        scheduler = LLMScheduler({"anthropic": FAST_LIMITS})
+        order = []
+        release = asyncio.Event()
+
+        async def blocker():
+            await release.wait()
+
+        def record(name):
+            async def call():
+                order.append(name)
+            return call
+
+        holder = asyncio.create_task(scheduler.run("anthropic", "k", blocker))
+        await asyncio.sleep(0)
+
+        background = asyncio.create_task(
+            scheduler.run("anthropic", "k", record("background"), priority=RequestPriority.BACKGROUND)
+        )
+        analysis = asyncio.create_task(
+            scheduler.run("anthropic", "k", record("analysis"), priority=RequestPriority.ANALYSIS)
+        )
+        interactive = asyncio.create_task(
+            scheduler.run("anthropic", "k", record("interactive"), priority=RequestPriority.INTERACTIVE)
+        )
+        await asyncio.sleep(0.01)
+
+        depth = scheduler.get_metrics()["lanes"][0]["queue_depth_by_priority"]
+        assert depth == {"interactive": 1, "analysis": 1, "background": 1}
+
+        release.set()
+        await asyncio.gather(holder, background, analysis, interactive)
+
+        assert order == ["interactive", "analysis", "background"]
+
+    @pytest.mark.asyncio
+    async def test_token_bucket_spaces_requests(self):
+        """Test requests beyond the burst wait for the bucket to refill"""
+        loop = asyncio.get_running_loop()
+        scheduler = LLMScheduler({"openai": ProviderLimits(max_concurrent=10, requests_per_minute=600.0, burst=1)})
+        started = []
+
+        async def call():
+            started.append(loop.time())
+
+        await asyncio.gather(*[scheduler.run("openai", "k", call) for _ in range(3)])
+
+        # 600 rpm = one request every 0.1s after the first
+        assert started[-1] - started[0] >= 0.15
+
+    @pytest.mark.asyncio
+    async def test_retries_rate_limited_exception(self):
+        """Test exceptions carrying status 429 are retried"""
+        scheduler = LLMScheduler({"anthropic": FAST_LIMITS})
+        attempts = 0
+
+        class RateLimited(Exception):
+            status_code = 429
+
+        async def flaky():
+            nonlocal attempts
+            attempts += 1
+            if attempts < 3:
+                raise RateLimited("slow down")
+            return "done"
+
+        assert await scheduler.run("anthropic", "k", flaky) == "done"
+        lane = scheduler.get_metrics()["lanes"][0]
+        assert lane["retries"] == 2
+        assert lane["rate_limited"] == 2
+
+    @pytest.mark.asyncio
+    async def test_non_retryable_exception_raises(self):
+        """Test other errors propagate immediately"""
+        scheduler = LLMScheduler({"anthropic": FAST_LIMITS})
+        attempts = 0
+
+        async def broken():
+            nonlocal attempts
+            attempts += 1
+            raise ValueError("bad request")
+
+        with pytest.raises(ValueError):
+            await scheduler.run("anthropic", "k", broken)
+        assert attempts == 1
+        assert scheduler.get_metrics()["lanes"][0]["active"] == 0
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Returns 429 with Retry-After for the first N requests, then a completion"""
+
+    rate_limited_responses = 0
+    requests_seen = 0
+
+    def do_POST(self):
+        cls = type(self)
+        cls.requests_seen += 1
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        if cls.requests_seen <= cls.rate_limited_responses:
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            return
+
+        body = json.dumps({
+            "choices": [{"message": {"content": "Stub suggestion"}}],
+            "usage": {"prompt_tokens": 5, "completion_tokens": 7, "total_tokens": 12},
+            "model": "stub-model",
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    """Local OpenRouter-compatible stub server"""
+    handler = type("Handler", (_StubHandler,), {"rate_limited_responses": 2, "requests_seen": 0})
+    server = HTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, handler
+    server.shutdown()
+    server.server_close()
+
+
+class TestSchedulerAgainstStubServer:
+    """End-to-end retry behavior against a local HTTP stub"""
+
+    @pytest.mark.asyncio
+    async def test_openrouter_retries_429_then_succeeds(self, stub_server, unthrottled_llm_scheduler):
+        server, handler = stub_server
+        unthrottled_llm_scheduler.set_limits("openrouter", FAST_LIMITS)
+
+        service = OpenRouterService(api_key="stub-key")
+        service.BASE_URL = f"http://127.0.0.1:{server.server_port}"
+
+        result = await service.get_writing_suggestion(text="Prompt", context="System")
+
+        assert result["success"] is True
+        assert result["suggestion"] == "Stub suggestion"
+        assert handler.requests_seen == 3
+
+        metrics = unthrottled_llm_scheduler.get_metrics()
+        assert metrics["providers"]["openrouter"]["rate_limited"] == 2
+        assert metrics["total_queue_depth"] == 0
+
+    @pytest.mark.asyncio
+    async def test_openrouter_gives_up_after_max_retries(self, stub_server, unthrottled_llm_scheduler):
+        server, handler = stub_server
+        handler.rate_limited_responses = 10
+        unthrottled_llm_scheduler.set_limits("openrouter", FAST_LIMITS)
+
+        service = OpenRouterService(api_key="stub-key")
+        service.BASE_URL = f"http://127.0.0.1:{server.server_port}"
+
+        result = await service.get_writing_suggestion(text="Prompt", context="System")
+
+        assert result["success"] is False
+        assert "429" in result["error"]
+        assert handler.requests_seen == FAST_LIMITS.max_retries + 1
+
+
+def test_metrics_endpoint(client):
+    """Test /api/ai/metrics exposes scheduler and coalescing counters"""
+    response = client.get("/api/ai/metrics")
+
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert "coalescing" in data
+    assert "total_queue_depth" in data["scheduler"]
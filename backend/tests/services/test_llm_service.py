@@ -433,3 +433,225 @@ class TestLLMServiceGlobalInstance:
 
         assert llm_service is not None
         assert isinstance(llm_service, LLMService)
+
+
+class TestRequestCoalescing:
+    """Tests for single-flight deduplication of identical in-flight requests"""
+
+    @pytest.fixture
+    def service(self):
+        from app.services.request_coalescer import llm_request_coalescer
+        llm_request_coalescer.reset_stats()
+        return LLMService()
+
+    @pytest.fixture
+    def config(self):
+        return LLMConfig(
+            provider=LLMProvider.ANTHROPIC,
+            model="claude-3-haiku-20240307",
+            api_key="test-key"
+        )
+
+    def _slow_model(self, content="Shared answer"):
+        import asyncio
+
+        mock_response = MagicMock()
+        mock_response.content = content
+        mock_response.response_metadata = {
+            "usage": {"prompt_tokens": 10, "completion_tokens": 20, "total_tokens": 30}
+        }
+
+        async def slow_invoke(_messages):
+            await asyncio.sleep(0.05)
+            return mock_response
+
+        mock_model = MagicMock()
+        mock_model.ainvoke = AsyncMock(side_effect=slow_invoke)
+        return mock_model
+
+    @pytest.mark.asyncio
+    async def test_identical_concurrent_requests_share_one_call(self, service, config):
+        """Test concurrent identical requests reach the provider once"""
+        import asyncio
+
+        messages = [{"role": "user", "content": "Brainstorm a villain"}]
+        mock_model = self._slow_model()
+
+        with patch.object(service, '_get_langchain_model', return_value=mock_model):
+            responses = await asyncio.gather(
+                *[service.generate(config, list(messages)) for _ in range(3)]
+            )
+
+        assert mock_model.ainvoke.await_count == 1
+        assert all(r.content == "Shared answer" for r in responses)
+        assert sum(1 for r in responses if r.coalesced) == 2
+
+        stats = service.get_coalescing_stats()
+        assert stats["leaders"] == 1
+        assert stats["followers"] == 2
+        assert stats["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_different_api_keys_not_coalesced(self, service, config):
+        """Test requests from different API keys are never shared"""
+        import asyncio
+
+        other_config = LLMConfig(
+            provider=config.provider, model=config.model, api_key="other-key"
+        )
+        messages = [{"role": "user", "content": "Same prompt"}]
+        mock_model = self._slow_model()
+
+        with patch.object(service, '_get_langchain_model', return_value=mock_model):
+            await asyncio.gather(
+                service.generate(config, list(messages)),
+                service.generate(other_config, list(messages)),
+            )
+
+        assert mock_model.ainvoke.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_coalesce_disabled(self, service, config):
+        """Test coalesce=False always calls the provider"""
+        import asyncio
+
+        messages = [{"role": "user", "content": "Same prompt"}]
+        mock_model = self._slow_model()
+
+        with patch.object(service, '_get_langchain_model', return_value=mock_model):
+            await asyncio.gather(
+                service.generate(config, list(messages), coalesce=False),
+                service.generate(config, list(messages), coalesce=False),
+            )
+
+        assert mock_model.ainvoke.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_failure_propagates_to_followers(self, service, config):
+        """Test a failing leader raises in every coalesced caller"""
+        import asyncio
+
+        async def failing_invoke(_messages):
+            await asyncio.sleep(0.02)
+            raise RuntimeError("provider down")
+
+        mock_model = MagicMock()
+        mock_model.ainvoke = AsyncMock(side_effect=failing_invoke)
+        messages = [{"role": "user", "content": "Will fail"}]
+
+        with patch.object(service, '_get_langchain_model', return_value=mock_model):
+            results = await asyncio.gather(
+                service.generate(config, list(messages)),
+                service.generate(config, list(messages)),
+                return_exceptions=True,
+            )
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert mock_model.ainvoke.await_count == 1
+        assert service.get_coalescing_stats()["failures"] == 1
+
+    @pytest.mark.asyncio
+    async def test_sequential_requests_not_coalesced(self, service, config):
+        """Test completed requests are not reused (coalescing is not caching)"""
+        messages = [{"role": "user", "content": "Hello"}]
+        mock_model = self._slow_model()
+
+        with patch.object(service, '_get_langchain_model', return_value=mock_model):
+            first = await service.generate(config, list(messages))
+            second = await service.generate(config, list(messages))
+
+        assert mock_model.ainvoke.await_count == 2
+        assert not first.coalesced
+        assert not second.coalesced
+
+
+class TestPromptCaching:
+    """Tests for prompt-prefix cache markers and cache usage reporting"""
+
+    @pytest.fixture
+    def service(self):
+        return LLMService()
+
+    def _messages(self):
+        return [
+            {"role": "system", "content": "Stable preamble. " * 400, "cache": True},
+            {"role": "user", "content": "Volatile question"},
+        ]
+
+    def test_anthropic_gets_cache_control_marker(self, service):
+        """Test Anthropic system prompts get an ephemeral cache breakpoint"""
+        config = LLMConfig(provider=LLMProvider.ANTHROPIC, model="claude-3-haiku-20240307")
+
+        converted = service._convert_messages(self._messages(), config)
+
+        block = converted[0].content[0]
+        assert block["cache_control"] == {"type": "ephemeral"}
+        assert converted[1].content == "Volatile question"
+
+    def test_openrouter_anthropic_model_gets_marker(self, service):
+        """Test OpenRouter forwards markers for Anthropic models only"""
+        anthropic_via_or = LLMConfig(provider=LLMProvider.OPENROUTER, model="anthropic/claude-3-haiku")
+        openai_via_or = LLMConfig(provider=LLMProvider.OPENROUTER, model="openai/gpt-4o")
+
+        assert isinstance(service._convert_messages(self._messages(), anthropic_via_or)[0].content, list)
+        assert isinstance(service._convert_messages(self._messages(), openai_via_or)[0].content, str)
+
+    def test_openai_keeps_plain_content(self, service):
+        """Test OpenAI relies on automatic prefix caching (no markers)"""
+        config = LLMConfig(provider=LLMProvider.OPENAI, model="gpt-4o")
+
+        converted = service._convert_messages(self._messages(), config)
+
+        assert isinstance(converted[0].content, str)
+
+    def test_short_prefix_not_marked(self, service):
+        """Test prefixes below the provider minimum are left alone"""
+        config = LLMConfig(provider=LLMProvider.ANTHROPIC, model="claude-3-haiku-20240307")
+        messages = [{"role": "system", "content": "Short", "cache": True}]
+
+        assert service._convert_messages(messages, config)[0].content == "Short"
+
+    @pytest.mark.asyncio
+    async def test_generate_reports_cached_tokens(self, service):
+        """Test provider cache reads are surfaced in usage"""
+        config = LLMConfig(provider=LLMProvider.ANTHROPIC, model="claude-3-haiku-20240307", api_key="k")
+
+        mock_response = MagicMock()
+        mock_response.content = "ok"
+        mock_response.usage_metadata = {
+            "input_tokens": 1200,
+            "output_tokens": 10,
+            "input_token_details": {"cache_read": 1000, "cache_creation": 0},
+        }
+        mock_response.response_metadata = {
+            "usage": {"prompt_tokens": 1200, "completion_tokens": 10, "total_tokens": 1210}
+        }
+
+        with patch.object(service, '_get_langchain_model') as mock_get_model:
+            mock_model = MagicMock()
+            mock_model.ainvoke = AsyncMock(return_value=mock_response)
+            mock_get_model.return_value = mock_model
+
+            response = await service.generate(config, self._messages())
+
+        assert response.usage["cached_prompt_tokens"] == 1000
+        assert response.usage["prompt_tokens"] == 1200
+
+    def test_extract_openai_cached_tokens(self):
+        """Test OpenAI prompt_tokens_details.cached_tokens is recognized"""
+        from app.services.prompt_cache import extract_cache_usage
+
+        response = MagicMock()
+        response.usage_metadata = None
+        response.response_metadata = {
+            "token_usage": {"prompt_tokens": 2048, "prompt_tokens_details": {"cached_tokens": 1024}}
+        }
+
+        assert extract_cache_usage(response) == (1024, 0)
+
+    def test_local_prefix_length(self):
+        """Test llama.cpp prefix reuse counting"""
+        from app.services.local_inference_worker import common_prefix_length
+
+        assert common_prefix_length([1, 2, 3, 4], [1, 2, 9]) == 2
+        assert common_prefix_length([], [1, 2]) == 0
@@ -0,0 +1,215 @@
+"""
+Tests for Local Inference Worker (serialized execution, LRU residency, metrics)
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from app.services.local_inference_worker import LocalInferenceWorker
+
+
+MB = 1024 * 1024
+
+
+class FakeLlama:
+    """Stands in for llama_cpp.Llama: one call at a time, word tokens"""
+
+    def __init__(self, path, delay=0.01):
+        self.path = path
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def tokenize(self, data: bytes):
+        return data.decode().split()
+
+    def __call__(self, prompt, echo=False, max_tokens=16, temperature=0.7, stop=None):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+            self.prompts.append(prompt)
+        return {
+            "choices": [{"text": f" reply to {prompt[-5:]}"}],
+            "usage": {"prompt_tokens": len(prompt.split()), "completion_tokens": 4},
+        }
+
+
+@pytest.fixture
+def loaded():
+    """Models loaded by the worker, keyed by path"""
+    return {}
+
+
+@pytest.fixture
+def worker(loaded):
+    def loader(path, n_ctx, n_gpu_layers):
+        loaded[path] = FakeLlama(path)
+        return loaded[path]
+
+    worker = LocalInferenceWorker(max_resident_bytes=250 * MB, loader=loader, size_of=lambda path: 100 * MB)
+    yield worker
+    worker.unload()
+
+
+class TestLocalInferenceWorker:
+    """Tests for the local inference worker"""
+
+    @pytest.mark.asyncio
+    async def test_calls_into_one_model_are_serialized(self, worker, loaded):
+        """Test concurrent requests never run inside the same model at once"""
+        results = await asyncio.gather(*[
+            worker.generate("a.gguf", f"prompt {i}", max_tokens=4) for i in range(6)
+        ])
+
+        assert len(results) == 6
+        assert loaded["a.gguf"].peak == 1
+
+    @pytest.mark.asyncio
+    async def test_model_stays_resident(self, worker):
+        """Test repeated requests don't reload the model"""
+        await worker.generate("a.gguf", "one")
+        await worker.generate("a.gguf", "two")
+
+        assert worker.get_metrics()["loads"] == 1
+
+    def test_lru_eviction_under_ram_budget(self, worker):
+        """Test the least recently used idle model is unloaded when over budget"""
+        for path in ["a.gguf", "b.gguf", "a.gguf", "c.gguf"]:  # a is more recent than b
+            worker.release(worker.acquire(path))
+
+        metrics = worker.get_metrics()
+        paths = [m["model_path"] for m in metrics["models"]]
+        assert paths == ["a.gguf", "c.gguf"]
+        assert metrics["evictions"] == 1
+
+    def test_pinned_model_is_not_evicted(self, worker):
+        """Test a model between acquire() and release() survives eviction"""
+        pinned = worker.acquire("a.gguf")
+        worker.release(worker.acquire("b.gguf"))
+        worker.release(worker.acquire("c.gguf"))  # Over budget: b goes, a is pinned
+
+        assert [m["model_path"] for m in worker.get_metrics()["models"]] == ["a.gguf", "c.gguf"]
+        assert worker.submit(pinned, "still loaded").result(timeout=5)["choices"]
+        worker.release(pinned)
+        assert pinned.idle
+
+    def test_larger_context_does_not_unload_pinned_model(self, worker):
+        """Test a caller needing a bigger n_ctx gets its own instance"""
+        small = worker.acquire("a.gguf", n_ctx=2048)
+        large = worker.acquire("a.gguf", n_ctx=8192)
+
+        assert large is not small
+        assert worker.submit(small, "still loaded").result(timeout=5)["choices"]
+        assert worker.acquire("a.gguf", n_ctx=4096) is large  # Any big enough instance will do
+        for model in (small, large, large):
+            worker.release(model)
+
+    def test_loads_run_outside_the_lock(self):
+        """Test a slow load blocks neither other models nor waits for the same one twice"""
+        gate = threading.Event()
+        loads = []
+
+        def loader(path, n_ctx, n_gpu_layers):
+            loads.append(path)
+            if path == "slow.gguf":
+                gate.wait(5)
+            return FakeLlama(path)
+
+        worker = LocalInferenceWorker(max_resident_bytes=1000 * MB, loader=loader, size_of=lambda p: MB)
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            first = pool.submit(worker.acquire, "slow.gguf")
+            while not loads:
+                time.sleep(0.001)
+            second = pool.submit(worker.acquire, "slow.gguf")
+            worker.release(worker.acquire("fast.gguf"))  # Not stuck behind slow.gguf
+            gate.set()
+            assert first.result(timeout=5) is second.result(timeout=5)
+
+        assert loads == ["slow.gguf", "fast.gguf"]
+        assert first.result().pins == 2
+        worker.unload()
+
+    def test_prefix_affinity_with_long_shared_prefix(self, worker, loaded):
+        """Test requests with the same long system prompt are pulled forward"""
+        model = worker.acquire("a.gguf")
+        loaded["a.gguf"].delay = 0.05
+        preamble_a = "A " * 1100
+        preamble_b = "B " * 1100
+
+        first = worker.submit(model, preamble_a + "q1")
+        time.sleep(0.01)
+        rest = [worker.submit(model, preamble_b + "q2"), worker.submit(model, preamble_a + "q3")]
+        for f in [first] + rest:
+            f.result(timeout=5)
+
+        assert [p[-2:] for p in loaded["a.gguf"].prompts] == ["q1", "q3", "q2"]
+        assert model.metrics.affinity_picks == 1
+
+    @pytest.mark.asyncio
+    async def test_metrics_report_queue_wait_and_throughput(self, worker):
+        """Test queue wait, tokens/sec and reused prompt tokens are reported"""
+        await asyncio.gather(*[worker.generate("a.gguf", "shared prefix text") for _ in range(3)])
+
+        model_metrics = worker.get_metrics()["models"][0]
+        assert model_metrics["requests"] == 3
+        assert model_metrics["completion_tokens"] == 12
+        assert model_metrics["tokens_per_second"] > 0
+        assert model_metrics["max_queue_wait_ms"] > 0
+        assert model_metrics["cached_prompt_tokens"] == 6  # 2nd and 3rd reuse all 3 tokens
+
+    def test_warm_up(self, worker, loaded):
+        """Test warm-up loads the model and runs a tiny completion"""
+        warmed = worker.warm_up(["a.gguf"])
+
+        assert warmed == ["a.gguf"]
+        assert loaded["a.gguf"].prompts == ["Hello"]
+
+    def test_warm_up_skips_failures(self):
+        """Test a model that fails to load doesn't abort warm-up"""
+        def loader(path, n_ctx, n_gpu_layers):
+            raise RuntimeError("bad gguf")
+
+        worker = LocalInferenceWorker(max_resident_bytes=MB, loader=loader, size_of=lambda p: 0)
+
+        assert worker.warm_up(["broken.gguf"]) == []
+
+    def test_unload_fails_queued_requests(self, worker, loaded):
+        """Test unloading a model rejects work still waiting in its queue"""
+        model = worker.acquire("a.gguf")
+        loaded["a.gguf"].delay = 0.05
+        running = worker.submit(model, "running")
+        time.sleep(0.01)
+        queued = worker.submit(model, "queued")
+
+        worker.unload("a.gguf")
+
+        assert running.result(timeout=5)["choices"]
+        with pytest.raises(RuntimeError):
+            queued.result(timeout=5)
+
+
+class TestLocalLLMWrapper:
+    """Tests for the LangChain wrapper routing through the worker"""
+
+    @pytest.mark.asyncio
+    async def test_langchain_wrapper_uses_worker(self, worker, monkeypatch):
+        from app.services import local_llm_service as module
+
+        monkeypatch.setattr(module, "local_inference_worker", worker)
+        model = module.LocalLLM(model_path="a.gguf", temperature=0.1, max_tokens=8)
+
+        result = await model.ainvoke([SystemMessage(content="Be brief."), HumanMessage(content="Hi")])
+
+        assert result.content.startswith("reply to")
+        [model_metrics] = worker.get_metrics()["models"]
+        assert model_metrics["requests"] == 1
+        assert model_metrics["pins"] == 0
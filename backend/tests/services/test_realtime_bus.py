@@ -0,0 +1,120 @@
+"""
+Tests for the realtime session registry and broadcast bus
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.services.realtime_bus import InMemoryRealtimeBus, SQLiteRealtimeBus
+
+
+@pytest.fixture
+def shared_path(tmp_path):
+    return str(tmp_path / "realtime.db")
+
+
+def worker_bus(path, **kwargs):
+    """One worker's view of a shared SQLite bus"""
+    return SQLiteRealtimeBus(path=path, poll_interval=0.01, max_connections=2, **kwargs)
+
+
+async def next_message(subscription, timeout=1.0):
+    return await asyncio.wait_for(subscription.__anext__(), timeout)
+
+
+class TestInMemoryRealtimeBus:
+    """Tests for the single-process backend"""
+
+    @pytest.mark.asyncio
+    async def test_connection_limit(self):
+        bus = InMemoryRealtimeBus(max_connections=2)
+        assert await bus.register("ms-1", "a")
+        assert await bus.register("ms-1", "b")
+        assert not await bus.register("ms-1", "c")
+        # Limit is per manuscript
+        assert await bus.register("ms-2", "c")
+
+        assert await bus.unregister("ms-1", "a") == 1
+        assert await bus.register("ms-1", "d")
+        assert bus.rejected == 1
+
+    @pytest.mark.asyncio
+    async def test_publish_reaches_manuscript_subscribers_only(self):
+        bus = InMemoryRealtimeBus()
+        first = await bus.subscribe("ms-1")
+        second = await bus.subscribe("ms-1")
+        other = await bus.subscribe("ms-2")
+
+        await bus.publish("ms-1", {"type": "entities", "new_entities": [{"name": "Elara"}]})
+
+        assert (await next_message(first))["new_entities"][0]["name"] == "Elara"
+        assert (await next_message(second))["type"] == "entities"
+        with pytest.raises(asyncio.TimeoutError):
+            await next_message(other, timeout=0.05)
+        await bus.close()
+
+    @pytest.mark.asyncio
+    async def test_close_ends_iteration(self):
+        bus = InMemoryRealtimeBus()
+        subscription = await bus.subscribe("ms-1")
+        received = []
+
+        async def consume():
+            async for message in subscription:
+                received.append(message)
+
+        consumer = asyncio.create_task(consume())
+        await bus.publish("ms-1", {"n": 1})
+        await asyncio.sleep(0)
+        subscription.close()
+        await asyncio.wait_for(consumer, 1.0)
+
+        assert received == [{"n": 1}]
+        assert bus.get_stats()["subscriptions"] == 0
+
+
+class TestSQLiteRealtimeBus:
+    """Tests for the backend shared by workers on one host"""
+
+    @pytest.mark.asyncio
+    async def test_limit_holds_across_workers(self, shared_path):
+        worker_a, worker_b = worker_bus(shared_path), worker_bus(shared_path)
+
+        assert await worker_a.register("ms-1", "a1")
+        assert await worker_b.register("ms-1", "b1")
+        assert not await worker_b.register("ms-1", "b2")
+        assert await worker_a.total_connections() == 2
+
+        assert await worker_b.unregister("ms-1", "b1") == 1
+        assert await worker_b.register("ms-1", "b2")
+        await worker_a.close()
+        await worker_b.close()
+
+    @pytest.mark.asyncio
+    async def test_dead_worker_sessions_expire(self, shared_path):
+        crashed = worker_bus(shared_path, session_ttl=0.05)
+        assert await crashed.register("ms-1", "a1")
+        assert await crashed.register("ms-1", "a2")
+        await crashed.close()  # Heartbeat stops; sessions are never unregistered
+
+        time.sleep(0.1)
+        survivor = worker_bus(shared_path)
+        assert await survivor.register("ms-1", "b1")
+        await survivor.close()
+
+    @pytest.mark.asyncio
+    async def test_broadcast_reaches_other_workers(self, shared_path):
+        worker_a, worker_b = worker_bus(shared_path), worker_bus(shared_path)
+        await worker_a.publish("ms-1", {"type": "stale"})  # Before anyone subscribed
+        listener = await worker_b.subscribe("ms-1")
+
+        await worker_a.publish("ms-1", {"type": "codex_entity", "entity": {"name": "Elara"}})
+        await worker_a.publish("ms-2", {"type": "codex_entity", "entity": {"name": "Thorne"}})
+
+        message = await next_message(listener)
+        assert message["entity"]["name"] == "Elara"
+        with pytest.raises(asyncio.TimeoutError):
+            await next_message(listener, timeout=0.05)
+        await worker_a.close()
+        await worker_b.close()
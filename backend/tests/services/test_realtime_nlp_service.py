@@ -0,0 +1,116 @@
+"""
+Tests for Realtime NLP Service stream sessions (per-connection debounce)
+"""
+import asyncio
+
+import pytest
+
+from app.services.realtime_nlp_service import RealtimeNLPService
+
+
+@pytest.fixture
+def service():
+    """Service whose analysis records each window instead of parsing"""
+    service = RealtimeNLPService()
+    service.windows = []
+
+    async def analyze(text, manuscript_id, existing_entities, confidence_threshold='medium'):
+        service.windows.append((text, confidence_threshold))
+        return {"new_entities": [{"name": text.strip()}], "timestamp": "now"}
+
+    service.analyze_text_chunk = analyze
+    return service
+
+
+async def collect(session, into):
+    async for result in session.results():
+        into.append(result)
+
+
+class TestRealtimeStreamSession:
+    """Tests for coalescing, debounce and the high-water mark"""
+
+    @pytest.mark.asyncio
+    async def test_typing_burst_becomes_one_window(self, service):
+        """Test deltas within the debounce window are analyzed together once"""
+        session = service.create_session("ms-1", [])
+        session.configure(debounce_delay=0.05)
+        results = []
+        consumer = asyncio.create_task(collect(session, results))
+
+        for word in ["Sir ", "Galahad ", "rode ", "north."]:
+            session.push(word)
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.12)
+        session.close()
+        await consumer
+
+        assert service.windows == [("Sir Galahad rode north.", "medium")]
+        assert session.windows_superseded >= 1
+        assert session.high_water_mark == len("Sir Galahad rode north.")
+
+    @pytest.mark.asyncio
+    async def test_analyzed_text_is_not_reparsed(self, service):
+        """Test a second burst only analyzes text past the high-water mark"""
+        session = service.create_session("ms-1", [])
+        session.configure(debounce_delay=0.02)
+        results = []
+        consumer = asyncio.create_task(collect(session, results))
+
+        session.push("Elara arrived. ")
+        await asyncio.sleep(0.06)
+        session.push("Then Borin spoke.")
+        await asyncio.sleep(0.06)
+        session.close()
+        await consumer
+
+        assert [w for w, _ in service.windows] == ["Elara arrived. ", "Then Borin spoke."]
+        assert len(results) == 2
+
+    @pytest.mark.asyncio
+    async def test_debounce_is_per_session(self, service):
+        """Test one connection's config doesn't change another's debounce"""
+        fast = service.create_session("ms-1", [])
+        slow = service.create_session("ms-1", [])
+
+        fast.configure(debounce_delay=0.1)
+
+        assert fast.debounce_delay == 0.1
+        assert slow.debounce_delay == service.debounce_delay == 2.0
+
+    @pytest.mark.asyncio
+    async def test_threshold_update_applies_to_next_window(self, service):
+        """Test confidence changes take effect without reconnecting"""
+        session = service.create_session("ms-1", [], "medium")
+        session.configure(debounce_delay=0.01, confidence_threshold="high")
+        consumer = asyncio.create_task(collect(session, []))
+
+        session.push("Mira waved.")
+        await asyncio.sleep(0.05)
+        session.close()
+        await consumer
+
+        assert service.windows == [("Mira waved.", "high")]
+
+    def test_buffer_overflow_drops_oldest(self, service):
+        """Test backpressure keeps only the newest max_buffer_size chars"""
+        service.max_buffer_size = 10
+        session = service.create_session("ms-1", [])
+
+        session.push("abcdefgh")
+        session.push("ijkl")
+
+        assert session.take_window() == "cdefghijkl"
+        assert session.chars_dropped == 2
+        assert session.high_water_mark == 12
+
+    @pytest.mark.asyncio
+    async def test_close_ends_results(self, service):
+        """Test closing the session stops the stream without waiting for idle timeout"""
+        session = service.create_session("ms-1", [])
+        consumer = asyncio.create_task(collect(session, []))
+        await asyncio.sleep(0)
+
+        session.close()
+
+        await asyncio.wait_for(consumer, timeout=1)
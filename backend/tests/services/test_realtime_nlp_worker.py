@@ -0,0 +1,124 @@
+"""
+Tests for Realtime NLP Worker (micro-batching, futures, histograms)
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.services.realtime_nlp_worker import Histogram, RealtimeNLPWorker
+from app.services.realtime_nlp_service import RealtimeNLPService
+
+
+def echo_batch(texts):
+    """Stand-in for nlp.pipe: one candidate per text, records batch sizes"""
+    echo_batch.calls.append(len(texts))
+    time.sleep(0.01)
+    return [[{"name": t, "type": "CHARACTER", "confidence_score": 0.9}] for t in texts]
+
+
+echo_batch.calls = []
+
+
+@pytest.fixture
+def worker():
+    echo_batch.calls = []
+    worker = RealtimeNLPWorker(processes=0, batch_window_ms=5, max_batch=8, batch_fn=echo_batch)
+    yield worker
+    worker.shutdown()
+
+
+class TestRealtimeNLPWorker:
+    """Tests for the micro-batching worker"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_chunks_share_one_batch(self, worker):
+        """Test chunks from many connections are parsed in one pipe call"""
+        results = await asyncio.gather(*[worker.analyze(f"Name{i}") for i in range(6)])
+
+        assert [r[0]["name"] for r in results] == [f"Name{i}" for i in range(6)]
+        assert echo_batch.calls == [6]
+
+    @pytest.mark.asyncio
+    async def test_max_batch_splits(self, worker):
+        """Test batches never exceed max_batch"""
+        await asyncio.gather(*[worker.analyze(f"Name{i}") for i in range(20)])
+
+        assert max(echo_batch.calls) <= 8
+        assert sum(echo_batch.calls) == 20
+
+    @pytest.mark.asyncio
+    async def test_chunks_arriving_during_a_batch_form_the_next(self, worker):
+        """Test work queued while a batch runs is batched together afterwards"""
+        first = asyncio.ensure_future(worker.analyze("first"))
+        await asyncio.sleep(0.008)  # first batch is now running
+        rest = await asyncio.gather(*[worker.analyze(f"later{i}") for i in range(4)])
+        await first
+
+        assert echo_batch.calls == [1, 4]
+        assert len(rest) == 4
+
+    @pytest.mark.asyncio
+    async def test_failure_propagates_to_every_caller(self):
+        """Test a failed batch rejects each waiting future"""
+        def broken(texts):
+            raise ValueError("model crashed")
+
+        worker = RealtimeNLPWorker(processes=0, batch_window_ms=1, batch_fn=broken)
+        try:
+            results = await asyncio.gather(
+                worker.analyze("a"), worker.analyze("b"), return_exceptions=True
+            )
+        finally:
+            worker.shutdown()
+
+        assert all(isinstance(r, ValueError) for r in results)
+        assert worker.get_metrics()["failures"] == 1
+
+    @pytest.mark.asyncio
+    async def test_metrics_histograms(self, worker):
+        """Test batch size and latency histograms are recorded"""
+        await asyncio.gather(*[worker.analyze(f"Name{i}") for i in range(3)])
+
+        metrics = worker.get_metrics()
+        assert metrics["batches"] == 1
+        assert metrics["batch_size"]["buckets"]["4"] == 1
+        assert metrics["batch_size"]["buckets"]["2"] == 0
+        assert metrics["request_latency_ms"]["count"] == 3
+        assert metrics["batch_latency_ms"]["mean"] >= 10
+
+
+class TestHistogram:
+    """Tests for the fixed-bucket histogram"""
+
+    def test_cumulative_buckets(self):
+        h = Histogram((1, 5, 10))
+        for value in (0.5, 3, 3, 7, 100):
+            h.observe(value)
+
+        assert h.to_dict()["buckets"] == {"1": 1, "5": 3, "10": 4, "+Inf": 5}
+        assert h.to_dict()["count"] == 5
+
+
+class TestFilterCandidates:
+    """Tests for per-connection filtering of worker results"""
+
+    def test_filters_known_low_confidence_and_duplicates(self):
+        service = RealtimeNLPService()
+        candidates = [
+            {"name": "Elara", "type": "CHARACTER", "confidence_score": 0.9},
+            {"name": "elara", "type": "ITEM", "confidence_score": 0.9},
+            {"name": "Known", "type": "CHARACTER", "confidence_score": 0.9},
+            {"name": "Maybe Thing", "type": "ITEM", "confidence_score": 0.55},
+        ]
+
+        result = service.filter_candidates(candidates, ["known"], "medium")
+
+        assert [e["name"] for e in result] == ["Elara"]
+        assert result[0]["type"] == "CHARACTER"
+
+    def test_low_threshold_keeps_more(self):
+        service = RealtimeNLPService()
+        candidates = [{"name": f"N{i}", "type": "ITEM", "confidence_score": 0.55} for i in range(8)]
+
+        assert len(service.filter_candidates(candidates, [], "low")) == 5
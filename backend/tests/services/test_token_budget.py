@@ -0,0 +1,139 @@
+"""
+Tests for Token Budget (token counting and relevance-ranked packing)
+"""
+from app.services import token_budget
+from app.services.token_budget import (
+    ContextItem,
+    ContextSection,
+    count_tokens,
+    pack_sections,
+    render_section,
+    truncate_to_tokens,
+)
+
+
+class TestCountTokens:
+    """Tests for token counting"""
+
+    def test_empty(self):
+        assert count_tokens("") == 0
+
+    def test_prose_is_close_to_bpe(self):
+        """Test counts are in the BPE range, not len / 4"""
+        text = "\"Where are you going?\" asked Elara, glancing at the ruined tower."
+        # cl100k_base encodes this sentence as 17 tokens
+        assert 14 <= count_tokens(text) <= 20
+
+    def test_punctuation_heavy_text_counts_more_than_len_over_4(self):
+        """Test markdown lists aren't undercounted"""
+        text = "- a\n- b\n- c\n- d\n- e"
+        assert count_tokens(text) > len(text) // 4
+
+    def test_only_short_texts_are_memoized(self):
+        """Test whole chapters are counted without being kept in the cache"""
+        chapter = "The river ran north past the mill. " * 200
+        line = "- Elara, a ranger of the northern marches"
+        before = token_budget._count_short.cache_info().currsize
+
+        assert count_tokens(chapter) == count_tokens(chapter)
+        count_tokens(line)
+
+        assert token_budget._count_short.cache_info().currsize <= before + 1
+
+
+class TestTruncateToTokens:
+    """Tests for truncation"""
+
+    def test_short_text_unchanged(self):
+        assert truncate_to_tokens("Short text.", 100, "[cut]") == "Short text."
+
+    def test_long_text_fits_budget(self):
+        text = "The river ran north. " * 500
+        result = truncate_to_tokens(text, 50, "\n[cut]")
+
+        assert result.endswith("[cut]")
+        assert count_tokens(result) <= 50
+
+
+class TestPackSections:
+    """Tests for relevance-ranked packing"""
+
+    def _sections(self):
+        return [
+            ContextSection(
+                name="manuscript",
+                header="## Current Manuscript: Test",
+                weight=1.0,
+                items=[
+                    ContextItem("- Minor innkeeper with a long backstory " * 5, 0.2, "\n### Entities"),
+                    ContextItem("- Elara", 1.0, "\n### Entities"),
+                ],
+            ),
+            ContextSection(
+                name="author",
+                header="## Author Profile",
+                weight=0.5,
+                items=[ContextItem("- dialogue", 0.8, "\n### Strengths")],
+            ),
+        ]
+
+    def test_everything_fits_keeps_document_order(self):
+        """Test an unconstrained pack renders every item in order"""
+        packed = pack_sections(self._sections(), 10_000, title="# Context")
+
+        assert packed.text.index("Minor innkeeper") < packed.text.index("Elara")
+        assert "[Context truncated]" not in packed.text
+        assert packed.report.items_dropped == 0
+
+    def test_sections_render_highest_weight_first(self):
+        """Test sections are ordered by weight, whatever order they are passed in"""
+        packed = pack_sections(list(reversed(self._sections())), 10_000)
+
+        assert packed.text.index("## Current Manuscript") < packed.text.index("## Author Profile")
+
+    def test_tight_budget_drops_least_relevant(self):
+        """Test the low-relevance item is dropped before high-relevance ones"""
+        packed = pack_sections(self._sections(), 45, title="# Context")
+
+        assert "Elara" in packed.text
+        assert "dialogue" in packed.text
+        assert "Minor innkeeper" not in packed.text
+        assert "[Context truncated]" in packed.text
+        assert packed.report.tokens_used <= 45
+
+    def test_report_per_section(self):
+        """Test the budget report accounts for each section"""
+        packed = pack_sections(self._sections(), 45, title="# Context")
+        report = packed.report.to_dict()
+
+        by_name = {s["name"]: s for s in report["sections"]}
+        assert by_name["manuscript"]["items_included"] == 1
+        assert by_name["manuscript"]["items_dropped"] == 1
+        assert by_name["author"]["items_included"] == 1
+        assert sum(s["tokens_used"] for s in report["sections"]) <= report["max_tokens"]
+
+    def test_group_heading_omitted_when_group_empty(self):
+        """Test headings are only emitted for groups with surviving items"""
+        section = ContextSection(
+            name="world",
+            header="## World",
+            items=[ContextItem("- rule", 1.0, "\n### Rules"), ContextItem("- note", 0.1, "\n### Notes")],
+        )
+
+        assert "### Notes" not in render_section(section, keep={0})
+
+    def test_truncatable_item_is_cut_not_dropped(self):
+        """Test long descriptions are shortened to fit"""
+        section = ContextSection(
+            name="manuscript",
+            header="## Manuscript",
+            items=[ContextItem("A long description sentence. " * 200, 1.0, truncatable=True)],
+        )
+
+        packed = pack_sections([section], 120)
+
+        assert "A long description" in packed.text
+        assert "[Context truncated]" in packed.text
+        assert packed.report.tokens_used <= 120
+        # Caller's section is untouched
+        assert len(section.items[0].text) > 1000
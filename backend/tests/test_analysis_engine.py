@@ -0,0 +1,282 @@
+"""
+Tests for the single-pass narrative analysis engine.
+"""
+
+import uuid
+
+import pytest
+
+from dataclasses import replace
+
+from app.models.analysis_cache import ChapterAnalysisCache
+from app.models.entity import Entity, Relationship
+from app.models.manuscript import Manuscript, Chapter
+from app.services.analysis_engine import ANALYZERS, NarrativeAnalysisEngine
+from app.services.chapter_analysis_store import ChapterAnalysisStore
+from app.services.emotional_beat_service import EmotionalBeatService
+from app.services.pacing_optimizer_service import PacingOptimizerService
+from app.services.pov_consistency_service import POVConsistencyService
+from app.services.relationship_evolution_service import RelationshipEvolutionService
+from app.services.scene_purpose_service import ScenePurposeService
+from app.services.subplot_tracker_service import SubplotTrackerService
+
+CHAPTER_TEXTS = [
+    "Mara met Tomas at the docks. She had never seen him before, a stranger in a grey coat. "
+    "\"Who are you?\" she asked. He smiled and said nothing. Her heart raced as the ship pulled away. "
+    "She wondered what secret he carried, and why the captain feared him.",
+    "Mara and Tomas became friends over the long winter. They trusted him with the map. "
+    "\"We leave at dawn,\" Tomas said. The danger was real; blood on the snow, a scream in the dark. "
+    "Suddenly the wolves attacked and they ran, fighting for every breath.",
+    "",
+    "The ancient city was vast and dim. Mara walked its weathered streets alone, thinking about her mother. "
+    "She remembered the promise. The mystery of the missing ledger still haunted her. "
+    "Elena watched from a balcony, betrayed and furious, plotting revenge against them both.",
+    "Tomas betrayed Mara at the gate. She hated him now, her former friend turned enemy. "
+    "\"You lied to me!\" she screamed. The battle was brutal; they fought, she escaped, bleeding. "
+    "In the end she forgave him, and the secret of the ledger was finally revealed.",
+    "The long road home was quiet. Mara thought of Elena and Tomas, of what was lost. "
+    "She felt a strange peace, and hope, as the sun rose over the hills of her childhood.",
+]
+
+
+@pytest.fixture
+def book(test_db):
+    manuscript = Manuscript(id=str(uuid.uuid4()), title="Harbor", genre="Fantasy", word_count=0)
+    test_db.add(manuscript)
+    for i, text in enumerate(CHAPTER_TEXTS):
+        test_db.add(Chapter(
+            id=str(uuid.uuid4()),
+            manuscript_id=manuscript.id,
+            title=f"Chapter {i + 1}",
+            order_index=i,
+            document_type="CHAPTER",
+            content=text,
+        ))
+    test_db.add(Chapter(
+        id=str(uuid.uuid4()), manuscript_id=manuscript.id, title="Notes",
+        order_index=99, document_type="NOTES", content="Mara notes",
+    ))
+    characters = [
+        Entity(id=str(uuid.uuid4()), manuscript_id=manuscript.id, type="CHARACTER", name=name)
+        for name in ("Mara", "Tomas", "Elena")
+    ]
+    test_db.add_all(characters)
+    test_db.add(Relationship(
+        source_entity_id=characters[1].id, target_entity_id=characters[0].id, relationship_type="ALLIANCE",
+    ))
+    test_db.commit()
+    return manuscript
+
+
+def without_timestamps(value):
+    if isinstance(value, dict):
+        return {k: without_timestamps(v) for k, v in value.items() if k != "analyzed_at"}
+    if isinstance(value, list):
+        return [without_timestamps(v) for v in value]
+    return value
+
+
+def service_reports(db, manuscript_id, genre=None):
+    return {
+        "pov": POVConsistencyService(db).analyze_manuscript(manuscript_id),
+        "scene_purpose": ScenePurposeService(db).analyze_manuscript(manuscript_id, genre),
+        "relationships": RelationshipEvolutionService(db).analyze_all_relationships(manuscript_id),
+        "emotional_beats": EmotionalBeatService(db).analyze_manuscript(manuscript_id, genre),
+        "subplots": SubplotTrackerService(db).analyze_manuscript(manuscript_id),
+        "pacing": PacingOptimizerService(db).analyze_manuscript_pacing(manuscript_id, genre),
+    }
+
+
+class TestNarrativeAnalysisEngine:
+    """The one-pass engine reproduces each service's manuscript report"""
+
+    def test_matches_individual_services(self, test_db, book):
+        engine = NarrativeAnalysisEngine(processes=0)
+        reports = engine.analyze(test_db, book.id)
+
+        assert list(reports) == list(ANALYZERS)
+        assert without_timestamps(reports) == without_timestamps(service_reports(test_db, book.id))
+        assert reports["pov"]["chapters_analyzed"] == 5
+        assert reports["relationships"]["relationships_analyzed"] >= 1
+        assert reports["subplots"]["total_chapters"] == 6
+        assert reports["pacing"]["genre"] == "fantasy"
+
+    def test_process_pool_matches_inline(self, test_db, book):
+        inline = NarrativeAnalysisEngine(processes=0).analyze(test_db, book.id, "thriller")
+        engine = NarrativeAnalysisEngine(processes=1, chapters_per_task=2)
+        try:
+            pooled = engine.analyze(test_db, book.id, "thriller")
+        finally:
+            engine.shutdown()
+        assert without_timestamps(pooled) == without_timestamps(inline)
+
+    def test_selected_analyzers_only(self, test_db, book):
+        reports = NarrativeAnalysisEngine(processes=0).analyze(test_db, book.id, analyzers=["pacing", "pov"])
+        assert list(reports) == ["pacing", "pov"]
+        with pytest.raises(ValueError):
+            NarrativeAnalysisEngine(processes=0).analyze(test_db, book.id, analyzers=["astrology"])
+
+    def test_missing_manuscript_errors_like_services(self, test_db):
+        reports = NarrativeAnalysisEngine(processes=0).analyze(test_db, "missing")
+        assert without_timestamps(reports) == without_timestamps(service_reports(test_db, "missing"))
+        assert reports["scene_purpose"] == {"error": "Manuscript not found"}
+        assert reports["pov"] == {"error": "No chapters found"}
+
+
+def recording_engine(monkeypatch, store=None):
+    """Inline engine that records (chapter titles, analyzers) of every map call"""
+    engine = NarrativeAnalysisEngine(processes=0, store=store or ChapterAnalysisStore())
+    calls = []
+    original = engine._map
+
+    def record(chapters, context):
+        calls.append(([chapter.title for chapter in chapters], context.analyzers))
+        return original(chapters, context)
+
+    monkeypatch.setattr(engine, "_map", record)
+    return engine, calls
+
+
+class TestChapterAnalysisCache:
+    """Stored per-chapter partials: only changed chapters are re-analyzed"""
+
+    def test_unchanged_manuscript_reuses_every_chapter(self, test_db, book, monkeypatch):
+        engine, calls = recording_engine(monkeypatch)
+        first = engine.analyze(test_db, book.id)
+        second = engine.analyze(test_db, book.id)
+
+        assert len(calls) == 1
+        assert len(calls[0][0]) == 5
+        assert without_timestamps(second) == without_timestamps(first)
+        assert test_db.query(ChapterAnalysisCache).count() == 5 * len(ANALYZERS)
+        assert engine.store.get_stats()["hits"] == 5 * len(ANALYZERS)
+
+    def test_edited_chapter_is_the_only_one_reanalyzed(self, test_db, book, monkeypatch):
+        engine, calls = recording_engine(monkeypatch)
+        engine.analyze(test_db, book.id)
+
+        chapter = test_db.query(Chapter).filter(
+            Chapter.manuscript_id == book.id, Chapter.title == "Chapter 2"
+        ).one()
+        chapter.content += " Tomas laughed, and the fear was gone."
+        test_db.commit()
+
+        reports = engine.analyze(test_db, book.id)
+        assert calls[-1] == (["Chapter 2"], tuple(ANALYZERS))
+        assert without_timestamps(reports) == without_timestamps(service_reports(test_db, book.id))
+
+    def test_character_changes_only_invalidate_analyzers_that_read_them(self, test_db, book, monkeypatch):
+        engine, calls = recording_engine(monkeypatch)
+        engine.analyze(test_db, book.id)
+
+        test_db.add(Entity(id=str(uuid.uuid4()), manuscript_id=book.id, type="CHARACTER", name="Ivo"))
+        test_db.commit()
+
+        reports = engine.analyze(test_db, book.id)
+        assert len(calls[-1][0]) == 5
+        # New character pairs too; text-only analyzers are reused
+        assert set(calls[-1][1]) == {"pov", "subplots", "relationships"}
+        assert without_timestamps(reports) == without_timestamps(service_reports(test_db, book.id))
+
+    def test_analyzer_version_bump_recomputes(self, test_db, book, monkeypatch):
+        engine, calls = recording_engine(monkeypatch)
+        engine.analyze(test_db, book.id, analyzers=["pacing"])
+
+        monkeypatch.setitem(ANALYZERS, "pacing", replace(ANALYZERS["pacing"], version=2))
+        engine.analyze(test_db, book.id, analyzers=["pacing"])
+        engine.analyze(test_db, book.id, analyzers=["pacing"])
+
+        assert len(calls) == 2
+        versions = {row.analyzer_version for row in test_db.query(ChapterAnalysisCache)}
+        assert versions == {2}
+
+    def test_deleted_chapter_drops_its_results(self, test_db, book, monkeypatch):
+        engine, _ = recording_engine(monkeypatch)
+        engine.analyze(test_db, book.id, analyzers=["pacing"])
+
+        chapter = test_db.query(Chapter).filter(
+            Chapter.manuscript_id == book.id, Chapter.title == "Chapter 1"
+        ).one()
+        chapter_id = chapter.id
+        test_db.delete(chapter)
+        test_db.commit()
+
+        assert test_db.query(ChapterAnalysisCache).filter(ChapterAnalysisCache.chapter_id == chapter_id).count() == 0
+        assert test_db.query(ChapterAnalysisCache).count() == 4
+
+    def test_store_disabled_analyzes_every_time(self, test_db, book):
+        engine = NarrativeAnalysisEngine(processes=0, store=None)
+        engine.analyze(test_db, book.id)
+        engine.analyze(test_db, book.id)
+        assert test_db.query(ChapterAnalysisCache).count() == 0
+
+    def test_store_write_leaves_commit_to_the_caller(self, test_db, book):
+        store = ChapterAnalysisStore()
+        chapter = test_db.query(Chapter).filter(Chapter.manuscript_id == book.id).first()
+        test_db.add(Manuscript(id="draft", title="Draft"))
+        test_db.flush()
+
+        assert store.put_many(test_db, book.id, [(chapter.id, "pacing", 1, "hash", {})])
+        test_db.rollback()
+
+        assert test_db.query(ChapterAnalysisCache).count() == 0
+        assert test_db.query(Manuscript).filter(Manuscript.id == "draft").count() == 0
+
+    def test_failed_store_write_keeps_the_callers_changes(self, test_db, book, monkeypatch):
+        store = ChapterAnalysisStore()
+        chapter = test_db.query(Chapter).filter(Chapter.manuscript_id == book.id).first()
+        test_db.add(Manuscript(id="draft", title="Draft"))
+        test_db.flush()
+
+        upsert = store._upsert
+
+        def upsert_then_fail(db, rows):
+            upsert(db, rows)
+            raise RuntimeError("disk full")
+
+        monkeypatch.setattr(store, "_upsert", upsert_then_fail)
+        assert not store.put_many(test_db, book.id, [(chapter.id, "pacing", 1, "hash", {})])
+        test_db.commit()
+
+        assert store.get_stats()["write_errors"] == 1
+        assert test_db.query(ChapterAnalysisCache).count() == 0
+        assert test_db.query(Manuscript).filter(Manuscript.id == "draft").count() == 1
+
+
+class TestManuscriptRoutesUseEngine:
+    """POST /analysis/*/manuscript share the engine's stored chapter results"""
+
+    def test_pacing_then_dashboard_reuse_chapters(self, client, test_db, book, monkeypatch):
+        engine, calls = recording_engine(monkeypatch)
+        monkeypatch.setattr("app.api.routes.analysis.analysis_engine", engine)
+
+        response = client.post("/analysis/pacing/manuscript", json={"manuscript_id": book.id})
+        assert response.status_code == 200
+        assert "suggestions" in response.json()
+        assert calls[-1][1] == ("pacing",)
+
+        response = client.post("/analysis/dashboard/issues", json={"manuscript_id": book.id})
+        assert response.status_code == 200
+        assert "pacing" not in calls[-1][1]
+
+        calls.clear()
+        for path in ("pov", "scene-purpose", "relationships", "emotional-beats", "subplots", "pacing"):
+            response = client.post(f"/analysis/{path}/manuscript", json={"manuscript_id": book.id})
+            assert response.status_code == 200, path
+        assert calls == []
+
+
+class TestCompleteManuscriptRoute:
+    """POST /analysis/complete-manuscript"""
+
+    def test_summary_from_single_pass(self, client, book, monkeypatch):
+        monkeypatch.setattr("app.api.routes.analysis.analysis_engine", NarrativeAnalysisEngine(processes=0))
+        response = client.post("/analysis/complete-manuscript", json={"manuscript_id": book.id})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert set(data["analyses"]) == {
+            "pov", "scene_purpose", "relationships", "emotional_beats", "subplots", "pacing",
+        }
+        assert data["analyses"]["pacing"]["avg_chapter_length"] > 0
+        assert data["overall_health"] in {"excellent", "good", "fair", "needs_work", "significant_issues"}
@@ -0,0 +1,200 @@
+"""
+Tests for the persisted dialogue index and batched voice analysis.
+"""
+
+import uuid
+
+import pytest
+
+from app.models.dialogue_index import DialogueIndexChapter, DialogueSpan
+from app.models.entity import Entity
+from app.models.manuscript import Manuscript, Chapter
+from app.models.voice_profile import CharacterVoiceProfile
+from app.services.dialogue_index import DialogueExtractor, DialogueIndex, Speaker, name_variants
+from app.services.voice_analysis_service import DialogueSample, VoiceAnalysisService
+
+CHAPTER_TEXTS = [
+    '"We ought to leave before the tide turns," Mara said. "Yeah, gonna be dark soon," Tomas replied. '
+    'Mara frowned, "Therefore we should certainly hurry."',
+    '"Hey, that is totally awesome stuff!" Tomas shouted. Elena Vance whispered, "Perhaps we are being followed."',
+    '"Indeed, it is precisely as I feared," Mara said. "Nope, no way," Tomas laughed.',
+]
+
+
+@pytest.fixture
+def cast(test_db):
+    manuscript = Manuscript(id=str(uuid.uuid4()), title="Tides", word_count=0)
+    test_db.add(manuscript)
+    chapters = [
+        Chapter(
+            id=str(uuid.uuid4()), manuscript_id=manuscript.id, title=f"Chapter {i + 1}",
+            order_index=i, document_type="CHAPTER", content=text,
+        )
+        for i, text in enumerate(CHAPTER_TEXTS)
+    ]
+    test_db.add_all(chapters)
+    characters = {
+        name: Entity(id=str(uuid.uuid4()), manuscript_id=manuscript.id, type="CHARACTER", name=name, aliases=aliases)
+        for name, aliases in (("Mara", []), ("Tomas", ["Tom"]), ("Elena Vance", []))
+    }
+    test_db.add_all(characters.values())
+    test_db.commit()
+    return manuscript, chapters, characters
+
+
+class TestDialogueExtractor:
+    """One pass attributes every speaker's dialogue"""
+
+    def test_name_variants(self):
+        assert name_variants("Elena Vance", ["Lena", "", None, "lena"]) == ("elena vance", "lena", "elena")
+
+    def test_attributes_each_quote_to_its_speaker(self):
+        extractor = DialogueExtractor([
+            Speaker("m", ("mara",)), Speaker("t", ("tomas", "tom")), Speaker("e", ("elena vance", "elena")),
+        ])
+        found = [(speaker_id, sample.text) for speaker_id, sample in extractor.extract(CHAPTER_TEXTS[0], "c1")]
+        assert found == [
+            ("m", "We ought to leave before the tide turns,"),
+            ("t", "Yeah, gonna be dark soon,"),
+            ("m", "Therefore we should certainly hurry."),
+        ]
+
+    def test_longest_name_wins_and_shared_names_attribute_to_all(self):
+        extractor = DialogueExtractor([
+            Speaker("js", ("john smith",)), Speaker("j1", ("john",)), Speaker("j2", ("john",)),
+        ])
+        text = '"I have the ledger," John Smith said. "Where is it hidden?" John asked.'
+        found = [(speaker_id, sample.text) for speaker_id, sample in extractor.extract(text, "c")]
+        assert found == [
+            ("js", "I have the ledger,"),
+            ("j1", "Where is it hidden?"),
+            ("j2", "Where is it hidden?"),
+        ]
+
+    def test_single_speaker_extraction_is_unchanged(self):
+        samples = VoiceAnalysisService(None)._extract_attributed_dialogue(CHAPTER_TEXTS[1], "c2", ["tomas"])
+        assert [(s.text, s.start_offset) for s in samples] == [("Hey, that is totally awesome stuff!", 0)]
+        assert samples[0].context.startswith('"Hey')
+
+
+class TestDialogueIndex:
+    """Spans are persisted and only stale chapters are re-scanned"""
+
+    def test_samples_by_speaker_in_chapter_order(self, test_db, cast):
+        manuscript, chapters, characters = cast
+        index = DialogueIndex()
+        samples = index.samples(test_db, manuscript.id)
+
+        mara = samples[characters["Mara"].id]
+        assert [s.chapter_id for s in mara] == [chapters[0].id, chapters[0].id, chapters[2].id]
+        assert samples[characters["Elena Vance"].id][0].text == "Perhaps we are being followed."
+        assert test_db.query(DialogueIndexChapter).count() == 3
+        assert index.get_stats()["chapters_indexed"] == 3
+
+    def test_only_changed_chapters_are_reindexed(self, test_db, cast):
+        manuscript, chapters, characters = cast
+        index = DialogueIndex()
+        index.samples(test_db, manuscript.id)
+
+        chapters[1].content = '"Fine, I will stay right here," Tom said.'
+        test_db.commit()
+        samples = index.samples(test_db, manuscript.id, [characters["Tomas"].id])
+
+        assert [s.text for s in samples[characters["Tomas"].id]] == [
+            "Yeah, gonna be dark soon,", "Fine, I will stay right here,", "Nope, no way,",
+        ]
+        assert index.get_stats() == {"chapters_indexed": 4, "chapters_reused": 2, "write_errors": 0}
+
+    def test_new_character_reindexes_everything(self, test_db, cast):
+        manuscript, chapters, _ = cast
+        index = DialogueIndex()
+        index.samples(test_db, manuscript.id)
+        test_db.add(Entity(manuscript_id=manuscript.id, type="CHARACTER", name="Elena", aliases=[]))
+        test_db.commit()
+
+        index.samples(test_db, manuscript.id)
+        assert index.get_stats()["chapters_indexed"] == 6
+
+    def test_deleted_and_retyped_chapters_drop_their_spans(self, test_db, cast):
+        manuscript, chapters, _ = cast
+        index = DialogueIndex()
+        index.samples(test_db, manuscript.id)
+
+        test_db.delete(chapters[0])
+        chapters[1].document_type = "NOTES"
+        test_db.commit()
+        index.samples(test_db, manuscript.id)
+
+        assert {span.chapter_id for span in test_db.query(DialogueSpan)} == {chapters[2].id}
+
+    def test_failed_write_falls_back_to_extraction(self, test_db, cast, monkeypatch):
+        manuscript, _, characters = cast
+        index = DialogueIndex()
+        monkeypatch.setattr(test_db, "commit", lambda: (_ for _ in ()).throw(RuntimeError("locked")))
+
+        samples = index.samples(test_db, manuscript.id, [characters["Mara"].id])
+        assert len(samples[characters["Mara"].id]) == 3
+        assert list(samples) == [characters["Mara"].id]
+        assert index.get_stats()["write_errors"] == 1
+
+    def test_chapter_save_reindexes_chapter(self, client, test_db, cast):
+        manuscript, chapters, characters = cast
+        response = client.put(
+            f"/api/chapters/{chapters[0].id}",
+            json={"content": '"Not another step, not one more," Mara warned.'},
+        )
+        assert response.status_code == 200
+
+        spans = test_db.query(DialogueSpan).filter(DialogueSpan.chapter_id == chapters[0].id).all()
+        assert [(span.character_id, span.text) for span in spans] == [
+            (characters["Mara"].id, "Not another step, not one more,"),
+        ]
+
+
+class TestBatchedVoiceAnalysis:
+    """Voice features read the index and compute metrics for all speakers at once"""
+
+    def test_batch_metrics_match_single_speaker_metrics(self):
+        service = VoiceAnalysisService(None)
+        groups = {
+            "a": [DialogueSample("Yeah, gonna be fine. Right?", "c", 0, 1), DialogueSample("Wow! Awesome stuff.", "c", 2, 3)],
+            "b": [DialogueSample("Therefore, we must certainly proceed. Indeed.", "c", 0, 1)],
+            "c": [DialogueSample("...", "c", 0, 1)],
+            "d": [],
+        }
+        batch = service.compute_voice_metrics_batch(groups)
+        for key, samples in groups.items():
+            single = service.compute_voice_metrics(samples)
+            assert batch[key].to_dict() == single.to_dict()
+        assert batch["b"].formality_score > batch["a"].formality_score
+        assert batch["c"].total_words == 0 and batch["c"].dialogue_samples == 1
+
+    def test_profiles_built_together(self, test_db, cast):
+        manuscript, _, characters = cast
+        service = VoiceAnalysisService(test_db)
+        ids = [character.id for character in characters.values()]
+
+        profiles = service.build_voice_profiles(manuscript.id, ids)
+        assert profiles[characters["Tomas"].id].profile_data["dialogue_samples"] == 3
+        assert test_db.query(CharacterVoiceProfile).count() == 3
+        # Existing profiles are reused unless rebuilt
+        assert service.build_voice_profile(manuscript.id, characters["Mara"].id) is profiles[characters["Mara"].id]
+
+        summary = service.get_manuscript_voice_summary(manuscript.id)
+        assert summary["characters_with_profiles"] == 3
+
+    def test_inconsistencies_and_comparison(self, test_db, cast):
+        manuscript, _, characters = cast
+        service = VoiceAnalysisService(test_db)
+        tomas = characters["Tomas"].id
+        profile = service.build_voice_profile(manuscript.id, tomas)
+        profile.confidence_score = 1.0
+        profile.profile_data = {**profile.profile_data, "formality_score": 1.0}
+        test_db.commit()
+
+        issues = service.detect_all_inconsistencies(manuscript.id)
+        assert {issue.character_id for issue in issues} == {tomas}
+        assert {issue.inconsistency_type for issue in issues} == {"FORMALITY"}
+
+        comparison = service.compare_voices(manuscript.id, characters["Mara"].id, tomas)
+        assert comparison.comparison_data["character_b_name"] == "Tomas"
@@ -0,0 +1,178 @@
+"""
+Tests for the content-addressed export cache.
+"""
+
+import os
+import uuid
+
+import pytest
+
+from app.models.manuscript import Manuscript, Chapter
+from app.services.export_cache import ExportCache, export_cache, export_cache_key
+from app.services.export_workers import ExportWorkerPool
+
+
+@pytest.fixture
+def book(test_db):
+    manuscript = Manuscript(id=str(uuid.uuid4()), title="Cached Book", author="A. Writer", word_count=0)
+    test_db.add(manuscript)
+    chapters = [
+        Chapter(
+            id=str(uuid.uuid4()),
+            manuscript_id=manuscript.id,
+            title=f"Chapter {i + 1}",
+            is_folder=0,
+            order_index=i,
+            content=f"Body of chapter {i + 1}.",
+        )
+        for i in range(3)
+    ]
+    test_db.add_all(chapters)
+    test_db.commit()
+    test_db.close = lambda: None
+    return manuscript, chapters
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    """The singleton cache (chapter write listeners use it) pointed at a temp dir"""
+    monkeypatch.setattr(export_cache, "directory", tmp_path / "exports")
+    return export_cache
+
+
+def rendered(tmp_path, data=b"rendered"):
+    path = tmp_path / f"render-{uuid.uuid4().hex}"
+    path.write_bytes(data)
+    return str(path)
+
+
+class TestExportCacheKey:
+    """Fingerprinting the manuscript state"""
+
+    def test_stable_while_unchanged(self, test_db, book):
+        manuscript, _ = book
+        first = export_cache_key(test_db, manuscript.id, "docx")
+        second = export_cache_key(test_db, manuscript.id, "docx")
+        assert first.filename == second.filename
+        assert first.chapters == 3
+        assert first.title == "Cached Book"
+
+    def test_changes_with_content_and_options(self, test_db, book):
+        manuscript, chapters = book
+        before = export_cache_key(test_db, manuscript.id, "docx")
+        selected = export_cache_key(test_db, manuscript.id, "docx", [chapters[0].id])
+        assert selected.options_hash != before.options_hash
+
+        chapters[1].content = "Rewritten, and longer than before."
+        test_db.commit()
+        after = export_cache_key(test_db, manuscript.id, "docx")
+        assert after.options_hash == before.options_hash
+        assert after.fingerprint != before.fingerprint
+
+    def test_missing_manuscript(self, test_db):
+        with pytest.raises(ValueError):
+            export_cache_key(test_db, "missing", "pdf")
+
+
+class TestExportCache:
+    """Storage, replacement, invalidation and eviction"""
+
+    def test_put_then_get(self, test_db, book, cache, tmp_path):
+        manuscript, _ = book
+        key = export_cache_key(test_db, manuscript.id, "pdf")
+        assert cache.get(key) is None
+
+        source = rendered(tmp_path)
+        path = cache.put(key, source)
+        assert cache.get(key) == path
+        assert path.read_bytes() == b"rendered"
+        assert cache.status([key])["pdf"]["cached"] is True
+
+    def test_new_render_replaces_stale_one(self, test_db, book, cache, tmp_path):
+        manuscript, chapters = book
+        old_key = export_cache_key(test_db, manuscript.id, "pdf")
+        old_path = cache.put(old_key, rendered(tmp_path))
+        old_key.fingerprint = "0" * 32  # As if a chapter changed without an ORM event
+        new_path = cache.put(old_key, rendered(tmp_path))
+        assert not old_path.exists()
+        assert new_path.exists()
+
+    def test_chapter_write_invalidates_manuscript(self, test_db, book, cache, tmp_path):
+        manuscript, chapters = book
+        key = export_cache_key(test_db, manuscript.id, "docx")
+        cache.put(key, rendered(tmp_path))
+
+        chapters[0].title = "Renamed"
+        test_db.commit()
+        assert cache.get(key) is None
+        assert not (cache.directory / manuscript.id).exists()
+
+    def test_unsafe_manuscript_id_is_not_cached(self, test_db, book, cache, tmp_path):
+        manuscript, _ = book
+        key = export_cache_key(test_db, manuscript.id, "docx")
+        key.manuscript_id = "../escape"
+        source = rendered(tmp_path)
+        assert cache.put(key, source) is None
+        assert cache.get(key) is None
+
+    def test_evicts_least_recently_used(self, test_db, book, tmp_path):
+        manuscript, chapters = book
+        cache = ExportCache(tmp_path / "small", max_bytes=150)
+        docx_key = export_cache_key(test_db, manuscript.id, "docx")
+        pdf_key = export_cache_key(test_db, manuscript.id, "pdf")
+        docx_path = cache.put(docx_key, rendered(tmp_path, b"d" * 100))
+        os.utime(docx_path, (1, 1))
+        cache.put(pdf_key, rendered(tmp_path, b"p" * 100))
+
+        assert cache.get(docx_key) is None
+        assert cache.get(pdf_key) is not None
+        assert cache.get_stats()["evictions"] == 1
+
+
+class TestExportCacheRoutes:
+    """Export downloads served from the cache"""
+
+    @pytest.fixture(autouse=True)
+    def use_test_pool(self, test_db, cache, monkeypatch):
+        pool = ExportWorkerPool(processes=0, session_factory=lambda: test_db)
+        monkeypatch.setattr("app.api.routes.export.export_pool", pool)
+        yield
+        pool.shutdown()
+
+    def test_second_export_is_a_cache_hit(self, client, book):
+        manuscript, _ = book
+        first = client.post(f"/api/export/pdf/{manuscript.id}", json={})
+        second = client.post(f"/api/export/pdf/{manuscript.id}", json={})
+
+        assert first.headers["x-export-cache"] == "miss"
+        assert second.headers["x-export-cache"] == "hit"
+        assert second.content == first.content
+        assert "Cached_Book.pdf" in second.headers["content-disposition"]
+
+    def test_chapter_update_forces_rerender(self, client, book):
+        manuscript, chapters = book
+        client.post(f"/api/export/docx/{manuscript.id}", json={})
+        response = client.put(f"/api/chapters/{chapters[0].id}", json={"content": "A new opening."})
+        assert response.status_code == 200
+
+        again = client.post(f"/api/export/docx/{manuscript.id}", json={})
+        assert again.headers["x-export-cache"] == "miss"
+
+    def test_preview_reports_cache_status(self, client, book):
+        manuscript, _ = book
+        client.post(f"/api/export/docx/{manuscript.id}", json={})
+
+        status = client.get(f"/api/export/preview/{manuscript.id}").json()["data"]["export_cache"]
+        assert status["docx"]["cached"] is True
+        assert status["docx"]["size"] > 0
+        assert status["pdf"]["cached"] is False
+
+    def test_export_job_completes_from_cache(self, client, book):
+        manuscript, _ = book
+        client.post(f"/api/export/pdf/{manuscript.id}", json={})
+
+        response = client.post("/api/export/jobs", json={"manuscript_id": manuscript.id, "format": "pdf"})
+        assert response.json()["cached"] is True
+        task_id = response.json()["task_id"]
+        assert client.get(f"/api/export/jobs/{task_id}").json()["status"] == "completed"
+        assert client.get(f"/api/export/jobs/{task_id}/download").content[:4] == b"%PDF"
@@ -0,0 +1,219 @@
+"""
+Tests for the streaming export engine and the export job API.
+"""
+
+import io
+import json
+import uuid
+
+import pytest
+from docx import Document
+
+from app.models.manuscript import Manuscript, Chapter
+from app.services.export_workers import (
+    ExportManuscript,
+    ExportWorkerPool,
+    _FlowableStream,
+    _CHAPTER_END,
+    load_export_data,
+    write_docx,
+    write_pdf,
+)
+from app.services.lexical_utils import FORMAT_BOLD
+
+
+def lexical(*paragraphs):
+    """Lexical state with one paragraph per (text, format) list"""
+    return json.dumps({"root": {"type": "root", "children": [
+        {"type": "paragraph", "children": [
+            {"type": "text", "text": text, "format": fmt} for text, fmt in runs
+        ]}
+        for runs in paragraphs
+    ]}})
+
+
+class ChapterRow:
+    def __init__(self, title, lexical_state="", content=""):
+        self.id = str(uuid.uuid4())
+        self.title = title
+        self.lexical_state = lexical_state
+        self.content = content
+
+
+@pytest.fixture
+def book(test_db):
+    manuscript = Manuscript(id=str(uuid.uuid4()), title="Long Book", author="A. Writer", word_count=0)
+    other = Manuscript(id=str(uuid.uuid4()), title="Other", word_count=0)
+    test_db.add_all([manuscript, other])
+    chapters = []
+    for i in range(5):
+        chapter = Chapter(
+            id=str(uuid.uuid4()),
+            manuscript_id=manuscript.id,
+            title=f"Chapter {i + 1}",
+            is_folder=0,
+            order_index=i,
+            lexical_state=lexical([(f"Body of chapter {i + 1}. ", 0), ("Bold", FORMAT_BOLD)]),
+            content=f"Body of chapter {i + 1}. Bold",
+        )
+        chapters.append(chapter)
+    foreign = Chapter(id=str(uuid.uuid4()), manuscript_id=other.id, title="Foreign", order_index=0)
+    test_db.add_all(chapters + [foreign])
+    test_db.commit()
+    test_db.close = lambda: None
+    return manuscript, chapters, foreign
+
+
+@pytest.fixture
+def pool(test_db):
+    pool = ExportWorkerPool(processes=0, session_factory=lambda: test_db)
+    yield pool
+    pool.shutdown()
+
+
+class TestLoadExportData:
+    """One ordered batch query"""
+
+    def test_selected_chapters_keep_requested_order(self, test_db, book):
+        manuscript, chapters, foreign = book
+        ids = [chapters[3].id, chapters[0].id, foreign.id]
+
+        _, rows = load_export_data(test_db, manuscript.id, ids)
+
+        assert [row.title for row in rows] == ["Chapter 4", "Chapter 1"]
+
+    def test_all_chapters_in_order(self, test_db, book):
+        manuscript, _, _ = book
+        info, rows = load_export_data(test_db, manuscript.id)
+        assert info.title == "Long Book"
+        assert [row.title for row in rows] == [f"Chapter {i}" for i in range(1, 6)]
+
+    def test_missing_manuscript(self, test_db):
+        with pytest.raises(ValueError, match="not found"):
+            load_export_data(test_db, "missing")
+
+
+class TestStreamingDocx:
+    """Document-level styles instead of per-run fonts"""
+
+    def test_styles_and_runs(self):
+        chapters = [
+            ChapterRow("One", lexical([("Plain ", 0), ("bold & <odd>", FORMAT_BOLD)])),
+            ChapterRow("Two", content="First line\nSecond line"),
+        ]
+        buffer = io.BytesIO()
+        progress = []
+
+        write_docx(buffer, ExportManuscript("m", "Title", "Author"), chapters, lambda d, t: progress.append((d, t)))
+        doc = Document(io.BytesIO(buffer.getvalue()))
+
+        normal = doc.styles["Normal"]
+        assert normal.font.name == "Times New Roman"
+        assert normal.font.size.pt == 12
+        assert normal.paragraph_format.first_line_indent.inches == 0.5
+        assert doc.core_properties.title == "Title"
+
+        texts = [(p.style.name, p.text) for p in doc.paragraphs if p.text]
+        assert texts[:3] == [("Title", "Title"), ("Author", "by Author"), ("Heading 1", "One")]
+        assert ("Normal", "Plain bold & <odd>") in texts
+        assert ("Normal", "Second line") in texts
+
+        bold_run = next(r for p in doc.paragraphs for r in p.runs if r.text == "bold & <odd>")
+        assert bold_run.bold is True
+        assert bold_run.font.name is None  # Font comes from the style
+        assert progress == [(1, 2), (2, 2)]
+        assert doc.sections[0].left_margin.inches == 1
+
+
+class TestStreamingPdf:
+    """Flowables are generated a chapter at a time"""
+
+    def test_flowable_stream_refills_per_chapter(self):
+        stream = _FlowableStream(iter(["a", "b", _CHAPTER_END, "c", _CHAPTER_END]))
+        assert len(stream) == 2
+        del stream[:2]
+        assert len(stream) == 1
+        del stream[0]
+        assert len(stream) == 0
+
+    def test_pdf_renders_all_chapters(self):
+        chapters = [ChapterRow(f"Chapter {i}", content="Words " * 400) for i in range(20)]
+        buffer = io.BytesIO()
+        progress = []
+
+        write_pdf(buffer, ExportManuscript("m", "Title", None), chapters, lambda d, t: progress.append(d))
+
+        assert buffer.getvalue()[:4] == b"%PDF"
+        assert progress == list(range(1, 21))
+
+
+class TestExportWorkerPool:
+    """Rendering to a temp file off the event loop"""
+
+    @pytest.mark.asyncio
+    async def test_render_to_temp_file(self, pool, book):
+        manuscript, _, _ = book
+        progress = []
+
+        export_file = await pool.render("docx", manuscript.id, progress=lambda d, t: progress.append((d, t)))
+        try:
+            doc = Document(export_file.path)
+            assert export_file.chapters == 5
+            assert export_file.filename == "Long_Book.docx"
+            assert [p.text for p in doc.paragraphs if p.style.name == "Heading 1"][0] == "Chapter 1"
+            assert progress[-1] == (5, 5)
+        finally:
+            export_file.remove()
+
+    @pytest.mark.asyncio
+    async def test_unknown_manuscript_leaves_no_file(self, pool, tmp_path, monkeypatch):
+        monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+        with pytest.raises(ValueError, match="not found"):
+            await pool.render("pdf", "missing")
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestExportRoutes:
+    """Streaming export responses and the export job API"""
+
+    @pytest.fixture(autouse=True)
+    def use_test_pool(self, pool, monkeypatch, tmp_path):
+        monkeypatch.setattr("app.api.routes.export.export_pool", pool)
+        monkeypatch.setattr("app.services.export_cache.export_cache.directory", tmp_path)
+
+    def test_docx_download_streams_file(self, client, book):
+        manuscript, _, _ = book
+        response = client.post(f"/api/export/docx/{manuscript.id}", json={})
+
+        assert response.status_code == 200
+        assert "Long_Book.docx" in response.headers["content-disposition"]
+        doc = Document(io.BytesIO(response.content))
+        assert any(p.text == "Chapter 5" for p in doc.paragraphs)
+
+    def test_pdf_missing_manuscript_is_404(self, client):
+        assert client.post("/api/export/pdf/missing", json={}).status_code == 404
+
+    def test_export_job_progress_and_download(self, client, book):
+        manuscript, chapters, _ = book
+        response = client.post("/api/export/jobs", json={
+            "manuscript_id": manuscript.id,
+            "format": "pdf",
+            "chapter_ids": [chapters[1].id, chapters[0].id],
+        })
+        assert response.status_code == 200
+        task_id = response.json()["task_id"]
+
+        status = client.get(f"/api/export/jobs/{task_id}").json()
+        assert status["status"] == "completed"
+        assert status["total_chapters"] == 2
+        assert status["progress_percent"] == 100.0
+
+        download = client.get(f"/api/export/jobs/{task_id}/download")
+        assert download.status_code == 200
+        assert download.content[:4] == b"%PDF"
+
+    def test_export_job_validation(self, client, book):
+        manuscript, _, _ = book
+        assert client.post("/api/export/jobs", json={"manuscript_id": manuscript.id, "format": "rtf"}).status_code == 400
+        assert client.post("/api/export/jobs", json={"manuscript_id": "missing"}).status_code == 404
+        assert client.get("/api/export/jobs/missing").status_code == 404
@@ -0,0 +1,191 @@
+"""
+Tests for bulk setup/payoff matching in the foreshadowing detector.
+"""
+
+import uuid
+
+import numpy as np
+import pytest
+
+from app.models.manuscript import Manuscript, Chapter
+from app.services import foreshadowing_detector_service as detector_module
+from app.services.foreshadowing_detector_service import (
+    DetectedPayoff,
+    DetectedSetup,
+    ForeshadowingDetectorService,
+    SetupKeywordIndex,
+    SetupPayoffScorer,
+)
+
+WORDS = (
+    "the ancient sword hidden secret pistol prophecy fulfilled came true drew used fired "
+    "finally realized warning curse destiny river shadow blade oath heart"
+).split()
+
+
+def make_setup(chapter_id, start, text, setup_type="HINT", confidence=0.6, keywords=None):
+    return DetectedSetup(
+        text=text, chapter_id=chapter_id, chapter_title="", start_offset=start, end_offset=start + len(text),
+        setup_type=setup_type, confidence=confidence, context=text, keywords=keywords or [], suggestion="",
+    )
+
+
+def make_payoff(chapter_id, start, text, confidence=0.6):
+    return DetectedPayoff(
+        text=text, chapter_id=chapter_id, chapter_title="", start_offset=start, end_offset=start + len(text),
+        setup_reference="", confidence=confidence, context=text,
+    )
+
+
+def random_items(seed=3, setups=40, payoffs=50):
+    rng = np.random.default_rng(seed)
+
+    def text():
+        return " ".join(rng.choice(WORDS, size=int(rng.integers(2, 25))))
+
+    types = ["CHEKHOV_GUN", "PROPHECY", "SYMBOL", "HINT"]
+    return (
+        [make_setup(f"c{i % 5}", int(rng.integers(0, 300)), text(), types[i % 4], float(rng.choice([0.5, 0.7, 0.9])))
+         for i in range(setups)],
+        [make_payoff(f"c{i % 5}", int(rng.integers(0, 300)), text(), float(rng.choice([0.5, 0.8])))
+         for i in range(payoffs)],
+    )
+
+
+class TestSetupPayoffScorer:
+    """Bulk scores equal per-pair scoring"""
+
+    def test_scores_match_per_pair_scores(self, monkeypatch):
+        monkeypatch.setattr(detector_module, "_BLOCK_CELLS", 300)  # Several blocks
+        service = ForeshadowingDetectorService(None)
+        setups, payoffs = random_items()
+
+        matrix = SetupPayoffScorer(setups, payoffs).score_matrix()
+        expected = [[service._calculate_match_score(s, p) for p in payoffs] for s in setups]
+        assert matrix.tolist() == expected
+
+    def test_best_matches_match_per_pair_search(self):
+        service = ForeshadowingDetectorService(None)
+        setups, payoffs = random_items(seed=11)
+
+        expected = []
+        for i, setup in enumerate(setups):
+            best, best_score = None, 0.0
+            for j, payoff in enumerate(payoffs):
+                score = service._calculate_match_score(setup, payoff)
+                if score > best_score and score > 0.4:
+                    best, best_score = j, score
+            if best is not None:
+                expected.append((i, best, best_score))
+        assert SetupPayoffScorer(setups, payoffs).best_matches() == expected
+
+    def test_payoffs_only_match_earlier_setups(self):
+        setups = [
+            make_setup("c2", 10, "the silver pistol hidden in the drawer", "CHEKHOV_GUN"),
+            make_setup("c1", 50, "a silver pistol on the mantel", "CHEKHOV_GUN"),
+        ]
+        payoffs = [
+            make_payoff("c1", 10, "finally she drew the silver pistol"),
+            make_payoff("c1", 90, "finally she drew the silver pistol"),
+            make_payoff("c3", 0, "finally he used the pistol hidden in the drawer"),
+        ]
+        order = {"c1": 0, "c2": 1, "c3": 2}
+
+        unordered = SetupPayoffScorer(setups, payoffs).best_matches()
+        ordered = SetupPayoffScorer(setups, payoffs, order).best_matches()
+        assert [(s, p) for s, p, _ in unordered] == [(0, 2), (1, 0)]
+        assert [(s, p) for s, p, _ in ordered] == [(0, 2), (1, 1)]
+        assert SetupPayoffScorer(setups, payoffs, order).score_matrix()[0, :2].tolist() == [-1.0, -1.0]
+
+    def test_embedding_similarity_supplements_word_overlap(self):
+        setups = [make_setup("c1", 0, "the crown glittered", confidence=0.5)]
+        payoffs = [make_payoff("c2", 0, "a royal diadem shone", confidence=0.5)]
+        assert SetupPayoffScorer(setups, payoffs).best_matches() == []
+
+        embeddings = (np.array([[1.0, 0.0]]), np.array([[0.8, 0.6]]))
+        [(_, _, score)] = SetupPayoffScorer(setups, payoffs, embeddings=embeddings).best_matches()
+        assert score == pytest.approx(0.8 * 0.4 + 0.1)
+
+    def test_empty_inputs(self):
+        setups, payoffs = random_items(setups=3, payoffs=3)
+        assert SetupPayoffScorer([], payoffs).best_matches() == []
+        assert SetupPayoffScorer(setups, []).best_matches() == []
+        assert SetupPayoffScorer(setups, []).score_matrix().shape == (3, 0)
+
+
+class TestSetupKeywordIndex:
+    """Payoff candidates are checked against every prior setup at once"""
+
+    def test_overlaps_match_per_setup_overlap(self):
+        service = ForeshadowingDetectorService(None)
+        setups = [
+            make_setup("c1", 0, "x", keywords=["ancient", "hidden", "hidden"]),
+            make_setup("c1", 5, "x"),
+            make_setup("c1", 9, "x", keywords=["curse", "fate"]),
+        ]
+        index = SetupKeywordIndex()
+        index.add(setups)
+        context = "Finally the hidden curse of fate was undone"
+        words = {w.lower() for w in context.split()}
+
+        assert index.setups == [setups[0], setups[2]]
+        assert index.overlaps(words, "c2", 0).tolist() == [
+            service._calculate_keyword_overlap(setup.keywords, context) for setup in index.setups
+        ]
+        # Setups later in the payoff's own chapter aren't prior setups
+        assert index.overlaps(words, "c1", 9).tolist() == [2 / 3, 0.0]
+
+    def test_detect_payoffs_without_index(self):
+        class FakeChapter:
+            id = "c2"
+            title = "Two"
+            order_index = 1
+            content = "At last the ancient curse was broken, as the hidden oracle foretold."
+
+        setups = [make_setup("c1", 0, "the ancient curse", keywords=["ancient", "curse"])]
+        payoffs = ForeshadowingDetectorService(None)._detect_payoffs(FakeChapter(), setups)
+        assert [(p.text[:7], p.confidence, p.setup_reference) for p in payoffs] == [("At last", 1.0, "the ancient curse")]
+
+
+@pytest.fixture
+def foreshadowed_manuscript(test_db):
+    manuscript = Manuscript(id=str(uuid.uuid4()), title="Heirloom", word_count=0)
+    test_db.add(manuscript)
+    texts = [
+        "Finally the guards drew their blades and fired at the pistol.",
+        "She noticed the ancient pistol on the mantel, a hidden weapon.",
+        "Finally she realized the hidden ancient pistol was loaded, and fired it.",
+    ]
+    chapters = [
+        Chapter(
+            id=str(uuid.uuid4()), manuscript_id=manuscript.id, title=f"Chapter {i + 1}",
+            order_index=i, document_type="CHAPTER", content=text,
+        )
+        for i, text in enumerate(texts)
+    ]
+    test_db.add_all(chapters)
+    test_db.commit()
+    return manuscript, chapters
+
+
+class TestDetectForeshadowing:
+    """Manuscript detection pairs setups with later payoffs"""
+
+    def test_setups_pair_with_later_chapters(self, test_db, foreshadowed_manuscript):
+        manuscript, chapters = foreshadowed_manuscript
+        results = ForeshadowingDetectorService(test_db).detect_foreshadowing(manuscript.id, min_confidence=0.0)
+
+        assert results["matches"]
+        for match in results["matches"]:
+            assert match["setup"]["chapter_id"] == chapters[1].id
+            assert match["payoff"]["chapter_id"] == chapters[2].id
+        assert results["stats"]["embedding_similarity"] is False
+
+    def test_embeddings_fall_back_to_keywords(self, test_db, foreshadowed_manuscript, monkeypatch):
+        manuscript, _ = foreshadowed_manuscript
+        service = ForeshadowingDetectorService(test_db)
+        monkeypatch.setattr(service, "_embed", lambda setups, payoffs: None)
+
+        with_embeddings = service.detect_foreshadowing(manuscript.id, min_confidence=0.0, use_embeddings=True)
+        without = service.detect_foreshadowing(manuscript.id, min_confidence=0.0)
+        assert with_embeddings["matches"] == without["matches"]
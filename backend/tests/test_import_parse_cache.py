@@ -0,0 +1,111 @@
+"""
+Tests for the disk-backed import parse cache.
+"""
+
+import os
+import time
+
+import pytest
+
+from app.services.import_parse_cache import ImportParseCache, cache_key
+from app.services.import_service import ImportService
+
+BOOK = b"Chapter 1\n\nIt was a *dark* night.\n\nChapter 2\n\nThe rain fell."
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return tmp_path / "import_cache"
+
+
+class TestImportParseCache:
+    """Content addressing, round trips and LRU eviction"""
+
+    @pytest.mark.asyncio
+    async def test_round_trip(self, cache_dir):
+        service = ImportService(cache=ImportParseCache(cache_dir))
+        result = await service.parse_document(BOOK, "book.md", "pattern")
+
+        loaded = service.get_cached_result(result.parse_id)
+
+        assert loaded is not result
+        assert loaded.title == result.title
+        assert [c.title for c in loaded.chapters] == [c.title for c in result.chapters]
+        assert loaded.chapters[0].lexical_state == result.chapters[0].lexical_state
+        assert loaded.chapters[0].paragraphs == result.chapters[0].paragraphs
+
+    @pytest.mark.asyncio
+    async def test_parse_id_is_content_addressed(self, cache_dir):
+        service = ImportService(cache=ImportParseCache(cache_dir))
+
+        first = await service.parse_document(BOOK, "book.txt", "pattern")
+        again = await service.parse_document(BOOK, "book.txt", "pattern")
+        single = await service.parse_document(BOOK, "book.txt", "single")
+
+        assert first.parse_id == again.parse_id
+        assert first.parse_id != single.parse_id
+
+    @pytest.mark.asyncio
+    async def test_reupload_skips_parsing(self, cache_dir, tmp_path):
+        path = tmp_path / "book.txt"
+        path.write_bytes(BOOK)
+        service = ImportService(cache=ImportParseCache(cache_dir))
+        first = await service.parse_file(str(path), "book.txt", "pattern")
+
+        async def fail_parse(*args, **kwargs):
+            pytest.fail("cached file was parsed again")
+
+        service.pool.parse = fail_parse
+        try:
+            again = await service.parse_file(str(path), "book.txt", "pattern")
+        finally:
+            del service.pool.parse
+
+        assert again.parse_id == first.parse_id
+        assert again.total_words == first.total_words
+
+    @pytest.mark.asyncio
+    async def test_shared_between_workers(self, cache_dir):
+        """Preview on one worker, create on another"""
+        parser = ImportService(cache=ImportParseCache(cache_dir))
+        creator = ImportService(cache=ImportParseCache(cache_dir))
+        result = await parser.parse_document(BOOK, "book.txt", "pattern")
+
+        assert creator.get_cached_result(result.parse_id) is not None
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction_by_size(self, cache_dir):
+        cache = ImportParseCache(cache_dir)
+        service = ImportService(cache=cache)
+        results = []
+        for i in range(3):
+            content = BOOK + f"\n\nVersion {i}.".encode()
+            results.append(await service.parse_document(content, "book.txt", "pattern"))
+            # Distinct mtimes, oldest first
+            path = cache._path(results[-1].parse_id)
+            os.utime(path, (time.time() - 100 + i * 10,) * 2)
+
+        # Reading the oldest entry makes it most recently used
+        assert cache.get(results[0].parse_id) is not None
+        entry_size = max(cache._path(r.parse_id).stat().st_size for r in results)
+        cache.max_bytes = entry_size * 2
+        cache._evict()
+
+        assert cache.get(results[1].parse_id) is None
+        assert cache.get(results[0].parse_id) is not None
+        assert cache.get(results[2].parse_id) is not None
+        assert cache.get_stats()["evictions"] == 1
+
+    def test_rejects_non_hash_keys(self, cache_dir):
+        cache = ImportParseCache(cache_dir)
+        assert cache.get("../../etc/passwd") is None
+        assert cache.get("non-existent-id") is None
+
+    def test_unreadable_entry_is_dropped(self, cache_dir):
+        cache = ImportParseCache(cache_dir)
+        key = cache_key("abc", "auto")
+        cache_dir.mkdir(parents=True)
+        cache._path(key).write_bytes(b"not gzip")
+
+        assert cache.get(key) is None
+        assert not cache._path(key).exists()
@@ -16,13 +16,14 @@ from app.services.import_service import (
     ChapterBoundary,
     SUPPORTED_FORMATS,
 )
+from app.services.import_parse_cache import ImportParseCache
 from app.services.lexical_utils import TextRun, RichParagraph
 
 
 @pytest.fixture
-def service():
-    """Create a fresh import service instance."""
-    return ImportService()
+def service(tmp_path):
+    """Create a fresh import service instance with its own parse cache."""
+    return ImportService(cache=ImportParseCache(tmp_path / "import_cache"))
 
 
 class TestSupportedFormats:
@@ -358,6 +359,52 @@ class TestManuscriptCreation:
         # Just verify the call was made
         assert mock_db.add.called
 
+    @pytest.mark.asyncio
+    async def test_create_manuscript_bulk_inserts_chapters(self, service, test_db):
+        """Chapters are inserted in order with precomputed content and word counts."""
+        content = b"Chapter 1\n\nOne two three.\n\nChapter 2\n\nFour five.\n\nChapter 3\n\nSix."
+        result = await service.parse_document(content, "test.txt", "pattern")
+
+        manuscript = await service.create_manuscript_from_import(
+            db=test_db,
+            parse_id=result.parse_id,
+            chapter_adjustments=[{"index": 1, "included": False}],
+        )
+
+        from app.models.manuscript import Chapter
+        chapters = test_db.query(Chapter).filter_by(
+            manuscript_id=manuscript.id
+        ).order_by(Chapter.order_index).all()
+        assert [c.title for c in chapters] == ["Chapter 1", "Chapter 3"]
+        assert [c.order_index for c in chapters] == [0, 1]
+        assert chapters[0].word_count == 5
+        assert "One two three." in chapters[0].content
+        assert json.loads(chapters[0].lexical_state)["root"]["children"]
+        assert chapters[0].created_at is not None
+        assert manuscript.word_count == sum(c.word_count for c in chapters)
+
+    @pytest.mark.asyncio
+    async def test_run_import_followups(self, service, test_db):
+        """The follow-up job recomputes word counts and skips steps that don't apply."""
+        content = b"Chapter 1\n\nSome content here."
+        result = await service.parse_document(content, "test.txt", "single")
+        manuscript = await service.create_manuscript_from_import(db=test_db, parse_id=result.parse_id)
+        manuscript.word_count = 0
+        test_db.commit()
+        test_db.close = lambda: None
+
+        from app.services.import_task_registry import import_registry
+        task = import_registry.create_task("test", kind="followup")
+        with patch("app.services.import_service.FOLLOWUP_EMBEDDINGS", False):
+            summary = service.run_import_followups(
+                manuscript.id, task.id, session_factory=lambda: test_db
+            )
+
+        assert summary == {"word_count": 5, "embeddings": 0, "wiki_changes": 0}
+        assert import_registry.get_task(task.id).status == "completed"
+        test_db.refresh(manuscript)
+        assert manuscript.word_count == 5
+
     @pytest.mark.asyncio
     async def test_create_manuscript_expired_cache(self, service):
         """Test error when parse result has expired."""
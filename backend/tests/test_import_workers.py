@@ -0,0 +1,224 @@
+"""
+Tests for the import workers: streaming parsers, spooled uploads and the worker pool.
+"""
+
+import io
+
+import pytest
+
+from app.services.import_parse_cache import ImportParseCache
+from app.services.import_service import ImportService
+from app.services.import_workers import (
+    ImportWorkerPool,
+    parse_docx,
+    parse_path,
+    pdf_page_count,
+    spool_upload,
+)
+from app.services.import_task_registry import import_registry
+
+
+class FakeUpload:
+    """Minimal async UploadFile stand-in"""
+
+    def __init__(self, data: bytes):
+        self._buffer = io.BytesIO(data)
+
+    async def read(self, size: int = -1) -> bytes:
+        return self._buffer.read(size)
+
+
+def make_docx(path):
+    docx = pytest.importorskip("docx")
+    document = docx.Document()
+    document.core_properties.title = "Streamed Novel"
+    document.core_properties.author = "A. Writer"
+    document.add_heading("Chapter One", level=1)
+    paragraph = document.add_paragraph("It was a ")
+    paragraph.add_run("dark").bold = True
+    paragraph.add_run(" and ")
+    paragraph.add_run("stormy").italic = True
+    paragraph.add_run(" night.")
+    document.add_heading("Chapter Two", level=1)
+    document.add_paragraph("The rain fell.")
+    document.save(path)
+
+
+def make_pdf(path, pages):
+    fitz = pytest.importorskip("fitz")
+    document = fitz.open()
+    for text in pages:
+        page = document.new_page()
+        page.insert_text((72, 72), text)
+    document.save(path)
+    document.close()
+
+
+class TestStreamingDocx:
+    """The zip/iterparse DOCX parser"""
+
+    def test_paragraphs_styles_and_formatting(self, tmp_path):
+        path = tmp_path / "novel.docx"
+        make_docx(str(path))
+
+        parsed = parse_docx(str(path))
+
+        assert parsed.title == "Streamed Novel"
+        assert parsed.author == "A. Writer"
+        texts = [p.get_plain_text() for p in parsed.paragraphs]
+        assert texts == ["Chapter One", "It was a dark and stormy night.", "Chapter Two", "The rain fell."]
+        assert parsed.paragraphs[0].heading_level == 1
+        runs = {run.text: run for run in parsed.paragraphs[1].runs}
+        assert runs["dark"].bold
+        assert runs["stormy"].italic
+
+    def test_bytes_and_path_sources_match(self, tmp_path):
+        path = tmp_path / "novel.docx"
+        make_docx(str(path))
+
+        from_path = parse_docx(str(path))
+        from_bytes = parse_docx(path.read_bytes())
+
+        assert [p.get_plain_text() for p in from_path.paragraphs] == \
+            [p.get_plain_text() for p in from_bytes.paragraphs]
+
+    def test_rejects_non_docx(self):
+        with pytest.raises(ValueError):
+            parse_docx(b"not a zip")
+
+
+class TestWorkerPool:
+    """ImportWorkerPool dispatch (thread mode)"""
+
+    @pytest.mark.asyncio
+    async def test_pdf_page_ranges_merge_in_order(self, tmp_path):
+        path = tmp_path / "book.pdf"
+        make_pdf(str(path), [f"Page number {i}" for i in range(5)])
+        pool = ImportWorkerPool(processes=0, pdf_pages_per_task=2)
+        updates = []
+
+        try:
+            parsed = await pool.parse(str(path), ".pdf", progress=lambda done, total, stage: updates.append((done, total)))
+        finally:
+            pool.shutdown()
+
+        texts = [p.get_plain_text() for p in parsed.paragraphs]
+        whole = parse_path(str(path), ".pdf")
+        assert texts == [p.get_plain_text() for p in whole.paragraphs]
+        assert texts[0].startswith("Page number 0")
+        assert pdf_page_count(str(path)) == 5
+        assert updates[-1] == (5, 5)
+
+    @pytest.mark.asyncio
+    async def test_convert_chapters_in_batches_keeps_order(self):
+        from app.services.lexical_utils import RichParagraph, TextRun
+
+        specs = [
+            (i, f"Chapter {i}", [RichParagraph(runs=[TextRun(text=f"Body of chapter {i}.")])])
+            for i in range(7)
+        ]
+        pool = ImportWorkerPool(processes=0, chapters_per_task=2)
+        updates = []
+
+        try:
+            chapters = await pool.convert_chapters(specs, progress=lambda done, total, stage: updates.append(done))
+        finally:
+            pool.shutdown()
+
+        assert [c.title for c in chapters] == [f"Chapter {i}" for i in range(7)]
+        assert all(c.word_count == 4 for c in chapters)
+        assert updates[0] == 0 and updates[-1] == 7
+
+    @pytest.mark.asyncio
+    async def test_parse_file_builds_chapters(self, tmp_path):
+        path = tmp_path / "novel.docx"
+        make_docx(str(path))
+        service = ImportService(cache=ImportParseCache(tmp_path / "import_cache"))
+        service.pool = ImportWorkerPool(processes=0)
+
+        try:
+            result = await service.parse_file(str(path), "novel.docx", detection_mode="headings")
+        finally:
+            service.pool.shutdown()
+
+        assert [c.title for c in result.chapters] == ["Chapter One", "Chapter Two"]
+        assert service.get_cached_result(result.parse_id).chapters[1].title == "Chapter Two"
+
+
+class TestSpoolUpload:
+    """Chunked copy of uploads to disk"""
+
+    @pytest.mark.asyncio
+    async def test_spools_to_disk_with_hash(self):
+        import hashlib
+
+        data = b"x" * 3000
+        upload = await spool_upload(FakeUpload(data), suffix=".txt")
+        try:
+            with open(upload.path, "rb") as f:
+                assert f.read() == data
+            assert upload.size == 3000
+            assert upload.sha256 == hashlib.sha256(data).hexdigest()
+        finally:
+            upload.remove()
+
+    @pytest.mark.asyncio
+    async def test_rejects_empty_and_oversized(self):
+        with pytest.raises(ValueError, match="empty"):
+            await spool_upload(FakeUpload(b""))
+        with pytest.raises(ValueError, match="limit"):
+            await spool_upload(FakeUpload(b"x" * 100), max_bytes=10)
+
+
+class TestImportTaskRoutes:
+    """Background parse and task polling"""
+
+    def test_parse_async_completes_with_parse_id(self, client):
+        response = client.post(
+            "/api/import/parse-async",
+            files={"file": ("story.txt", b"Chapter 1\n\nOnce upon a time.", "text/plain")},
+        )
+        assert response.status_code == 200
+        task_id = response.json()["task_id"]
+
+        # TestClient runs background tasks before returning
+        status = client.get(f"/api/import/tasks/{task_id}").json()
+        assert status["status"] == "completed"
+        assert status["progress_percent"] == 100.0
+        preview = client.get(f"/api/import/preview/{status['parse_id']}")
+        assert preview.status_code == 200
+
+    def test_parse_async_rejects_unsupported_format(self, client):
+        response = client.post(
+            "/api/import/parse-async",
+            files={"file": ("story.exe", b"data", "application/octet-stream")},
+        )
+        assert response.status_code == 400
+
+    def test_create_enqueues_one_followup_job(self, client, monkeypatch):
+        from app.services.import_service import import_service
+
+        calls = []
+        monkeypatch.setattr(import_service, "run_import_followups", lambda *args: calls.append(args))
+        parsed = client.post(
+            "/api/import/parse",
+            files={"file": ("story.txt", b"Chapter 1\n\nOne.\n\nChapter 2\n\nTwo.", "text/plain")},
+            params={"detection_mode": "pattern"},
+        ).json()
+
+        response = client.post("/api/import/create", json={"parse_id": parsed["parse_id"]})
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["chapter_count"] == 2
+        assert calls == [(body["manuscript_id"], body["followup_task_id"])]
+
+    def test_unknown_task_is_404(self, client):
+        assert client.get("/api/import/tasks/missing").status_code == 404
+
+    def test_registry_progress_percent(self):
+        task = import_registry.create_task("book.pdf")
+        import_registry.update_progress(task.id, 5, 20, "Parsing pages")
+        assert import_registry.get_task(task.id).progress_percent == 25.0
+        import_registry.fail_task(task.id, "boom")
+        assert import_registry.get_task(task.id).status == "failed"
@@ -0,0 +1,401 @@
+"""
+Tests for the background job queue, the job API and the wiki scan registry.
+"""
+
+import asyncio
+import threading
+import time
+import uuid
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.api.routes import jobs as jobs_routes
+from app.models.job import Job, JobStatus
+from app.services.job_queue import JobHandler, JobManager
+from app.services.scan_task_registry import WIKI_SCAN_JOB, ScanTaskRegistry
+
+
+def wait_for(manager, job_id, statuses=JobStatus.FINISHED, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} still {manager.get(job_id)['status']}")
+
+
+class Gate:
+    """A handler that blocks until released, reporting progress meanwhile"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+
+    def __call__(self, ctx, **params):
+        self.started.set()
+        while not self.release.wait(0.01):
+            ctx.report(progress_percent=50.0, stage="Waiting")
+        return {"params": params}
+
+
+@pytest.fixture
+def session_factory(test_db):
+    return sessionmaker(autocommit=False, autoflush=False, bind=test_db.get_bind())
+
+
+@pytest.fixture
+def gate():
+    gate = Gate()
+    yield gate
+    gate.release.set()
+
+
+@pytest.fixture
+def manager(session_factory, gate):
+    def stream(ctx, count=3):
+        for i in range(count):
+            ctx.partial({"index": i})
+            ctx.report(progress_percent=(i + 1) / count * 100, stage=f"Part {i + 1}", parts=i + 1)
+        return {"parts": count}
+
+    def explode(ctx):
+        raise RuntimeError("boom")
+
+    async def remote(ctx, api_key, text):
+        await asyncio.sleep(0)
+        return {"key_length": len(api_key), "text": text}
+
+    handlers = {
+        "test.gate": JobHandler("test.gate", gate, dedup_params=("name",)),
+        "test.stream": JobHandler("test.stream", stream),
+        "test.explode": JobHandler("test.explode", explode),
+        "test.remote": JobHandler("test.remote", remote, secret_params=("api_key",)),
+    }
+    manager = JobManager(session_factory=session_factory, workers=2, max_per_user=1, handlers=handlers)
+    manager.start()
+    yield manager
+    gate.release.set()
+    manager.shutdown()
+
+
+class TestJobManager:
+    """Jobs run, report progress, and finish with their result"""
+
+    def test_job_runs_to_completion(self, manager):
+        job, created = manager.submit("test.stream", {"count": 3})
+        assert created
+
+        job = wait_for(manager, job["id"])
+        assert job["status"] == JobStatus.COMPLETED
+        assert job["result"] == {"parts": 3}
+        assert job["partial_results"] == [{"index": 0}, {"index": 1}, {"index": 2}]
+        assert job["progress"] == {"parts": 3}
+        assert job["progress_percent"] == 100.0
+        assert job["attempts"] == 1
+
+    def test_failure_is_recorded(self, manager):
+        job, _ = manager.submit("test.explode", {})
+        job = wait_for(manager, job["id"])
+        assert job["status"] == JobStatus.FAILED
+        assert job["error"] == "boom"
+
+    def test_unknown_kind_is_rejected(self, manager):
+        with pytest.raises(ValueError):
+            manager.submit("test.nothing", {})
+
+    def test_secret_params_are_not_persisted(self, manager, test_db):
+        with pytest.raises(ValueError):
+            manager.submit("test.remote", {"text": "hi"})
+
+        job, _ = manager.submit("test.remote", {"api_key": "sk-secret", "text": "hi"})
+        job = wait_for(manager, job["id"])
+        assert job["result"] == {"key_length": 9, "text": "hi"}
+        assert job["params"] == {"text": "hi"}
+        assert "sk-secret" not in repr(test_db.get(Job, job["id"]).params)
+
+
+class TestDeduplication:
+    """Identical in-flight jobs are submitted once"""
+
+    def test_identical_in_flight_job_is_returned(self, manager, gate):
+        first, created = manager.submit("test.gate", {"name": "a", "extra": 1}, user_id="u1")
+        again, created_again = manager.submit("test.gate", {"name": "a", "extra": 2}, user_id="u1")
+        other_user, created_other = manager.submit("test.gate", {"name": "a"}, user_id="u2")
+
+        assert created and not created_again and created_other
+        assert again["id"] == first["id"]
+        assert other_user["id"] != first["id"]
+        assert manager.find_active("test.gate", {"name": "a"}, "u1")["id"] == first["id"]
+        assert manager.get_stats()["deduplicated"] == 1
+
+    def test_finished_jobs_are_not_reused(self, manager):
+        first, _ = manager.submit("test.stream", {"count": 1})
+        wait_for(manager, first["id"])
+        second, created = manager.submit("test.stream", {"count": 1})
+        assert created and second["id"] != first["id"]
+
+
+class TestConcurrencyLimits:
+    """Workers and per-user limits bound what runs at once"""
+
+    def test_per_user_limit_queues_later_jobs(self, manager, gate):
+        first, _ = manager.submit("test.gate", {"name": "a"}, user_id="u1")
+        second, _ = manager.submit("test.gate", {"name": "b"}, user_id="u1")
+        other, _ = manager.submit("test.gate", {"name": "c"}, user_id="u2")
+
+        wait_for(manager, first["id"], statuses=(JobStatus.RUNNING,))
+        wait_for(manager, other["id"], statuses=(JobStatus.RUNNING,))
+        assert manager.get(second["id"])["status"] == JobStatus.QUEUED
+
+        gate.release.set()
+        assert wait_for(manager, second["id"])["status"] == JobStatus.COMPLETED
+
+    def test_jobs_without_a_user_share_one_limit(self, manager, gate):
+        first, _ = manager.submit("test.gate", {"name": "a"})
+        second, _ = manager.submit("test.gate", {"name": "b"})
+
+        wait_for(manager, first["id"], statuses=(JobStatus.RUNNING,))
+        assert manager.get(second["id"])["status"] == JobStatus.QUEUED
+
+        gate.release.set()
+        assert wait_for(manager, second["id"])["status"] == JobStatus.COMPLETED
+
+    def test_worker_limit(self, manager, gate):
+        ids = [manager.submit("test.gate", {"name": str(i)}, user_id=f"u{i}")[0]["id"] for i in range(3)]
+        wait_for(manager, ids[1], statuses=(JobStatus.RUNNING,))
+        assert manager.get(ids[2])["status"] == JobStatus.QUEUED
+        assert manager.get_stats()["running"] == 2
+
+
+class TestCancellation:
+    """Queued jobs are dropped; running jobs stop at their next report"""
+
+    def test_cancel_queued_job(self, manager, gate):
+        running, _ = manager.submit("test.gate", {"name": "a"}, user_id="u1")
+        queued, _ = manager.submit("test.gate", {"name": "b"}, user_id="u1")
+
+        assert manager.cancel(queued["id"])["status"] == JobStatus.CANCELLED
+        gate.release.set()
+        wait_for(manager, running["id"])
+        assert manager.get(queued["id"])["attempts"] == 0
+
+    def test_cancel_running_job(self, manager, gate):
+        job, _ = manager.submit("test.gate", {"name": "a"})
+        assert gate.started.wait(5)
+
+        assert manager.cancel(job["id"])["cancel_requested"] is True
+        job = wait_for(manager, job["id"])
+        assert job["status"] == JobStatus.CANCELLED
+
+    def test_cancel_unknown_job(self, manager):
+        assert manager.cancel(str(uuid.uuid4())) is None
+
+
+class TestRestartRecovery:
+    """Jobs interrupted by a restart resume on the next start"""
+
+    def test_interrupted_jobs_are_requeued(self, session_factory, test_db, gate):
+        handlers = {"test.gate": JobHandler("test.gate", gate)}
+        manager = JobManager(session_factory=session_factory, handlers=handlers)
+        manager.start()
+        job, _ = manager.submit("test.gate", {"name": "a"})
+        assert gate.started.wait(5)
+        manager.shutdown()
+
+        test_db.expire_all()
+        assert test_db.get(Job, job["id"]).status == JobStatus.RUNNING
+
+        restarted = JobManager(session_factory=session_factory, handlers=handlers)
+        restarted.start()
+        gate.release.set()
+        job = wait_for(restarted, job["id"])
+        restarted.shutdown()
+        assert job["status"] == JobStatus.COMPLETED
+        assert job["attempts"] == 2
+        assert restarted.get_stats()["recovered"] == 1
+
+    def test_recovery_fails_unresumable_jobs(self, session_factory, test_db, gate):
+        handlers = {
+            "test.gate": JobHandler("test.gate", gate),
+            "test.remote": JobHandler("test.remote", gate, secret_params=("api_key",)),
+        }
+        rows = [
+            Job(kind="test.remote", dedup_key="a", params={}, status=JobStatus.QUEUED),
+            Job(kind="test.gone", dedup_key="b", params={}, status=JobStatus.RUNNING),
+            Job(kind="test.gate", dedup_key="c", params={}, status=JobStatus.RUNNING, attempts=3),
+            Job(kind="test.gate", dedup_key="d", params={}, status=JobStatus.RUNNING, cancel_requested=1),
+        ]
+        test_db.add_all(rows)
+        test_db.commit()
+        ids = [row.id for row in rows]
+
+        manager = JobManager(session_factory=session_factory, max_attempts=3, handlers=handlers)
+        manager.start()
+        jobs = [manager.get(job_id) for job_id in ids]
+        manager.shutdown()
+
+        assert [job["status"] for job in jobs] == [
+            JobStatus.FAILED, JobStatus.FAILED, JobStatus.FAILED, JobStatus.CANCELLED,
+        ]
+        assert "submit the job again" in jobs[0]["error"]
+        assert not gate.started.is_set()
+
+
+class TestSubscriptions:
+    """Subscribers get a snapshot, then every update until the job ends"""
+
+    def test_events_stream_until_finished(self, manager, gate):
+        async def collect():
+            job, _ = manager.submit("test.gate", {"name": "a"})
+            subscription = await manager.subscribe(job["id"])
+            events = []
+            async for event in subscription:
+                events.append(event)
+                if event["type"] == "progress":
+                    gate.release.set()
+            return events
+
+        events = asyncio.run(asyncio.wait_for(collect(), 5))
+        types = [event["type"] for event in events]
+        assert types[0] == "snapshot"
+        assert "progress" in types
+        assert events[-1]["type"] == "status"
+        assert events[-1]["job"]["status"] == JobStatus.COMPLETED
+
+    def test_events_published_while_the_snapshot_loads_follow_it(self, manager, gate, monkeypatch):
+        job, _ = manager.submit("test.gate", {"name": "a"})
+        wait_for(manager, job["id"], statuses=(JobStatus.RUNNING,))
+        real_get = manager.get
+
+        def get_after_an_update(job_id):
+            manager._publish(job_id, {"type": "progress", "late": True})
+            return real_get(job_id)
+
+        monkeypatch.setattr(manager, "get", get_after_an_update)
+
+        async def collect():
+            events = []
+            async for event in await manager.subscribe(job["id"]):
+                events.append(event)
+                gate.release.set()
+            return events
+
+        events = asyncio.run(asyncio.wait_for(collect(), 5))
+        assert [event["type"] for event in events][:2] == ["snapshot", "progress"]
+        assert events[1].get("late")
+        assert events[-1]["job"]["status"] == JobStatus.COMPLETED
+        assert manager.get_stats()["subscriptions"] == 0
+
+    def test_finished_job_stream_is_just_the_snapshot(self, manager):
+        job, _ = manager.submit("test.stream", {"count": 1})
+        wait_for(manager, job["id"])
+
+        async def collect():
+            return [event async for event in await manager.subscribe(job["id"])]
+
+        [event] = asyncio.run(collect())
+        assert event["type"] == "snapshot"
+        assert event["job"]["result"] == {"parts": 1}
+
+
+class TestJobRoutes:
+    """The job API"""
+
+    @pytest.fixture
+    def routed(self, client, manager, monkeypatch):
+        monkeypatch.setattr(jobs_routes, "job_manager", manager)
+        monkeypatch.setattr(jobs_routes, "JOB_HANDLERS", manager.handlers)
+        return client
+
+    def test_submit_poll_and_list(self, routed, manager):
+        response = routed.post("/api/jobs", json={"kind": "test.stream", "params": {"count": 2}, "user_id": "u1"})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["success"] and body["deduplicated"] is False
+
+        wait_for(manager, body["job_id"])
+        job = routed.get(f"/api/jobs/{body['job_id']}").json()["data"]
+        assert job["result"] == {"parts": 2}
+
+        listed = routed.get("/api/jobs", params={"user_id": "u1"}).json()["data"]
+        assert [j["id"] for j in listed] == [body["job_id"]]
+        assert "result" not in listed[0]
+
+    def test_unknown_kind_and_job(self, routed):
+        assert routed.post("/api/jobs", json={"kind": "test.nothing"}).status_code == 400
+        assert routed.get(f"/api/jobs/{uuid.uuid4()}").status_code == 404
+        assert routed.post(f"/api/jobs/{uuid.uuid4()}/cancel").status_code == 404
+
+    def test_kinds_hide_nothing_but_list_secrets(self, routed):
+        kinds = {k["kind"]: k for k in routed.get("/api/jobs/kinds").json()["data"]}
+        assert kinds["test.remote"]["secret_params"] == ["api_key"]
+
+    def test_event_stream(self, routed, manager):
+        job, _ = manager.submit("test.stream", {"count": 2})
+        wait_for(manager, job["id"])
+
+        response = routed.get(f"/api/jobs/{job['id']}/events")
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert response.text.startswith("event: snapshot\n")
+
+    def test_websocket_cancel(self, routed, manager, gate):
+        job, _ = manager.submit("test.gate", {"name": "a"})
+        assert gate.started.wait(5)
+
+        with routed.websocket_connect(f"/api/jobs/{job['id']}/ws") as websocket:
+            assert websocket.receive_json()["type"] == "snapshot"
+            websocket.send_json({"type": "cancel"})
+            while True:
+                event = websocket.receive_json()
+                if event["type"] == "status":
+                    break
+        assert event["job"]["status"] == JobStatus.CANCELLED
+
+
+class TestScanTaskRegistry:
+    """Wiki scans are jobs viewed as ScanTasks"""
+
+    def test_one_scan_per_world(self, session_factory, gate):
+        def scan(ctx, world_id, manuscript_id=None):
+            ctx.report(total_manuscripts=1, current_manuscript_title="Book", total_changes=0)
+            gate(ctx)
+            return {"total_changes": 4}
+
+        handlers = {WIKI_SCAN_JOB: JobHandler(WIKI_SCAN_JOB, scan, dedup_params=("world_id",))}
+        manager = JobManager(session_factory=session_factory, handlers=handlers)
+        manager.start()
+        registry = ScanTaskRegistry(manager)
+        try:
+            task = registry.start_scan("w1", "m1")
+            assert registry.start_scan("w1").id == task.id
+            assert gate.started.wait(5)
+
+            active = registry.get_active_task_for_world("w1")
+            assert active.id == task.id and active.status == "running"
+            assert active.world_id == "w1"
+            assert registry.get_active_task_for_world("w2") is None
+
+            gate.release.set()
+            wait_for(manager, task.id)
+            done = registry.get_task(task.id)
+            assert done.status == "completed"
+            assert done.total_changes == 4
+            assert done.total_manuscripts == 1
+            assert done.current_manuscript_title == "Book"
+            assert registry.get_active_task_for_world("w1") is None
+        finally:
+            manager.shutdown()
+
+    def test_cancelled_scan_reads_as_failed(self, session_factory, gate):
+        handlers = {WIKI_SCAN_JOB: JobHandler(WIKI_SCAN_JOB, gate, dedup_params=("world_id",))}
+        manager = JobManager(session_factory=session_factory, handlers=handlers)
+        registry = ScanTaskRegistry(manager)
+        task = registry.start_scan("w1")  # Not started: stays queued
+        manager.cancel(task.id)
+
+        cancelled = registry.get_task(task.id)
+        assert cancelled.status == "failed"
+        assert cancelled.error == "Scan cancelled"
+        assert registry.get_task(str(uuid.uuid4())) is None
@@ -0,0 +1,108 @@
+"""
+Tests for single-pass Lexical processing (parse_lexical) and its memoization.
+"""
+
+import json
+
+import pytest
+
+from app.services import lexical_utils
+from app.services.lexical_utils import (
+    FORMAT_BOLD,
+    FORMAT_ITALIC,
+    LexicalDocumentCache,
+    extract_text_from_lexical,
+    lexical_to_rich_paragraphs,
+    parse_lexical,
+)
+
+
+def text_node(text, fmt=0):
+    return {"type": "text", "text": text, "format": fmt}
+
+
+def state(*blocks):
+    return json.dumps({"root": {"type": "root", "children": list(blocks)}})
+
+
+SAMPLE = state(
+    {"type": "heading", "tag": "h2", "children": [text_node("Chapter One")]},
+    {"type": "paragraph", "children": [text_node("It was "), text_node("dark", FORMAT_BOLD), text_node(".")]},
+    {"type": "quote", "children": [text_node("A quoted line")]},
+    {"type": "paragraph", "children": [
+        {"type": "link", "children": [text_node("Linked words", FORMAT_ITALIC)]},
+        text_node(" follow."),
+    ]},
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(lexical_utils, "lexical_document_cache", LexicalDocumentCache(max_entries=8))
+
+
+class TestParseLexical:
+    """One walk produces text, paragraphs, offsets and word counts"""
+
+    def test_text_and_word_count(self):
+        document = parse_lexical(SAMPLE)
+        assert document.valid
+        assert document.text == "Chapter One\nIt was dark.\nA quoted lineLinked words follow."
+        assert document.word_count == 10
+
+    def test_rich_paragraphs_keep_formatting_and_headings(self):
+        paragraphs = parse_lexical(SAMPLE).paragraphs
+        assert [p.heading_level for p in paragraphs] == [2, 0, 0]
+        assert [run.bold for run in paragraphs[1].runs] == [False, True, False]
+        assert paragraphs[2].runs[0].italic
+        # Quotes contribute text but aren't top-level paragraphs
+        assert all("quoted" not in p.get_plain_text() for p in paragraphs)
+
+    def test_paragraph_offsets_index_into_text(self):
+        document = parse_lexical(SAMPLE)
+        for (start, end), paragraph in zip(document.paragraph_offsets, document.paragraphs):
+            assert document.text[start:end] == paragraph.get_plain_text()
+        assert document.paragraph_word_counts == [2, 3, 3]
+
+    def test_deep_nesting_does_not_recurse(self):
+        node = text_node("deep")
+        for _ in range(5000):
+            node = {"type": "paragraph", "children": [node]}
+        document = parse_lexical({"root": {"type": "root", "children": [node]}})
+        assert document.text == "deep"
+        assert len(document.paragraphs) == 1
+
+    def test_nested_root_paragraphs(self):
+        nested = {"type": "root", "children": [{"type": "paragraph", "children": [text_node("Inner")]}]}
+        assert [p.get_plain_text() for p in lexical_to_rich_paragraphs(state(nested))] == ["Inner"]
+
+    def test_invalid_and_empty_input(self):
+        assert parse_lexical("not valid json").valid is False
+        assert parse_lexical("[1, 2]").valid is False
+        assert parse_lexical("").text == ""
+        assert parse_lexical(None).word_count == 0
+        assert extract_text_from_lexical("{}") == ""
+
+    def test_accepts_parsed_dict(self):
+        assert parse_lexical(json.loads(SAMPLE)).text == parse_lexical(SAMPLE).text
+
+
+class TestLexicalMemoization:
+    """Repeated consumers of the same state share one parse"""
+
+    def test_same_content_is_walked_once(self, monkeypatch):
+        calls = []
+        walk = lexical_utils._walk_lexical
+        monkeypatch.setattr(lexical_utils, "_walk_lexical", lambda s: calls.append(1) or walk(s))
+
+        assert extract_text_from_lexical(SAMPLE)
+        assert lexical_to_rich_paragraphs(SAMPLE)
+        assert parse_lexical(SAMPLE).word_count == 10
+        assert len(calls) == 1
+        assert lexical_utils.lexical_document_cache.get_stats()["hits"] == 2
+
+    def test_least_recently_used_documents_are_dropped(self):
+        cache = lexical_utils.lexical_document_cache
+        for i in range(10):
+            parse_lexical(state({"type": "paragraph", "children": [text_node(f"Doc {i}")]}))
+        assert cache.get_stats()["entries"] == 8
@@ -0,0 +1,145 @@
+"""
+Tests for compiled pattern banks and the services that score with them.
+"""
+
+import re
+
+import pytest
+
+from app.services.pattern_bank import PatternBank, benchmark, per_pattern_counts, required_literals
+from app.services.emotional_beat_service import BEAT_BANK, EmotionalBeat
+from app.services.foreshadowing_detector_service import ForeshadowingDetectorService
+from app.services.pacing_optimizer_service import PACING_BANK, PacingOptimizerService
+from app.services.pov_consistency_service import POV_MARKER_BANK, POVConsistencyService
+
+TEXTS = [
+    "",
+    "Mara ran. She RAN again, running; the fearful fear of fearless men. Hopeless hope!",
+    "The ancient city was dark. Her heart pounded and she couldn't breathe?! Blood, death... \"Who?\" he asked.",
+    "Little did he know the truth. He thought she knew; she felt it. Meanwhile, elsewhere the storm raged!!",
+    "Unicode: ſecret ıntrigue Kelvin K, Straße İstanbul, déjà vu — “I” said the oracle. I me my we us our.",
+    "won't won wonder won't-won; love loved loving lover. tears? tear! cried crying.",
+]
+
+TABLE = {
+    "word": [r"fear(?:ful)?", r"\bran\b", r"hope", (r"\b(?:love|loved)\b", 3), r"won\b"],
+    "phrase": [r"heart\s+pounded", r"\bthe\s+\w+\s+was\s+\w+\b", r"[!?]{2,}", r"couldn\'t\s+breathe"],
+    "marker": [r"(he|she)\s+(thought|knew|felt)", r"\bI\b", r"s[eé]cret"],
+}
+
+
+class TestPatternBank:
+    """Counts match a per-pattern re.findall scan"""
+
+    @pytest.mark.parametrize("flags", [0, re.IGNORECASE])
+    def test_counts_match_findall(self, flags):
+        bank = PatternBank(TABLE, flags)
+        for text in TEXTS:
+            for candidate in (text, text.lower()):
+                assert bank.pattern_counts(candidate) == per_pattern_counts(bank, candidate)
+
+    def test_splits_word_and_phrase_patterns(self):
+        bank = PatternBank(TABLE)
+        word = {p.pattern for p in bank.patterns if p.is_word}
+        assert word == {r"fear(?:ful)?", r"\bran\b", r"hope", r"\b(?:love|loved)\b", r"won\b", r"\bI\b"}
+        # Zero-length matches can't be counted per word
+        assert not PatternBank({"x": [r"(?:a)?"]}).patterns[0].is_word
+
+    def test_counts_and_weighted_scores_by_category(self):
+        bank = PatternBank(TABLE, re.IGNORECASE)
+        text = "Love, loved. Fear! Fearful?? She thought."
+        assert bank.counts(text) == {"word": 4, "phrase": 1, "marker": 1}
+        assert bank.scores(text) == {"word": 8, "phrase": 1, "marker": 1}
+        assert list(bank.counts("fear. she knew")) == ["word", "marker"]
+
+    def test_words_are_scored_once(self):
+        bank = PatternBank(TABLE)
+        bank.pattern_counts("fear fear hope and fear")
+        bank.pattern_counts("hope again")
+        stats = bank.get_stats()
+        assert stats["words_scored"] == 4  # fear, hope, and, again
+        assert stats["words_reused"] == 1
+
+    def test_word_cache_is_bounded(self):
+        bank = PatternBank(TABLE, word_cache_size=3)
+        bank.pattern_counts("one two three four five fear")
+        assert bank.get_stats()["cached_words"] <= 3
+        assert bank.pattern_counts("fear") == per_pattern_counts(bank, "fear")
+
+    def test_finditer_in_table_order_and_filtered(self):
+        bank = PatternBank(TABLE, re.IGNORECASE)
+        text = "She knew. Fear ran. I ran!!"
+        found = [(p.pattern, m.group()) for p, m in bank.finditer(text)]
+        assert found[:3] == [(r"fear(?:ful)?", "Fear"), (r"\bran\b", "ran"), (r"\bran\b", "ran")]
+        assert {p.category for p, _ in bank.finditer(text, ["marker"])} == {"marker"}
+
+
+class TestRequiredLiterals:
+    """Literals every match must contain, used to skip phrase scans"""
+
+    @pytest.mark.parametrize("pattern, expected", [
+        (r"(he|she)\s+thought", (("he", "she"), ("thought",))),
+        (r"little did (he|she) know", (("little did ",), ("he", "she"), (" know",))),
+        (r"couldn\'t\s+believe", (("couldn't",), ("believe",))),
+        (r"sobbed?", (("sobbe",),)),
+        (r"ab+cde", (("cde",),)),
+        (r"x{0,3}yyy", (("yyy",),)),
+        (r"(?:world|land)?\s+end", (("end",),)),
+        (r"[!?]{2,}", ()),
+        (r"danger|peril", ()),
+        (r"(?=foo)bar", (("bar",),)),
+    ])
+    def test_required_literals(self, pattern, expected):
+        assert required_literals(pattern) == expected
+
+    def test_missing_literal_skips_scan_without_changing_counts(self):
+        bank = PatternBank({"x": [r"(he|she)\s+thought"]}, re.IGNORECASE)
+        assert bank.pattern_counts("HE  THOUGHT") == [1]
+        assert bank.pattern_counts("he wondered") == [0]
+        # Non-ASCII text is never prefiltered case-insensitively
+        assert bank.pattern_counts("ſhe thought") == per_pattern_counts(bank, "ſhe thought")
+
+
+class TestServiceBanks:
+    """Services score through their banks with unchanged results"""
+
+    def test_pacing_metrics_from_one_pass(self):
+        service = PacingOptimizerService(None)
+        text = TEXTS[2] * 5
+        signals = PACING_BANK.scores(text)
+        assert service._estimate_tension_level(text) == service._estimate_tension_level(text, signals)
+        assert signals["tension"] > 0 and signals["description"] > 0
+
+    def test_emotional_beats_scores(self):
+        scores = BEAT_BANK.counts("she was afraid and full of dread, then she laughed and laughed")
+        assert scores[EmotionalBeat.FEAR_TENSION] == 2
+        assert scores[EmotionalBeat.HUMOR_LEVITY] == 2
+
+    def test_pov_markers(self):
+        result = POVConsistencyService(None).detect_pov_type(
+            "I walked home. My feet hurt and I knew we were late. I sat with my mother."
+        )
+        assert result["pov_type"] == "first_person"
+        assert POV_MARKER_BANK.get_stats()["patterns"] == 28
+
+    def test_foreshadowing_setups(self):
+        class FakeChapter:
+            id = "c1"
+            title = None
+            order_index = 3
+            content = "She noticed the old pistol on the mantel. The prophecy foretold his fall. Once again, silence."
+
+        setups = ForeshadowingDetectorService(None)._detect_setups(FakeChapter())
+        assert [s.setup_type for s in setups] == ["CHEKHOV_GUN", "PROPHECY", "PROPHECY", "PARALLEL"]
+        assert setups[0].chapter_title == "Chapter 3"
+        assert setups[1].suggestion == ForeshadowingDetectorService.SETUP_SUGGESTIONS["PROPHECY"]
+
+
+@pytest.mark.slow
+class TestBenchmark:
+    """python -m app.services.pattern_bank"""
+
+    def test_benchmark_runs_for_every_service(self):
+        results = benchmark(chapters=2, words_per_chapter=300, repeat=1)
+        assert set(results) == {"pacing", "emotional_beats", "scene_purpose", "subplots", "pov", "foreshadowing"}
+        assert all(result["warm_ms"] >= 0 for result in results.values())
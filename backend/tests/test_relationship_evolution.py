@@ -0,0 +1,124 @@
+"""
+Tests for single-pass relationship evolution tracking.
+"""
+
+import uuid
+
+import pytest
+
+from app.models.entity import Entity
+from app.models.manuscript import Manuscript, Chapter
+from app.services.relationship_evolution_service import CharacterMatcher, RelationshipEvolutionService
+
+CHAPTER_TEXTS = [
+    "Anna met Sam at the market. Joanna watched them, a stranger to both.",
+    "Anna and Sam became friends. They trusted him with everything.",
+    "Samwise walked alone. Joanna hated the quiet; her rival had left town.",
+    "Anna and Sam broke up after he betrayed her. She couldn't forgive him.",
+    "Ann married Bo in the spring. Their wedding was small.",
+]
+
+
+class FakeChapter:
+    def __init__(self, index, content):
+        self.id = f"c{index}"
+        self.title = f"Chapter {index + 1}"
+        self.order_index = index
+        self.content = content
+
+
+class TestCharacterMatcher:
+    """Every character's mentions from one scan"""
+
+    def test_counts_overlapping_names(self):
+        matcher = CharacterMatcher(["Ann", "Anna", "Joanna", "Sam"])
+        mentions = matcher.mentions("joanna and anna met sam; samwise and ann left.")
+        # "ann" inside "anna" (twice) and "joanna", "sam" inside "samwise"
+        assert mentions.tolist() == [3, 2, 1, 2]
+
+    def test_aliases_count_as_mentions(self):
+        matcher = CharacterMatcher(["Samwise", "Frodo"], {"Samwise": ["Sam", "Samwise"], "Frodo": [None, ""]})
+        assert matcher.mentions("sam and samwise; frodo").tolist() == [2, 1]
+
+    def test_pair_index(self):
+        matcher = CharacterMatcher(["A", "B", "A", "C"])
+        assert matcher.names == ["A", "B", "C"]
+        assert matcher.pair_index([("C", "A", True), ("A", "B", False)]).tolist() == [[2, 0], [0, 1]]
+        assert matcher.pair_index([]).shape == (0, 2)
+
+
+class TestPairEvolutions:
+    """Timelines from the mention matrix match per-pair detection"""
+
+    def test_matches_per_pair_detection(self):
+        service = RelationshipEvolutionService(None)
+        chapters = [FakeChapter(i, text) for i, text in enumerate(CHAPTER_TEXTS)]
+        names = ["Anna", "Sam", "Joanna", "Ann", "Bo"]
+        pairs = [(a, b) for i, a in enumerate(names) for b in names[i:]]
+        matcher = service.character_matcher(pairs)
+        index = matcher.pair_index(pairs)
+
+        evolutions = service.pair_evolutions("m", pairs, matcher, [
+            (chapter, service.chapter_signals(chapter.content, matcher, index)) for chapter in chapters
+        ])
+
+        for (char_a, char_b), evolution in zip(pairs, evolutions):
+            expected = service.summarize_evolution("m", char_a, char_b, [
+                (chapter, service.detect_relationship_state(chapter.content, char_a, char_b))
+                for chapter in chapters
+            ])
+            assert {k: v for k, v in evolution.items() if k not in ("chapters_together", "shared_mentions")} == expected
+
+        anna_sam = evolutions[pairs.index(("Anna", "Sam"))]
+        assert anna_sam["chapters_together"] == 4  # "Joanna" and "Samwise" in chapter 3
+        assert [change["to_state"] for change in anna_sam["state_changes"]][:2] == ["neutral", "friends"]
+
+    def test_state_scored_only_when_a_pair_is_together(self):
+        service = RelationshipEvolutionService(None)
+        matcher = service.character_matcher([("Anna", "Bo")])
+        index = matcher.pair_index([("Anna", "Bo")])
+        assert service.chapter_signals(CHAPTER_TEXTS[1], matcher, index) == {"mentions": [1, 0], "detection": None}
+        assert service.chapter_signals("Anna and Bo", matcher, index)["detection"]["detected_state"] == "neutral"
+
+    def test_matcher_is_reused(self):
+        service = RelationshipEvolutionService(None)
+        matcher = service.character_matcher([("Anna", "Sam", True)], {"Sam": ["Samwise"]})
+        assert service.character_matcher([("Anna", "Sam", False)], {"Sam": ["Samwise"]}) is matcher
+        assert service.character_matcher([("Anna", "Sam", False)]) is not matcher
+
+
+@pytest.fixture
+def aliased_book(test_db):
+    manuscript = Manuscript(id=str(uuid.uuid4()), title="Shire", word_count=0)
+    test_db.add(manuscript)
+    for i, text in enumerate(["Frodo and Samwise became friends.", "Frodo hated Sam; Sam was his enemy now."]):
+        test_db.add(Chapter(
+            id=str(uuid.uuid4()), manuscript_id=manuscript.id, title=f"Chapter {i + 1}",
+            order_index=i, document_type="CHAPTER", content=text,
+        ))
+    test_db.add_all([
+        Entity(manuscript_id=manuscript.id, type="CHARACTER", name="Frodo"),
+        Entity(manuscript_id=manuscript.id, type="CHARACTER", name="Samwise", aliases=["Sam"]),
+    ])
+    test_db.commit()
+    return manuscript
+
+
+class TestManuscriptRelationships:
+    """Manuscript-wide analysis uses character aliases"""
+
+    def test_aliases_place_characters_in_chapters(self, test_db, aliased_book):
+        service = RelationshipEvolutionService(test_db)
+        assert service.character_aliases(aliased_book.id, ["Frodo", "Samwise"]) == {"Samwise": ["Sam"]}
+
+        report = service.analyze_all_relationships(aliased_book.id)
+        evolution = report["relationships"][0]
+        assert evolution["chapters_together"] == 2
+        assert [change["to_state"] for change in evolution["state_changes"]] == ["friends", "enemies"]
+
+    def test_track_single_pair(self, test_db, aliased_book):
+        evolution = RelationshipEvolutionService(test_db).track_relationship_evolution(
+            aliased_book.id, "Frodo", "Samwise"
+        )
+        assert evolution["ending_state"] == "enemies"
+        assert evolution["shared_mentions"] == 2
@@ -0,0 +1,163 @@
+"""
+Tests for the Scrivener import service reading zipped projects in place.
+"""
+
+import zipfile
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.models.entity import Entity
+from app.models.manuscript import Manuscript, Chapter
+from app.services.import_workers import ImportWorkerPool
+from app.services.scrivener_import_service import ScrivenerImportService, basic_rtf_strip
+
+SCRIVX = """<?xml version="1.0" encoding="UTF-8"?>
+<ScrivenerProject Version="2.0">
+  <Binder>
+    <BinderItem UUID="DRAFT" Type="DraftFolder">
+      <Title>Draft</Title>
+      <Children>
+        <BinderItem UUID="CH1" Type="Text"><Title>Chapter One</Title></BinderItem>
+        <BinderItem UUID="CH2" Type="Text"><Title>Chapter Two</Title></BinderItem>
+      </Children>
+    </BinderItem>
+    <BinderItem UUID="CHARS" Type="Folder">
+      <Title>Characters</Title>
+      <Children>
+        <BinderItem UUID="ALICE" Type="Text"><Title>Alice</Title></BinderItem>
+      </Children>
+    </BinderItem>
+  </Binder>
+</ScrivenerProject>
+"""
+
+
+def make_project_zip(path):
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("Novel.scriv/Novel.scrivx", SCRIVX)
+        archive.writestr("Novel.scriv/Files/Data/CH1/content.rtf", r"{\rtf1\ansi The storm broke at dawn.}")
+        archive.writestr("Novel.scriv/Files/Data/CH1/synopsis.txt", "Storm opening\n")
+        archive.writestr("Novel.scriv/Files/Data/CH2/content.txt", "Plain text chapter.")
+        archive.writestr("Novel.scriv/Files/Data/ALICE/content.rtf", r"{\rtf1\ansi A brave sailor.}")
+        archive.writestr("__MACOSX/Novel.scriv/._Novel.scrivx", "junk")
+
+
+@pytest.fixture
+def service():
+    service = ScrivenerImportService(pool=ImportWorkerPool(processes=0))
+    yield service
+    service.pool.shutdown()
+
+
+class TestScrivenerZip:
+    """Parsing a zipped .scriv project without extracting it"""
+
+    @pytest.mark.asyncio
+    async def test_reads_members_directly(self, service, tmp_path, monkeypatch):
+        path = tmp_path / "novel.zip"
+        make_project_zip(path)
+        # Nothing may be extracted
+        monkeypatch.setattr(zipfile.ZipFile, "extractall", lambda *a, **k: pytest.fail("extractall called"))
+        updates = []
+
+        project = await service.parse_scrivener_project(
+            str(path), progress=lambda done, total, stage: updates.append((done, total))
+        )
+
+        assert project.title == "Novel"
+        assert project.draft_folder_uuid == "DRAFT"
+        assert project.characters_folder_uuid == "CHARS"
+        assert project.documents["CH1"].content_plain.strip() == "The storm broke at dawn."
+        assert project.documents["CH1"].synopsis == "Storm opening"
+        assert project.documents["CH2"].content_plain == "Plain text chapter."
+        assert project.documents["DRAFT"].content_plain is None
+        assert updates[0] == (0, 3) and updates[-1] == (3, 3)
+
+    @pytest.mark.asyncio
+    async def test_batches_documents(self, service, tmp_path, monkeypatch):
+        path = tmp_path / "novel.zip"
+        make_project_zip(path)
+        monkeypatch.setattr("app.services.scrivener_import_service.DOCUMENTS_PER_TASK", 1)
+        calls = []
+        run = service.pool.run
+
+        async def counting_run(fn, *args):
+            calls.append(args[-1])
+            return await run(fn, *args)
+
+        service.pool.run = counting_run
+        project = await service.parse_scrivener_project(str(path))
+
+        assert sorted(len(batch) for batch in calls) == [1, 1, 1]
+        preview = service.get_preview(project)
+        assert preview["draft"]["documents"] == 2
+
+    @pytest.mark.asyncio
+    async def test_missing_scriv_folder(self, service, tmp_path):
+        path = tmp_path / "empty.zip"
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr("readme.txt", "no project here")
+
+        with pytest.raises(ValueError, match="No .scriv folder"):
+            await service.parse_scrivener_project(str(path))
+
+    @pytest.mark.asyncio
+    async def test_invalid_zip(self, service, tmp_path):
+        path = tmp_path / "broken.zip"
+        path.write_bytes(b"not a zip")
+
+        with pytest.raises(ValueError, match="Invalid zip"):
+            await service.parse_scrivener_project(str(path))
+
+    @pytest.mark.asyncio
+    async def test_unzipped_folder(self, service, tmp_path):
+        path = tmp_path / "novel.zip"
+        make_project_zip(path)
+        with zipfile.ZipFile(path) as archive:
+            archive.extractall(tmp_path / "extracted")
+
+        project = await service.parse_scrivener_project(
+            str(tmp_path / "extracted" / "Novel.scriv"), is_zip=False
+        )
+
+        assert project.documents["CH2"].content_plain == "Plain text chapter."
+
+
+class TestScrivenerImportRoute:
+    """The background Scrivener import runs to a created manuscript"""
+
+    def test_async_import_creates_manuscript(self, client, test_db, service, tmp_path, monkeypatch):
+        from app.services.scrivener_import_service import scrivener_import_service
+
+        monkeypatch.setattr(scrivener_import_service, "pool", service.pool)
+        monkeypatch.setattr(
+            "app.api.routes.import_routes.SessionLocal", sessionmaker(bind=test_db.get_bind())
+        )
+        path = tmp_path / "novel.zip"
+        make_project_zip(path)
+
+        response = client.post(
+            "/api/import/scrivener-async",
+            files={"file": ("novel.zip", path.read_bytes(), "application/zip")},
+        )
+        assert response.status_code == 200
+
+        # TestClient runs background tasks before returning
+        status = client.get(f"/api/import/tasks/{response.json()['task_id']}").json()
+        assert status["status"] == "completed", status.get("error")
+
+        manuscript = test_db.query(Manuscript).filter_by(id=status["manuscript_id"]).one()
+        assert manuscript.title == "Novel"
+        chapters = test_db.query(Chapter).filter_by(manuscript_id=manuscript.id).order_by(Chapter.order_index).all()
+        assert [c.title for c in chapters] == ["Chapter One", "Chapter Two"]
+        assert [c.order_index for c in chapters] == [0, 1]
+        assert chapters[1].word_count == 3
+        assert "Plain text chapter." in chapters[1].lexical_state
+        assert manuscript.word_count == sum(c.word_count for c in chapters)
+        [alice] = test_db.query(Entity).filter_by(manuscript_id=manuscript.id).all()
+        assert alice.name == "Alice"
+
+
+def test_basic_rtf_strip():
+    assert basic_rtf_strip(r"{\rtf1\ansi\b Bold\b0  text}") == "Bold text"
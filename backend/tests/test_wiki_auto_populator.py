@@ -0,0 +1,289 @@
+"""
+Tests for incremental wiki auto-population
+"""
+import pickle
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.models.manuscript import Manuscript, Chapter
+from app.models.wiki import WikiEntry, WikiChange, WikiChangeStatus, WikiChangeType, WikiEntryType
+from app.models.world import World, Series
+from app.services.wiki_auto_populator import (
+    WikiAutoPopulator,
+    proposal_keys,
+    split_paragraphs,
+)
+from app.services import world_scan
+from app.services.world_scan import WorldScanner
+
+TRAIT = "Mira has green eyes that caught the lantern light."
+HABIT = "Mira always hums when she is nervous about the crossing."
+RULE = "Magic requires a blood price paid before the sun rises."
+
+
+@pytest.fixture
+def populated_world(test_db):
+    world = World(id=str(uuid.uuid4()), name="Ashlands")
+    series = Series(id=str(uuid.uuid4()), world_id=world.id, name="Ash Saga")
+    manuscript = Manuscript(id=str(uuid.uuid4()), title="Book One", series_id=series.id, word_count=0)
+    mira = WikiEntry(
+        id=str(uuid.uuid4()), world_id=world.id, entry_type=WikiEntryType.CHARACTER.value,
+        title="Mira", slug="mira", structured_data={"physical": ["tall"]},
+    )
+    chapter = Chapter(
+        id=str(uuid.uuid4()), manuscript_id=manuscript.id, title="Chapter 1",
+        order_index=0, is_folder=0, content=f"The road was long.\n\n{TRAIT}\n\n{RULE}",
+    )
+    test_db.add_all([world, series, manuscript, mira, chapter])
+    test_db.commit()
+    return world, manuscript, chapter, mira
+
+
+def pending_changes(db, world_id):
+    return db.query(WikiChange).filter(
+        WikiChange.world_id == world_id,
+        WikiChange.status == WikiChangeStatus.PENDING.value
+    ).all()
+
+
+class TestProposalKeys:
+    """Proposals are compared by what they add, not how they were found"""
+
+    def test_create_keyed_by_title(self):
+        keys = proposal_keys(WikiChangeType.CREATE.value, proposed_entry={"title": " Mira "})
+        assert keys == {("create", "mira")}
+
+    def test_update_keyed_by_added_items(self):
+        old = {"relationships": [{"relationship_type": "friend", "related_to": "Tal", "context": "a"}]}
+        new = {"relationships": old["relationships"] + [
+            {"relationship_type": "enemy", "related_to": "Oren", "context": "first sighting"}
+        ]}
+        again = {"relationships": old["relationships"] + [
+            {"relationship_type": "enemy", "related_to": "Oren", "context": "a later scene"}
+        ]}
+        keys = proposal_keys(WikiChangeType.UPDATE.value, "entry", "structured_data", old, new)
+        assert len(keys) == 1
+        assert keys == proposal_keys(WikiChangeType.UPDATE.value, "entry", "structured_data", old, again)
+
+    def test_split_paragraphs_drops_blank_lines(self):
+        assert split_paragraphs("One.\n\n  \nTwo.\r\n") == ["One.", "Two."]
+
+
+class TestIncrementalPopulation:
+    """Only new and changed paragraphs are extracted"""
+
+    def test_unchanged_manuscript_does_no_work(self, test_db, populated_world):
+        world, manuscript, _, _ = populated_world
+
+        first = WikiAutoPopulator(test_db).analyze_manuscript(manuscript.id)
+        assert first["paragraphs_analyzed"] == 3
+        assert first["extractions"]["world_rules"] == 1
+        assert first["extractions"]["character_traits"] == 1
+
+        second = WikiAutoPopulator(test_db).analyze_manuscript(manuscript.id)
+        assert second["chapters_changed"] == 0
+        assert second["paragraphs_analyzed"] == 0
+        assert second["total_changes"] == 0
+        assert len(pending_changes(test_db, world.id)) == 2
+
+    def test_saving_a_chapter_extracts_only_the_edit(self, test_db, populated_world):
+        world, _, chapter, _ = populated_world
+        WikiAutoPopulator(test_db).analyze_chapter(chapter.id)
+
+        chapter.content += f"\n\n{HABIT}"
+        test_db.commit()
+        result = WikiAutoPopulator(test_db).on_chapter_save(chapter.id)
+
+        assert result["paragraphs_analyzed"] == 1
+        assert result["total_changes"] == 1
+        [habit] = [c for c in pending_changes(test_db, world.id) if "habit" in (c.new_value or {})]
+        assert habit.new_value["habit"] == ["hums when she is nervous about the crossing."]
+
+    def test_full_rescan_skips_pending_duplicates(self, test_db, populated_world):
+        world, manuscript, _, _ = populated_world
+        WikiAutoPopulator(test_db).analyze_manuscript(manuscript.id)
+
+        result = WikiAutoPopulator(test_db).analyze_manuscript(manuscript.id, full_rescan=True)
+
+        assert result["paragraphs_analyzed"] == 3
+        assert result["total_changes"] == 0
+        assert result["duplicates_skipped"] == 2
+        assert len(pending_changes(test_db, world.id)) == 2
+
+    def test_updates_to_one_entry_build_on_each_other(self, test_db, populated_world):
+        world, _, chapter, mira = populated_world
+        chapter.content = f"{TRAIT}\n\nMira has silver streaked hair, cut short."
+        test_db.commit()
+
+        WikiAutoPopulator(test_db).analyze_chapter(chapter.id)
+
+        first, second = sorted(
+            (c for c in pending_changes(test_db, world.id) if c.wiki_entry_id == mira.id),
+            key=lambda c: len(c.new_value["physical"])
+        )
+        assert first.old_value["physical"] == ["tall"]
+        assert first.new_value["physical"] == ["tall", "green"]
+        assert second.old_value == first.new_value
+        assert second.new_value["physical"] == ["tall", "green", "silver streaked"]
+        test_db.refresh(mira)
+        assert mira.structured_data == {"physical": ["tall"]}
+
+    def test_edited_out_source_withdraws_pending_change(self, test_db, populated_world):
+        world, _, chapter, _ = populated_world
+        WikiAutoPopulator(test_db).analyze_chapter(chapter.id)
+
+        chapter.content = f"The road was long.\n\n{TRAIT}"
+        test_db.commit()
+        result = WikiAutoPopulator(test_db).analyze_chapter(chapter.id)
+
+        assert result["changes_withdrawn"] == 1
+        assert result["paragraphs_analyzed"] == 0
+        [remaining] = pending_changes(test_db, world.id)
+        assert remaining.new_value["physical"] == ["tall", "green"]
+        rejected = test_db.query(WikiChange).filter(
+            WikiChange.status == WikiChangeStatus.REJECTED.value
+        ).one()
+        assert rejected.reviewer_note.startswith("Withdrawn")
+
+
+@pytest.fixture
+def second_book(test_db, populated_world):
+    """Another manuscript in the same world, repeating the first book's world rule"""
+    _, manuscript, _, _ = populated_world
+    book = Manuscript(id=str(uuid.uuid4()), title="Book Two", series_id=manuscript.series_id, word_count=0)
+    chapter = Chapter(
+        id=str(uuid.uuid4()), manuscript_id=book.id, title="Chapter 1",
+        order_index=0, is_folder=0, content=f"{RULE}\n\n{HABIT}",
+    )
+    test_db.add_all([book, chapter])
+    test_db.commit()
+    return book
+
+
+class TestPlanAndApply:
+    """Plans are computed without writing and applied one at a time"""
+
+    def test_planning_writes_nothing(self, test_db, populated_world):
+        world, manuscript, _, _ = populated_world
+
+        plan = WikiAutoPopulator(test_db).plan_manuscript(manuscript.id)
+
+        assert [name for name, _ in plan.proposals] == ["world_rules", "character_traits"]
+        assert pending_changes(test_db, world.id) == []
+        assert pickle.loads(pickle.dumps(plan)).proposals == plan.proposals
+
+    def test_plans_made_concurrently_do_not_duplicate(self, test_db, populated_world, second_book):
+        world, manuscript, _, _ = populated_world
+        first = WikiAutoPopulator(test_db).plan_manuscript(manuscript.id)
+        second = WikiAutoPopulator(test_db).plan_manuscript(second_book.id)
+
+        WikiAutoPopulator(test_db).apply_plan(first)
+        result = WikiAutoPopulator(test_db).apply_plan(second)
+
+        assert result["extractions"]["world_rules"] == 0
+        assert result["extractions"]["character_traits"] == 1
+        assert result["duplicates_skipped"] == 1
+        assert len(pending_changes(test_db, world.id)) == 3
+
+
+class TestWorldScan:
+    """Manuscripts are planned in parallel and applied serially"""
+
+    def test_in_process_scan_reports_stages(self, test_db, populated_world, second_book):
+        world, manuscript, _, _ = populated_world
+        reports = []
+
+        result = WorldScanner(processes=0).scan(
+            test_db, world.id, [manuscript, second_book], progress_callback=lambda **f: reports.append(f)
+        )
+
+        assert result["total_changes"] == 3
+        assert result["duplicates_skipped"] == 1
+        assert [r["stage"] for r in reports if r.get("stage", "").startswith("Extracting")][:1] == ["Extracting entities"]
+        assert reports[-1]["manuscripts_completed"] == 2
+
+    def test_sharded_scan_merges_progress(self, test_db, populated_world, second_book, monkeypatch):
+        world, manuscript, _, _ = populated_world
+        monkeypatch.setattr("app.database.SessionLocal", sessionmaker(bind=test_db.get_bind()))
+        first_applied = threading.Event()
+        real_plan = world_scan.plan_manuscript_scan
+
+        def plan_after_first_applied(world_id, manuscript_id, full_rescan):
+            if manuscript_id == second_book.id:
+                first_applied.wait(5)  # The test database is one connection; don't plan while applying
+            return real_plan(world_id, manuscript_id, full_rescan)
+
+        def record(**fields):
+            reports.append(fields)
+            if fields.get("manuscripts_completed") == 1:
+                first_applied.set()
+
+        monkeypatch.setattr(world_scan, "plan_manuscript_scan", plan_after_first_applied)
+        scanner = WorldScanner(processes=2)
+        scanner._executor = ThreadPoolExecutor(max_workers=1)
+        reports = []
+
+        try:
+            result = scanner.scan(test_db, world.id, [manuscript, second_book], progress_callback=record)
+        finally:
+            first_applied.set()
+            scanner.shutdown(wait=True)
+
+        assert result["total_changes"] == 3
+        assert result["duplicates_skipped"] == 1
+        assert len(pending_changes(test_db, world.id)) == 3
+        assert reports[0]["workers"] == 2
+        assert reports[0]["current_manuscript_title"] == "Book One, Book Two"
+        assert [r["manuscripts_completed"] for r in reports[1:3]] == [1, 2]
+        assert reports[-1]["current_manuscript_title"] == ""
+
+    def test_cancelled_scan_stops_submitting(self, test_db, populated_world, second_book, monkeypatch):
+        world, manuscript, _, _ = populated_world
+        monkeypatch.setattr("app.database.SessionLocal", sessionmaker(bind=test_db.get_bind()))
+        planned = []
+        real_plan = world_scan.plan_manuscript_scan
+        monkeypatch.setattr(world_scan, "plan_manuscript_scan", lambda *args: planned.append(args[1]) or real_plan(*args))
+        scanner = WorldScanner(processes=1)
+        scanner._executor = ThreadPoolExecutor(max_workers=1)
+
+        try:
+            with pytest.raises(RuntimeError):
+                scanner.scan(test_db, world.id, [manuscript, second_book], progress_callback=cancel_after_first)
+        finally:
+            scanner.shutdown(wait=True)
+
+        assert planned == [manuscript.id]
+        assert len(pending_changes(test_db, world.id)) == 2
+
+    def test_cancelled_scan_discards_running_plans(self, test_db, populated_world, second_book, monkeypatch):
+        world, manuscript, _, _ = populated_world
+        monkeypatch.setattr("app.database.SessionLocal", sessionmaker(bind=test_db.get_bind()))
+        cancelled = threading.Event()
+        real_plan = world_scan.plan_manuscript_scan
+
+        def plan_after_cancel(world_id, manuscript_id, full_rescan):
+            if manuscript_id == second_book.id:
+                cancelled.wait(5)  # Already running when the scan is cancelled
+            return real_plan(world_id, manuscript_id, full_rescan)
+
+        monkeypatch.setattr(world_scan, "plan_manuscript_scan", plan_after_cancel)
+        scanner = WorldScanner(processes=2)
+        scanner._executor = ThreadPoolExecutor(max_workers=1)
+
+        try:
+            with pytest.raises(RuntimeError):
+                scanner.scan(test_db, world.id, [manuscript, second_book], progress_callback=cancel_after_first)
+        finally:
+            cancelled.set()
+            scanner.shutdown(wait=True)
+
+        assert len(pending_changes(test_db, world.id)) == 2
+
+
+def cancel_after_first(**fields):
+    if fields.get("manuscripts_completed") == 1:
+        raise RuntimeError("cancelled")